@@ -0,0 +1,54 @@
+"""
+Benchmark long-audio transcription: one serial request vs concurrent chunks
+
+Runs against a stub Whisper whose latency grows with the audio length (a
+fixed overhead plus a real-time factor), so the comparison reflects how the
+work is split rather than network noise.
+
+Usage (from backend/):
+    python -m benchmarks.bench_long_audio [--minutes 10] [--parallel 4]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.rate_limit_scheduler import estimate_audio_seconds
+from utils.long_audio import LongAudioTranscriber
+from benchmarks.bench_stt_upload import make_wav
+
+# Stub upstream: 250 ms per request plus audio processed at 100x real time
+REQUEST_OVERHEAD_SECONDS = 0.25
+REALTIME_FACTOR = 100.0
+
+async def stub_transcribe(audio_data: bytes, format: str) -> str:
+    await asyncio.sleep(REQUEST_OVERHEAD_SECONDS + estimate_audio_seconds(audio_data) / REALTIME_FACTOR)
+    return "transcribed words"
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--minutes", type=float, default=10)
+    parser.add_argument("--parallel", type=int, default=4)
+    args = parser.parse_args()
+
+    audio_data = make_wav(args.minutes * 60, sample_rate=16000, channels=1)
+    print(f"{args.minutes:g} min 16 kHz mono WAV ({len(audio_data) / 1024 / 1024:.1f} MiB)")
+
+    start = time.perf_counter()
+    await stub_transcribe(audio_data, "wav")
+    serial = time.perf_counter() - start
+    print(f"serial       {serial:>7.2f} s   1 request")
+
+    transcriber = LongAudioTranscriber(max_parallel=args.parallel)
+    start = time.perf_counter()
+    _, chunks = await transcriber.transcribe(audio_data, "wav", stub_transcribe)
+    chunked = time.perf_counter() - start
+    print(f"chunked      {chunked:>7.2f} s   {chunks} chunks, {args.parallel} in parallel"
+          f"  ({serial / chunked:.1f}x faster)")
+
+if __name__ == "__main__":
+    asyncio.run(main())
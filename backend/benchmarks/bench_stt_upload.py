@@ -0,0 +1,116 @@
+"""
+Benchmark the STT upload path: temp-file round trip vs in-memory upload
+
+Runs the transcription path against a stub Whisper client (no network) and
+reports per-request wall time, read/write syscalls and bytes written, as
+counted by /proc/self/io.
+
+Usage (from backend/):
+    python -m benchmarks.bench_stt_upload [--requests 200]
+"""
+
+import io
+import os
+import sys
+import time
+import wave
+import asyncio
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.groq_stt import GroqSTTModel
+
+class _StubTranscriptions:
+    """Stand-in for the Groq transcription API that consumes the upload like httpx would"""
+
+    async def create(self, file, model, language=None, response_format="text"):
+        _, content = file
+        data = content.read() if hasattr(content, "read") else content
+        return f"{len(data)} bytes transcribed"
+
+class _StubClient:
+    def __init__(self):
+        self.audio = type("Audio", (), {"transcriptions": _StubTranscriptions()})()
+
+def make_wav(seconds: float, sample_rate: int = 48000, channels: int = 2) -> bytes:
+    """Build a silent 16-bit PCM WAV like a raw browser recording"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(b"\x00" * int(seconds * sample_rate) * 2 * channels)
+    return buffer.getvalue()
+
+def read_proc_io() -> dict:
+    """Read the process I/O counters (Linux only)"""
+    try:
+        with open("/proc/self/io") as f:
+            return {key: int(value) for key, value in (line.split(": ") for line in f)}
+    except OSError:
+        return {}
+
+async def legacy_transcribe(model: GroqSTTModel, audio_data: bytes) -> str:
+    """Previous flow: save the upload to a temp file, validate it, re-open it and send it"""
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
+        temp_file.write(audio_data)
+        temp_path = temp_file.name
+    try:
+        if not model.validate_audio_file(temp_path):
+            raise RuntimeError("invalid audio")
+        with open(temp_path, "rb") as audio_file:
+            return await model.async_client.audio.transcriptions.create(
+                file=(os.path.basename(temp_path), audio_file),
+                model=model.model,
+                response_format="text"
+            )
+    finally:
+        os.unlink(temp_path)
+
+async def in_memory_transcribe(model: GroqSTTModel, audio_data: bytes) -> str:
+    """Current flow: validate and send the bytes directly"""
+    return await model.transcribe_audio_data(audio_data, "wav")
+
+async def run_case(name: str, transcribe, model: GroqSTTModel, audio_data: bytes, requests: int):
+    # Warm up caches and imports outside the measurement
+    await transcribe(model, audio_data)
+
+    before = read_proc_io()
+    start = time.perf_counter()
+    for _ in range(requests):
+        await transcribe(model, audio_data)
+    elapsed = time.perf_counter() - start
+    after = read_proc_io()
+
+    def per_request(key):
+        if key not in before:
+            return float("nan")
+        return (after[key] - before[key]) / requests
+
+    print(
+        f"{name:<12} {elapsed / requests * 1000:>9.3f} ms/req"
+        f"  syscr {per_request('syscr'):>7.1f}"
+        f"  syscw {per_request('syscw'):>7.1f}"
+        f"  wchar {per_request('wchar') / 1024:>9.1f} KiB"
+    )
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    model = GroqSTTModel()
+    model.is_configured = True
+    model.client = object()
+    model.async_client = _StubClient()
+
+    for seconds in (3, 15):
+        audio_data = make_wav(seconds)
+        print(f"\n{seconds}s 48 kHz stereo WAV ({len(audio_data) / 1024:.0f} KiB), {args.requests} requests")
+        await run_case("temp-file", legacy_transcribe, model, audio_data, args.requests)
+        await run_case("in-memory", in_memory_transcribe, model, audio_data, args.requests)
+
+if __name__ == "__main__":
+    asyncio.run(main())
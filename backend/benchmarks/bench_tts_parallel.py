@@ -0,0 +1,61 @@
+"""
+Benchmark TTS synthesis time against text length: one request vs sentence-parallel segments
+
+Runs against a stub Edge TTS whose latency is a fixed request overhead plus
+a per-character synthesis cost, so the comparison reflects how the text is
+split rather than network noise. Reports total time and time until the
+first segment's audio is available.
+
+Usage (from backend/):
+    python -m benchmarks.bench_tts_parallel [--concurrency 4]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.parallel_tts import ParallelTTS
+
+# Stub upstream: 300 ms per request plus 1 ms per character (roughly Edge's real-time factor)
+REQUEST_OVERHEAD_SECONDS = 0.3
+SECONDS_PER_CHAR = 0.001
+
+SENTENCE = "The quick brown fox jumps over the lazy dog while the band plays on. "
+
+async def stub_synthesize(text: str) -> bytes:
+    await asyncio.sleep(REQUEST_OVERHEAD_SECONDS + len(text) * SECONDS_PER_CHAR)
+    return b"\xff\xfb\x90\x00" + b"\x00" * 413
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    synthesizer = ParallelTTS(min_text_chars=0, max_concurrency=args.concurrency)
+    print(f"{'chars':>6}  {'serial':>8}  {'parallel':>8}  {'first audio':>11}  {'segments':>8}  speedup")
+
+    for length in (200, 500, 1000, 1500, 3000):
+        text = (SENTENCE * (length // len(SENTENCE) + 1))[:length].rsplit(" ", 1)[0] + "."
+
+        start = time.perf_counter()
+        await stub_synthesize(text)
+        serial = time.perf_counter() - start
+
+        start = time.perf_counter()
+        first_audio = None
+        segments = 0
+        async for _ in synthesizer.synthesize_iter(text, "mp3", "stub", stub_synthesize):
+            segments += 1
+            if first_audio is None:
+                first_audio = time.perf_counter() - start
+        parallel = time.perf_counter() - start
+
+        print(f"{len(text):>6}  {serial:>7.2f}s  {parallel:>7.2f}s  {first_audio:>10.2f}s  {segments:>8}"
+              f"  {serial / parallel:.1f}x")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -2,6 +2,7 @@
 FastAPI backend for Voice Bot application
 """
 import os
+import asyncio
 from datetime import datetime
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
@@ -37,6 +38,11 @@ except ImportError:
 # Load environment variables
 load_dotenv()
 
+# Uploads stay in memory up to this size and are only spooled to disk beyond it,
+# so typical voice clips reach Whisper without touching the filesystem
+from starlette.formparsers import MultiPartParser
+MultiPartParser.spool_max_size = int(os.getenv("UPLOAD_SPILL_THRESHOLD_BYTES", str(4 * 1024 * 1024)))
+
 # Import routers
 from routers import chat, voice, websocket
 
@@ -209,7 +215,10 @@ async def health_check(request: Request):
                 "/api/chat/text",
                 "/api/chat/sample-questions",
                 "/api/voice/transcribe",
+                "/api/voice/transcribe-long",
                 "/api/voice/synthesize",
+                "/api/voice/synthesize/stream",
+                "/api/voice/filler",
                 "/api/voice/conversation",
                 "/api/voice/voices",
                 "/ws/voice-chat",
@@ -237,6 +246,8 @@ async def get_config():
     """
     Get API configuration information (non-sensitive)
     """
+    from utils.tts_provider import tts_provider
+
     return {
         "groq_models": {
             "chat": ["llama3-8b-8192", "mixtral-8x7b-32768"],
@@ -244,6 +255,7 @@ async def get_config():
             "tts": ["playai-tts", "playai-tts-arabic"]
         },
         "supported_audio_formats": ["flac", "mp3", "mp4", "mpeg", "mpga", "m4a", "ogg", "wav", "webm"],
+        "tts_output_formats": tts_provider.get_output_formats(),
         "max_audio_file_size_mb": 25,
         "max_tts_text_length": 10000,
         "default_settings": {
@@ -317,6 +329,26 @@ async def get_performance_metrics():
     """
     try:
         from utils.performance_optimizer import performance_monitor, memory_manager
+        from utils.response_cache import response_cache
+        from utils.semantic_cache import semantic_cache
+        from utils.stt_cache import stt_cache
+        from utils.request_coalescer import request_coalescer
+        from utils.conversation_store import conversation_store
+        from utils.history_compactor import history_compactor
+        from utils.model_router import model_router
+        from utils.request_hedger import request_hedger
+        from utils.rate_limit_scheduler import rate_limit_scheduler
+        from utils.concurrency_limiter import stt_limiter
+        from utils.audio_processor import audio_processor
+        from utils.audio_transcoder import audio_transcoder
+        from utils.long_audio import long_audio_transcriber
+        from utils.stt_batcher import stt_batcher
+        from utils.whisper_router import whisper_router
+        from utils.streaming_stt import streaming_stt
+        from utils.tts_provider import tts_provider
+        from utils.tts_cache import tts_cache
+        from utils.parallel_tts import parallel_tts
+        from utils.phrase_bank import phrase_bank
 
         # Get comprehensive performance report
         performance_report = performance_monitor.get_performance_report()
@@ -335,6 +367,29 @@ async def get_performance_metrics():
             "timestamp": datetime.now().isoformat(),
             "performance": performance_report,
             "memory": memory_stats,
+            "caches": {
+                "chat_responses": response_cache.get_stats(),
+                "semantic_answers": semantic_cache.get_stats(),
+                "stt_transcripts": stt_cache.get_stats(),
+                "tts_audio": tts_cache.get_stats()
+            },
+            "coalescing": request_coalescer.get_stats(),
+            "conversations": conversation_store.get_stats(),
+            "history_compaction": history_compactor.get_stats(),
+            "model_routing": model_router.get_stats(),
+            "hedging": request_hedger.get_stats(),
+            "rate_limits": rate_limit_scheduler.get_stats(),
+            "stt_executor": stt_limiter.get_stats(),
+            "voice_activity": audio_processor.get_vad_stats(),
+            "audio_validation": audio_processor.get_sniff_stats(),
+            "transcoding": audio_transcoder.get_stats(),
+            "long_audio": long_audio_transcriber.get_stats(),
+            "stt_batching": stt_batcher.get_stats(),
+            "stt_model_routing": whisper_router.get_stats(),
+            "stt_streaming": streaming_stt.get_stats(),
+            "tts": tts_provider.get_stats(),
+            "tts_parallel": parallel_tts.get_stats(),
+            "phrase_bank": phrase_bank.get_stats(),
             "optimization": {
                 "async_optimization": True,
                 "memory_management": True,
@@ -351,6 +406,39 @@ async def get_performance_metrics():
             "timestamp": datetime.now().isoformat()
         }
 
+@app.on_event("startup")
+async def warm_phrase_bank():
+    """Synthesize filler phrases in the background when no prebuilt manifest was loaded"""
+    from utils.phrase_bank import phrase_bank, build_phrase_bank
+
+    if not phrase_bank.enabled or len(phrase_bank):
+        return
+    if os.getenv("PHRASE_BANK_BUILD_ON_STARTUP", "true").lower() != "true":
+        return
+
+    async def build():
+        try:
+            await build_phrase_bank()
+            # Later starts map the saved manifest instead of synthesizing again
+            phrase_bank.save()
+        except Exception as e:
+            logger.warning(f"Phrase bank build failed: {e}")
+
+    app.state.phrase_bank_build = asyncio.create_task(build())
+
+@app.on_event("shutdown")
+async def shutdown_services():
+    """Persist warm caches and release pooled upstream connections on shutdown"""
+    from utils.groq_client import groq_client
+    from utils.semantic_cache import semantic_cache
+    from utils.audio_transcoder import audio_transcoder
+
+    semantic_cache.save()
+    audio_transcoder.shutdown()
+
+    if groq_client is not None:
+        await groq_client.aclose()
+
 # Standardized exception handlers
 @app.exception_handler(404)
 async def not_found_handler(request: Request, exc):
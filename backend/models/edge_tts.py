@@ -4,7 +4,7 @@ Microsoft Edge TTS API integration - Completely FREE
 import asyncio
 import tempfile
 import os
-from typing import Optional
+from typing import Optional, AsyncIterator
 import edge_tts
 
 class EdgeTTSModel:
@@ -13,7 +13,10 @@ class EdgeTTSModel:
     def __init__(self):
         # TTS configuration
         self.max_input_length = 10000  # Edge TTS can handle long texts
-        self.output_format = "wav"
+        self.output_format = "mp3"
+        # Formats from utils.tts_formats this client can request; edge-tts
+        # always asks for audio-24khz-48kbitrate-mono-mp3
+        self.output_formats = ["mp3"]
         
         # Available voices by category
         self.voices = {
@@ -49,7 +52,8 @@ class EdgeTTSModel:
         text: str,
         voice: Optional[str] = None,
         speed: float = 1.0,
-        save_to_file: Optional[str] = None
+        save_to_file: Optional[str] = None,
+        audio_format: str = "mp3"
     ) -> bytes:
         """
         Convert text to speech using Microsoft Edge TTS
@@ -59,10 +63,44 @@ class EdgeTTSModel:
             voice: Voice to use (defaults to en-US-JennyNeural)
             speed: Speech speed (0.5-2.0)
             save_to_file: Optional path to save audio file
+            audio_format: Output format name (see output_formats)
             
         Returns:
-            Audio data as bytes (WAV format)
+            Audio data as bytes (MP3, 24 kHz mono, 48 kbps)
         """
+        # Collect chunks and join once; appending to bytes copies the whole buffer per chunk
+        chunks = [chunk async for chunk in self.synthesize_stream(text, voice, speed, audio_format)]
+        audio_data = b"".join(chunks)
+
+        # Save to file if requested
+        if save_to_file:
+            with open(save_to_file, "wb") as f:
+                f.write(audio_data)
+
+        return audio_data
+
+    async def synthesize_stream(
+        self,
+        text: str,
+        voice: Optional[str] = None,
+        speed: float = 1.0,
+        audio_format: str = "mp3"
+    ) -> AsyncIterator[bytes]:
+        """
+        Convert text to speech, yielding audio as Edge TTS produces it
+        
+        Args:
+            text: Text to convert to speech
+            voice: Voice to use (defaults to en-US-JennyNeural)
+            speed: Speech speed (0.5-2.0)
+            audio_format: Output format name (see output_formats)
+            
+        Yields:
+            Audio chunks in playback order
+        """
+        if audio_format not in self.output_formats:
+            raise ValueError(f"Edge TTS can't produce '{audio_format}'. Available: {self.output_formats}")
+
         try:
             # Validate and clean input text
             if not text or not text.strip():
@@ -74,17 +112,7 @@ class EdgeTTSModel:
             if len(text) > self.max_input_length:
                 raise ValueError(f"Text length ({len(text)}) exceeds maximum ({self.max_input_length} characters)")
             
-            # Use default voice if none specified
-            if voice is None:
-                voice = self.default_voice
-            
-            # Map Groq voices to Edge voices if needed
-            voice = self._map_voice_name(voice)
-            
-            # Validate voice
-            if voice not in self.all_voices:
-                print(f"Warning: Voice '{voice}' not found, using default '{self.default_voice}'")
-                voice = self.default_voice
+            voice = self.resolve_voice(voice)
             
             # Convert speed to Edge TTS rate format
             rate = self._convert_speed_to_rate(speed)
@@ -94,23 +122,16 @@ class EdgeTTSModel:
             # Create Edge TTS communicate object
             communicate = edge_tts.Communicate(text, voice, rate=rate)
             
-            # Generate audio data
-            audio_data = b""
+            received = False
             async for chunk in communicate.stream():
-                if chunk["type"] == "audio":
-                    audio_data += chunk["data"]
+                if chunk["type"] == "audio" and chunk["data"]:
+                    received = True
+                    yield chunk["data"]
             
             # Validate audio data
-            if not audio_data or len(audio_data) == 0:
+            if not received:
                 raise Exception("Received empty audio data from Edge TTS")
             
-            # Save to file if requested
-            if save_to_file:
-                with open(save_to_file, "wb") as f:
-                    f.write(audio_data)
-            
-            return audio_data
-            
         except Exception as e:
             # Handle specific error types
             error_msg = str(e)
@@ -121,6 +142,21 @@ class EdgeTTSModel:
                 raise Exception(f"Edge TTS voice error: {error_msg}. Voice '{voice}' may not be available.")
             else:
                 raise Exception(f"Edge TTS synthesis error: {error_msg}")
+
+    def resolve_voice(self, voice: Optional[str]) -> str:
+        """Map a requested voice to an available Edge voice, falling back to the default"""
+        # Use default voice if none specified
+        if voice is None:
+            return self.default_voice
+        
+        # Map Groq voices to Edge voices if needed
+        voice = self._map_voice_name(voice)
+        
+        # Validate voice
+        if voice not in self.all_voices:
+            print(f"Warning: Voice '{voice}' not found, using default '{self.default_voice}'")
+            return self.default_voice
+        return voice
     
     def _map_voice_name(self, voice: str) -> str:
         """Map voice names from other providers to Edge TTS format"""
@@ -197,6 +233,7 @@ class EdgeTTSModel:
             "default_voice": self.default_voice,
             "max_input_length": self.max_input_length,
             "output_format": self.output_format,
+            "output_formats": self.output_formats,
             "available_voices": self.all_voices,
             "voice_categories": list(self.voices.keys()),
             "cost": "FREE - No limits",
@@ -1,15 +1,29 @@
+import time
 import logging
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, AsyncIterator, Any, Tuple
 from utils.groq_client import groq_client
+from utils.response_cache import response_cache, make_chat_cache_key
+from utils.semantic_cache import semantic_cache, make_context_key
+from utils.request_coalescer import request_coalescer
+from utils.request_hedger import request_hedger
+from utils.history_compactor import history_compactor, estimate_tokens, estimate_message_tokens, MESSAGE_OVERHEAD_TOKENS
+from utils.model_router import model_router, RoutingDecision
+from utils.rate_limit_scheduler import rate_limit_scheduler
 
 logger = logging.getLogger(__name__)
 
+def _usage_value(usage, field: str) -> float:
+    """Read a numeric usage field from a completion, treating missing values as 0"""
+    value = getattr(usage, field, None)
+    return float(value) if isinstance(value, (int, float)) else 0.0
+
 class GroqChatModel:
     """
     Groq Chat API integration for conversational AI responses
     """
     def __init__(self):
         self.client = groq_client.client
+        self.async_client = groq_client.async_client
         self.model = groq_client.get_default_chat_model()
         
         # System prompt for direct, concise responses
@@ -46,7 +60,10 @@ Key Focus Areas (choose as needed—don’t list all each time):
         message: str, 
         conversation_history: Optional[List[Dict[str, str]]] = None,
         temperature: float = 0.7,
-        max_tokens: int = 500
+        max_tokens: int = 500,
+        use_cache: bool = True,
+        conversation_id: Optional[str] = None,
+        route: Optional[RoutingDecision] = None
     ) -> str:
         """
         Generate a conversational response using Groq Chat API
@@ -56,24 +73,112 @@ Key Focus Areas (choose as needed—don’t list all each time):
             conversation_history: Previous conversation context
             temperature: Response creativity (0.0-1.0)
             max_tokens: Maximum response length
+            use_cache: Serve identical requests from the response cache
+            conversation_id: Optional conversation id used to track its rolling summary
+            route: Routing decision from route_request (routed as a text turn if omitted)
             
         Returns:
             Generated response text
         """
+        if route is None:
+            route = self.route_request(message, conversation_history, max_tokens)
+        model = route.model
+
+        request_key = make_chat_cache_key(
+            self.system_prompt, conversation_history, message,
+            model, temperature, max_tokens
+        )
+
+        cache_key = None
+        if use_cache and response_cache.is_cacheable(temperature):
+            cache_key = request_key
+            cached_response = response_cache.get(cache_key)
+            if cached_response is not None:
+                logger.debug("Chat response served from cache")
+                return cached_response
+
+        # Paraphrased questions can only share an answer when no history shapes it
+        semantic_context = None
+        if use_cache and not conversation_history:
+            semantic_context = make_context_key(self.system_prompt, model, max_tokens)
+            semantic_match = semantic_cache.lookup(message, semantic_context)
+            if semantic_match is not None:
+                answer, similarity = semantic_match
+                logger.debug(f"Chat response served from semantic cache (similarity={similarity:.3f})")
+                return answer
+
+        messages = self._build_messages(message, conversation_history, conversation_id, route.token_budget)
+
+        # Identical concurrent requests share a single upstream completion
+        response_text = await request_coalescer.run(
+            "chat",
+            request_key,
+            lambda: request_hedger.run(
+                "chat",
+                lambda: self._create_completion(messages, temperature, max_tokens, model)
+            )
+        )
+
+        if cache_key is not None and response_text:
+            response_cache.set(cache_key, response_text)
+        if semantic_context is not None and response_text:
+            semantic_cache.add(message, response_text, semantic_context)
+        return response_text
+
+    def route_request(
+        self,
+        message: str,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        max_tokens: int = 500,
+        latency_slo_ms: Optional[float] = None,
+        profile: str = "text"
+    ) -> RoutingDecision:
+        """
+        Choose the chat model for a request
+
+        Args:
+            message: User's question/message
+            conversation_history: Previous conversation context
+            max_tokens: Maximum response length
+            latency_slo_ms: Optional latency target for the call
+            profile: "voice" for spoken turns, "text" otherwise
+
+        Returns:
+            Routing decision (pass it on as route=...)
+        """
+        prompt_tokens = (
+            estimate_tokens(self.system_prompt) + MESSAGE_OVERHEAD_TOKENS +
+            sum(estimate_message_tokens(turn) for turn in (conversation_history or [])) +
+            estimate_tokens(message) + MESSAGE_OVERHEAD_TOKENS
+        )
+        return model_router.route(prompt_tokens, max_tokens, latency_slo_ms=latency_slo_ms, profile=profile)
+
+    async def _create_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        model: Optional[str] = None
+    ) -> str:
+        """
+        Request a single non-streaming completion from Groq
+
+        Args:
+            messages: Full messages array
+            temperature: Response creativity
+            max_tokens: Maximum response length
+            model: Chat model to use (defaults to the configured model)
+
+        Returns:
+            Generated response text
+        """
+        model = model or self.model
+        estimated_tokens = await self._acquire_capacity(messages, max_tokens)
+        start = time.perf_counter()
         try:
-            # Build messages array
-            messages = [{"role": "system", "content": self.system_prompt}]
-            
-            # Add conversation history if provided
-            if conversation_history:
-                messages.extend(conversation_history)
-            
-            # Add current user message
-            messages.append({"role": "user", "content": message})
-            
-            # Generate response
-            response = self.client.chat.completions.create(
-                model=self.model,
+            # Generate response on the async client so the event loop stays free
+            response = await self.async_client.chat.completions.create(
+                model=model,
                 messages=messages,
                 temperature=temperature,
                 max_tokens=max_tokens,
@@ -81,10 +186,114 @@ Key Focus Areas (choose as needed—don’t list all each time):
                 stream=False
             )
             
-            return response.choices[0].message.content.strip()
-            
+            response_text = response.choices[0].message.content.strip()
+
         except Exception as e:
+            model_router.record_failure(model)
             raise Exception(f"Groq Chat API error: {str(e)}")
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        usage = getattr(response, "usage", None)
+        # Groq reports queue and prompt time separately, which approximates time to first token
+        prompt_ms = (_usage_value(usage, "queue_time") + _usage_value(usage, "prompt_time")) * 1000
+        model_router.record_success(
+            model,
+            ttft_ms=prompt_ms if 0 < prompt_ms < elapsed_ms else elapsed_ms,
+            total_ms=elapsed_ms,
+            output_tokens=int(_usage_value(usage, "completion_tokens"))
+        )
+        rate_limit_scheduler.reconcile("chat_tokens", estimated_tokens, _usage_value(usage, "total_tokens"))
+        return response_text
+
+    async def _acquire_capacity(self, messages: List[Dict[str, str]], max_tokens: int) -> int:
+        """
+        Wait for rate-limit capacity for one completion
+
+        The token cost is estimated as the prompt plus the full max_tokens
+        allowance; non-streaming calls reconcile it with the reported usage.
+
+        Args:
+            messages: Full messages array
+            max_tokens: Maximum response length
+
+        Returns:
+            Estimated token cost that was acquired
+        """
+        estimated_tokens = sum(estimate_message_tokens(msg) for msg in messages) + max_tokens
+        waited = await rate_limit_scheduler.acquire(
+            "chat", {"chat_requests": 1, "chat_tokens": estimated_tokens}
+        )
+        if waited > 0.5:
+            logger.info(f"Chat request waited {waited:.1f}s for Groq rate-limit capacity")
+        return estimated_tokens
+
+    def _build_messages(
+        self,
+        message: str,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        conversation_id: Optional[str] = None,
+        token_budget: Optional[int] = None
+    ) -> List[Dict[str, str]]:
+        """
+        Build the messages array sent to the Groq Chat API
+
+        History is compacted to the prompt token budget: the most recent
+        turns are kept and older ones are represented by a rolling summary.
+
+        Args:
+            message: User's question/message
+            conversation_history: Previous conversation context
+            conversation_id: Optional conversation id used to track its rolling summary
+            token_budget: Optional prompt budget overriding the compactor default
+
+        Returns:
+            System prompt, history and current user message
+        """
+        messages = [{"role": "system", "content": self.system_prompt}]
+
+        # Add conversation history if provided
+        if conversation_history:
+            history, prompt_tokens = history_compactor.compact(
+                self.system_prompt,
+                conversation_history,
+                message,
+                conversation_id=conversation_id,
+                summarizer=self._summarize_turns,
+                token_budget=token_budget
+            )
+            messages.extend(history)
+            logger.debug(f"Prompt size: ~{prompt_tokens} tokens")
+
+        # Add current user message
+        messages.append({"role": "user", "content": message})
+        return messages
+
+    async def _summarize_turns(self, previous_summary: str, turns: List[Dict[str, str]]) -> str:
+        """
+        Fold conversation turns into a rolling summary
+
+        Args:
+            previous_summary: Summary of even older turns (may be empty)
+            turns: Turns to fold into the summary
+
+        Returns:
+            Updated summary text
+        """
+        transcript = "\n".join(f"{turn['role']}: {turn['content']}" for turn in turns)
+        request = (
+            f"Existing summary:\n{previous_summary or '(none)'}\n\n"
+            f"New conversation turns:\n{transcript}\n\n"
+            "Update the summary so it covers both. Keep names, facts and open questions; "
+            "write at most five short sentences in the third person."
+        )
+        return await self._create_completion(
+            [
+                {"role": "system", "content": "You maintain concise running summaries of conversations."},
+                {"role": "user", "content": request}
+            ],
+            temperature=0.2,
+            max_tokens=history_compactor.max_summary_tokens
+        )
     
     def generate_streaming_response(
         self,
@@ -106,13 +315,7 @@ Key Focus Areas (choose as needed—don’t list all each time):
             Response chunks as they're generated
         """
         try:
-            # Build messages array
-            messages = [{"role": "system", "content": self.system_prompt}]
-
-            if conversation_history:
-                messages.extend(conversation_history)
-
-            messages.append({"role": "user", "content": message})
+            messages = self._build_messages(message, conversation_history)
 
             # Generate streaming response
             stream = self.client.chat.completions.create(
@@ -131,22 +334,136 @@ Key Focus Areas (choose as needed—don’t list all each time):
         except Exception as e:
             raise Exception(f"Groq Chat streaming error: {str(e)}")
 
+    async def generate_streaming_response_async(
+        self,
+        message: str,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 500,
+        conversation_id: Optional[str] = None,
+        route: Optional[RoutingDecision] = None
+    ) -> AsyncIterator[str]:
+        """
+        Generate a streaming response without holding a worker thread
+
+        Closing the generator (e.g. when the client disconnects) closes the
+        upstream Groq stream so no further tokens are generated.
+
+        Args:
+            message: User's question/message
+            conversation_history: Previous conversation context
+            temperature: Response creativity
+            max_tokens: Maximum response length
+            conversation_id: Optional conversation id used to track its rolling summary
+            route: Routing decision from route_request (routed as a text turn if omitted)
+
+        Yields:
+            Response chunks as they're generated
+        """
+        if route is None:
+            route = self.route_request(message, conversation_history, max_tokens)
+        model = route.model
+        messages = self._build_messages(message, conversation_history, conversation_id, route.token_budget)
+
+        # The stream is hedged until its first token; after that it is committed
+        stream, first_token, start = await request_hedger.run(
+            "chat_stream",
+            lambda: self._open_stream(messages, temperature, max_tokens, model),
+            discard=lambda attempt: attempt[0].close()
+        )
+
+        first_token_ms = (time.perf_counter() - start) * 1000
+        chunks = 0
+        try:
+            if first_token is not None:
+                chunks += 1
+                yield first_token
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content is not None:
+                        chunks += 1
+                        yield chunk.choices[0].delta.content
+        except Exception as e:
+            model_router.record_failure(model)
+            raise Exception(f"Groq Chat streaming error: {str(e)}")
+        finally:
+            await stream.close()
+
+        # Only completed streams are profiled; abandoned ones say nothing about speed
+        model_router.record_success(
+            model,
+            ttft_ms=first_token_ms,
+            total_ms=(time.perf_counter() - start) * 1000,
+            output_tokens=chunks
+        )
+
+    async def _open_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        model: str
+    ) -> Tuple[Any, Optional[str], float]:
+        """
+        Open a streaming completion and wait for its first token
+
+        Args:
+            messages: Full messages array
+            temperature: Response creativity
+            max_tokens: Maximum response length
+            model: Chat model to use
+
+        Returns:
+            Tuple of (open stream, first content chunk or None if the stream
+            ended without content, perf_counter time the attempt started)
+        """
+        await self._acquire_capacity(messages, max_tokens)
+        start = time.perf_counter()
+        try:
+            stream = await self.async_client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                top_p=1,
+                stream=True
+            )
+        except Exception as e:
+            model_router.record_failure(model)
+            raise Exception(f"Groq Chat streaming error: {str(e)}")
+
+        try:
+            # Pull chunks directly so the rest of the stream can be iterated later
+            while True:
+                try:
+                    chunk = await stream.__anext__()
+                except StopAsyncIteration:
+                    return stream, None, start
+                if chunk.choices and chunk.choices[0].delta.content is not None:
+                    return stream, chunk.choices[0].delta.content, start
+        except BaseException as e:
+            # Losing a hedge race (cancellation) must not leak the upstream stream
+            await stream.close()
+            if isinstance(e, Exception):
+                model_router.record_failure(model)
+                raise Exception(f"Groq Chat streaming error: {str(e)}")
+            raise
+
     async def generate_response_async(
         self,
         message: str,
         conversation_history: Optional[List[Dict[str, str]]] = None,
         temperature: float = 0.7,
-        max_tokens: int = 500
+        max_tokens: int = 500,
+        conversation_id: Optional[str] = None,
+        route: Optional[RoutingDecision] = None
     ) -> str:
         """
         Async version of generate_response for WebSocket support
         """
-        # For now, just call the sync version
-        # In production, you'd use an async HTTP client
-        import asyncio
-        return await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: self.generate_response(message, conversation_history, temperature, max_tokens)
+        return await self.generate_response(
+            message, conversation_history, temperature, max_tokens,
+            conversation_id=conversation_id,
+            route=route
         )
 
 # Global chat model instance
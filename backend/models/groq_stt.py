@@ -2,14 +2,23 @@
 Groq STT (Speech-to-Text) integration using Whisper models
 """
 import os
-import tempfile
+import time
 import asyncio
-from typing import Optional, Union
+from typing import Optional, Union, Any, Dict, List
 from utils.groq_client import groq_client
+from utils.request_hedger import request_hedger
+from utils.rate_limit_scheduler import rate_limit_scheduler, estimate_audio_seconds
+from utils.concurrency_limiter import stt_limiter
+from utils.whisper_router import whisper_router
+from utils.audio_processor import audio_processor
 from dotenv import load_dotenv
 
 load_dotenv()
 
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
 class GroqSTTModel:
     """Groq Whisper STT wrapper for speech-to-text conversion"""
     
@@ -18,11 +27,13 @@ class GroqSTTModel:
         if groq_client is None:
             print("❌ Groq client not available")
             self.client = None
+            self.async_client = None
             self.model = "whisper-large-v3-turbo"  # Default fallback
             self.api_key = None
             self.is_configured = False
         else:
             self.client = groq_client.client
+            self.async_client = groq_client.async_client
             self.model = groq_client.get_default_whisper_model()  # whisper-large-v3-turbo
             self.api_key = groq_client.api_key
 
@@ -93,6 +104,12 @@ class GroqSTTModel:
             if file_ext not in self.supported_formats:
                 print(f"❌ Unsupported format: {file_ext} (supported: {self.supported_formats})")
                 return False
+
+            # Catch corrupted or mislabeled files before they cost an upload
+            metadata = audio_processor.sniff_audio_file(file_path)
+            if not metadata.valid:
+                print(f"❌ Invalid audio file: {metadata.error}")
+                return False
             
             return True
             
@@ -100,6 +117,31 @@ class GroqSTTModel:
             print(f"❌ File validation error: {e}")
             return False
 
+    def validate_audio_data(self, audio_data: bytes, format: str) -> bool:
+        """
+        Validate in-memory audio format and size
+
+        Args:
+            audio_data: Audio data as bytes
+            format: Audio format (file extension without the dot)
+
+        Returns:
+            True if valid, False otherwise
+        """
+        if not audio_data:
+            print("❌ Empty audio data")
+            return False
+
+        if len(audio_data) > self.max_file_size:
+            print(f"❌ Audio data too large: {len(audio_data)} bytes (max: {self.max_file_size})")
+            return False
+
+        if format.lower().lstrip('.') not in self.supported_formats:
+            print(f"❌ Unsupported format: {format} (supported: {self.supported_formats})")
+            return False
+
+        return True
+
     async def transcribe_audio_file(
         self,
         audio_file_path: str,
@@ -128,31 +170,24 @@ class GroqSTTModel:
             print(f"Groq Whisper: Transcribing audio file: {audio_file_path}")
 
             # Double-check client is available before making API call
-            if self.client is None:
+            if self.async_client is None:
                 raise Exception("Groq client is not initialized")
 
             # Check if client has audio attribute (version compatibility)
-            if not hasattr(self.client, 'audio'):
+            if not hasattr(self.async_client, 'audio'):
                 raise Exception("Groq client does not have 'audio' attribute - check library version")
 
-            if not hasattr(self.client.audio, 'transcriptions'):
+            if not hasattr(self.async_client.audio, 'transcriptions'):
                 raise Exception("Groq client does not have 'audio.transcriptions' attribute")
 
-            # Open and transcribe the audio file
-            with open(audio_file_path, "rb") as audio_file:
-                transcript = self.client.audio.transcriptions.create(
-                    file=audio_file,
-                    model=self.model,
-                    language=language,  # Optional: specify language
-                    response_format="text"
-                )
-            
-            # Handle different response formats
-            if hasattr(transcript, 'text'):
-                transcribed_text = transcript.text.strip()
-            else:
-                # If response is just a string
-                transcribed_text = str(transcript).strip()
+            # Read off the event loop so large files don't stall other requests
+            audio_bytes = await asyncio.to_thread(_read_file, audio_file_path)
+
+            # Slow transcriptions are hedged with a second attempt when enabled
+            transcribed_text = await request_hedger.run(
+                "stt",
+                lambda: self._create_transcription(audio_bytes, os.path.basename(audio_file_path), language)
+            )
             
             print(f"Groq Whisper: Transcription successful: '{transcribed_text}'")
             return transcribed_text
@@ -179,19 +214,143 @@ class GroqSTTModel:
                 print("🔄 Returning mock transcription due to error")
                 return self._mock_transcription(audio_file_path)
 
+    async def _request_transcription(
+        self,
+        audio_bytes: bytes,
+        filename: str,
+        language: Optional[str] = None,
+        response_format: str = "text",
+        model: Optional[str] = None,
+        **options: Any
+    ) -> Any:
+        """
+        Send one transcription request on the async Groq client
+
+        Args:
+            audio_bytes: Encoded audio
+            filename: File name carrying the audio format extension
+            language: Optional language code
+            response_format: Whisper response format ("text" or "verbose_json")
+            model: Whisper model to use (defaults to self.model)
+            **options: Extra request parameters such as timestamp_granularities
+
+        Returns:
+            Raw transcription response
+        """
+        await rate_limit_scheduler.acquire(
+            "audio", {"audio_requests": 1, "audio_seconds": estimate_audio_seconds(audio_bytes)}
+        )
+        # Transcriptions get their own concurrency cap so a burst of uploads
+        # queues here instead of starving chat and TTS
+        model = model or self.model
+        async with stt_limiter.slot():
+            # Timed inside the slot so queueing doesn't count against the model
+            start = time.perf_counter()
+            try:
+                transcript = await self.async_client.audio.transcriptions.create(
+                    file=(filename, audio_bytes),
+                    model=model,
+                    language=language,  # Optional: specify language
+                    response_format=response_format,
+                    **options
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                whisper_router.record_failure(model)
+                raise
+            whisper_router.record_success(model, (time.perf_counter() - start) * 1000)
+            return transcript
+
+    async def _create_transcription(
+        self,
+        audio_bytes: bytes,
+        filename: str,
+        language: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> str:
+        """
+        Transcribe audio to plain text
+
+        Args:
+            audio_bytes: Encoded audio
+            filename: File name carrying the audio format extension
+            language: Optional language code
+            model: Whisper model to use (defaults to self.model)
+
+        Returns:
+            Transcribed text
+        """
+        transcript = await self._request_transcription(audio_bytes, filename, language, model=model)
+
+        # Handle different response formats
+        if hasattr(transcript, 'text'):
+            return transcript.text.strip()
+        # If response is just a string
+        return str(transcript).strip()
+
+    async def transcribe_segments(
+        self,
+        audio_data: bytes,
+        format: str = "wav",
+        language: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Transcribe audio into timestamped segments
+
+        Args:
+            audio_data: Audio data as bytes
+            format: Audio format (wav, mp3, etc.)
+            language: Optional language code
+            model: Whisper model to use (defaults to self.model)
+
+        Returns:
+            List of {"start", "end", "text"} segments, times in seconds
+        """
+        if not self.is_configured or self.async_client is None:
+            raise Exception("Groq STT is not configured for segment transcription")
+        if not self.validate_audio_data(audio_data, format):
+            raise Exception(f"Invalid audio data: {len(audio_data)} bytes of {format}")
+
+        transcript = await request_hedger.run(
+            "stt",
+            lambda: self._request_transcription(
+                audio_data, f"audio.{format.lower().lstrip('.')}", language,
+                response_format="verbose_json", model=model, timestamp_granularities=["segment"]
+            )
+        )
+
+        segments = transcript.get("segments") if isinstance(transcript, dict) else getattr(transcript, "segments", None)
+        result = []
+        for segment in segments or []:
+            if not isinstance(segment, dict):
+                segment = {key: getattr(segment, key, None) for key in ("start", "end", "text")}
+            result.append({
+                "start": float(segment["start"]),
+                "end": float(segment["end"]),
+                "text": (segment.get("text") or "").strip()
+            })
+        return result
+
     async def transcribe_audio_data(
         self,
         audio_data: bytes,
         format: str = "wav",
-        language: Optional[str] = None
+        language: Optional[str] = None,
+        model: Optional[str] = None
     ) -> str:
         """
         Transcribe audio data to text using Groq Whisper
-        
+
+        The bytes are sent to the API as a named in-memory upload, so no
+        temporary file is written.
+
         Args:
             audio_data: Audio data as bytes
             format: Audio format (wav, mp3, etc.)
             language: Optional language code
+            model: Whisper model to use (defaults to self.model)
             
         Returns:
             Transcribed text
@@ -202,25 +361,21 @@ class GroqSTTModel:
             return self._mock_transcription("audio_data")
         
         try:
-            # Validate audio data size
-            if len(audio_data) > self.max_file_size:
-                raise Exception(f"Audio data too large: {len(audio_data)} bytes (max: {self.max_file_size})")
-            
-            # Create temporary file for audio data
-            with tempfile.NamedTemporaryFile(suffix=f'.{format}', delete=False) as temp_file:
-                temp_file.write(audio_data)
-                temp_file_path = temp_file.name
-            
-            try:
-                # Transcribe using the temporary file
-                result = await self.transcribe_audio_file(temp_file_path, language)
-                return result
-            finally:
-                # Clean up temporary file
-                try:
-                    os.unlink(temp_file_path)
-                except:
-                    pass
+            # Validate audio data size and format
+            if not self.validate_audio_data(audio_data, format):
+                raise Exception(f"Invalid audio data: {len(audio_data)} bytes of {format}")
+
+            if self.async_client is None:
+                raise Exception("Groq client is not initialized")
+
+            # Slow transcriptions are hedged with a second attempt when enabled
+            transcribed_text = await request_hedger.run(
+                "stt",
+                lambda: self._create_transcription(audio_data, f"audio.{format.lower().lstrip('.')}", language, model)
+            )
+
+            print(f"Groq Whisper: Transcription successful: '{transcribed_text}'")
+            return transcribed_text
                     
         except Exception as e:
             error_msg = str(e)
@@ -1,23 +1,31 @@
 """
 Chat API endpoints for text-based conversations
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, field_validator, Field
 from typing import List, Dict, Optional
 from models.groq_chat import groq_chat
+from utils.model_router import model_router
 from utils.validation import (
     sanitize_text, validate_conversation_history, validate_numeric_range,
-    handle_validation_error, SecurityError, MAX_MESSAGE_LENGTH
+    validate_conversation_id, handle_validation_error, SecurityError, MAX_MESSAGE_LENGTH
 )
+from utils.conversation_store import conversation_store, ConversationNotFoundError
 from utils.logging_config import get_logger
 from utils.error_handler import ErrorCategory, ErrorSeverity
 # Temporarily disable performance optimizer imports for deployment debugging
 # from utils.performance_optimizer import async_timed, memory_efficient, performance_monitor, memory_manager
+import os
 import json
+import asyncio
+from datetime import datetime
 
 logger = get_logger(__name__)
 
+# Seconds of upstream silence before an SSE keep-alive comment is sent
+SSE_KEEPALIVE_INTERVAL = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 
 class ChatMessage(BaseModel):
@@ -41,9 +49,11 @@ class ChatMessage(BaseModel):
 
 class ChatRequest(BaseModel):
     message: str = Field(..., min_length=1, max_length=MAX_MESSAGE_LENGTH, description="User message")
+    conversation_id: Optional[str] = Field(None, description="Server-issued conversation id; replaces conversation_history")
     conversation_history: Optional[List[ChatMessage]] = Field(None, description="Previous conversation messages")
     temperature: Optional[float] = Field(0.7, ge=0.0, le=2.0, description="Response creativity (0.0-2.0)")
     max_tokens: Optional[int] = Field(500, ge=1, le=4000, description="Maximum response length")
+    latency_slo_ms: Optional[int] = Field(None, ge=100, le=60000, description="Target response latency used to pick the model")
 
     @field_validator('message')
     @classmethod
@@ -53,6 +63,14 @@ class ChatRequest(BaseModel):
         except SecurityError as e:
             raise ValueError(str(e))
 
+    @field_validator('conversation_id')
+    @classmethod
+    def validate_conversation_id_format(cls, v):
+        try:
+            return validate_conversation_id(v)
+        except SecurityError as e:
+            raise ValueError(str(e))
+
     @field_validator('conversation_history')
     @classmethod
     def validate_history(cls, v):
@@ -72,16 +90,42 @@ class ChatResponse(BaseModel):
     conversation_id: Optional[str] = Field(None, description="Conversation identifier")
     timestamp: Optional[str] = Field(None, description="Response timestamp")
 
+def resolve_conversation(request: ChatRequest):
+    """
+    Resolve the conversation id and history for a chat request
+
+    Args:
+        request: Chat request with either a conversation id or inline history
+
+    Returns:
+        Tuple of (conversation_id, history)
+
+    Raises:
+        HTTPException: 404 if the conversation id is unknown or expired
+    """
+    client_history = None
+    if request.conversation_history:
+        client_history = [
+            {"role": msg.role, "content": msg.content}
+            for msg in request.conversation_history
+        ]
+
+    try:
+        return conversation_store.resolve(request.conversation_id, client_history)
+    except ConversationNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
 @router.post("/text", response_model=ChatResponse)
 # Temporarily disable performance decorators for deployment debugging
 # @async_timed(performance_monitor)
 # @memory_efficient(memory_manager)
-async def chat_text(request: ChatRequest):
+async def chat_text(request: ChatRequest, response: Response):
     """
     Process text-based chat message using Groq Chat API with performance optimization
 
     Args:
         request: Chat request with message and optional history
+        response: Outgoing response used to expose the chosen model
 
     Returns:
         Generated response from the AI
@@ -90,36 +134,47 @@ async def chat_text(request: ChatRequest):
         # Input validation is handled by Pydantic models
         logger.info(f"Processing chat request: message_length={len(request.message)}")
 
-        # Convert conversation history to dict format
-        history = None
-        if request.conversation_history:
-            history = [
-                {"role": msg.role, "content": msg.content}
-                for msg in request.conversation_history
-            ]
+        conversation_id, history = resolve_conversation(request)
+        if history:
             logger.info(f"Using conversation history with {len(history)} messages")
 
+        route = groq_chat.route_request(
+            request.message, history, request.max_tokens,
+            latency_slo_ms=request.latency_slo_ms
+        )
+        response.headers.update(route.to_headers())
+
         # Generate response using Groq Chat
-        response = await groq_chat.generate_response(
+        ai_response = await groq_chat.generate_response(
             message=request.message,
-            conversation_history=history,
+            conversation_history=history or None,
             temperature=request.temperature,
-            max_tokens=request.max_tokens
+            max_tokens=request.max_tokens,
+            conversation_id=conversation_id,
+            route=route
         )
 
         # Sanitize the response as well
         try:
-            sanitized_response = sanitize_text(response, MAX_MESSAGE_LENGTH)
+            sanitized_response = sanitize_text(ai_response, MAX_MESSAGE_LENGTH)
         except SecurityError as e:
             logger.warning(f"Response sanitization failed: {e}")
             sanitized_response = "Response contained invalid content and was filtered."
 
+        # Stored turns are already sanitized, so later requests skip re-validation
+        conversation_store.append_turns(conversation_id, [
+            {"role": "user", "content": request.message},
+            {"role": "assistant", "content": sanitized_response}
+        ])
+
         return ChatResponse(
             response=sanitized_response,
-            conversation_id=None,  # Could implement conversation tracking
-            timestamp=None  # Could add timestamp
+            conversation_id=conversation_id,
+            timestamp=datetime.now().isoformat()
         )
 
+    except HTTPException:
+        raise
     except ValueError as e:
         # Pydantic validation errors - let middleware handle with standardized response
         logger.warning(f"Validation error in chat request: {e}")
@@ -133,57 +188,172 @@ async def chat_text(request: ChatRequest):
         logger.error(f"Unexpected error in chat processing: {e}")
         raise HTTPException(status_code=500, detail=f"Chat processing error: {str(e)}")
 
+def format_sse_event(data: Dict, event_id: Optional[int] = None) -> str:
+    """
+    Format a payload as a Server-Sent Event
+
+    Args:
+        data: JSON-serializable event payload
+        event_id: Optional event id for client reconnection
+
+    Returns:
+        SSE wire-format string
+    """
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
 @router.post("/stream")
-async def chat_stream(request: ChatRequest):
+async def chat_stream(request: ChatRequest, http_request: Request):
     """
     Process text-based chat message with streaming response
 
+    Streams Server-Sent Events from an async generator, so an open stream
+    holds no threadpool worker. Keep-alive comments are sent while upstream
+    is idle, and the Groq stream is closed as soon as the client disconnects.
+
     Args:
         request: Chat request with message and optional history
+        http_request: Raw request used for disconnect detection
 
     Returns:
-        Streaming response with real-time text generation
+        Streaming text/event-stream response with real-time text generation
     """
     try:
-        # Convert conversation history to dict format
-        history = None
-        if request.conversation_history:
-            history = [
-                {"role": msg.role, "content": msg.content}
-                for msg in request.conversation_history
-            ]
-
-        # Generate streaming response
-        def generate_stream():
+        conversation_id, history = resolve_conversation(request)
+        route = groq_chat.route_request(
+            request.message, history, request.max_tokens,
+            latency_slo_ms=request.latency_slo_ms
+        )
+
+        async def generate_stream():
+            stream = groq_chat.generate_streaming_response_async(
+                message=request.message,
+                conversation_history=history or None,
+                temperature=request.temperature,
+                max_tokens=request.max_tokens,
+                conversation_id=conversation_id,
+                route=route
+            )
+            response_chunks = []
+            event_id = 0
+            next_chunk = None
             try:
-                for chunk in groq_chat.generate_streaming_response(
-                    message=request.message,
-                    conversation_history=history,
-                    temperature=request.temperature,
-                    max_tokens=request.max_tokens
-                ):
-                    # Send each chunk as Server-Sent Events format
-                    yield f"data: {json.dumps({'chunk': chunk})}\n\n"
-
-                # Send end signal
-                yield f"data: {json.dumps({'done': True})}\n\n"
+                while True:
+                    if next_chunk is None:
+                        next_chunk = asyncio.ensure_future(stream.__anext__())
+
+                    done, _ = await asyncio.wait({next_chunk}, timeout=SSE_KEEPALIVE_INTERVAL)
+
+                    if await http_request.is_disconnected():
+                        logger.info("SSE client disconnected, cancelling upstream stream")
+                        break
+
+                    if not done:
+                        # Comment lines keep proxies from closing an idle stream
+                        yield ": keep-alive\n\n"
+                        continue
+
+                    try:
+                        chunk = next_chunk.result()
+                    except StopAsyncIteration:
+                        next_chunk = None
+                        break
+                    next_chunk = None
+
+                    response_chunks.append(chunk)
+                    event_id += 1
+                    yield format_sse_event({"chunk": chunk}, event_id)
+
+                if not await http_request.is_disconnected():
+                    # Only completed answers become part of the stored conversation
+                    try:
+                        sanitized_response = sanitize_text("".join(response_chunks), MAX_MESSAGE_LENGTH)
+                        conversation_store.append_turns(conversation_id, [
+                            {"role": "user", "content": request.message},
+                            {"role": "assistant", "content": sanitized_response}
+                        ])
+                    except SecurityError as e:
+                        logger.warning(f"Streamed response not stored: {e}")
+
+                    event_id += 1
+                    yield format_sse_event({"done": True, "conversation_id": conversation_id}, event_id)
 
             except Exception as e:
-                yield f"data: {json.dumps({'error': str(e)})}\n\n"
+                event_id += 1
+                yield format_sse_event({"error": str(e)}, event_id)
+            finally:
+                if next_chunk is not None and not next_chunk.done():
+                    next_chunk.cancel()
+                    try:
+                        await next_chunk
+                    except (asyncio.CancelledError, StopAsyncIteration, Exception):
+                        pass
+                await stream.aclose()
 
         return StreamingResponse(
             generate_stream(),
-            media_type="text/plain",
+            media_type="text/event-stream",
             headers={
                 "Cache-Control": "no-cache",
                 "Connection": "keep-alive",
+                "X-Accel-Buffering": "no",
+                "X-Conversation-Id": conversation_id,
                 "Access-Control-Allow-Origin": "*",
+                **route.to_headers()
             }
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Streaming chat error: {str(e)}")
 
+@router.get("/conversations/{conversation_id}")
+async def get_conversation(conversation_id: str):
+    """
+    Get the stored turns of a conversation
+
+    Args:
+        conversation_id: Server-issued conversation id
+
+    Returns:
+        Conversation id and its stored messages
+    """
+    try:
+        conversation_id = validate_conversation_id(conversation_id)
+    except SecurityError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    history = conversation_store.get_history(conversation_id)
+    if history is None:
+        raise HTTPException(status_code=404, detail="Conversation not found or expired")
+
+    return {"conversation_id": conversation_id, "messages": history}
+
+@router.delete("/conversations/{conversation_id}")
+async def delete_conversation(conversation_id: str):
+    """
+    Delete a stored conversation
+
+    Args:
+        conversation_id: Server-issued conversation id
+
+    Returns:
+        Deletion status
+    """
+    try:
+        conversation_id = validate_conversation_id(conversation_id)
+    except SecurityError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not conversation_store.delete(conversation_id):
+        raise HTTPException(status_code=404, detail="Conversation not found or expired")
+
+    return {"conversation_id": conversation_id, "deleted": True}
+
 @router.get("/sample-questions")
 async def get_sample_questions():
     """
@@ -226,6 +396,7 @@ async def get_model_info():
     try:
         return {
             "model": groq_chat.model,
+            "available_models": model_router.context_windows,
             "provider": "Groq",
             "capabilities": [
                 "Conversational responses",
@@ -259,7 +430,8 @@ async def health_check():
         test_response = await groq_chat.generate_response(
             message="Hello, this is a test.",
             temperature=0.1,
-            max_tokens=10
+            max_tokens=10,
+            use_cache=False
         )
         
         return HealthResponse(
@@ -1,36 +1,97 @@
 """
 Voice API endpoints for speech-to-text and text-to-speech
 """
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Response, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field, field_validator
 from typing import Optional
 from utils.stt_provider import STTProvider
 from models.groq_chat import groq_chat
-from utils.audio_processor import audio_processor
+from utils.audio_processor import audio_processor, AudioMetadata, AudioValidationError
 from utils.tts_provider import tts_provider
+from utils.tts_formats import TTS_FORMATS, TTSFormat, UnsupportedFormatError, prefers_raw_audio
+from utils.phrase_bank import phrase_bank
 from utils.validation import (
     sanitize_text, validate_filename, validate_audio_format, validate_language_code,
-    validate_voice_name, validate_numeric_range, SecurityError, MAX_TEXT_LENGTH
+    validate_voice_name, validate_numeric_range, validate_conversation_id,
+    SecurityError, MAX_TEXT_LENGTH
 )
+from utils.conversation_store import conversation_store, ConversationNotFoundError
+from utils.long_audio import long_audio_transcriber, LongAudioError
+from routers.chat import format_sse_event
 import logging
 import html
+import time
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/voice", tags=["voice"])
 
+def sniff_upload(audio_data: bytes, file_extension: str) -> AudioMetadata:
+    """
+    Read an upload's header and reject it if it isn't usable audio
+
+    Args:
+        audio_data: Uploaded bytes
+        file_extension: Extension from the uploaded file name
+
+    Returns:
+        Parsed header metadata
+
+    Raises:
+        HTTPException: 400 if the data is corrupted or not a supported container
+    """
+    metadata = audio_processor.sniff_audio(audio_data, file_extension)
+    if not metadata.valid:
+        logger.warning(f"Rejected {file_extension} upload of {len(audio_data)} bytes: {metadata.error}")
+        raise HTTPException(status_code=400, detail=f"Invalid audio file: {metadata.error}")
+    if metadata.mislabeled:
+        logger.info(f"Upload named .{file_extension} is {metadata.format} audio")
+    return metadata
+
+def negotiate_format(requested: Optional[str], accept: Optional[str]) -> TTSFormat:
+    """
+    Resolve the TTS output format for a request
+
+    Args:
+        requested: Format name from the request body, if any
+        accept: Accept header value
+
+    Returns:
+        Format the provider will synthesize
+
+    Raises:
+        HTTPException: 406 if the provider can't produce an acceptable format
+    """
+    try:
+        return tts_provider.resolve_format(requested, accept)
+    except UnsupportedFormatError as e:
+        raise HTTPException(status_code=406, detail=str(e))
+
 # Initialize STT provider
 stt_provider = STTProvider()
 
+
 class TranscriptionResponse(BaseModel):
     transcribed_text: str = Field(..., description="Transcribed text from audio")
     model_used: str = Field(..., description="STT model used for transcription")
     language: str = Field(..., description="Language detected/used")
+    audio_info: Optional[dict] = Field(None, description="Container, codec, duration and sample rate read from the upload header")
+
+class LongTranscriptionResponse(BaseModel):
+    transcribed_text: str = Field(..., description="Stitched transcript of all chunks")
+    model_used: str = Field(..., description="STT model used for transcription")
+    language: str = Field(..., description="Language detected/used")
+    chunks: int = Field(..., description="Number of chunks transcribed")
 
 class TTSRequest(BaseModel):
     text: str = Field(..., min_length=1, max_length=MAX_TEXT_LENGTH, description="Text to synthesize")
     voice: Optional[str] = Field(None, description="TTS voice to use")
     speed: Optional[float] = Field(1.0, ge=0.5, le=2.0, description="Speech speed (0.5-2.0)")
+    format: Optional[str] = Field(
+        None,
+        description="Output format (mp3, mp3-32k, opus-webm, opus-ogg); negotiated from the Accept header if omitted"
+    )
 
     @field_validator('text')
     @classmethod
@@ -50,10 +111,18 @@ class TTSRequest(BaseModel):
         except SecurityError as e:
             raise ValueError(str(e))
 
+    @field_validator('format')
+    @classmethod
+    def validate_format(cls, v):
+        if v is not None and v not in TTS_FORMATS:
+            raise ValueError(f"Unknown audio format. Known: {list(TTS_FORMATS)}")
+        return v
+
 class TTSResponse(BaseModel):
     audio_data: str  # Base64 encoded audio
     filename: str
     format: str
+    mime_type: Optional[str] = None
     size_bytes: int
     voice_used: str
 
@@ -65,15 +134,20 @@ class VoiceConversationRequest(BaseModel):
 
 class VoiceConversationResponse(BaseModel):
     transcribed_text: Optional[str] = None
+    stt_model: Optional[str] = None  # Whisper model that transcribed the audio input
     ai_response: str
     audio_data: str  # Base64 encoded audio response
     filename: str
+    mime_type: Optional[str] = None
     voice_used: str
+    conversation_id: Optional[str] = None
 
 @router.post("/transcribe", response_model=TranscriptionResponse)
 async def transcribe_audio(
     audio_file: UploadFile = File(...),
-    language: str = Form("en-US")
+    language: str = Form("en-US"),
+    accuracy: bool = Form(False),
+    response: Response = None
 ):
     """
     Convert speech to text using Groq Whisper STT
@@ -81,13 +155,15 @@ async def transcribe_audio(
     Args:
         audio_file: Audio file to transcribe
         language: Language code (default: 'en-US')
+        accuracy: Prefer the most accurate Whisper model over the fastest
+        response: Outgoing response used to expose the chosen model
 
     Returns:
         Transcribed text and metadata
     """
-    temp_file_path = None
     try:
         # Check file extension from filename
+        file_extension = "wav"
         if audio_file.filename:
             file_extension = audio_file.filename.lower().split('.')[-1]
             current_provider = stt_provider.providers[stt_provider.current_provider]
@@ -97,7 +173,7 @@ async def transcribe_audio(
                     detail=f"Unsupported audio format: {file_extension}. Supported formats: {current_provider.supported_formats}"
                 )
 
-        # Save uploaded file to temporary location
+        # The upload is already spooled in memory; it is sent on without a temp file
         audio_data = await audio_file.read()
 
         # Check file size
@@ -108,44 +184,176 @@ async def transcribe_audio(
                 detail=f"File too large: {len(audio_data)} bytes. Maximum: {current_provider.max_file_size} bytes"
             )
 
-        temp_file_path = audio_processor.save_uploaded_audio(audio_data, audio_file.filename or "audio.wav")
-
-        # Additional validation after saving
-        if not current_provider.validate_audio_file(temp_file_path):
+        if not current_provider.validate_audio_data(audio_data, file_extension):
             raise HTTPException(status_code=400, detail="Invalid audio file format or corrupted file")
+        metadata = sniff_upload(audio_data, file_extension)
+
+        # English goes to the distil model, other languages to turbo
+        selection = stt_provider.select_model(language, accuracy)
+        if response is not None:
+            response.headers.update(selection.to_headers())
 
         # Transcribe audio
-        transcribed_text = await stt_provider.transcribe_audio_file(
-            audio_file_path=temp_file_path,
-            language=language
+        transcribed_text = await stt_provider.transcribe_audio_data(
+            audio_data,
+            format=file_extension,
+            language=language,
+            model=selection.model,
+            metadata=metadata
         )
 
         return TranscriptionResponse(
             transcribed_text=transcribed_text,
-            model_used=f"{stt_provider.current_provider.title()} STT",
-            language=language
+            model_used=selection.model,
+            language=language,
+            audio_info=metadata.to_dict()
         )
         
     except HTTPException:
         raise
+    except AudioValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Transcription error: {str(e)}")
+
+@router.post("/transcribe-long")
+async def transcribe_long_audio(
+    http_request: Request,
+    audio_file: UploadFile = File(...),
+    language: str = Form("en-US"),
+    progressive: bool = Form(False),
+    accuracy: bool = Form(False)
+):
+    """
+    Transcribe recordings longer than a single Whisper request allows
+
+    The recording is split at silence into overlapping chunks that are
+    transcribed concurrently, then stitched with the overlap removed.
+
+    Args:
+        http_request: Raw request used for disconnect detection
+        audio_file: Audio file to transcribe (may exceed 25MB)
+        language: Language code (default: 'en-US')
+        progressive: Stream each chunk's text as Server-Sent Events as soon as it is ready
+        accuracy: Prefer the most accurate Whisper model over the fastest
+
+    Returns:
+        Stitched transcript, or a text/event-stream of per-chunk results
+    """
+    try:
+        file_extension = "wav"
+        if audio_file.filename:
+            try:
+                validate_filename(audio_file.filename)
+            except SecurityError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            file_extension = audio_file.filename.lower().split('.')[-1]
+        current_provider = stt_provider.providers[stt_provider.current_provider]
+        if file_extension not in current_provider.supported_formats:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported audio format: {file_extension}. Supported formats: {current_provider.supported_formats}"
+            )
+
+        audio_data = await audio_file.read()
+        if not audio_data:
+            raise HTTPException(status_code=400, detail="Empty audio file")
+        metadata = sniff_upload(audio_data, file_extension)
+        file_extension = metadata.format
+
+        # Every chunk uses the same model so the stitched text is consistent
+        selection = stt_provider.select_model(language, accuracy)
+
+        async def transcribe_chunk(chunk_data: bytes, chunk_format: str) -> str:
+            return await stt_provider.transcribe_audio_data(
+                chunk_data, format=chunk_format, language=language, model=selection.model
+            )
+
+        if not progressive:
+            transcribed_text, chunks = await long_audio_transcriber.transcribe(
+                audio_data, file_extension, transcribe_chunk
+            )
+            return LongTranscriptionResponse(
+                transcribed_text=transcribed_text,
+                model_used=selection.model,
+                language=language,
+                chunks=chunks
+            )
+
+        # Split before streaming so bad input still gets a 400
+        parts = long_audio_transcriber.transcribe_iter(audio_data, file_extension, transcribe_chunk)
+        try:
+            first = await parts.__anext__()
+        except StopAsyncIteration:
+            first = None
+
+        async def generate_events():
+            texts = []
+            event_id = 0
+            part = first
+            try:
+                while part is not None:
+                    if part.text:
+                        texts.append(part.text)
+                    event_id += 1
+                    yield format_sse_event({
+                        "chunk": part.index,
+                        "total_chunks": part.total_chunks,
+                        "start_seconds": round(part.start_seconds, 2),
+                        "end_seconds": round(part.end_seconds, 2),
+                        "text": part.text
+                    }, event_id)
+                    if await http_request.is_disconnected():
+                        logger.info("Long transcription client disconnected, cancelling remaining chunks")
+                        return
+                    try:
+                        part = await parts.__anext__()
+                    except StopAsyncIteration:
+                        part = None
+
+                event_id += 1
+                yield format_sse_event({
+                    "done": True,
+                    "transcribed_text": " ".join(texts),
+                    "model_used": selection.model
+                }, event_id)
+            except Exception as e:
+                event_id += 1
+                yield format_sse_event({"error": str(e)}, event_id)
+            finally:
+                await parts.aclose()
+
+        return StreamingResponse(
+            generate_events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **selection.to_headers()}
+        )
+
+    except HTTPException:
+        raise
+    except (LongAudioError, AudioValidationError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Transcription error: {str(e)}")
-    finally:
-        # Clean up temporary file
-        if temp_file_path:
-            audio_processor.cleanup_temp_file(temp_file_path)
 
 @router.post("/synthesize", response_model=TTSResponse)
-async def synthesize_speech(request: TTSRequest):
+async def synthesize_speech(request: TTSRequest, http_request: Request):
     """
     Convert text to speech using Edge TTS
 
+    The output format comes from the request's format field or, failing
+    that, the Accept header. Clients that rank an audio type above JSON
+    get the raw audio body instead of base64 in JSON.
+
     Args:
         request: TTS request with text and voice options
+        http_request: Raw request carrying the Accept header
 
     Returns:
-        Audio data and metadata
+        Audio data and metadata, or the audio itself
     """
+    accept = http_request.headers.get("accept")
+    fmt = negotiate_format(request.format, accept)
     try:
         # Validate text length
         if not tts_provider.validate_text_length(request.text):
@@ -163,18 +371,32 @@ async def synthesize_speech(request: TTSRequest):
         audio_data = await tts_provider.synthesize_speech(
             text=tts_text,  # Use decoded text for TTS
             voice=request.voice,
-            speed=request.speed
+            speed=request.speed,
+            audio_format=fmt.name
         )
-        
+        voice_used = request.voice or tts_provider.get_provider_info().get('default_voice', 'default')
+
+        if prefers_raw_audio(accept):
+            # Binary body: a third smaller than base64 in JSON
+            return Response(
+                content=audio_data,
+                media_type=fmt.mime_type,
+                headers={
+                    "Content-Disposition": f'inline; filename="{fmt.filename()}"',
+                    "X-TTS-Voice": voice_used
+                }
+            )
+
         # Create response format
-        audio_response = audio_processor.create_audio_response(audio_data, "response.wav")
+        audio_response = audio_processor.create_audio_response(audio_data, fmt.filename(), fmt.mime_type)
         
         return TTSResponse(
             audio_data=audio_response["audio_data"],
             filename=audio_response["filename"],
-            format=audio_response["format"],
+            format=fmt.name,
+            mime_type=audio_response["mime_type"],
             size_bytes=audio_response["size_bytes"],
-            voice_used=request.voice or tts_provider.get_provider_info().get('default_voice', 'default')
+            voice_used=voice_used
         )
         
     except HTTPException:
@@ -182,13 +404,119 @@ async def synthesize_speech(request: TTSRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"TTS synthesis error: {str(e)}")
 
+@router.post("/synthesize/stream")
+async def synthesize_speech_stream(request: TTSRequest, http_request: Request):
+    """
+    Convert text to speech, streaming audio over chunked HTTP as it is synthesized
+
+    Playback can start with the first chunk instead of after the whole clip.
+    The X-TTS-First-Byte-Ms header carries the server-side time to first
+    audio byte. The format is negotiated as for /synthesize.
+
+    Args:
+        request: TTS request with text and voice options
+        http_request: Raw request used for disconnect detection
+
+    Returns:
+        Streaming audio response
+    """
+    if not tts_provider.validate_text_length(request.text):
+        max_length = tts_provider.get_provider_info().get('max_input_length', 5000)
+        raise HTTPException(status_code=400, detail=f"Text too long. Maximum length: {max_length} characters")
+    fmt = negotiate_format(request.format, http_request.headers.get("accept"))
+
+    start = time.perf_counter()
+    chunks = tts_provider.synthesize_stream(
+        text=html.unescape(request.text),
+        voice=request.voice,
+        speed=request.speed,
+        audio_format=fmt.name
+    )
+
+    # Wait for the first chunk so synthesis errors still get a proper status code
+    try:
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        raise HTTPException(status_code=500, detail="TTS synthesis error: no audio produced")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"TTS synthesis error: {str(e)}")
+    first_byte_ms = (time.perf_counter() - start) * 1000
+
+    async def stream_audio():
+        try:
+            yield first
+            async for chunk in chunks:
+                if await http_request.is_disconnected():
+                    logger.info("TTS stream client disconnected, stopping synthesis")
+                    return
+                yield chunk
+        except Exception as e:
+            # Headers are already sent; ending the body early is all that's left
+            logger.error(f"TTS stream failed mid-response: {e}")
+        finally:
+            await chunks.aclose()
+
+    return StreamingResponse(
+        stream_audio(),
+        media_type=fmt.mime_type,
+        headers={
+            "Content-Disposition": f'inline; filename="{fmt.filename()}"',
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            "X-TTS-First-Byte-Ms": f"{first_byte_ms:.1f}",
+            "X-TTS-Voice": request.voice or tts_provider.get_provider_info().get('default_voice', 'default')
+        }
+    )
+
+@router.get("/filler")
+async def get_filler_audio(http_request: Request, voice: Optional[str] = None, format: Optional[str] = None):
+    """
+    Get a pre-synthesized acknowledgement ("Let me think…") for a voice
+
+    Served from memory without calling the TTS provider, so clients can
+    request it when they send a /conversation turn and play it while the
+    answer is generated.
+
+    Args:
+        http_request: Raw request carrying the Accept header
+        voice: TTS voice the answer will use
+        format: Output format name; negotiated from the Accept header if omitted
+
+    Returns:
+        Audio response with the spoken phrase in the X-Filler-Text header
+    """
+    if voice:
+        try:
+            voice = validate_voice_name(voice)
+        except SecurityError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    fmt = negotiate_format(format, http_request.headers.get("accept"))
+
+    clip = phrase_bank.pick(tts_provider.resolve_voice(voice), fmt.name)
+    if clip is None:
+        raise HTTPException(status_code=404, detail="No filler audio available for this voice and format")
+
+    return Response(
+        content=bytes(clip.audio),
+        media_type=fmt.mime_type,
+        headers={
+            "Content-Disposition": f'inline; filename="{fmt.filename("filler")}"',
+            "Cache-Control": "no-store",
+            # Header values must be ASCII-safe; the ellipsis is only a pause marker
+            "X-Filler-Text": clip.text.replace("…", "...").encode("ascii", "ignore").decode()
+        }
+    )
+
 @router.post("/conversation", response_model=VoiceConversationResponse)
 async def voice_conversation(
     audio_file: Optional[UploadFile] = File(None),
     text: Optional[str] = Form(None),
     voice: Optional[str] = Form(None),
     speed: Optional[float] = Form(1.0),
-    language: str = Form("en")
+    language: str = Form("en"),
+    conversation_id: Optional[str] = Form(None),
+    audio_format: Optional[str] = Form(None),
+    response: Response = None
 ):
     """
     Complete voice conversation workflow: STT → Chat → TTS
@@ -199,11 +527,13 @@ async def voice_conversation(
         voice: TTS voice to use
         speed: TTS speech speed
         language: STT language
+        conversation_id: Optional server-issued conversation id for context
+        audio_format: TTS output format name; the provider default if omitted
+        response: Outgoing response used to expose the chosen model
 
     Returns:
         Complete conversation response with audio
     """
-    temp_file_path = None
     try:
         # Input validation
         logger.info("Processing voice conversation request")
@@ -216,11 +546,14 @@ async def voice_conversation(
                 voice = validate_voice_name(voice)
             if speed:
                 speed = validate_numeric_range(speed, 0.5, 2.0, "speed")
+            conversation_id = validate_conversation_id(conversation_id)
         except SecurityError as e:
             logger.warning(f"Parameter validation failed: {e}")
             raise HTTPException(status_code=400, detail=str(e))
+        fmt = negotiate_format(audio_format, None)
 
         transcribed_text = None
+        stt_model = None
 
         # Handle input (either audio or text)
         if audio_file:
@@ -242,20 +575,30 @@ async def voice_conversation(
                 raise HTTPException(status_code=400, detail=str(e))
 
             # Process audio input
+            file_extension = (audio_file.filename or "audio.wav").lower().split('.')[-1]
             current_provider = stt_provider.providers[stt_provider.current_provider]
-            if not current_provider.validate_audio_file(audio_file.filename):
+            if not current_provider.validate_audio_data(audio_data, file_extension):
                 raise HTTPException(
                     status_code=400,
                     detail=f"Unsupported audio format. Supported: {current_provider.supported_formats}"
                 )
-
-            # Save and transcribe audio
-            temp_file_path = audio_processor.save_uploaded_audio(audio_data, audio_file.filename)
-
-            transcribed_text = await stt_provider.transcribe_audio_file(
-                audio_file_path=temp_file_path,
-                language=language
+            metadata = sniff_upload(audio_data, file_extension)
+
+            selection = stt_provider.select_model(language)
+            stt_model = selection.model
+            if response is not None:
+                response.headers.update(selection.to_headers())
+
+            # Transcribe straight from memory
+            transcribed_text = await stt_provider.transcribe_audio_data(
+                audio_data,
+                format=file_extension,
+                language=language,
+                model=stt_model,
+                metadata=metadata
             )
+            if not transcribed_text.strip():
+                raise HTTPException(status_code=400, detail="No speech detected in audio")
             user_input = transcribed_text
 
         elif text:
@@ -270,12 +613,25 @@ async def voice_conversation(
         else:
             raise HTTPException(status_code=400, detail="Either audio_file or text must be provided")
         
+        try:
+            conversation_id, history = conversation_store.resolve(conversation_id)
+        except ConversationNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+
+        # Spoken turns go to the fastest healthy model
+        route = groq_chat.route_request(user_input, history, 500, profile="voice")
+        if response is not None:
+            response.headers.update(route.to_headers())
+
         # Generate AI response
-        logger.info("Generating AI response")
+        logger.info(f"Generating AI response with {route.model} ({route.reason})")
         ai_response = await groq_chat.generate_response(
             message=user_input,
+            conversation_history=history or None,
             temperature=0.7,
-            max_tokens=500
+            max_tokens=500,
+            conversation_id=conversation_id,
+            route=route
         )
 
         # Sanitize AI response
@@ -285,6 +641,11 @@ async def voice_conversation(
             logger.warning(f"AI response sanitization failed: {e}")
             ai_response = "Response contained invalid content and was filtered."
 
+        conversation_store.append_turns(conversation_id, [
+            {"role": "user", "content": user_input},
+            {"role": "assistant", "content": ai_response}
+        ])
+
         # Decode HTML entities for TTS (but keep encoded version for response)
         tts_text = html.unescape(ai_response)
 
@@ -293,33 +654,37 @@ async def voice_conversation(
         audio_data = await tts_provider.synthesize_speech(
             text=tts_text,  # Use decoded text for TTS
             voice=voice,
-            speed=speed
+            speed=speed,
+            audio_format=fmt.name
         )
 
         # Create audio response
-        audio_response = audio_processor.create_audio_response(audio_data, "conversation_response.wav")
+        audio_response = audio_processor.create_audio_response(
+            audio_data, fmt.filename("conversation_response"), fmt.mime_type
+        )
 
         logger.info("Voice conversation completed successfully")
         return VoiceConversationResponse(
             transcribed_text=transcribed_text,
+            stt_model=stt_model,
             ai_response=ai_response,
             audio_data=audio_response["audio_data"],
             filename=audio_response["filename"],
-            voice_used=voice or tts_provider.get_provider_info().get('default_voice', 'default')
+            mime_type=audio_response["mime_type"],
+            voice_used=voice or tts_provider.get_provider_info().get('default_voice', 'default'),
+            conversation_id=conversation_id
         )
 
     except HTTPException:
         raise
+    except AudioValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except SecurityError as e:
         logger.warning(f"Security validation failed in voice conversation: {e}")
         raise HTTPException(status_code=400, detail=f"Security validation failed: {str(e)}")
     except Exception as e:
         logger.error(f"Unexpected error in voice conversation: {e}")
         raise HTTPException(status_code=500, detail=f"Voice conversation error: {str(e)}")
-    finally:
-        # Clean up temporary file
-        if temp_file_path:
-            audio_processor.cleanup_temp_file(temp_file_path)
 
 @router.get("/voices")
 async def get_available_voices():
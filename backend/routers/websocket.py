@@ -13,6 +13,9 @@ from datetime import datetime
 from models.groq_chat import GroqChatModel
 from utils.stt_provider import STTProvider
 from utils.tts_provider import TTSProvider
+from utils.audio_processor import audio_processor, AudioValidationError
+from utils.streaming_stt import streaming_stt
+from utils.phrase_bank import phrase_bank
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -43,6 +46,10 @@ class ConnectionManager:
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
         if websocket in self.connection_data:
+            # Abandon a recording still streaming when the client went away
+            session = self.connection_data[websocket].get('stt_stream')
+            if session is not None:
+                streaming_stt.release(session)
             del self.connection_data[websocket]
         logger.info(f"WebSocket connection closed. Total connections: {len(self.active_connections)}")
     
@@ -114,6 +121,9 @@ async def handle_websocket_message(websocket: WebSocket, message_data: Dict[str,
         elif message_type == "audio_data":
             await handle_audio_data(websocket, message_data)
         
+        elif message_type == "audio_chunk":
+            await handle_audio_chunk(websocket, message_data)
+        
         elif message_type == "start_recording":
             await handle_start_recording(websocket, message_data)
         
@@ -173,14 +183,24 @@ async def handle_text_message(websocket: WebSocket, message_data: Dict[str, Any]
         "message": user_message,
         "timestamp": datetime.now().isoformat()
     }, websocket)
+
+    # Spoken turns get a pre-synthesized acknowledgement while the model thinks
+    if voice_settings.get("auto_tts", False) and voice_settings.get("filler", True):
+        await send_filler_audio(websocket, voice_settings)
     
     try:
         # Generate AI response
+        # History excludes the message just appended; the chat model compacts
+        # it to the prompt token budget
+        history = conversation_history[:-1]
+        route = chat_model.route_request(user_message, history, 500, profile="voice")
         ai_response = await chat_model.generate_response_async(
             message=user_message,
-            conversation_history=conversation_history[-10:],  # Last 10 messages
+            conversation_history=history,
             temperature=0.7,
-            max_tokens=500
+            max_tokens=500,
+            conversation_id=manager.connection_data[websocket]['session_id'],
+            route=route
         )
         
         if ai_response:
@@ -198,6 +218,7 @@ async def handle_text_message(websocket: WebSocket, message_data: Dict[str, Any]
             await manager.send_personal_message({
                 "type": "ai_response",
                 "message": decoded_response,
+                "model": route.model,
                 "timestamp": datetime.now().isoformat()
             }, websocket)
 
@@ -244,12 +265,26 @@ async def handle_audio_data(websocket: WebSocket, message_data: Dict[str, Any]):
         # Transcribe audio
         import base64
         audio_bytes = base64.b64decode(audio_data)
-        transcribed_text = await stt_provider.transcribe_audio_data(audio_bytes, "wav", language)
+        # Browsers record WebM or Ogg; the header tells us which, and rejects garbage early
+        metadata = audio_processor.sniff_audio(audio_bytes, message_data.get("format", "wav"))
+        if not metadata.valid:
+            await manager.send_personal_message({
+                "type": "error",
+                "message": f"Invalid audio: {metadata.error}",
+                "timestamp": datetime.now().isoformat()
+            }, websocket)
+            return
+        selection = stt_provider.select_model(language)
+        transcribed_text = await stt_provider.transcribe_audio_data(
+            audio_bytes, metadata.format, language, selection.model, metadata=metadata
+        )
         
         if transcribed_text:
             await manager.send_personal_message({
                 "type": "transcription_result",
                 "transcribed_text": transcribed_text,
+                "model": selection.model,
+                "audio_info": metadata.to_dict(),
                 "timestamp": datetime.now().isoformat()
             }, websocket)
             
@@ -265,6 +300,12 @@ async def handle_audio_data(websocket: WebSocket, message_data: Dict[str, Any]):
                 "timestamp": datetime.now().isoformat()
             }, websocket)
     
+    except AudioValidationError as e:
+        await manager.send_personal_message({
+            "type": "error",
+            "message": f"Invalid audio: {str(e)}",
+            "timestamp": datetime.now().isoformat()
+        }, websocket)
     except Exception as e:
         logger.error(f"Error processing audio: {e}")
         await manager.send_personal_message({
@@ -274,21 +315,121 @@ async def handle_audio_data(websocket: WebSocket, message_data: Dict[str, Any]):
         }, websocket)
 
 async def handle_start_recording(websocket: WebSocket, message_data: Dict[str, Any]):
-    """Handle start recording request"""
+    """
+    Handle start recording request
+
+    With "streaming": true the client sends the recording as audio_chunk
+    messages (base64 16-bit mono PCM at "sample_rate"). Segments are cut at
+    pauses and transcribed while the user speaks, each pushed as a
+    partial_transcript, so stop_recording only waits for the last one.
+    """
+    if not message_data.get("streaming"):
+        await manager.send_personal_message({
+            "type": "recording_started",
+            "message": "Recording started - speak now",
+            "timestamp": datetime.now().isoformat()
+        }, websocket)
+        return
+
+    connection = manager.connection_data[websocket]
+    previous = connection.pop('stt_stream', None)
+    if previous is not None:
+        streaming_stt.release(previous)
+
+    language = message_data.get("language", "en-US")
+    selection = stt_provider.select_model(language)
+
+    async def transcribe_segment(audio_data: bytes) -> str:
+        return await stt_provider.transcribe_audio_data(audio_data, "wav", language, selection.model)
+
+    async def send_partial(segment: int, text: str):
+        await manager.send_personal_message({
+            "type": "partial_transcript",
+            "segment": segment,
+            "text": text,
+            "transcript": session.transcript,
+            "timestamp": datetime.now().isoformat()
+        }, websocket)
+
+    try:
+        session = streaming_stt.create_session(
+            transcribe_segment,
+            send_partial,
+            sample_rate=int(message_data.get("sample_rate", 16000))
+        )
+    except (RuntimeError, ValueError) as e:
+        await manager.send_personal_message({
+            "type": "error",
+            "message": f"Streaming transcription unavailable: {str(e)}",
+            "timestamp": datetime.now().isoformat()
+        }, websocket)
+        return
+
+    connection['stt_stream'] = session
+    connection['stt_stream_settings'] = {
+        "model": selection.model,
+        "voice_settings": message_data.get("voice_settings", {})
+    }
     await manager.send_personal_message({
         "type": "recording_started",
         "message": "Recording started - speak now",
+        "streaming": True,
+        "sample_rate": session.sample_rate,
+        "model": selection.model,
         "timestamp": datetime.now().isoformat()
     }, websocket)
 
+async def handle_audio_chunk(websocket: WebSocket, message_data: Dict[str, Any]):
+    """Handle a frame of a streaming recording"""
+    session = manager.connection_data[websocket].get('stt_stream')
+    if session is None:
+        await manager.send_personal_message({
+            "type": "error",
+            "message": "No streaming recording in progress; send start_recording with streaming enabled first",
+            "timestamp": datetime.now().isoformat()
+        }, websocket)
+        return
+
+    import base64
+    session.feed(base64.b64decode(message_data.get("audio_data", "")))
+
 async def handle_stop_recording(websocket: WebSocket, message_data: Dict[str, Any]):
-    """Handle stop recording request"""
+    """Handle stop recording request, finishing a streaming transcription if one is running"""
     await manager.send_personal_message({
         "type": "recording_stopped",
         "message": "Recording stopped - processing audio",
         "timestamp": datetime.now().isoformat()
     }, websocket)
 
+    connection = manager.connection_data[websocket]
+    session = connection.pop('stt_stream', None)
+    if session is None:
+        return
+    settings = connection.pop('stt_stream_settings', {})
+
+    transcribed_text = await streaming_stt.finish(session)
+    if not transcribed_text:
+        await manager.send_personal_message({
+            "type": "error",
+            "message": "No speech detected in recording",
+            "timestamp": datetime.now().isoformat()
+        }, websocket)
+        return
+
+    await manager.send_personal_message({
+        "type": "transcription_result",
+        "transcribed_text": transcribed_text,
+        "model": settings.get("model"),
+        "streaming": True,
+        "segments": session.segments,
+        "timestamp": datetime.now().isoformat()
+    }, websocket)
+
+    await handle_text_message(websocket, {
+        "message": transcribed_text,
+        "voice_settings": message_data.get("voice_settings", settings.get("voice_settings", {}))
+    })
+
 async def handle_get_voices(websocket: WebSocket, message_data: Dict[str, Any]):
     """Handle get available voices request"""
     try:
@@ -306,11 +447,30 @@ async def handle_get_voices(websocket: WebSocket, message_data: Dict[str, Any]):
             "timestamp": datetime.now().isoformat()
         }, websocket)
 
+async def send_filler_audio(websocket: WebSocket, voice_settings: Dict[str, Any]):
+    """Send a filler clip from the phrase bank, if one exists for the voice and format"""
+    try:
+        fmt = tts_provider.resolve_format(voice_settings.get("format"))
+    except ValueError:
+        return
+    clip = phrase_bank.pick(tts_provider.resolve_voice(voice_settings.get("voice")), fmt.name)
+    if clip is None:
+        return
+    await manager.send_personal_message({
+        "type": "filler_audio",
+        "audio_data": clip.audio_base64(),
+        "text": clip.text,
+        "format": fmt.name,
+        "mime_type": fmt.mime_type,
+        "timestamp": datetime.now().isoformat()
+    }, websocket)
+
 async def generate_and_send_tts(websocket: WebSocket, text: str, voice_settings: Dict[str, Any]):
     """Generate TTS and send audio data"""
     try:
         voice = voice_settings.get("voice")
         speed = voice_settings.get("speed", 1.0)
+        fmt = tts_provider.resolve_format(voice_settings.get("format"))
         
         # Send TTS processing status
         await manager.send_personal_message({
@@ -320,12 +480,14 @@ async def generate_and_send_tts(websocket: WebSocket, text: str, voice_settings:
         }, websocket)
         
         # Generate TTS
-        audio_data = await tts_provider.synthesize_async(text, voice, speed)
+        audio_data = await tts_provider.synthesize_async(text, voice, speed, fmt.name)
         
         if audio_data:
             await manager.send_personal_message({
                 "type": "tts_audio",
                 "audio_data": audio_data,  # Base64 encoded
+                "format": fmt.name,
+                "mime_type": fmt.mime_type,
                 "text": text,
                 "timestamp": datetime.now().isoformat()
             }, websocket)
@@ -353,6 +515,7 @@ async def websocket_status():
         "supported_message_types": [
             "text_message",
             "audio_data", 
+            "audio_chunk",
             "start_recording",
             "stop_recording",
             "get_voices",
@@ -0,0 +1,32 @@
+"""
+Audio fixtures shared by the audio test modules
+"""
+
+import io
+import wave
+import struct
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+def tone(seconds: float, sample_rate: int = SAMPLE_RATE, frequency: float = 440.0, amplitude: float = 0.3) -> np.ndarray:
+    """A sine tone as float samples"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+def pcm_wav(samples: np.ndarray, sample_rate: int = SAMPLE_RATE, channels: int = 1) -> bytes:
+    """Encode float samples in [-1, 1] as 16-bit PCM WAV, copied to every channel"""
+    pcm = (np.clip(samples, -1, 1) * 32767).astype("<i2")
+    if channels > 1:
+        pcm = np.repeat(pcm, channels)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+def ogg_page(granule: int, payload: bytes) -> bytes:
+    """Single-segment Ogg page (CRC not checked by the sniffer)"""
+    return b"OggS\x00\x00" + struct.pack("<qIII", granule, 1, 0, 0) + bytes([1, len(payload)]) + payload
@@ -19,6 +19,7 @@ os.environ["TESTING"] = "true"
 os.environ["GROQ_API_KEY"] = "gsk_test_key_" + "a" * 48  # Valid test key format
 os.environ["AZURE_SPEECH_KEY"] = "test_azure_key_12345678901234567890"
 os.environ["AZURE_SPEECH_REGION"] = "eastus"
+os.environ["PHRASE_BANK_BUILD_ON_STARTUP"] = "false"
 
 @pytest.fixture(scope="session")
 def event_loop():
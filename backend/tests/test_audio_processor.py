@@ -0,0 +1,309 @@
+"""
+Unit tests for audio processing, header sniffing and voice activity trimming
+"""
+
+import io
+import wave
+import struct
+import pytest
+import numpy as np
+from unittest.mock import AsyncMock, Mock, patch
+from utils.audio_processor import AudioProcessor, AudioValidationError
+from utils.stt_provider import STTProvider
+from tests.audio_helpers import SAMPLE_RATE, pcm_wav, ogg_page
+
+def _utterance(lead: float, speech: float, tail: float, noise_level: float = 0.001) -> np.ndarray:
+    """Quiet background noise around a voiced segment"""
+    rng = np.random.default_rng(0)
+    total = int((lead + speech + tail) * SAMPLE_RATE)
+    samples = rng.normal(0, noise_level, total).astype(np.float32)
+    start = int(lead * SAMPLE_RATE)
+    t = np.arange(int(speech * SAMPLE_RATE)) / SAMPLE_RATE
+    samples[start:start + len(t)] += 0.3 * np.sin(2 * np.pi * 220 * t) * (1 + 0.5 * np.sin(2 * np.pi * 3 * t))
+    return samples
+
+def _ebml(element_id: bytes, payload: bytes) -> bytes:
+    """EBML element with an 8-byte size"""
+    return element_id + b"\x01" + len(payload).to_bytes(7, "big") + payload
+
+def _box(box_type: bytes, payload: bytes) -> bytes:
+    """MP4 box"""
+    return struct.pack(">I", 8 + len(payload)) + box_type + payload
+
+def _webm(duration_ms: float = 2500.0) -> bytes:
+    """WebM/Opus header as MediaRecorder writes it, without real clusters"""
+    header = _ebml(b"\x1a\x45\xdf\xa3", _ebml(b"\x42\x82", b"webm"))
+    info = _ebml(b"\x15\x49\xa9\x66",
+                 _ebml(b"\x2a\xd7\xb1", (1000000).to_bytes(3, "big")) + _ebml(b"\x44\x89", struct.pack(">d", duration_ms)))
+    track = _ebml(b"\xae", _ebml(b"\x86", b"A_OPUS") +
+                  _ebml(b"\xe1", _ebml(b"\xb5", struct.pack(">d", 48000.0)) + _ebml(b"\x9f", b"\x01")))
+    segment = _ebml(b"\x18\x53\x80\x67", info + _ebml(b"\x16\x54\xae\x6b", track) +
+                    _ebml(b"\x1f\x43\xb6\x75", b"\x00" * 100))
+    return header + segment
+
+@pytest.mark.unit
+class TestAudioSniffing:
+    """Test container detection and header parsing"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.processor = AudioProcessor()
+
+    def test_wav(self):
+        """Test WAV duration comes from the data chunk and byte rate"""
+        metadata = self.processor.sniff_audio(pcm_wav(np.zeros(SAMPLE_RATE * 2), channels=2), "wav")
+
+        assert metadata.valid
+        assert (metadata.format, metadata.codec) == ("wav", "pcm_16")
+        assert (metadata.sample_rate, metadata.channels) == (SAMPLE_RATE, 2)
+        assert metadata.duration_seconds == pytest.approx(2.0)
+
+    def test_flac(self):
+        """Test FLAC facts come from STREAMINFO"""
+        fields = (44100 << 44) | (1 << 41) | (15 << 36) | 44100 * 3
+        streaminfo = b"\x10\x00\x10\x00" + b"\x00" * 6 + fields.to_bytes(8, "big") + b"\x00" * 16
+        metadata = self.processor.sniff_audio(b"fLaC\x80\x00\x00\x22" + streaminfo, "flac")
+
+        assert metadata.valid
+        assert (metadata.sample_rate, metadata.channels) == (44100, 2)
+        assert metadata.duration_seconds == pytest.approx(3.0)
+
+    def test_ogg_opus(self):
+        """Test Opus duration comes from the last granule position minus pre-skip"""
+        head = b"OpusHead\x01\x01" + struct.pack("<HIhB", 312, 16000, 0, 0)
+        audio = ogg_page(0, head) + ogg_page(312 + 48000 * 2, b"\x00" * 50)
+        metadata = self.processor.sniff_audio(audio, "ogg")
+
+        assert metadata.valid
+        assert (metadata.codec, metadata.sample_rate, metadata.channels) == ("opus", 16000, 1)
+        assert metadata.duration_seconds == pytest.approx(2.0)
+
+    def test_mp3_cbr_after_id3_tag(self):
+        """Test the ID3 tag is skipped and CBR duration estimated from the payload"""
+        frame = b"\xff\xfb\x90\x00" + b"\x00" * 413  # MPEG-1 layer 3, 128 kbps, 44.1 kHz
+        id3 = b"ID3\x03\x00\x00\x00\x00\x00\x0a" + b"\x00" * 10
+        metadata = self.processor.sniff_audio(id3 + frame * 100, "mp3")
+
+        assert metadata.valid
+        assert (metadata.codec, metadata.sample_rate, metadata.channels) == ("mp3", 44100, 2)
+        assert metadata.duration_seconds == pytest.approx(100 * 1152 / 44100, rel=0.01)
+
+    def test_webm(self):
+        """Test WebM facts come from the segment info and audio track"""
+        metadata = self.processor.sniff_audio(_webm(2500.0), "webm")
+
+        assert metadata.valid
+        assert (metadata.codec, metadata.sample_rate, metadata.channels) == ("opus", 48000, 1)
+        assert metadata.duration_seconds == pytest.approx(2.5)
+
+    def test_m4a(self):
+        """Test M4A facts come from mvhd and the audio sample entry"""
+        mvhd = _box(b"mvhd", b"\x00" * 12 + struct.pack(">II", 1000, 4000) + b"\x00" * 80)
+        entry = _box(b"mp4a", b"\x00" * 6 + b"\x00\x01" + b"\x00" * 8 + struct.pack(">HHHHI", 2, 16, 0, 0, 44100 << 16))
+        stsd = _box(b"stsd", b"\x00" * 4 + struct.pack(">I", 1) + entry)
+        trak = _box(b"trak", _box(b"mdia", _box(b"minf", _box(b"stbl", stsd))))
+        audio = _box(b"ftyp", b"M4A \x00\x00\x00\x00") + _box(b"moov", mvhd + trak) + _box(b"mdat", b"\x00" * 64)
+        metadata = self.processor.sniff_audio(audio, "m4a")
+
+        assert metadata.valid
+        assert (metadata.codec, metadata.sample_rate, metadata.channels) == ("mp4a", 44100, 2)
+        assert metadata.duration_seconds == pytest.approx(4.0)
+
+    def test_garbage_is_rejected(self):
+        """Test unrecognized and truncated data is invalid"""
+        assert not self.processor.sniff_audio(b"\x00" * 64, "mp3").valid
+        assert not self.processor.sniff_audio(b"RIFF\x00\x00\x00\x00WAVE", "wav").valid
+        assert not self.processor.sniff_audio(b"", "wav").valid
+        assert self.processor.get_sniff_stats()['rejected'] == 3
+
+    def test_mislabeled_file_is_detected(self):
+        """Test the detected container wins over the file extension"""
+        metadata = self.processor.sniff_audio(pcm_wav(np.zeros(SAMPLE_RATE)), "mp3")
+
+        assert metadata.valid
+        assert metadata.mislabeled
+        assert metadata.format == "wav"
+        assert self.processor.get_sniff_stats()['mislabeled'] == 1
+
+    def test_sniff_file(self, tmp_path):
+        """Test files are sniffed without the extension deciding the format"""
+        path = tmp_path / "clip.webm"
+        path.write_bytes(pcm_wav(np.zeros(SAMPLE_RATE)))
+
+        metadata = self.processor.sniff_audio_file(str(path))
+
+        assert (metadata.format, metadata.declared_format) == ("wav", "webm")
+        assert metadata.size_bytes == path.stat().st_size
+
+    def test_duration_limits(self):
+        """Test durations outside the configured limits are flagged"""
+        self.processor.max_audio_seconds = 2.0
+        short = self.processor.sniff_audio(pcm_wav(np.zeros(SAMPLE_RATE // 100)), "wav")
+        long = self.processor.sniff_audio(pcm_wav(np.zeros(SAMPLE_RATE * 3)), "wav")
+        fine = self.processor.sniff_audio(pcm_wav(np.zeros(SAMPLE_RATE)), "wav")
+
+        assert self.processor.check_duration(short) == "too_short"
+        assert self.processor.check_duration(long) == "too_long"
+        assert self.processor.check_duration(fine) is None
+
+@pytest.mark.unit
+class TestVoiceActivityTrimming:
+    """Test energy-based silence trimming"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.processor = AudioProcessor()
+        self.processor.vad_enabled = True
+
+    def test_trims_leading_and_trailing_silence(self):
+        """Test silence around speech is removed, keeping the hangover"""
+        audio = pcm_wav(_utterance(1.0, 1.0, 1.0))
+
+        result = self.processor.trim_silence(audio, "wav")
+
+        assert result.speech_detected
+        assert result.original_seconds == pytest.approx(3.0)
+        # 2s of silence minus ~0.2s hangover on each side
+        assert 1.4 <= result.trimmed_seconds <= 1.8
+        assert len(result.audio_data) < len(audio) * 0.6
+        with wave.open(io.BytesIO(result.audio_data), "rb") as wav:
+            assert wav.getframerate() == SAMPLE_RATE
+            assert wav.getnframes() / SAMPLE_RATE == pytest.approx(3.0 - result.trimmed_seconds)
+
+    def test_silent_clip_has_no_speech(self):
+        """Test a clip of background noise is reported as speechless"""
+        audio = pcm_wav(_utterance(2.0, 0.0, 0.0))
+
+        result = self.processor.trim_silence(audio, "wav")
+
+        assert not result.speech_detected
+        assert result.audio_data == b""
+        assert self.processor.get_vad_stats()['no_speech_skipped'] == 1
+
+    def test_continuous_speech_is_kept(self):
+        """Test a clip that is speech throughout is passed through unchanged"""
+        audio = pcm_wav(_utterance(0.0, 2.0, 0.0))
+
+        result = self.processor.trim_silence(audio, "wav")
+
+        assert result.speech_detected
+        assert result.audio_data == audio
+        assert result.trimmed_seconds == 0.0
+
+    def test_stereo_input(self):
+        """Test multi-channel audio is analyzed as mono and trimmed per frame"""
+        audio = pcm_wav(_utterance(0.5, 0.5, 0.5), channels=2)
+
+        result = self.processor.trim_silence(audio, "wav")
+
+        with wave.open(io.BytesIO(result.audio_data), "rb") as wav:
+            assert wav.getnchannels() == 2
+        assert result.trimmed_seconds > 0.4
+
+    def test_non_wav_passes_through(self):
+        """Test formats that can't be decoded are left alone"""
+        result = self.processor.trim_silence(b"\x1aE\xdf\xa3webm", "webm")
+
+        assert result.speech_detected
+        assert not result.analyzed
+        assert result.audio_data == b"\x1aE\xdf\xa3webm"
+
+    def test_metrics_report_trimmed_seconds(self):
+        """Test trimmed seconds are reported per request"""
+        self.processor.trim_silence(pcm_wav(_utterance(1.0, 1.0, 1.0)), "wav")
+
+        stats = self.processor.get_vad_stats()
+        assert stats['analyzed'] == 1
+        assert stats['last_trimmed_seconds'] > 1.0
+        assert stats['total_input_seconds'] == pytest.approx(3.0)
+
+@pytest.mark.unit
+class TestSTTProviderVAD:
+    """Test the STT provider skips speechless audio"""
+
+    @pytest.mark.asyncio
+    async def test_silent_audio_skips_upstream(self):
+        """Test no transcription is requested when there is no speech"""
+        provider = STTProvider()
+        upstream = AsyncMock(return_value="should not be called")
+
+        with patch.object(provider.providers["groq"], "transcribe_audio_data", upstream), \
+                patch("utils.stt_provider.audio_processor.vad_enabled", True):
+            result = await provider.transcribe_audio_data(pcm_wav(np.zeros(SAMPLE_RATE)), "wav")
+
+        assert result == ""
+        upstream.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_speech_is_sent_trimmed(self):
+        """Test trimmed audio is what reaches the upstream model"""
+        provider = STTProvider()
+        upstream = AsyncMock(return_value="hello")
+        audio = pcm_wav(_utterance(1.0, 1.0, 1.0))
+
+        with patch.object(provider.providers["groq"], "transcribe_audio_data", upstream), \
+                patch("utils.stt_provider.audio_processor.vad_enabled", True):
+            result = await provider.transcribe_audio_data(audio, "wav")
+
+        assert result == "hello"
+        sent_audio = upstream.call_args.args[0]
+        assert len(sent_audio) < len(audio)
+
+@pytest.mark.unit
+class TestSTTProviderEarlyRejection:
+    """Test bad uploads never reach the upstream model"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.provider = STTProvider()
+        self.upstream = AsyncMock(return_value="hello")
+
+    @pytest.mark.asyncio
+    async def test_corrupted_audio_raises(self):
+        """Test unrecognized data is rejected before upload"""
+        with patch.object(self.provider.providers["groq"], "transcribe_audio_data", self.upstream):
+            with pytest.raises(AudioValidationError):
+                await self.provider.transcribe_audio_data(b"not audio at all" * 8, "webm")
+
+        self.upstream.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_too_short_audio_is_skipped(self):
+        """Test clips below the minimum duration short-circuit to an empty transcript"""
+        with patch.object(self.provider.providers["groq"], "transcribe_audio_data", self.upstream):
+            result = await self.provider.transcribe_audio_data(pcm_wav(np.zeros(SAMPLE_RATE // 100)), "wav")
+
+        assert result == ""
+        self.upstream.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_mislabeled_audio_is_sent_with_detected_format(self):
+        """Test a WAV named .mp3 is uploaded as WAV"""
+        with patch.object(self.provider.providers["groq"], "transcribe_audio_data", self.upstream), \
+                patch("utils.stt_provider.audio_processor.vad_enabled", False), \
+                patch("utils.stt_provider.audio_transcoder.enabled", False):
+            await self.provider.transcribe_audio_data(pcm_wav(_utterance(0.2, 0.5, 0.2)), "mp3")
+
+        assert self.upstream.call_args.args[1] == "wav"
+
+    @pytest.mark.asyncio
+    async def test_compressed_recording_is_decoded_and_trimmed(self):
+        """Test a WebM/Opus browser recording is decoded to PCM so silence can be trimmed"""
+        provider = STTProvider()
+        upstream = AsyncMock(return_value="hello")
+        recording = _webm(3000.0)
+        decoded = pcm_wav(_utterance(1.0, 1.0, 1.0))
+        transcoder = Mock(enabled=False)
+        transcoder.decode_to_wav = AsyncMock(return_value=decoded)
+
+        with patch.object(provider.providers["groq"], "transcribe_audio_data", upstream), \
+                patch("utils.stt_provider.audio_processor.vad_enabled", True), \
+                patch("utils.stt_provider.audio_transcoder", transcoder):
+            result = await provider.transcribe_audio_data(recording, "wav")
+
+        assert result == "hello"
+        transcoder.decode_to_wav.assert_awaited_once_with(recording, "webm")
+        sent_audio, sent_format = upstream.call_args.args[:2]
+        assert sent_format == "wav"
+        with wave.open(io.BytesIO(sent_audio), "rb") as wav:
+            assert wav.getnframes() / SAMPLE_RATE < 2.0
@@ -0,0 +1,168 @@
+"""
+Unit tests for pre-upload audio transcoding
+"""
+
+import io
+import wave
+import pytest
+from unittest.mock import AsyncMock, patch
+from utils.audio_transcoder import AudioTranscoder, transcode_worker, FFMPEG_PATH
+from utils.stt_provider import STTProvider
+from tests.audio_helpers import pcm_wav, tone
+
+def _recording(seconds: float, sample_rate: int = 48000, channels: int = 2) -> bytes:
+    """A tone as 16-bit PCM WAV like a raw browser recording"""
+    return pcm_wav(tone(seconds, sample_rate), sample_rate, channels)
+
+@pytest.mark.unit
+class TestTranscodeWorker:
+    """Test the worker function run in the process pool"""
+
+    def test_numpy_fallback_resamples_to_16k_mono(self):
+        """Test 48 kHz stereo WAV becomes 16 kHz mono WAV without ffmpeg"""
+        audio = _recording(1.0)
+
+        output, output_format, cpu_seconds = transcode_worker(audio, "flac", None)
+
+        assert output_format == "wav"
+        assert cpu_seconds > 0
+        with wave.open(io.BytesIO(output), "rb") as wav:
+            assert wav.getframerate() == 16000
+            assert wav.getnchannels() == 1
+            assert wav.getnframes() == 16000
+        # 3x fewer samples per channel and half the channels
+        assert len(output) < len(audio) / 5
+
+    def test_numpy_fallback_rejects_undecodable(self):
+        """Test non-PCM input yields no output"""
+        output, _, _ = transcode_worker(b"\x1aE\xdf\xa3webm", "flac", None)
+
+        assert output is None
+
+    @pytest.mark.skipif(FFMPEG_PATH is None, reason="ffmpeg not installed")
+    def test_ffmpeg_encodes_flac(self):
+        """Test ffmpeg produces 16 kHz mono FLAC"""
+        output, output_format, _ = transcode_worker(_recording(1.0), "flac", FFMPEG_PATH)
+
+        assert output_format == "flac"
+        assert output.startswith(b"fLaC")
+
+    @pytest.mark.skipif(FFMPEG_PATH is None, reason="ffmpeg not installed")
+    def test_ffmpeg_encodes_speech_formats(self):
+        """Test TTS formats get their own sample rate and WebM keeps its duration"""
+        from utils.audio_processor import audio_processor
+
+        webm, output_format, _ = transcode_worker(_recording(1.0), "opus-webm", FFMPEG_PATH, 24000)
+        metadata = audio_processor.sniff_audio(webm, "webm", record_stats=False)
+        assert output_format == "webm"
+        assert metadata.duration_seconds == pytest.approx(1.0, abs=0.1)
+
+        mp3, output_format, _ = transcode_worker(_recording(1.0), "mp3-32k", FFMPEG_PATH, 16000)
+        assert output_format == "mp3"
+        assert audio_processor.sniff_audio(mp3, "mp3", record_stats=False).sample_rate == 16000
+
+@pytest.mark.unit
+class TestAudioTranscoder:
+    """Test the normalization stage and its metrics"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.transcoder = AudioTranscoder(enabled=True, max_workers=1, ffmpeg_path=None)
+
+    def teardown_method(self):
+        """Stop worker processes"""
+        self.transcoder.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_normalize_runs_in_process_pool(self):
+        """Test transcoding happens in a worker and records ratio and CPU time"""
+        audio = _recording(2.0)
+
+        result = await self.transcoder.normalize(audio, "wav")
+
+        assert result.transcoded
+        assert result.format == "wav"
+        assert result.output_bytes < result.input_bytes
+        stats = self.transcoder.get_stats()
+        assert stats['transcoded'] == 1
+        assert stats['compression_ratio'] > 5
+        assert stats['cpu_seconds'] > 0
+        assert stats['backend'] == "numpy"
+
+    @pytest.mark.asyncio
+    async def test_small_input_is_skipped(self):
+        """Test short clips aren't worth a round trip to the pool"""
+        audio = _recording(0.05)
+
+        result = await self.transcoder.normalize(audio, "wav")
+
+        assert not result.transcoded
+        assert result.reason == "small_input"
+        assert result.audio_data == audio
+
+    @pytest.mark.asyncio
+    async def test_compressed_input_needs_ffmpeg(self):
+        """Test formats the NumPy fallback can't decode are sent as-is"""
+        audio = b"\x1aE\xdf\xa3" + b"\x00" * 64 * 1024
+
+        result = await self.transcoder.normalize(audio, "webm")
+
+        assert not result.transcoded
+        assert result.reason == "no_decoder"
+        assert result.format == "webm"
+
+    @pytest.mark.asyncio
+    async def test_output_not_smaller_keeps_original(self):
+        """Test audio already at 16 kHz mono isn't replaced"""
+        audio = _recording(2.0, sample_rate=16000, channels=1)
+
+        result = await self.transcoder.normalize(audio, "wav")
+
+        assert not result.transcoded
+        assert result.reason == "not_smaller"
+        assert result.audio_data == audio
+
+    @pytest.mark.asyncio
+    async def test_speech_encoding_needs_ffmpeg(self):
+        """Test TTS formats are only offered and encoded when ffmpeg is present"""
+        transcoder = AudioTranscoder(enabled=True, ffmpeg_path=None)
+
+        assert not transcoder.can_encode("opus-ogg")
+        assert await transcoder.encode_speech(b"ID3 mp3", "opus-ogg", 24000) is None
+        assert AudioTranscoder(ffmpeg_path="/usr/bin/ffmpeg").can_encode("opus-webm")
+        assert not AudioTranscoder(ffmpeg_path="/usr/bin/ffmpeg").can_encode("flac")
+
+    @pytest.mark.asyncio
+    async def test_disabled(self):
+        """Test a disabled transcoder passes audio through"""
+        self.transcoder.enabled = False
+
+        result = await self.transcoder.normalize(_recording(2.0), "wav")
+
+        assert result.reason == "disabled"
+        assert self.transcoder._executor is None
+
+@pytest.mark.unit
+class TestSTTProviderTranscoding:
+    """Test the STT provider uploads the normalized audio"""
+
+    @pytest.mark.asyncio
+    async def test_upstream_receives_transcoded_audio(self):
+        """Test the smaller 16 kHz mono copy and its format reach the model"""
+        provider = STTProvider()
+        upstream = AsyncMock(return_value="hello")
+        transcoder = AudioTranscoder(enabled=True, max_workers=1, ffmpeg_path=None)
+        audio = _recording(2.0)
+
+        try:
+            with patch.object(provider.providers["groq"], "transcribe_audio_data", upstream), \
+                    patch("utils.stt_provider.audio_processor.vad_enabled", False), \
+                    patch("utils.stt_provider.audio_transcoder", transcoder):
+                result = await provider.transcribe_audio_data(audio, "wav")
+        finally:
+            transcoder.shutdown()
+
+        assert result == "hello"
+        sent_audio, sent_format = upstream.call_args.args[:2]
+        assert sent_format == "wav"
+        assert len(sent_audio) < len(audio) / 5
@@ -0,0 +1,86 @@
+"""
+Unit tests for the bounded upstream concurrency limiter
+"""
+
+import pytest
+import asyncio
+from utils.concurrency_limiter import ConcurrencyLimiter
+
+@pytest.mark.unit
+class TestConcurrencyLimiter:
+    """Test slot accounting, FIFO order and metrics"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.limiter = ConcurrencyLimiter("test", max_concurrency=2)
+
+    @pytest.mark.asyncio
+    async def test_caps_in_flight(self):
+        """Test no more than max_concurrency calls run at once"""
+        running = []
+        peak = []
+
+        async def call():
+            async with self.limiter.slot():
+                running.append(1)
+                peak.append(len(running))
+                await asyncio.sleep(0.01)
+                running.pop()
+
+        await asyncio.gather(*[call() for _ in range(6)])
+
+        assert max(peak) == 2
+        assert self.limiter.in_flight == 0
+        stats = self.limiter.get_stats()
+        assert stats['acquired'] == 6
+        assert stats['queued'] == 4
+        assert stats['max_queue_depth'] == 4
+        assert stats['peak_in_flight'] == 2
+
+    @pytest.mark.asyncio
+    async def test_fifo_order(self):
+        """Test queued calls get slots in arrival order"""
+        limiter = ConcurrencyLimiter("fifo", max_concurrency=1)
+        order = []
+
+        async def call(i):
+            async with limiter.slot():
+                order.append(i)
+                await asyncio.sleep(0)
+
+        await asyncio.gather(*[call(i) for i in range(5)])
+
+        assert order == [0, 1, 2, 3, 4]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_frees_queue(self):
+        """Test a cancelled waiter doesn't leak a slot"""
+        limiter = ConcurrencyLimiter("cancel", max_concurrency=1)
+        await limiter.acquire()
+
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.queue_depth == 1
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert limiter.queue_depth == 0
+        limiter.release()
+        assert limiter.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_wait_metrics(self):
+        """Test wait times are recorded for queued calls"""
+        limiter = ConcurrencyLimiter("wait", max_concurrency=1)
+
+        async def call():
+            async with limiter.slot():
+                await asyncio.sleep(0.02)
+
+        await asyncio.gather(call(), call())
+
+        stats = limiter.get_stats()
+        assert stats['p95_wait_ms'] >= 15
+        assert stats['avg_wait_ms'] > 0
@@ -0,0 +1,140 @@
+"""
+Unit tests for the server-side conversation store
+"""
+
+import pytest
+import time
+from utils.conversation_store import (
+    ConversationStore, InMemoryConversationBackend, ConversationNotFoundError
+)
+
+def _reused(store: ConversationStore, turns=None) -> str:
+    """Start a conversation and reuse its id once, as a client does on its second turn"""
+    conversation_id = store.create(turns)
+    store.resolve(conversation_id)
+    return conversation_id
+
+@pytest.mark.unit
+class TestConversationStore:
+    """Test conversation id issuing and turn storage"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.backend = InMemoryConversationBackend(ttl_seconds=60, max_conversations=100)
+        self.store = ConversationStore(self.backend, max_turns=4, max_chars=1000)
+
+    def test_create_and_append(self):
+        """Test turns appended to a conversation are returned in order"""
+        conversation_id = self.store.create()
+        self.store.append_turns(conversation_id, [
+            {"role": "user", "content": "Hi"},
+            {"role": "assistant", "content": "Hello!"}
+        ])
+
+        history = self.store.get_history(conversation_id)
+        assert [t["content"] for t in history] == ["Hi", "Hello!"]
+
+    def test_resolve_new_conversation_seeds_history(self):
+        """Test resolving without an id starts a conversation seeded with client history"""
+        client_history = [{"role": "user", "content": "Earlier"}]
+        conversation_id, history = self.store.resolve(None, client_history)
+
+        assert len(conversation_id) == 32
+        assert history == client_history
+        assert self.store.get_history(conversation_id) == client_history
+
+    def test_resolve_unknown_id(self):
+        """Test resolving an unknown id raises"""
+        with pytest.raises(ConversationNotFoundError):
+            self.store.resolve("0" * 32)
+
+    def test_turn_bound(self):
+        """Test only the most recent max_turns turns are kept"""
+        conversation_id = self.store.create()
+        for i in range(6):
+            self.store.append_turns(conversation_id, [{"role": "user", "content": f"m{i}"}])
+
+        history = self.store.get_history(conversation_id)
+        assert [t["content"] for t in history] == ["m2", "m3", "m4", "m5"]
+
+    def test_char_bound(self):
+        """Test oldest turns are dropped once the character budget is exceeded"""
+        store = ConversationStore(self.backend, max_turns=50, max_chars=10)
+        conversation_id = store.create()
+        store.append_turns(conversation_id, [
+            {"role": "user", "content": "aaaaaa"},
+            {"role": "assistant", "content": "bbbbbb"}
+        ])
+
+        assert [t["content"] for t in store.get_history(conversation_id)] == ["bbbbbb"]
+
+    def test_idle_ttl_eviction(self):
+        """Test idle conversations expire"""
+        backend = InMemoryConversationBackend(ttl_seconds=0.05)
+        store = ConversationStore(backend)
+        conversation_id = store.create([{"role": "user", "content": "Hi"}])
+        time.sleep(0.1)
+
+        assert store.get_history(conversation_id) is None
+
+    def test_conversation_count_bound(self):
+        """Test the least recently active conversation is evicted beyond the bound"""
+        backend = InMemoryConversationBackend(max_conversations=2)
+        store = ConversationStore(backend)
+        first = _reused(store)
+        second = _reused(store)
+        store.append_turns(first, [{"role": "user", "content": "still here"}])
+        _reused(store)
+
+        assert store.get_history(first) is not None
+        assert store.get_history(second) is None
+
+    def test_stored_turns_drop_extra_fields(self):
+        """Test only role and content are persisted"""
+        conversation_id = self.store.create()
+        self.store.append_turns(conversation_id, [
+            {"role": "user", "content": "Hi", "timestamp": "2024-01-01T00:00:00"}
+        ])
+
+        assert self.store.get_history(conversation_id) == [{"role": "user", "content": "Hi"}]
+
+    def test_history_only_requests_do_not_evict_live_conversations(self):
+        """Test ids that are never reused stay out of the backend"""
+        backend = InMemoryConversationBackend(max_conversations=2)
+        store = ConversationStore(backend, pending=InMemoryConversationBackend(max_conversations=2))
+        live = _reused(store, [{"role": "user", "content": "keep me"}])
+        for _ in range(10):
+            store.resolve(None, [{"role": "user", "content": "legacy client"}])
+
+        assert backend.count() == 1
+        assert store.get_history(live) == [{"role": "user", "content": "keep me"}]
+        assert store.get_stats()['pending_conversations'] == 2
+
+    def test_reused_id_is_promoted(self):
+        """Test a pending conversation is kept once a request carries its id"""
+        conversation_id, _ = self.store.resolve(None, [{"role": "user", "content": "Hi"}])
+        self.store.append_turns(conversation_id, [{"role": "assistant", "content": "Hello!"}])
+        assert self.backend.count() == 0
+
+        _, history = self.store.resolve(conversation_id)
+
+        assert [t["content"] for t in history] == ["Hi", "Hello!"]
+        assert self.backend.count() == 1
+        assert self.store.pending.count() == 0
+        assert self.store.get_stats()['promoted'] == 1
+
+    def test_total_bytes_bound(self):
+        """Test the least recently active conversations go once total size is over the bound"""
+        backend = InMemoryConversationBackend(max_total_bytes=25)
+        store = ConversationStore(backend)
+        first = _reused(store, [{"role": "user", "content": "a" * 10}])
+        second = _reused(store, [{"role": "user", "content": "b" * 10}])
+        third = _reused(store, [{"role": "user", "content": "c" * 10}])
+
+        assert store.get_history(first) is None
+        assert store.get_history(second) is not None
+        assert store.get_history(third) is not None
+        assert backend.total_bytes == 20
+
+        store.delete(second)
+        assert backend.total_bytes == 10
@@ -0,0 +1,159 @@
+"""
+Unit tests for the async Groq chat model
+"""
+
+import pytest
+import asyncio
+import time
+from unittest.mock import Mock, AsyncMock
+from models.groq_chat import GroqChatModel
+from utils.response_cache import response_cache
+from utils.semantic_cache import semantic_cache
+
+def _completion(content: str):
+    """Build a fake chat completion response"""
+    return Mock(choices=[Mock(message=Mock(content=content))])
+
+@pytest.mark.unit
+class TestGroqChatModelAsync:
+    """Test non-blocking chat generation"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.model = GroqChatModel()
+        self.model.async_client = Mock()
+        response_cache.clear()
+        semantic_cache.clear()
+
+    @pytest.mark.asyncio
+    async def test_generate_response_uses_async_client(self):
+        """Test generate_response awaits the async Groq client"""
+        self.model.async_client.chat.completions.create = AsyncMock(
+            return_value=_completion("  Hello there  ")
+        )
+
+        result = await self.model.generate_response("Hi")
+
+        assert result == "Hello there"
+        kwargs = self.model.async_client.chat.completions.create.call_args.kwargs
+        assert kwargs["messages"][0]["role"] == "system"
+        assert kwargs["messages"][-1] == {"role": "user", "content": "Hi"}
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_overlap(self):
+        """Test concurrent calls run in parallel instead of serially"""
+        async def slow_create(**kwargs):
+            await asyncio.sleep(0.2)
+            return _completion("ok")
+
+        self.model.async_client.chat.completions.create = slow_create
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*[
+            self.model.generate_response(f"question {i}") for i in range(5)
+        ])
+        elapsed = time.perf_counter() - start
+
+        assert results == ["ok"] * 5
+        assert elapsed < 0.6
+
+    @pytest.mark.asyncio
+    async def test_generate_response_async_delegates(self):
+        """Test generate_response_async no longer uses an executor"""
+        self.model.async_client.chat.completions.create = AsyncMock(
+            return_value=_completion("async")
+        )
+
+        result = await self.model.generate_response_async("Hi", conversation_history=[
+            {"role": "user", "content": "Earlier"}
+        ])
+
+        assert result == "async"
+
+    @pytest.mark.asyncio
+    async def test_generate_response_wraps_errors(self):
+        """Test upstream errors are surfaced as Groq Chat API errors"""
+        self.model.async_client.chat.completions.create = AsyncMock(
+            side_effect=RuntimeError("boom")
+        )
+
+        with pytest.raises(Exception, match="Groq Chat API error"):
+            await self.model.generate_response("Hi")
+
+    @pytest.mark.asyncio
+    async def test_identical_requests_hit_cache(self):
+        """Test repeated identical requests are served from the cache"""
+        self.model.async_client.chat.completions.create = AsyncMock(
+            return_value=_completion("cached answer")
+        )
+
+        first = await self.model.generate_response("What's your #1 superpower?")
+        second = await self.model.generate_response("What's your  #1 superpower? ")
+
+        assert first == second == "cached answer"
+        assert self.model.async_client.chat.completions.create.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_use_cache_false_bypasses_cache(self):
+        """Test callers can force an upstream request"""
+        self.model.async_client.chat.completions.create = AsyncMock(
+            return_value=_completion("fresh")
+        )
+
+        await self.model.generate_response("ping", use_cache=False)
+        await self.model.generate_response("ping", use_cache=False)
+
+        assert self.model.async_client.chat.completions.create.await_count == 2
+
+class _FakeStream:
+    """Minimal async stream mimicking groq.AsyncStream"""
+
+    def __init__(self, tokens):
+        self.tokens = list(tokens)
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.tokens:
+            raise StopAsyncIteration
+        await asyncio.sleep(0)
+        return Mock(choices=[Mock(delta=Mock(content=self.tokens.pop(0)))])
+
+    async def close(self):
+        self.closed = True
+
+@pytest.mark.unit
+class TestGroqChatStreamingAsync:
+    """Test async streaming generation"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.model = GroqChatModel()
+        self.model.async_client = Mock()
+        response_cache.clear()
+        semantic_cache.clear()
+
+    @pytest.mark.asyncio
+    async def test_streaming_yields_chunks(self):
+        """Test async streaming yields every token and closes upstream"""
+        stream = _FakeStream(["Hel", "lo"])
+        self.model.async_client.chat.completions.create = AsyncMock(return_value=stream)
+
+        chunks = [c async for c in self.model.generate_streaming_response_async("Hi")]
+
+        assert chunks == ["Hel", "lo"]
+        assert stream.closed
+
+    @pytest.mark.asyncio
+    async def test_closing_generator_closes_upstream(self):
+        """Test abandoning the stream early cancels the upstream request"""
+        stream = _FakeStream(["a", "b", "c"])
+        self.model.async_client.chat.completions.create = AsyncMock(return_value=stream)
+
+        generator = self.model.generate_streaming_response_async("Hi")
+        assert await generator.__anext__() == "a"
+        await generator.aclose()
+
+        assert stream.closed
@@ -0,0 +1,152 @@
+"""
+Unit tests for the Groq Whisper STT model
+"""
+
+import time
+import pytest
+import asyncio
+from unittest.mock import Mock, AsyncMock, patch
+from models.groq_stt import GroqSTTModel
+
+@pytest.mark.unit
+class TestGroqSTTInMemory:
+    """Test transcription straight from memory"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.model = GroqSTTModel()
+        self.model.is_configured = True
+        self.model.client = Mock()
+        self.model.async_client = Mock()
+        self.model.async_client.audio.transcriptions.create = AsyncMock(return_value=" hello world ")
+
+    @pytest.mark.asyncio
+    async def test_transcribe_audio_data_sends_named_bytes(self):
+        """Test audio bytes are uploaded as a named in-memory file"""
+        audio = b"RIFF" + b"\x00" * 100
+
+        result = await self.model.transcribe_audio_data(audio, "wav", "en")
+
+        assert result == "hello world"
+        kwargs = self.model.async_client.audio.transcriptions.create.call_args.kwargs
+        assert kwargs["file"] == ("audio.wav", audio)
+        assert kwargs["language"] == "en"
+
+    @pytest.mark.asyncio
+    async def test_transcribe_audio_data_writes_no_files(self):
+        """Test the in-memory path never opens a file"""
+        with patch("builtins.open", side_effect=AssertionError("disk touched")):
+            result = await self.model.transcribe_audio_data(b"\x00" * 64, "webm")
+
+        assert result == "hello world"
+
+    @pytest.mark.asyncio
+    async def test_transcribe_audio_data_rejects_invalid(self):
+        """Test unsupported formats fail before any upstream call"""
+        with pytest.raises(Exception):
+            await self.model.transcribe_audio_data(b"\x00" * 64, "exe")
+
+        self.model.async_client.audio.transcriptions.create.assert_not_called()
+
+    def test_validate_audio_data(self):
+        """Test in-memory validation of size and format"""
+        assert self.model.validate_audio_data(b"\x00" * 10, "mp3")
+        assert not self.model.validate_audio_data(b"", "mp3")
+        assert not self.model.validate_audio_data(b"\x00" * 10, "txt")
+        assert not self.model.validate_audio_data(b"\x00" * (self.model.max_file_size + 1), "wav")
+
+@pytest.mark.unit
+class TestGroqSTTConcurrency:
+    """Test transcriptions don't block the event loop"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.model = GroqSTTModel()
+        self.model.is_configured = True
+        self.model.client = Mock()
+        self.model.async_client = Mock()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_transcriptions_overlap(self):
+        """Test concurrent uploads run in parallel on the async client"""
+        async def slow_create(**kwargs):
+            await asyncio.sleep(0.2)
+            return "ok"
+
+        self.model.async_client.audio.transcriptions.create = slow_create
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*[
+            self.model.transcribe_audio_data(bytes([i]) * 32, "wav") for i in range(5)
+        ])
+        elapsed = time.perf_counter() - start
+
+        assert results == ["ok"] * 5
+        assert elapsed < 0.6
+
+@pytest.mark.unit
+class TestGroqSTTSegments:
+    """Test timestamped segment transcription used by batching"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.model = GroqSTTModel()
+        self.model.is_configured = True
+        self.model.client = Mock()
+        self.model.async_client = Mock()
+
+    @pytest.mark.asyncio
+    async def test_segments_are_parsed(self):
+        """Test verbose_json segments come back as plain dicts"""
+        self.model.async_client.audio.transcriptions.create = AsyncMock(return_value=Mock(segments=[
+            {"start": 0.5, "end": 1.5, "text": " hello ", "tokens": [1, 2]},
+            {"start": 3.0, "end": 4.0, "text": "world"}
+        ]))
+
+        segments = await self.model.transcribe_segments(b"RIFF" + b"\x00" * 64, "wav", "en")
+
+        assert segments == [
+            {"start": 0.5, "end": 1.5, "text": "hello"},
+            {"start": 3.0, "end": 4.0, "text": "world"}
+        ]
+        kwargs = self.model.async_client.audio.transcriptions.create.call_args.kwargs
+        assert kwargs["response_format"] == "verbose_json"
+        assert kwargs["timestamp_granularities"] == ["segment"]
+
+    @pytest.mark.asyncio
+    async def test_unconfigured_model_raises(self):
+        """Test batching falls back when segments can't be requested"""
+        self.model.is_configured = False
+
+        with pytest.raises(Exception):
+            await self.model.transcribe_segments(b"\x00" * 64, "wav")
+
+@pytest.mark.unit
+class TestGroqSTTModelSelection:
+    """Test per-request Whisper models and latency recording"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.model = GroqSTTModel()
+        self.model.is_configured = True
+        self.model.client = Mock()
+        self.model.async_client = Mock()
+        self.model.async_client.audio.transcriptions.create = AsyncMock(return_value="hi")
+
+    @pytest.mark.asyncio
+    async def test_requested_model_is_used_and_measured(self):
+        """Test the model argument reaches the API and its latency is recorded"""
+        with patch("models.groq_stt.whisper_router") as router:
+            await self.model.transcribe_audio_data(b"\x00" * 64, "wav", "en", "distil-whisper-large-v3-en")
+
+        kwargs = self.model.async_client.audio.transcriptions.create.call_args.kwargs
+        assert kwargs["model"] == "distil-whisper-large-v3-en"
+        assert router.record_success.call_args.args[0] == "distil-whisper-large-v3-en"
+
+    @pytest.mark.asyncio
+    async def test_default_model_without_selection(self):
+        """Test omitting the model keeps the configured default"""
+        await self.model.transcribe_audio_data(b"\x00" * 64, "wav")
+
+        kwargs = self.model.async_client.audio.transcriptions.create.call_args.kwargs
+        assert kwargs["model"] == self.model.model
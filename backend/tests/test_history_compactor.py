@@ -0,0 +1,134 @@
+"""
+Unit tests for token-budgeted history compaction
+"""
+
+import pytest
+import asyncio
+from utils.history_compactor import HistoryCompactor, estimate_tokens
+
+def _history(turns: int, words_per_turn: int = 50):
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"turn{i} " + "word " * words_per_turn}
+        for i in range(turns)
+    ]
+
+@pytest.mark.unit
+class TestTokenEstimate:
+    """Test the local tokenizer approximation"""
+
+    def test_estimate_tokens(self):
+        """Test short words count as one token and punctuation separately"""
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("Hi there!") == 3
+        assert estimate_tokens("internationalization") == 5
+
+@pytest.mark.unit
+class TestHistoryCompactor:
+    """Test history selection and rolling summaries"""
+
+    @pytest.mark.asyncio
+    async def test_small_history_is_untouched(self):
+        """Test history within budget is sent as-is"""
+        compactor = HistoryCompactor(token_budget=10000)
+        history = _history(4, words_per_turn=5)
+
+        selected, prompt_tokens = compactor.compact("system", history, "hello")
+
+        assert selected == history
+        assert prompt_tokens > 0
+        assert compactor.get_stats()["compacted_requests"] == 0
+
+    @pytest.mark.asyncio
+    async def test_keeps_recent_turns_within_budget(self):
+        """Test only the most recent turns fit when over budget"""
+        compactor = HistoryCompactor(token_budget=200, min_recent_turns=1)
+        history = _history(20)
+
+        selected, prompt_tokens = compactor.compact("system", history, "hello")
+
+        assert 0 < len(selected) < len(history)
+        assert selected[-1] == history[-1]
+        assert prompt_tokens <= 200
+
+    @pytest.mark.asyncio
+    async def test_min_recent_turns_always_kept(self):
+        """Test the newest turns are kept even if they exceed the budget"""
+        compactor = HistoryCompactor(token_budget=10, min_recent_turns=2)
+        history = _history(6)
+
+        selected, _ = compactor.compact("system", history, "hello")
+
+        assert selected == history[-2:]
+
+    @pytest.mark.asyncio
+    async def test_summary_is_built_off_the_hot_path(self):
+        """Test dropped turns are summarized in the background and used next time"""
+        compactor = HistoryCompactor(token_budget=200, min_recent_turns=1)
+        calls = []
+
+        async def summarizer(previous, turns):
+            calls.append((previous, len(turns)))
+            return f"summary of {len(turns)} turns"
+
+        history = _history(20)
+        first, _ = compactor.compact("system", history, "hello", "conv1", summarizer)
+        assert all(turn["role"] != "system" for turn in first)
+
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert len(calls) == 1
+
+        second, _ = compactor.compact("system", history, "hello", "conv1", summarizer)
+        assert second[0]["role"] == "system"
+        assert "summary of" in second[0]["content"]
+        assert compactor.get_stats()["summaries_generated"] == 1
+
+    @pytest.mark.asyncio
+    async def test_no_summary_without_conversation_id(self):
+        """Test histories without an id never share a summary, even with the same opening"""
+        compactor = HistoryCompactor(token_budget=200, min_recent_turns=1)
+        calls = []
+
+        async def summarizer(previous, turns):
+            calls.append(len(turns))
+            return "another user's summary"
+
+        history = _history(20)
+        compactor.compact("system", history, "hello", None, summarizer)
+        await asyncio.sleep(0.01)
+        selected, _ = compactor.compact("system", history[:1] + _history(20)[5:], "hello", None, summarizer)
+
+        assert calls == []
+        assert all(turn["role"] != "system" for turn in selected)
+
+    @pytest.mark.asyncio
+    async def test_summary_updates_incrementally(self):
+        """Test only turns not yet covered are sent to the summarizer"""
+        compactor = HistoryCompactor(token_budget=200, min_recent_turns=1)
+        folded = []
+
+        async def summarizer(previous, turns):
+            folded.append(len(turns))
+            return (previous + " +" if previous else "") + f"{len(turns)}"
+
+        history = _history(20)
+        compactor.compact("system", history, "hello", "conv1", summarizer)
+        await asyncio.sleep(0.01)
+
+        history = history + _history(4)
+        compactor.compact("system", history, "hello", "conv1", summarizer)
+        await asyncio.sleep(0.01)
+
+        assert len(folded) == 2
+        assert folded[1] < folded[0] + 4
+
+    @pytest.mark.asyncio
+    async def test_prompt_token_metrics(self):
+        """Test prompt token counts are recorded per request"""
+        compactor = HistoryCompactor(token_budget=10000)
+        compactor.compact("system", _history(2, 5), "hello")
+        compactor.compact("system", _history(4, 5), "hello")
+
+        prompt_tokens = compactor.get_stats()["prompt_tokens"]
+        assert prompt_tokens["last"] > 0
+        assert prompt_tokens["max"] >= prompt_tokens["avg"]
@@ -0,0 +1,171 @@
+"""
+Unit tests for chunked long-audio transcription
+"""
+
+import io
+import time
+import wave
+import asyncio
+import pytest
+import numpy as np
+from utils.long_audio import LongAudioTranscriber, LongAudioError, merge_overlap
+from tests.audio_helpers import SAMPLE_RATE, pcm_wav
+
+def _speech_with_pauses(seconds: int, pause_every: float = 7.0) -> np.ndarray:
+    """A swelling tone broken by half-second pauses every few seconds"""
+    t = np.arange(seconds * SAMPLE_RATE) / SAMPLE_RATE
+    samples = 0.3 * np.sin(2 * np.pi * 220 * t) * (0.5 + 0.5 * t / seconds)
+    samples[(t % pause_every) > pause_every - 0.5] = 0.0
+    return samples.astype(np.float32)
+
+@pytest.mark.unit
+class TestOverlapMerging:
+    """Test stitching of overlapping chunk transcripts"""
+
+    def test_repeated_words_are_removed(self):
+        """Test the words shared by both chunks appear once"""
+        merged = merge_overlap("we met at the old station", "the old station was closed")
+
+        assert merged == "was closed"
+
+    def test_match_ignores_case_and_punctuation(self):
+        """Test Whisper's capitalization differences don't block the match"""
+        merged = merge_overlap("Then we left the room.", "Left the room, and walked home.")
+
+        assert merged == "and walked home."
+
+    def test_garbled_edge_word_is_skipped(self):
+        """Test a partial word cut at the chunk start doesn't prevent de-duplication"""
+        merged = merge_overlap("it was a long day at work", "ong day at work so I slept")
+
+        assert merged == "so I slept"
+
+    def test_no_overlap_keeps_text(self):
+        """Test unrelated text is kept whole"""
+        assert merge_overlap("first part here", "second part there") == "second part there"
+
+@pytest.mark.unit
+class TestChunkPlanning:
+    """Test chunk boundaries land in silence"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.transcriber = LongAudioTranscriber(chunk_seconds=20, overlap_seconds=1.0, search_seconds=5.0)
+
+    def test_short_audio_is_one_chunk(self):
+        """Test recordings near the chunk length aren't split"""
+        chunks = self.transcriber.plan_chunks(_speech_with_pauses(22), SAMPLE_RATE)
+
+        assert chunks == [(0, 22 * SAMPLE_RATE)]
+
+    def test_cuts_fall_in_pauses_with_overlap(self):
+        """Test each cut is in a pause and neighbours share the overlap"""
+        samples = _speech_with_pauses(70)
+
+        chunks = self.transcriber.plan_chunks(samples, SAMPLE_RATE)
+
+        assert len(chunks) >= 3
+        assert chunks[0][0] == 0
+        assert chunks[-1][1] == len(samples)
+        overlap = SAMPLE_RATE
+        for (_, end), (start, _) in zip(chunks[:-1], chunks[1:]):
+            cut = end - overlap
+            assert start == cut - overlap
+            assert np.abs(samples[cut:cut + 160]).max() == 0.0
+
+    def test_split_encodes_mono_wav_chunks(self):
+        """Test chunks are standalone WAV files covering the recording"""
+        chunks = self.transcriber.split(pcm_wav(_speech_with_pauses(70)))
+
+        assert chunks[-1].end_seconds == pytest.approx(70.0)
+        for chunk in chunks:
+            with wave.open(io.BytesIO(chunk.audio_data), "rb") as wav:
+                assert wav.getnchannels() == 1
+                assert wav.getnframes() / SAMPLE_RATE == pytest.approx(chunk.end_seconds - chunk.start_seconds)
+
+@pytest.mark.unit
+class TestLongAudioTranscription:
+    """Test concurrent transcription and stitching"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.transcriber = LongAudioTranscriber(chunk_seconds=20, overlap_seconds=1.0, max_parallel=4)
+        self.audio = pcm_wav(_speech_with_pauses(80))
+
+    @pytest.mark.asyncio
+    async def test_chunks_run_concurrently_and_stitch_in_order(self):
+        """Test chunks overlap in time and the transcript keeps chunk order"""
+        chunks = self.transcriber.split(self.audio)
+        lookup = {chunk.audio_data: chunk.index for chunk in chunks}
+
+        async def transcribe(audio_data, format):
+            index = lookup[audio_data]
+            # Later chunks finish first
+            await asyncio.sleep(0.05 * (len(chunks) - index))
+            return f"shared{index} words{index} part {index} shared{index + 1} words{index + 1}"
+
+        start = time.perf_counter()
+        text, count = await self.transcriber.transcribe(self.audio, "wav", transcribe)
+        elapsed = time.perf_counter() - start
+
+        assert count == len(chunks)
+        serial = sum(0.05 * (len(chunks) - i) for i in range(len(chunks)))
+        assert elapsed < serial * 0.7
+        assert text.split().count("part") == len(chunks)
+        assert text.index("part 0") < text.index("part 1") < text.index(f"part {len(chunks) - 1}")
+        assert text.count("shared1 words1") == 1
+
+    @pytest.mark.asyncio
+    async def test_parallelism_is_capped(self):
+        """Test no more than max_parallel chunks are in flight"""
+        self.transcriber.max_parallel = 2
+        in_flight = 0
+        peak = 0
+
+        async def transcribe(audio_data, format):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return "text"
+
+        await self.transcriber.transcribe(self.audio, "wav", transcribe)
+
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_progressive_results_arrive_in_order(self):
+        """Test transcribe_iter yields every chunk in order"""
+        async def transcribe(audio_data, format):
+            return "hello"
+
+        indexes = [part.index async for part in self.transcriber.transcribe_iter(self.audio, "wav", transcribe)]
+
+        assert indexes == list(range(len(indexes)))
+        assert self.transcriber.get_stats()['chunks'] == len(indexes)
+
+    @pytest.mark.asyncio
+    async def test_undecodable_large_upload_is_rejected(self):
+        """Test compressed audio over 25MB needs ffmpeg to be split"""
+        self.transcriber_no_split = LongAudioTranscriber()
+
+        async def transcribe(audio_data, format):
+            return "unused"
+
+        with pytest.raises(LongAudioError):
+            await self.transcriber_no_split.transcribe(b"\x00" * (26 * 1024 * 1024), "webm", transcribe)
+
+    @pytest.mark.asyncio
+    async def test_undecodable_small_upload_is_sent_whole(self):
+        """Test compressed audio under the limit falls back to one request"""
+        received = []
+
+        async def transcribe(audio_data, format):
+            received.append(format)
+            return "whole"
+
+        text, count = await self.transcriber.transcribe(b"\x1aE\xdf\xa3" * 100, "webm", transcribe)
+
+        assert (text, count) == ("whole", 1)
+        assert received == ["webm"]
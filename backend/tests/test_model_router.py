@@ -0,0 +1,161 @@
+"""
+Unit tests for latency-aware chat model routing
+"""
+
+import pytest
+from unittest.mock import Mock, AsyncMock
+from utils.model_router import ModelRouter, LatencyProfile
+from models.groq_chat import GroqChatModel
+from utils.response_cache import response_cache
+from utils.semantic_cache import semantic_cache
+
+SMALL = "llama3-8b-8192"
+LARGE = "mixtral-8x7b-32768"
+
+@pytest.mark.unit
+class TestLatencyProfile:
+    """Test EWMA latency profiles"""
+
+    def test_first_sample_replaces_prior(self):
+        """Test the first measurement overrides the default estimate"""
+        profile = LatencyProfile(alpha=0.5)
+        profile.record_success(ttft_ms=100, total_ms=1100, output_tokens=101)
+
+        assert profile.ttft_ms == 100
+        assert profile.tokens_per_sec == pytest.approx(101)
+
+    def test_ewma_smooths_samples(self):
+        """Test later samples are averaged in"""
+        profile = LatencyProfile(alpha=0.5)
+        profile.record_success(ttft_ms=100, total_ms=100)
+        profile.record_success(ttft_ms=300, total_ms=300)
+
+        assert profile.ttft_ms == pytest.approx(200)
+
+    def test_failures_raise_error_rate(self):
+        """Test failures raise and successes decay the error rate"""
+        profile = LatencyProfile(alpha=0.5)
+        profile.record_failure()
+        assert profile.error_rate == pytest.approx(0.5)
+        assert profile.consecutive_failures == 1
+
+        profile.record_success(ttft_ms=100, total_ms=100)
+        assert profile.error_rate == pytest.approx(0.25)
+        assert profile.consecutive_failures == 0
+
+@pytest.mark.unit
+class TestModelRouter:
+    """Test per-request model selection"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.router = ModelRouter(
+            context_windows={SMALL: 8192, LARGE: 32768},
+            default_model=SMALL,
+            long_context_tokens=6000,
+            compacted_prompt_tokens=3000,
+            failure_threshold=2,
+            cooldown_seconds=60
+        )
+
+    def test_text_turn_uses_default_model(self):
+        """Test short text turns stay on the default model"""
+        decision = self.router.route(prompt_tokens=500, max_tokens=500)
+
+        assert decision.model == SMALL
+        assert decision.reason == "default"
+        assert decision.token_budget is None
+
+    def test_long_text_turn_uses_larger_window(self):
+        """Test long-context text turns go to the largest window with a larger budget"""
+        decision = self.router.route(prompt_tokens=9000, max_tokens=500)
+
+        assert decision.model == LARGE
+        assert decision.reason == "long_context"
+        assert decision.token_budget == 12000
+
+    def test_voice_turn_uses_fastest_model(self):
+        """Test voice turns pick the lowest estimated latency"""
+        self.router.record_success(SMALL, ttft_ms=400, total_ms=1400, output_tokens=200)
+        self.router.record_success(LARGE, ttft_ms=100, total_ms=300, output_tokens=200)
+
+        decision = self.router.route(prompt_tokens=9000, max_tokens=200, profile="voice")
+
+        assert decision.model == LARGE
+        assert decision.reason == "voice_fastest"
+
+    def test_slo_prefers_default_when_it_meets_target(self):
+        """Test an SLO keeps the preferred model when it is fast enough"""
+        self.router.record_success(SMALL, ttft_ms=200, total_ms=700, output_tokens=100)
+        self.router.record_success(LARGE, ttft_ms=100, total_ms=300, output_tokens=100)
+
+        assert self.router.route(500, 100, latency_slo_ms=1000).model == SMALL
+
+        decision = self.router.route(500, 100, latency_slo_ms=400)
+        assert decision.model == LARGE
+        assert decision.reason == "slo"
+
+    def test_unhealthy_model_fails_over(self):
+        """Test repeated failures move traffic to another model"""
+        self.router.record_failure(SMALL)
+        self.router.record_failure(SMALL)
+
+        decision = self.router.route(prompt_tokens=500, max_tokens=500)
+
+        assert decision.model == LARGE
+        assert decision.reason == "failover"
+        assert not self.router.get_stats()['models'][SMALL]['healthy']
+
+    def test_all_unhealthy_is_degraded(self):
+        """Test a model is still chosen when every model is failing"""
+        for _ in range(2):
+            self.router.record_failure(SMALL)
+            self.router.record_failure(LARGE)
+
+        decision = self.router.route(prompt_tokens=500, max_tokens=500)
+
+        assert decision.reason == "degraded"
+
+    def test_headers_and_stats(self):
+        """Test the decision is exposed in headers and metrics"""
+        decision = self.router.route(prompt_tokens=500, max_tokens=500)
+
+        assert decision.to_headers()["X-Model"] == SMALL
+        assert decision.to_headers()["X-Model-Route"] == "default"
+        stats = self.router.get_stats()
+        assert stats['decisions'] == 1
+        assert stats['by_model'][SMALL] == 1
+        assert stats['by_reason'] == {"default": 1}
+
+@pytest.mark.unit
+class TestGroqChatRouting:
+    """Test the chat model sends requests to the routed model"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.model = GroqChatModel()
+        self.model.async_client = Mock()
+        self.model.async_client.chat.completions.create = AsyncMock(
+            return_value=Mock(choices=[Mock(message=Mock(content="ok"))])
+        )
+        response_cache.clear()
+        semantic_cache.clear()
+
+    @pytest.mark.asyncio
+    async def test_route_selects_request_model(self):
+        """Test the routed model is used for the upstream call"""
+        route = self.model.route_request("Hi", max_tokens=100)
+        route.model = LARGE
+
+        await self.model.generate_response("Hi", max_tokens=100, route=route)
+
+        kwargs = self.model.async_client.chat.completions.create.call_args.kwargs
+        assert kwargs["model"] == LARGE
+
+    def test_route_request_counts_history(self):
+        """Test the prompt estimate grows with the conversation history"""
+        short = self.model.route_request("Hi")
+        history = [{"role": "user", "content": "word " * 200}]
+        longer = self.model.route_request("Hi", history)
+
+        assert longer.prompt_tokens > short.prompt_tokens + 200
@@ -0,0 +1,192 @@
+"""
+Unit tests for sentence-parallel speech synthesis
+"""
+
+import asyncio
+import pytest
+from unittest.mock import patch
+from utils.parallel_tts import ParallelTTS, split_sentences, plan_segments, prepare_segment
+from utils.response_cache import ResponseCache
+from utils.tts_cache import TTSCache
+from utils.tts_provider import TTSProviderManager
+
+LONG_TEXT = " ".join(f"This is sentence number {i} of a fairly long answer." for i in range(12))
+
+def _id3(payload: bytes = b"") -> bytes:
+    """ID3v2 header with a synchsafe size followed by its payload"""
+    return b"ID3\x04\x00\x00" + bytes([0, 0, 0, len(payload)]) + payload
+
+@pytest.mark.unit
+class TestSentenceSplitting:
+    """Test sentence boundaries and segment packing"""
+
+    def test_abbreviations_and_numbers_do_not_split(self):
+        """Test periods inside abbreviations, initials and decimals stay in the sentence"""
+        text = "Dr. Smith met J. R. Doe at 3.14 p.m. today. It went well! Did it? Yes."
+
+        assert split_sentences(text) == [
+            "Dr. Smith met J. R. Doe at 3.14 p.m. today.",
+            "It went well!",
+            "Did it?",
+            "Yes."
+        ]
+
+    def test_blank_line_ends_a_sentence(self):
+        """Test paragraphs without final punctuation are still split"""
+        assert split_sentences("A heading\n\nThe body text.") == ["A heading", "The body text."]
+
+    def test_segments_respect_limits_and_keep_all_text(self):
+        """Test the first segment is short, the rest near the target and nothing is lost"""
+        segments = plan_segments(LONG_TEXT, target_chars=150, first_segment_chars=60)
+
+        assert len(segments[0]) <= 60
+        assert all(len(segment) <= 150 for segment in segments)
+        assert " ".join(segments) == LONG_TEXT
+
+    def test_overlong_sentence_is_broken_up(self):
+        """Test a sentence longer than the target is split at clauses and spaces"""
+        sentence = ", ".join(["word " * 10] * 8).strip() + "."
+        segments = plan_segments(sentence, target_chars=100, first_segment_chars=100)
+
+        assert len(segments) > 1
+        assert all(len(segment) <= 100 for segment in segments)
+
+@pytest.mark.unit
+class TestSegmentStitching:
+    """Test segment audio is trimmed to join as one stream"""
+
+    def test_id3_kept_only_at_the_ends(self):
+        """Test inner MPEG segments lose their ID3 header and trailer"""
+        frames = b"\xff\xfb\x90\x00" * 4
+        audio_data = _id3(b"TIT2") + frames + b"TAG" + b"\x00" * 125
+
+        assert prepare_segment(audio_data, "mp3", 0, 3) == _id3(b"TIT2") + frames
+        assert prepare_segment(audio_data, "mp3", 1, 3) == frames
+        assert prepare_segment(audio_data, "mp3", 2, 3) == frames + b"TAG" + b"\x00" * 125
+
+    def test_ogg_segments_are_untouched(self):
+        """Test chained Ogg streams are joined as-is"""
+        assert prepare_segment(b"OggS data", "ogg", 1, 3) == b"OggS data"
+
+    def test_unstitchable_containers_are_not_split(self):
+        """Test WebM and short text go through a single request"""
+        synthesizer = ParallelTTS(min_text_chars=100)
+
+        assert synthesizer.should_split(LONG_TEXT, "mp3")
+        assert not synthesizer.should_split(LONG_TEXT, "webm")
+        assert not synthesizer.should_split("Short reply.", "mp3")
+
+@pytest.mark.unit
+class TestParallelSynthesis:
+    """Test concurrent synthesis with in-order delivery"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.synthesizer = ParallelTTS(min_text_chars=0, target_segment_chars=100, first_segment_chars=60,
+                                       max_concurrency=2)
+
+    @pytest.mark.asyncio
+    async def test_segments_are_yielded_in_order(self):
+        """Test a slow early segment holds back faster later ones"""
+        async def synthesize(segment: str) -> bytes:
+            await asyncio.sleep(0.03 if segment.startswith("This is sentence number 0") else 0.0)
+            return segment.encode()
+
+        parts = [part async for part in self.synthesizer.synthesize_iter(LONG_TEXT, "ogg", "edge", synthesize)]
+
+        assert b" ".join(parts).decode() == LONG_TEXT
+
+    @pytest.mark.asyncio
+    async def test_first_segment_is_not_delayed_by_the_rest(self):
+        """Test the first segment is yielded before the last one finishes"""
+        finished = []
+
+        async def synthesize(segment: str) -> bytes:
+            await asyncio.sleep(0.01)
+            finished.append(segment)
+            return b"x"
+
+        segments = plan_segments(LONG_TEXT, 100, 60)
+        async for _ in self.synthesizer.synthesize_iter(LONG_TEXT, "ogg", "edge", synthesize):
+            assert len(finished) < len(segments)
+            break
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_capped_per_provider(self):
+        """Test no more than max_concurrency requests run at once"""
+        running = 0
+        peak = 0
+
+        async def synthesize(segment: str) -> bytes:
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return b"x"
+
+        await asyncio.gather(
+            self.synthesizer.synthesize(LONG_TEXT, "ogg", "edge", synthesize),
+            self.synthesizer.synthesize(LONG_TEXT, "ogg", "edge", synthesize)
+        )
+
+        assert peak == 2
+        stats = self.synthesizer.get_stats()
+        assert stats['requests'] == 2
+        assert 'edge' in stats['providers']
+
+    @pytest.mark.asyncio
+    async def test_failure_cancels_remaining_segments(self):
+        """Test one failed segment fails the request and stops the others"""
+        started = []
+
+        async def synthesize(segment: str) -> bytes:
+            started.append(segment)
+            if len(started) == 1:
+                raise Exception("synthesis failed")
+            await asyncio.sleep(1)
+            return b"x"
+
+        with pytest.raises(Exception, match="synthesis failed"):
+            await self.synthesizer.synthesize(LONG_TEXT, "ogg", "edge", synthesize)
+
+        assert self.synthesizer.get_stats()['failures'] == 1
+        assert len(started) < len(plan_segments(LONG_TEXT, 100, 60))
+
+@pytest.mark.unit
+class TestProviderParallelSynthesis:
+    """Test the provider manager splits long text"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.manager = TTSProviderManager()
+        self.synthesizer = ParallelTTS(min_text_chars=200, target_segment_chars=150, first_segment_chars=60)
+
+    @pytest.mark.asyncio
+    async def test_long_text_is_synthesized_per_segment(self):
+        """Test each segment is one provider request and the whole text is cached"""
+        requested = []
+
+        async def synthesize(text, voice=None, speed=1.0, **kwargs):
+            requested.append(text)
+            return text.encode()
+
+        cache = TTSCache(ResponseCache())
+        with patch("utils.tts_provider.parallel_tts", self.synthesizer), \
+                patch("utils.tts_provider.tts_cache", cache), \
+                patch.object(self.manager, "_synthesize_speech", side_effect=synthesize):
+            audio_data = await self.manager.synthesize_speech(LONG_TEXT)
+            again = await self.manager.synthesize_speech(LONG_TEXT)
+
+        assert requested == plan_segments(LONG_TEXT, 150, 60)
+        assert audio_data == again == "".join(requested).encode()
+
+    @pytest.mark.asyncio
+    async def test_short_text_is_one_request(self):
+        """Test text under the threshold is not split"""
+        with patch("utils.tts_provider.parallel_tts", self.synthesizer), \
+                patch("utils.tts_provider.tts_cache", TTSCache(ResponseCache(enabled=False))), \
+                patch.object(self.manager, "_synthesize_speech", return_value=b"audio") as synthesize:
+            await self.manager.synthesize_speech("Just one sentence.")
+
+        synthesize.assert_called_once()
@@ -0,0 +1,185 @@
+"""
+Unit tests for the pre-synthesized filler phrase bank
+"""
+
+import json
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from utils.phrase_bank import PhraseBank, MANIFEST_MAGIC
+
+VOICES = ["en-US-GuyNeural", "en-US-AriaNeural"]
+PHRASES = ["Good question…", "Let me think…"]
+
+async def _synthesize(text: str, voice: str) -> bytes:
+    return f"{voice}:{text}".encode()
+
+@pytest.mark.unit
+class TestPhraseBank:
+    """Test building, rotating and persisting filler clips"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.bank = PhraseBank(phrases=PHRASES)
+
+    @pytest.mark.asyncio
+    async def test_build_covers_every_voice(self):
+        """Test each phrase is synthesized once per voice"""
+        synthesize = AsyncMock(side_effect=_synthesize)
+
+        assert await self.bank.build(synthesize, VOICES, "mp3") == 4
+        assert synthesize.await_count == 4
+        clip = self.bank.pick("en-US-AriaNeural", "mp3")
+        assert bytes(clip.audio) == "en-US-AriaNeural:Good question…".encode()
+
+    @pytest.mark.asyncio
+    async def test_pick_rotates_phrases(self):
+        """Test consecutive turns don't hear the same phrase"""
+        await self.bank.build(_synthesize, VOICES, "mp3")
+
+        texts = [self.bank.pick("en-US-GuyNeural", "mp3").text for _ in range(3)]
+
+        assert texts == ["Good question…", "Let me think…", "Good question…"]
+
+    @pytest.mark.asyncio
+    async def test_missing_voice_or_format_is_a_miss(self):
+        """Test voices and formats outside the bank return nothing"""
+        await self.bank.build(_synthesize, VOICES, "mp3")
+
+        assert self.bank.pick("en-US-JennyNeural", "mp3") is None
+        assert self.bank.pick("en-US-GuyNeural", "opus-ogg") is None
+        assert self.bank.get_stats()['misses'] == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_phrases_are_skipped(self):
+        """Test one failed synthesis leaves the rest of the bank usable"""
+        synthesize = AsyncMock(side_effect=[Exception("rate limited"), b"a", b"b", b"c"])
+
+        assert await self.bank.build(synthesize, VOICES, "mp3") == 3
+        assert self.bank.get_stats()['build_failures'] == 1
+
+    @pytest.mark.asyncio
+    async def test_manifest_round_trip(self, tmp_path):
+        """Test a saved manifest maps back to the same clips"""
+        path = str(tmp_path / "fillers.bin")
+        await self.bank.build(_synthesize, VOICES, "mp3")
+        assert self.bank.save(path)
+
+        loaded = PhraseBank(manifest_path=path)
+        assert loaded.load()
+
+        assert len(loaded) == 4
+        assert loaded.get_stats()['source'] == "manifest"
+        for voice in VOICES:
+            for text in PHRASES:
+                clip = loaded.pick(voice, "mp3")
+                assert clip.text == text
+                assert bytes(clip.audio) == f"{voice}:{text}".encode()
+
+    @pytest.mark.asyncio
+    async def test_manifest_layout(self, tmp_path):
+        """Test the header, index and audio region can be read without this module"""
+        path = tmp_path / "fillers.bin"
+        bank = PhraseBank(phrases=["Hi"])
+        await bank.build(_synthesize, ["v"], "mp3")
+        bank.save(str(path))
+
+        data = path.read_bytes()
+        index_length = int.from_bytes(data[8:12], "little")
+        index = json.loads(data[12:12 + index_length])
+        entry = index['entries'][0]
+        start = 12 + index_length + entry['offset']
+
+        assert data[:8] == MANIFEST_MAGIC
+        assert data[start:start + entry['length']] == b"v:Hi"
+
+    @pytest.mark.asyncio
+    async def test_global_build_skips_tts_cache_and_stats(self):
+        """Test building the bank doesn't fill the shared audio cache or count as deliveries"""
+        from utils import phrase_bank as module
+        from utils.response_cache import ResponseCache
+        from utils.tts_cache import TTSCache
+        from utils.tts_provider import tts_provider
+
+        cache = TTSCache(ResponseCache())
+        syntheses = tts_provider.stats['syntheses']
+        format_stats = {name: entry.copy() for name, entry in tts_provider.format_stats.items()}
+        with patch.object(module, "phrase_bank", self.bank), \
+                patch("utils.tts_provider.tts_cache", cache), \
+                patch.object(tts_provider, "get_available_voices", return_value=VOICES), \
+                patch.object(tts_provider, "_synthesize_speech", AsyncMock(return_value=b"clip")) as synthesize:
+            assert await module.build_phrase_bank("mp3") == 4
+
+        assert synthesize.await_count == 4
+        assert cache.get_stats()['lookups'] == 0
+        assert tts_provider.stats['syntheses'] == syntheses
+        assert tts_provider.format_stats == format_stats
+
+    def test_foreign_file_is_ignored(self, tmp_path):
+        """Test a file without the manifest magic is not loaded"""
+        path = tmp_path / "fillers.bin"
+        path.write_bytes(b"not a manifest at all")
+
+        assert not self.bank.load(str(path))
+        assert len(self.bank) == 0
+
+@pytest.mark.unit
+class TestFillerDelivery:
+    """Test fillers are sent as soon as a turn starts"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.bank = PhraseBank(phrases=PHRASES)
+
+    async def _fill(self, voice: str):
+        await self.bank.build(_synthesize, [voice], "mp3")
+
+    @pytest.mark.asyncio
+    async def test_websocket_filler_precedes_answer(self):
+        """Test the filler clip goes out before the model is called"""
+        from routers import websocket as ws
+        from utils.tts_provider import tts_provider
+        await self._fill(tts_provider.resolve_voice("en-US-GuyNeural"))
+
+        socket = Mock()
+        socket.send_text = AsyncMock()
+        ws.manager.connection_data[socket] = {'conversation_history': [], 'session_id': "s1"}
+        sent_before_model = []
+
+        async def generate(**kwargs):
+            sent_before_model.extend(json.loads(call.args[0])["type"] for call in socket.send_text.call_args_list)
+            return "Here is the answer."
+
+        chat_model = Mock()
+        chat_model.route_request.return_value = Mock(model="test-model")
+        chat_model.generate_response_async = generate
+
+        try:
+            with patch.object(ws, "phrase_bank", self.bank), \
+                    patch.object(ws, "chat_model", chat_model), \
+                    patch.object(ws, "generate_and_send_tts", AsyncMock()):
+                await ws.handle_text_message(socket, {
+                    "message": "Tell me about yourself",
+                    "voice_settings": {"auto_tts": True, "voice": "en-US-GuyNeural"}
+                })
+        finally:
+            ws.manager.disconnect(socket)
+
+        assert sent_before_model == ["message_received", "filler_audio"]
+        filler = json.loads(socket.send_text.call_args_list[1].args[0])
+        assert filler["text"] == "Good question…"
+        assert filler["mime_type"] == "audio/mpeg"
+
+    @pytest.mark.asyncio
+    async def test_filler_endpoint(self, test_client):
+        """Test the HTTP flow can fetch a filler without synthesis"""
+        await self._fill("en-US-GuyNeural")
+
+        with patch("routers.voice.phrase_bank", self.bank):
+            response = test_client.get("/api/voice/filler", params={"voice": "en-US-GuyNeural"})
+            missing = test_client.get("/api/voice/filler", params={"voice": "en-US-AriaNeural"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "audio/mpeg"
+        assert response.headers["x-filler-text"] == "Good question..."
+        assert response.content == "en-US-GuyNeural:Good question…".encode()
+        assert missing.status_code == 404
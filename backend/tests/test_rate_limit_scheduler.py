@@ -0,0 +1,181 @@
+"""
+Unit tests for the Groq rate-limit scheduler
+"""
+
+import time
+import pytest
+import asyncio
+import numpy as np
+from utils.rate_limit_scheduler import (
+    RateLimitScheduler, TokenBucket, parse_reset_seconds, estimate_audio_seconds,
+    request_kind, MIN_BILLED_AUDIO_SECONDS
+)
+from tests.audio_helpers import pcm_wav
+
+def _wav_bytes(seconds: float, sample_rate: int = 16000) -> bytes:
+    """Build a silent mono 16-bit WAV of the given duration"""
+    return pcm_wav(np.zeros(int(seconds * sample_rate)), sample_rate)
+
+@pytest.mark.unit
+class TestRateLimitHelpers:
+    """Test header parsing and cost estimation"""
+
+    def test_parse_reset_seconds(self):
+        """Test Groq duration formats"""
+        assert parse_reset_seconds("7.66s") == pytest.approx(7.66)
+        assert parse_reset_seconds("2m59.56s") == pytest.approx(179.56)
+        assert parse_reset_seconds("1h2m") == pytest.approx(3720)
+        assert parse_reset_seconds("120ms") == pytest.approx(0.12)
+        assert parse_reset_seconds("3") == 3.0
+        assert parse_reset_seconds(None) is None
+        assert parse_reset_seconds("soon") is None
+
+    def test_estimate_audio_seconds(self):
+        """Test WAV durations are read from the header with a billing minimum"""
+        assert estimate_audio_seconds(_wav_bytes(30)) == pytest.approx(30, rel=0.01)
+        assert estimate_audio_seconds(_wav_bytes(2)) == MIN_BILLED_AUDIO_SECONDS
+
+    def test_request_kind(self):
+        """Test API paths map to scheduler kinds"""
+        assert request_kind("/openai/v1/chat/completions") == "chat"
+        assert request_kind("/openai/v1/audio/transcriptions") == "audio"
+        assert request_kind("/openai/v1/models") is None
+
+@pytest.mark.unit
+class TestTokenBucket:
+    """Test token bucket accounting"""
+
+    def test_unlimited_until_configured(self):
+        """Test a bucket without limits never delays"""
+        bucket = TokenBucket()
+        assert bucket.wait_time(10 ** 6, time.monotonic()) == 0.0
+
+    def test_wait_time_after_consumption(self):
+        """Test the wait is the refill time of the shortfall"""
+        bucket = TokenBucket(capacity=10, refill_per_second=5)
+        bucket.consume(10)
+
+        assert bucket.wait_time(5, bucket.last_refill) == pytest.approx(1.0)
+
+    def test_update_from_headers(self):
+        """Test server-reported remaining capacity and reset define the refill rate"""
+        bucket = TokenBucket()
+        bucket.update(limit=6000, remaining=1000, reset_seconds=50)
+
+        assert bucket.limited
+        assert bucket.capacity == 6000
+        assert bucket.tokens == 1000
+        assert bucket.refill_per_second == pytest.approx(100)
+
+@pytest.mark.unit
+class TestRateLimitScheduler:
+    """Test admission control"""
+
+    @pytest.mark.asyncio
+    async def test_admits_immediately_with_capacity(self):
+        """Test requests under the limit are not delayed"""
+        scheduler = RateLimitScheduler(buckets={"chat_tokens": TokenBucket(1000, 100)})
+
+        waited = await scheduler.acquire("chat", {"chat_requests": 1, "chat_tokens": 500})
+
+        assert waited < 0.01
+        assert scheduler.buckets["chat_tokens"].tokens == pytest.approx(500, abs=1)
+
+    @pytest.mark.asyncio
+    async def test_queues_when_limit_reached(self):
+        """Test a request waits for the bucket to refill instead of failing"""
+        scheduler = RateLimitScheduler(buckets={"chat_requests": TokenBucket(2, 20)})
+        for _ in range(2):
+            await scheduler.acquire("chat", {"chat_requests": 1})
+
+        waited = await scheduler.acquire("chat", {"chat_requests": 1})
+
+        assert 0.03 <= waited < 0.5
+        assert scheduler.get_stats()['kinds']['chat']['delayed'] == 1
+
+    @pytest.mark.asyncio
+    async def test_admission_is_fifo(self):
+        """Test queued requests are admitted in arrival order"""
+        scheduler = RateLimitScheduler(buckets={"chat_requests": TokenBucket(1, 50)})
+        await scheduler.acquire("chat", {"chat_requests": 1})
+        order = []
+
+        async def request(i):
+            await scheduler.acquire("chat", {"chat_requests": 1})
+            order.append(i)
+
+        await asyncio.gather(*[request(i) for i in range(4)])
+
+        assert order == [0, 1, 2, 3]
+        assert scheduler.get_stats()['kinds']['chat']['max_queue_depth'] >= 4
+
+    @pytest.mark.asyncio
+    async def test_rate_limited_response_pauses_admission(self):
+        """Test a 429 with retry-after blocks new requests of that kind"""
+        scheduler = RateLimitScheduler()
+        scheduler.observe_headers("chat", 429, {"retry-after": "0.1"})
+
+        waited = await scheduler.acquire("chat", {"chat_requests": 1})
+
+        assert waited >= 0.05
+        assert scheduler.get_stats()['kinds']['chat']['rate_limited_responses'] == 1
+        # Audio requests are unaffected
+        assert await scheduler.acquire("audio", {"audio_requests": 1}) < 0.05
+
+    def test_observe_headers_learns_limits(self):
+        """Test x-ratelimit headers configure the chat buckets"""
+        scheduler = RateLimitScheduler()
+        scheduler.observe_headers("chat", 200, {
+            "x-ratelimit-limit-requests": "14400",
+            "x-ratelimit-remaining-requests": "14370",
+            "x-ratelimit-reset-requests": "2m59.56s",
+            "x-ratelimit-limit-tokens": "18000",
+            "x-ratelimit-remaining-tokens": "17997",
+            "x-ratelimit-reset-tokens": "7.66s"
+        })
+
+        buckets = scheduler.get_stats()['buckets']
+        assert buckets['chat_tokens']['capacity'] == 18000
+        assert buckets['chat_requests_daily']['capacity'] == 14400
+        assert not buckets['chat_requests']['limited']
+        assert not buckets['audio_seconds']['limited']
+
+    def test_daily_request_limit_does_not_raise_rpm(self):
+        """Test the requests-per-day header never replaces a configured per-minute limit"""
+        scheduler = RateLimitScheduler(buckets={"chat_requests": TokenBucket(30, 0.5)})
+        scheduler.observe_headers("chat", 200, {
+            "x-ratelimit-limit-requests": "14400",
+            "x-ratelimit-remaining-requests": "14399",
+            "x-ratelimit-reset-requests": "6s"
+        })
+
+        buckets = scheduler.get_stats()['buckets']
+        assert buckets['chat_requests']['capacity'] == 30
+        assert buckets['chat_requests']['refill_per_second'] == 0.5
+        assert buckets['chat_requests_daily']['capacity'] == 14400
+
+    @pytest.mark.asyncio
+    async def test_requests_count_against_daily_limit(self):
+        """Test an exhausted daily limit holds requests even with per-minute room"""
+        scheduler = RateLimitScheduler(buckets={"chat_requests_daily": TokenBucket(1, 20)})
+        await scheduler.acquire("chat", {"chat_requests": 1})
+
+        waited = await scheduler.acquire("chat", {"chat_requests": 1})
+
+        assert waited >= 0.03
+
+    def test_reconcile_refunds_overestimate(self):
+        """Test unused estimated tokens are returned to the bucket"""
+        scheduler = RateLimitScheduler(buckets={"chat_tokens": TokenBucket(1000, 1)})
+        scheduler.buckets["chat_tokens"].consume(600)
+
+        scheduler.reconcile("chat_tokens", estimated=600, actual=200)
+
+        assert scheduler.buckets["chat_tokens"].tokens == pytest.approx(800, abs=1)
+
+    @pytest.mark.asyncio
+    async def test_disabled_scheduler(self):
+        """Test a disabled scheduler admits everything"""
+        scheduler = RateLimitScheduler(buckets={"chat_requests": TokenBucket(1, 0.001)}, enabled=False)
+        for _ in range(5):
+            assert await scheduler.acquire("chat", {"chat_requests": 1}) == 0.0
@@ -0,0 +1,87 @@
+"""
+Unit tests for singleflight request coalescing
+"""
+
+import pytest
+import asyncio
+from utils.request_coalescer import RequestCoalescer, fingerprint
+
+@pytest.mark.unit
+class TestRequestCoalescer:
+    """Test coalescing of identical in-flight calls"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.coalescer = RequestCoalescer()
+        self.upstream_calls = 0
+
+    async def _slow_upstream(self, value="result", delay=0.05):
+        self.upstream_calls += 1
+        await asyncio.sleep(delay)
+        return value
+
+    @pytest.mark.asyncio
+    async def test_identical_calls_share_one_upstream_call(self):
+        """Test concurrent identical calls issue a single upstream request"""
+        results = await asyncio.gather(*[
+            self.coalescer.run("chat", "same", lambda: self._slow_upstream())
+            for _ in range(5)
+        ])
+
+        assert results == ["result"] * 5
+        assert self.upstream_calls == 1
+        stats = self.coalescer.get_stats()["chat"]
+        assert stats["coalesced_waiters"] == 4
+        assert stats["upstream_calls"] == 1
+
+    @pytest.mark.asyncio
+    async def test_different_keys_are_not_coalesced(self):
+        """Test different fingerprints run independently"""
+        await asyncio.gather(
+            self.coalescer.run("chat", "a", lambda: self._slow_upstream("a")),
+            self.coalescer.run("chat", "b", lambda: self._slow_upstream("b"))
+        )
+
+        assert self.upstream_calls == 2
+
+    @pytest.mark.asyncio
+    async def test_sequential_calls_are_not_coalesced(self):
+        """Test a finished call is not reused by later callers"""
+        await self.coalescer.run("tts", "k", lambda: self._slow_upstream())
+        await self.coalescer.run("tts", "k", lambda: self._slow_upstream())
+
+        assert self.upstream_calls == 2
+        assert self.coalescer.in_flight() == 0
+
+    @pytest.mark.asyncio
+    async def test_errors_propagate_to_all_waiters(self):
+        """Test an upstream failure is raised to every waiter"""
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        results = await asyncio.gather(*[
+            self.coalescer.run("stt", "k", failing) for _ in range(3)
+        ], return_exceptions=True)
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_cancel_others(self):
+        """Test one caller going away leaves the shared call running"""
+        first = asyncio.ensure_future(
+            self.coalescer.run("chat", "k", lambda: self._slow_upstream(delay=0.1))
+        )
+        second = asyncio.ensure_future(
+            self.coalescer.run("chat", "k", lambda: self._slow_upstream(delay=0.1))
+        )
+        await asyncio.sleep(0.01)
+        first.cancel()
+
+        assert await second == "result"
+        assert self.upstream_calls == 1
+
+    def test_fingerprint_is_stable(self):
+        """Test fingerprints depend only on the request parts"""
+        assert fingerprint(b"audio", "wav", "en") == fingerprint(b"audio", "wav", "en")
+        assert fingerprint(b"audio", "wav", "en") != fingerprint(b"audio", "wav", "es")
@@ -0,0 +1,166 @@
+"""
+Unit tests for hedged upstream requests
+"""
+
+import pytest
+import asyncio
+from utils.request_hedger import RequestHedger
+
+def _warm(hedger: RequestHedger, endpoint: str, latency_ms: float, count: int = 20):
+    """Fill the latency window so hedging has a threshold"""
+    for _ in range(count):
+        hedger.record_latency(endpoint, latency_ms)
+
+@pytest.mark.unit
+class TestRequestHedger:
+    """Test hedge thresholds, racing and budget"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.hedger = RequestHedger(
+            enabled=True,
+            budget_ratio=1.0,
+            budget_burst=5.0,
+            min_samples=20,
+            min_delay_ms=10
+        )
+
+    @pytest.mark.asyncio
+    async def test_disabled_runs_once(self):
+        """Test a disabled hedger just awaits the call"""
+        hedger = RequestHedger(enabled=False)
+        calls = []
+
+        async def call():
+            calls.append(1)
+            return "ok"
+
+        assert await hedger.run("chat", call) == "ok"
+        assert calls == [1]
+        assert hedger.get_stats()['endpoints'] == {}
+
+    @pytest.mark.asyncio
+    async def test_no_hedge_without_samples(self):
+        """Test requests are not hedged until a threshold can be computed"""
+        calls = []
+
+        async def call():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "ok"
+
+        assert await self.hedger.run("chat", call) == "ok"
+        assert len(calls) == 1
+        assert self.hedger.hedge_delay_ms("chat") is None
+
+    def test_delay_uses_percentile(self):
+        """Test the hedge delay follows the recorded latency percentile"""
+        for latency in range(1, 101):
+            self.hedger.record_latency("stt", float(latency))
+
+        assert self.hedger.hedge_delay_ms("stt") == pytest.approx(96.0)
+
+    @pytest.mark.asyncio
+    async def test_slow_primary_is_hedged_and_cancelled(self):
+        """Test a hedge fires after the threshold and the losing attempt is cancelled"""
+        _warm(self.hedger, "chat", 20)
+        attempts = []
+        cancelled = []
+
+        async def call():
+            attempt = len(attempts)
+            attempts.append(attempt)
+            try:
+                await asyncio.sleep(1.0 if attempt == 0 else 0.01)
+            except asyncio.CancelledError:
+                cancelled.append(attempt)
+                raise
+            return f"attempt-{attempt}"
+
+        result = await self.hedger.run("chat", call)
+        await asyncio.sleep(0)
+
+        assert result == "attempt-1"
+        assert cancelled == [0]
+        stats = self.hedger.get_stats()['endpoints']['chat']
+        assert stats['hedges_fired'] == 1
+        assert stats['hedge_wins'] == 1
+
+    @pytest.mark.asyncio
+    async def test_fast_primary_is_not_hedged(self):
+        """Test calls faster than the threshold run once"""
+        _warm(self.hedger, "chat", 200)
+        calls = []
+
+        async def call():
+            calls.append(1)
+            return "ok"
+
+        assert await self.hedger.run("chat", call) == "ok"
+        assert len(calls) == 1
+        assert self.hedger.get_stats()['endpoints']['chat']['hedges_fired'] == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_attempt_falls_back_to_other(self):
+        """Test an attempt failing does not fail the request while the other runs"""
+        _warm(self.hedger, "stt", 10)
+        attempts = []
+
+        async def call():
+            attempt = len(attempts)
+            attempts.append(attempt)
+            if attempt == 0:
+                await asyncio.sleep(0.05)
+                return "primary"
+            raise RuntimeError("hedge failed")
+
+        assert await self.hedger.run("stt", call) == "primary"
+        assert self.hedger.get_stats()['endpoints']['stt']['primary_wins'] == 1
+
+    @pytest.mark.asyncio
+    async def test_simultaneous_winner_discards_the_other(self):
+        """Test a second success in the same round is released instead of leaked"""
+        discarded = []
+
+        async def discard(result):
+            discarded.append(result)
+
+        loop = asyncio.get_running_loop()
+        primary, hedge = loop.create_future(), loop.create_future()
+        primary.set_result("primary stream")
+        hedge.set_result("hedge stream")
+        stats = self.hedger._endpoint_stats("chat_stream")
+
+        result = await self.hedger._race("chat_stream", stats, primary, hedge, 0.0, 0.0, discard)
+
+        assert discarded == [h for h in ("primary stream", "hedge stream") if h != result]
+
+    @pytest.mark.asyncio
+    async def test_budget_limits_hedges(self):
+        """Test hedges stop once the budget is spent"""
+        hedger = RequestHedger(
+            enabled=True, budget_ratio=0.05, budget_burst=1.0,
+            min_samples=20, window_size=1000, min_delay_ms=1
+        )
+        _warm(hedger, "chat", 1, count=1000)
+        calls = []
+
+        async def call():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "ok"
+
+        for _ in range(10):
+            await hedger.run("chat", call)
+
+        stats = hedger.get_stats()['endpoints']['chat']
+        assert stats['hedges_fired'] == 0
+        assert stats['budget_denied'] == 10
+        assert len(calls) == 10
+
+    def test_endpoint_filter(self):
+        """Test hedging only applies to configured endpoints"""
+        hedger = RequestHedger(enabled=True, endpoints={"stt"})
+
+        assert hedger.is_enabled("stt")
+        assert not hedger.is_enabled("chat")
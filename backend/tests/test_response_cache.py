@@ -0,0 +1,98 @@
+"""
+Unit tests for the exact-match response cache
+"""
+
+import pytest
+import time
+from utils.response_cache import ResponseCache, make_chat_cache_key
+
+@pytest.mark.unit
+class TestChatCacheKey:
+    """Test prompt fingerprinting"""
+
+    def test_key_is_stable(self):
+        """Test identical requests produce identical keys"""
+        key1 = make_chat_cache_key("sys", None, "Hello", "llama3-8b-8192", 0.7, 500)
+        key2 = make_chat_cache_key("sys", [], "  Hello ", "llama3-8b-8192", 0.7, 500)
+        assert key1 == key2
+
+    def test_key_ignores_history_metadata(self):
+        """Test extra history fields such as timestamps do not change the key"""
+        history = [{"role": "user", "content": "Hi"}]
+        history_with_ts = [{"role": "user", "content": "Hi", "timestamp": "2024-01-01"}]
+        assert (
+            make_chat_cache_key("sys", history, "Hello", "m", 0.7, 500) ==
+            make_chat_cache_key("sys", history_with_ts, "Hello", "m", 0.7, 500)
+        )
+
+    def test_key_changes_with_parameters(self):
+        """Test every request parameter takes part in the key"""
+        base = make_chat_cache_key("sys", None, "Hello", "m", 0.7, 500)
+        assert base != make_chat_cache_key("other", None, "Hello", "m", 0.7, 500)
+        assert base != make_chat_cache_key("sys", None, "Hello!", "m", 0.7, 500)
+        assert base != make_chat_cache_key("sys", None, "Hello", "m2", 0.7, 500)
+        assert base != make_chat_cache_key("sys", None, "Hello", "m", 0.2, 500)
+        assert base != make_chat_cache_key("sys", None, "Hello", "m", 0.7, 100)
+
+@pytest.mark.unit
+class TestResponseCache:
+    """Test LRU, TTL and byte budget behaviour"""
+
+    def test_hit_and_miss_counters(self):
+        """Test hits and misses are counted"""
+        cache = ResponseCache()
+        assert cache.get("a") is None
+        cache.set("a", "answer")
+        assert cache.get("a") == "answer"
+
+        stats = cache.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_lru_eviction(self):
+        """Test least recently used entries are evicted first"""
+        cache = ResponseCache(max_entries=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        cache.set("c", "3")
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+        assert cache.get_stats()["evictions"] == 1
+
+    def test_ttl_expiry(self):
+        """Test expired entries are not served"""
+        cache = ResponseCache(ttl_seconds=0.05)
+        cache.set("a", "answer")
+        time.sleep(0.1)
+
+        assert cache.get("a") is None
+        assert cache.get_stats()["expirations"] == 1
+
+    def test_byte_budget(self):
+        """Test the byte budget evicts entries and rejects oversized values"""
+        cache = ResponseCache(max_bytes=10)
+        cache.set("a", "12345")
+        cache.set("b", "12345")
+        cache.set("c", "12345")
+
+        assert len(cache) == 2
+        assert cache.current_bytes <= 10
+
+        cache.set("big", "x" * 11)
+        assert "big" not in cache
+
+    def test_sampled_opt_out(self):
+        """Test temperature > 0 requests can be excluded from caching"""
+        cache = ResponseCache(cache_sampled_responses=False)
+        assert cache.is_cacheable(0.0)
+        assert not cache.is_cacheable(0.7)
+        assert cache.get_stats()["skipped_sampled"] == 1
+
+    def test_disabled_cache(self):
+        """Test a disabled cache is never consulted"""
+        cache = ResponseCache(enabled=False)
+        assert not cache.is_cacheable(0.0)
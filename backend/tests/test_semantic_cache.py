@@ -0,0 +1,160 @@
+"""
+Unit tests for the semantic answer cache
+"""
+
+import os
+import pytest
+import time
+import numpy as np
+from utils.semantic_cache import SemanticCache, make_context_key
+
+CONTEXT = make_context_key("system prompt", "llama3-8b-8192", 500)
+
+# Labelled pairs the default threshold is calibrated against
+PARAPHRASES = [
+    ("What are your superpowers?", "What is your superpower?"),
+    ("Tell me about yourself", "Can you tell me about yourself?"),
+    ("Where do you see yourself in 5 years?", "Where do you see yourself in five years?"),
+    ("What programming languages do you know?", "Which programming languages do you know?"),
+    ("What is your biggest weakness?", "What's your biggest weakness?"),
+    ("Tell me about your experience with Python", "Tell me about your Python experience")
+]
+DIFFERENT_QUESTIONS = [
+    ("Why should we hire you?", "Why should we not hire you?"),
+    ("Why should we hire you?", "Why shouldn't we hire you?"),
+    ("What do you like about your job?", "What don't you like about your job?"),
+    ("Where do you see yourself in 5 years?", "Where do you see yourself in 10 years?"),
+    ("What's your #1 superpower?", "What's your #2 superpower?"),
+    ("What did you do in 2019?", "What did you do in 2020?"),
+    ("What are your strengths?", "What are your weaknesses?"),
+    ("Tell me about yourself", "Tell me about your family"),
+    ("What programming languages do you know?", "What programming languages do you dislike?"),
+    ("Tell me about your experience with Python", "Tell me about your experience with Java")
+]
+
+@pytest.mark.unit
+class TestSemanticCache:
+    """Test paraphrase matching and persistence"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.cache = SemanticCache()
+
+    def test_vectors_are_unit_length(self):
+        """Test question vectors are L2-normalized"""
+        vector = self.cache.vectorize("What's your #1 superpower?")
+        assert vector.dtype == np.float32
+        assert abs(float(np.linalg.norm(vector)) - 1.0) < 1e-5
+
+    def test_paraphrase_hit(self):
+        """Test a reworded question is served from the cache"""
+        self.cache.add("What's your superpower?", "Prototyping RAG systems.", CONTEXT)
+
+        match = self.cache.lookup("what is your superpower", CONTEXT)
+
+        assert match is not None
+        assert match[0] == "Prototyping RAG systems."
+        assert match[1] >= self.cache.threshold
+
+    def test_plural_paraphrase_hits(self):
+        """Test plural and singular forms of the same question match"""
+        self.cache.add("What is your superpower?", "Prototyping RAG systems.", CONTEXT)
+
+        assert self.cache.lookup("What are your superpowers?", CONTEXT) is not None
+
+    def test_negated_question_misses(self):
+        """Test a question asking the opposite is never served the cached answer"""
+        self.cache.add("Why should we hire you?", "I ship quickly.", CONTEXT)
+
+        assert self.cache.lookup("Why should we not hire you?", CONTEXT) is None
+        assert self.cache.lookup("Why shouldn't we hire you?", CONTEXT) is None
+
+    def test_changed_number_misses(self):
+        """Test a question with a different number is not matched"""
+        self.cache.add("Where do you see yourself in 5 years?", "Leading a team.", CONTEXT)
+
+        assert self.cache.lookup("Where do you see yourself in 10 years?", CONTEXT) is None
+        assert self.cache.lookup("Where do you see yourself in five years?", CONTEXT) is not None
+
+    @pytest.mark.parametrize("cached, asked", PARAPHRASES)
+    def test_default_threshold_hits_paraphrases(self, cached, asked):
+        """Test labelled paraphrases match at the shipped threshold"""
+        self.cache.add(cached, "answer", CONTEXT)
+
+        assert self.cache.lookup(asked, CONTEXT) is not None
+
+    @pytest.mark.parametrize("cached, asked", DIFFERENT_QUESTIONS)
+    def test_default_threshold_misses_different_questions(self, cached, asked):
+        """Test labelled near-miss questions don't match at the shipped threshold"""
+        self.cache.add(cached, "answer", CONTEXT)
+
+        assert self.cache.lookup(asked, CONTEXT) is None
+
+    def test_unrelated_question_misses(self):
+        """Test an unrelated question is not matched"""
+        self.cache.add("What's your #1 superpower?", "Prototyping RAG systems.", CONTEXT)
+
+        assert self.cache.lookup("What motivates you to get up every morning?", CONTEXT) is None
+        assert self.cache.get_stats()["misses"] == 1
+
+    def test_context_isolation(self):
+        """Test answers are not shared across generation contexts"""
+        self.cache.add("What's your superpower?", "Prototyping RAG systems.", CONTEXT)
+        other_context = make_context_key("system prompt", "mixtral-8x7b-32768", 500)
+
+        assert self.cache.lookup("What's your superpower?", other_context) is None
+
+    def test_lru_replacement_when_full(self):
+        """Test the least recently used row is replaced once capacity is reached"""
+        cache = SemanticCache(max_entries=2, threshold=0.99)
+        cache.add("first question about hobbies", "a1", CONTEXT)
+        time.sleep(0.01)
+        cache.add("second question about careers", "a2", CONTEXT)
+        cache.lookup("first question about hobbies", CONTEXT)
+        time.sleep(0.01)
+        cache.add("third question about travel", "a3", CONTEXT)
+
+        assert len(cache) == 2
+        assert cache.lookup("first question about hobbies", CONTEXT) is not None
+        assert cache.lookup("second question about careers", CONTEXT) is None
+
+    def test_save_and_load(self, tmp_path):
+        """Test the index survives a round trip to disk"""
+        path = str(tmp_path / "semantic_cache.npz")
+        self.cache.add("What's your superpower?", "Prototyping RAG systems.", CONTEXT)
+        assert self.cache.save(path)
+
+        restored = SemanticCache()
+        assert restored.load(path)
+        match = restored.lookup("what is your superpower", CONTEXT)
+
+        assert match is not None
+        assert match[0] == "Prototyping RAG systems."
+
+    def test_index_with_other_vector_settings_is_ignored(self, tmp_path):
+        """Test vectors saved with different feature settings are not reused"""
+        path = str(tmp_path / "semantic_cache.npz")
+        self.cache.add("What's your superpower?", "Prototyping RAG systems.", CONTEXT)
+        self.cache.save(path)
+
+        assert not SemanticCache(word_weight=1.0).load(path)
+
+    def test_disabled_by_default(self):
+        """Test the shared cache is opt-in"""
+        from utils.semantic_cache import semantic_cache
+
+        assert not semantic_cache.enabled or os.getenv("SEMANTIC_CACHE_ENABLED", "").lower() == "true"
+
+    def test_lookup_is_fast_at_scale(self):
+        """Test lookups over ~10k entries stay cheap"""
+        cache = SemanticCache(max_entries=10000)
+        for i in range(10000):
+            cache.add(f"sample interview question number {i}", f"answer {i}", CONTEXT)
+
+        start = time.perf_counter()
+        for _ in range(20):
+            cache.lookup("tell me about your leadership style", CONTEXT)
+        avg_ms = (time.perf_counter() - start) / 20 * 1000
+
+        assert len(cache) == 10000
+        assert avg_ms < 20
@@ -0,0 +1,181 @@
+"""
+Unit tests for streaming speech-to-text over WebSocket
+"""
+
+import base64
+import asyncio
+import json
+import pytest
+import numpy as np
+from unittest.mock import AsyncMock, Mock, patch
+from utils.streaming_stt import StreamingSTT
+
+SAMPLE_RATE = 16000
+
+def _speech(seconds: float) -> np.ndarray:
+    """Voiced tone with a syllable-rate envelope"""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return 0.3 * np.sin(2 * np.pi * 220 * t) * (1 + 0.5 * np.sin(2 * np.pi * 3 * t))
+
+def _silence(seconds: float) -> np.ndarray:
+    """Quiet background noise"""
+    return np.random.default_rng(0).normal(0, 0.001, int(seconds * SAMPLE_RATE))
+
+def _pcm(*parts: np.ndarray) -> bytes:
+    """Encode float samples as 16-bit mono PCM"""
+    return (np.clip(np.concatenate(parts), -1, 1) * 32767).astype("<i2").tobytes()
+
+def _frames(pcm: bytes, frame_bytes: int = 640):
+    """Split PCM into 20 ms client frames"""
+    return [pcm[i:i + frame_bytes] for i in range(0, len(pcm), frame_bytes)]
+
+@pytest.mark.unit
+class TestStreamingSTTSession:
+    """Test pause segmentation and ordered partial results"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.streaming = StreamingSTT(pause_ms=400, max_segment_seconds=6)
+        self.partials = []
+
+    async def _on_partial(self, segment: int, text: str):
+        self.partials.append((segment, text))
+
+    @pytest.mark.asyncio
+    async def test_segments_are_transcribed_while_recording(self):
+        """Test each utterance is sent as soon as its pause is heard"""
+        transcribe = AsyncMock(side_effect=["hello there", "how are you"])
+        session = self.streaming.create_session(transcribe, self._on_partial)
+
+        for frame in _frames(_pcm(_silence(0.5), _speech(1.0), _silence(0.8), _speech(1.2), _silence(0.8))):
+            session.feed(frame)
+            await asyncio.sleep(0)
+
+        # Both segments were handed off before recording stopped
+        assert transcribe.call_count == 2
+        transcript = await self.streaming.finish(session)
+
+        assert transcript == "hello there how are you"
+        assert self.partials == [(0, "hello there"), (1, "how are you")]
+        stats = self.streaming.get_stats()
+        assert stats['segments'] == 2
+        assert stats['active_sessions'] == 0
+
+    @pytest.mark.asyncio
+    async def test_trailing_speech_is_flushed_on_finish(self):
+        """Test speech still buffered when recording stops is transcribed"""
+        transcribe = AsyncMock(return_value="last words")
+        session = self.streaming.create_session(transcribe, self._on_partial)
+
+        session.feed(_pcm(_silence(0.3), _speech(1.0)))
+        assert transcribe.call_count == 0
+
+        assert await self.streaming.finish(session) == "last words"
+        assert transcribe.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_partials_are_reported_in_order(self):
+        """Test a slow first segment holds back a faster second one"""
+        async def transcribe(audio_data: bytes) -> str:
+            seconds = (len(audio_data) - 44) / 2 / SAMPLE_RATE
+            await asyncio.sleep(0.05 if seconds < 1.5 else 0.0)
+            return f"{seconds:.0f}s"
+
+        session = self.streaming.create_session(transcribe, self._on_partial)
+        session.feed(_pcm(_speech(1.0), _silence(0.8), _speech(2.0), _silence(0.8)))
+
+        await self.streaming.finish(session)
+
+        assert [segment for segment, _ in self.partials] == [0, 1]
+
+    @pytest.mark.asyncio
+    async def test_long_speech_is_cut_without_a_pause(self):
+        """Test continuous speech is split at the segment limit"""
+        transcribe = AsyncMock(return_value="words")
+        session = self.streaming.create_session(transcribe, self._on_partial)
+
+        session.feed(_pcm(_speech(10.0)))
+        await self.streaming.finish(session)
+
+        assert transcribe.call_count == 2
+        assert self.streaming.get_stats()['forced_cuts'] == 1
+
+    @pytest.mark.asyncio
+    async def test_silence_never_reaches_the_model(self):
+        """Test a recording without speech produces no transcription requests"""
+        transcribe = AsyncMock(return_value="noise")
+        session = self.streaming.create_session(transcribe, self._on_partial)
+
+        session.feed(_pcm(_silence(3.0)))
+
+        assert await self.streaming.finish(session) == ""
+        transcribe.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_failed_segment_does_not_stop_the_stream(self):
+        """Test a transcription error drops only that segment"""
+        transcribe = AsyncMock(side_effect=[Exception("rate limited"), "second"])
+        session = self.streaming.create_session(transcribe, self._on_partial)
+
+        session.feed(_pcm(_speech(1.0), _silence(0.8), _speech(1.0), _silence(0.8)))
+
+        assert await self.streaming.finish(session) == "second"
+        assert self.streaming.get_stats()['segment_errors'] == 1
+
+    def test_unsupported_sample_rate(self):
+        """Test odd sample rates are refused up front"""
+        with pytest.raises(ValueError):
+            self.streaming.create_session(AsyncMock(), sample_rate=12345)
+
+@pytest.mark.unit
+class TestStreamingWebSocketHandlers:
+    """Test the start/chunk/stop message flow"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        from routers import websocket as ws
+        self.ws = ws
+        self.socket = Mock()
+        self.socket.send_text = AsyncMock()
+        ws.manager.connection_data[self.socket] = {}
+
+    def teardown_method(self):
+        """Clean up test environment"""
+        self.ws.manager.disconnect(self.socket)
+
+    def _sent(self):
+        return [json.loads(call.args[0]) for call in self.socket.send_text.call_args_list]
+
+    @pytest.mark.asyncio
+    async def test_streaming_recording(self):
+        """Test partial transcripts arrive before stop and the final one after"""
+        ws = self.ws
+        upstream = AsyncMock(side_effect=["hello", "world"])
+        handle_text = AsyncMock()
+
+        with patch.object(ws.stt_provider, "transcribe_audio_data", upstream), \
+                patch.object(ws, "handle_text_message", handle_text):
+            await ws.handle_websocket_message(self.socket, {"type": "start_recording", "streaming": True})
+            for frame in _frames(_pcm(_speech(1.0), _silence(0.8), _speech(1.0), _silence(0.8))):
+                await ws.handle_websocket_message(self.socket, {
+                    "type": "audio_chunk",
+                    "audio_data": base64.b64encode(frame).decode()
+                })
+            await asyncio.sleep(0.01)
+            partials_before_stop = [m for m in self._sent() if m["type"] == "partial_transcript"]
+
+            await ws.handle_websocket_message(self.socket, {"type": "stop_recording"})
+
+        assert [m["text"] for m in partials_before_stop] == ["hello", "world"]
+        final = [m for m in self._sent() if m["type"] == "transcription_result"]
+        assert final[0]["transcribed_text"] == "hello world"
+        assert final[0]["streaming"] is True
+        handle_text.assert_awaited_once()
+        assert 'stt_stream' not in ws.manager.connection_data[self.socket]
+
+    @pytest.mark.asyncio
+    async def test_chunk_without_session(self):
+        """Test audio chunks outside a streaming recording are refused"""
+        await self.ws.handle_websocket_message(self.socket, {"type": "audio_chunk", "audio_data": ""})
+
+        assert self._sent()[0]["type"] == "error"
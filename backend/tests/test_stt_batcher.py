@@ -0,0 +1,186 @@
+"""
+Unit tests for Whisper micro-batching
+"""
+
+import io
+import wave
+import asyncio
+import pytest
+import numpy as np
+from unittest.mock import AsyncMock, patch
+from utils.stt_batcher import STTBatcher, assign_segments
+from tests.audio_helpers import pcm_wav, tone
+
+def _clip(seconds: float, sample_rate: int = 16000) -> bytes:
+    """A tone as 16-bit mono PCM WAV"""
+    return pcm_wav(tone(seconds, sample_rate, frequency=220), sample_rate)
+
+@pytest.mark.unit
+class TestSegmentAssignment:
+    """Test mapping segments back to clips"""
+
+    def test_segments_map_to_their_clip(self):
+        """Test each segment's text lands on the clip it overlaps"""
+        spans = [(1.5, 3.5), (5.0, 6.0)]
+        segments = [
+            {"start": 1.4, "end": 2.5, "text": "hello"},
+            {"start": 2.5, "end": 3.6, "text": "there"},
+            {"start": 4.9, "end": 6.1, "text": "bye"}
+        ]
+
+        texts, ambiguous = assign_segments(segments, spans)
+
+        assert texts == ["hello there", "bye"]
+        assert ambiguous == set()
+
+    def test_segment_spanning_two_clips_is_ambiguous(self):
+        """Test a segment merged across the separator marks both clips"""
+        spans = [(1.5, 3.5), (5.0, 6.0), (7.5, 8.0)]
+        segments = [
+            {"start": 1.5, "end": 6.0, "text": "hello there bye"},
+            {"start": 7.4, "end": 8.1, "text": "ok"}
+        ]
+
+        texts, ambiguous = assign_segments(segments, spans)
+
+        assert ambiguous == {0, 1}
+        assert texts[2] == "ok"
+
+    def test_clip_without_segments_is_ambiguous(self):
+        """Test a clip Whisper returned nothing for falls back"""
+        _, ambiguous = assign_segments([{"start": 1.5, "end": 3.5, "text": "hi"}], [(1.5, 3.5), (5.0, 6.0)])
+
+        assert ambiguous == {1}
+
+@pytest.mark.unit
+class TestSTTBatcher:
+    """Test collecting clips into batched requests"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.batcher = STTBatcher(enabled=True, window_ms=20, max_batch_size=8, separator_seconds=1.0)
+
+    async def _segments_for_batch(self, batch_audio: bytes):
+        """Echo one segment per clip naming its duration, matching the spans the batcher encoded"""
+        with wave.open(io.BytesIO(batch_audio), "rb") as wav:
+            samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype="<i2")
+        # 10 ms frames; a sine has zero samples but never a silent frame
+        frames = np.abs(samples[:len(samples) // 160 * 160].reshape(-1, 160)).max(axis=1)
+        voiced = np.concatenate([[0], (frames > 0).astype(np.int8), [0]])
+        edges = np.flatnonzero(np.diff(voiced))
+        starts, ends = edges[::2], edges[1::2]
+        return [
+            {"start": start / 100, "end": end / 100, "text": f"{(end - start) / 100:.1f}s"}
+            for start, end in zip(starts, ends)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_clips_share_one_request(self):
+        """Test clips arriving within the window are sent together and split back"""
+        upstream = AsyncMock(side_effect=self._segments_for_batch)
+        singles = [AsyncMock(return_value="single") for _ in range(4)]
+
+        results = await asyncio.gather(*[
+            self.batcher.submit(_clip(1.0 + i * 0.5), "wav", "en", singles[i], upstream)
+            for i in range(4)
+        ])
+
+        assert results == ["1.0s", "1.5s", "2.0s", "2.5s"]
+        assert upstream.call_count == 1
+        assert all(single.call_count == 0 for single in singles)
+        stats = self.batcher.get_stats()
+        assert stats['batches'] == 1
+        assert stats['requests_saved'] == 3
+
+    @pytest.mark.asyncio
+    async def test_ambiguous_clips_fall_back_individually(self):
+        """Test only clips with unclear boundaries are retried on their own"""
+        upstream = AsyncMock(return_value=[
+            {"start": 0.0, "end": 9.0, "text": "everything merged"}
+        ])
+        singles = [AsyncMock(return_value=f"single {i}") for i in range(2)]
+
+        results = await asyncio.gather(*[
+            self.batcher.submit(_clip(1.0), "wav", "en", singles[i], upstream) for i in range(2)
+        ])
+
+        assert results == ["single 0", "single 1"]
+        assert self.batcher.get_stats()['ambiguous_fallbacks'] == 2
+
+    @pytest.mark.asyncio
+    async def test_batch_failure_falls_back(self):
+        """Test an upstream error on the batch retries every clip alone"""
+        upstream = AsyncMock(side_effect=Exception("verbose_json unsupported"))
+        singles = [AsyncMock(return_value="single") for _ in range(3)]
+
+        results = await asyncio.gather(*[
+            self.batcher.submit(_clip(1.0), "wav", "en", singles[i], upstream) for i in range(3)
+        ])
+
+        assert results == ["single"] * 3
+        assert self.batcher.get_stats()['batch_failures'] == 1
+
+    @pytest.mark.asyncio
+    async def test_groups_are_not_mixed(self):
+        """Test clips for different languages go in separate requests"""
+        upstream = AsyncMock(side_effect=self._segments_for_batch)
+
+        await asyncio.gather(*[
+            self.batcher.submit(_clip(1.0), "wav", language, AsyncMock(), upstream)
+            for language in ("en", "en", "es", "es")
+        ])
+
+        assert upstream.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_ineligible_clips_go_straight_through(self):
+        """Test long or undecodable clips are transcribed individually without waiting"""
+        upstream = AsyncMock()
+        single = AsyncMock(return_value="direct")
+
+        assert await self.batcher.submit(b"\x1aE\xdf\xa3", "webm", "en", single, upstream) == "direct"
+        assert await self.batcher.submit(_clip(6.0), "wav", "en", single, upstream) == "direct"
+
+        upstream.assert_not_called()
+        assert self.batcher.get_stats()['clips_ineligible'] == 2
+
+    @pytest.mark.asyncio
+    async def test_compressed_clips_are_decoded_and_batched(self):
+        """Test WebM/Opus recordings are decoded with ffmpeg instead of skipping the batch"""
+        upstream = AsyncMock(side_effect=self._segments_for_batch)
+        recordings = {b"\x1aE\xdf\xa3 first": _clip(1.0), b"\x1aE\xdf\xa3 second": _clip(1.5)}
+
+        async def decode_to_wav(audio_data, format):
+            return recordings[audio_data]
+
+        with patch("utils.stt_batcher.audio_transcoder.decode_to_wav", side_effect=decode_to_wav) as decode:
+            results = await asyncio.gather(*[
+                self.batcher.submit(recording, "webm", "en", AsyncMock(), upstream) for recording in recordings
+            ])
+
+        assert results == ["1.0s", "1.5s"]
+        assert decode.call_count == 2
+        assert upstream.call_count == 1
+        assert self.batcher.get_stats()['clips_ineligible'] == 0
+
+    @pytest.mark.asyncio
+    async def test_lone_clip_uses_single_request(self):
+        """Test a clip with no company in the window isn't sent as a batch"""
+        upstream = AsyncMock()
+        single = AsyncMock(return_value="alone")
+
+        assert await self.batcher.submit(_clip(1.0), "wav", "en", single, upstream) == "alone"
+        upstream.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_full_batch_is_sent_before_window(self):
+        """Test reaching max_batch_size flushes immediately"""
+        self.batcher.window_ms = 10_000
+        self.batcher.max_batch_size = 2
+        upstream = AsyncMock(side_effect=self._segments_for_batch)
+
+        results = await asyncio.wait_for(asyncio.gather(*[
+            self.batcher.submit(_clip(seconds), "wav", "en", AsyncMock(), upstream) for seconds in (1.0, 1.5)
+        ]), timeout=1.0)
+
+        assert results == ["1.0s", "1.5s"]
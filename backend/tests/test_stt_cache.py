@@ -0,0 +1,134 @@
+"""
+Unit tests for the content-addressed STT transcript cache
+"""
+
+import os
+import time
+import pytest
+from unittest.mock import AsyncMock, patch
+from utils.disk_cache import DiskCache
+from utils.response_cache import ResponseCache
+from utils.stt_cache import STTCache, audio_cache_key
+from utils.stt_provider import STTProvider
+
+# WebM files start with the EBML magic; the header sniffer rejects anything else
+EBML_MAGIC = b"\x1aE\xdf\xa3"
+
+@pytest.mark.unit
+class TestDiskCache:
+    """Test the file-per-key disk tier"""
+
+    def test_round_trip_and_persistence(self, tmp_path):
+        """Test values survive a new cache instance over the same directory"""
+        DiskCache(str(tmp_path)).set("ab" * 32, b"hello")
+
+        reopened = DiskCache(str(tmp_path))
+
+        assert reopened.get("ab" * 32) == b"hello"
+        assert reopened.get("cd" * 32) is None
+        assert reopened.get_stats()['hit_rate'] == 0.5
+
+    def test_evicts_least_recently_used_over_budget(self, tmp_path):
+        """Test the byte budget evicts the coldest entry and its file"""
+        cache = DiskCache(str(tmp_path), max_bytes=20)
+        cache.set("aa" * 32, b"0123456789")
+        cache.set("bb" * 32, b"0123456789")
+        cache.get("aa" * 32)
+
+        cache.set("cc" * 32, b"0123456789")
+
+        assert cache.get("bb" * 32) is None
+        assert cache.get("aa" * 32) == b"0123456789"
+        assert not os.path.exists(os.path.join(str(tmp_path), "bb", "bb" * 32))
+        assert cache.current_bytes == 20
+
+    def test_expired_entries_are_removed(self, tmp_path):
+        """Test entries past their TTL miss"""
+        cache = DiskCache(str(tmp_path), ttl_seconds=10)
+        cache.set("aa" * 32, b"old")
+
+        with patch("utils.disk_cache.time.time", return_value=time.time() + 11):
+            assert cache.get("aa" * 32) is None
+        assert cache.get_stats()['expirations'] == 1
+
+    def test_disabled_without_directory(self):
+        """Test an empty directory disables the tier"""
+        cache = DiskCache("")
+        cache.set("aa" * 32, b"value")
+
+        assert not cache.enabled
+        assert cache.get("aa" * 32) is None
+
+@pytest.mark.unit
+class TestSTTCache:
+    """Test the memory and disk tiers together"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.memory = ResponseCache(max_entries=10)
+
+    @pytest.mark.asyncio
+    async def test_key_covers_model_and_language(self):
+        """Test the same audio under a different model or language is a different entry"""
+        audio = b"RIFF" + b"\x01" * 100
+        key = await audio_cache_key(audio, "wav", "en", "groq:whisper-large-v3-turbo")
+
+        assert key == await audio_cache_key(audio, ".WAV", "en", "groq:whisper-large-v3-turbo")
+        assert key != await audio_cache_key(audio, "wav", "es", "groq:whisper-large-v3-turbo")
+        assert key != await audio_cache_key(audio, "wav", "en", "groq:whisper-large-v3")
+
+    @pytest.mark.asyncio
+    async def test_disk_hits_are_promoted_to_memory(self, tmp_path):
+        """Test a restart-surviving disk entry is served and then cached in memory"""
+        await STTCache(ResponseCache(), DiskCache(str(tmp_path))).set("ab" * 32, "hello world")
+        cache = STTCache(self.memory, DiskCache(str(tmp_path)))
+
+        assert await cache.get("ab" * 32) == "hello world"
+        assert await cache.get("ab" * 32) == "hello world"
+        assert await cache.get("cd" * 32) is None
+
+        stats = cache.get_stats()
+        assert stats['disk_hits'] == 1
+        assert stats['memory_hits'] == 1
+        assert stats['hit_ratio'] == pytest.approx(0.667)
+
+@pytest.mark.unit
+class TestSTTProviderCache:
+    """Test repeated audio skips Whisper"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.provider = STTProvider()
+        self.cache = STTCache(ResponseCache(max_entries=10))
+
+    @pytest.mark.asyncio
+    async def test_repeated_audio_is_served_from_cache(self):
+        """Test a byte-identical second upload never reaches the model"""
+        upstream = AsyncMock(return_value="hello")
+        groq = self.provider.providers["groq"]
+
+        with patch.object(groq, "transcribe_audio_data", upstream), \
+                patch.object(groq, "is_configured", True), \
+                patch("utils.stt_provider.stt_cache", self.cache):
+            first = await self.provider.transcribe_audio_data(EBML_MAGIC + b"\x00\x01" * 64, "webm", "en")
+            second = await self.provider.transcribe_audio_data(EBML_MAGIC + b"\x00\x01" * 64, "webm", "en")
+            other_language = await self.provider.transcribe_audio_data(EBML_MAGIC + b"\x00\x01" * 64, "webm", "fr")
+
+        assert first == second == other_language == "hello"
+        assert upstream.call_count == 2
+        assert self.cache.get_stats()['memory_hits'] == 1
+
+    @pytest.mark.asyncio
+    async def test_unconfigured_provider_results_are_not_cached(self):
+        """Test mock transcripts aren't stored"""
+        upstream = AsyncMock(return_value="mock")
+        groq = self.provider.providers["groq"]
+
+        with patch.object(groq, "transcribe_audio_data", upstream), \
+                patch.object(groq, "is_configured", False), \
+                patch("utils.stt_provider.stt_cache", self.cache):
+            await self.provider.transcribe_audio_data(EBML_MAGIC + b"\x02" * 64, "webm")
+            await self.provider.transcribe_audio_data(EBML_MAGIC + b"\x02" * 64, "webm")
+
+        assert upstream.call_count == 2
+        assert len(self.cache.memory) == 0
@@ -0,0 +1,207 @@
+"""
+Unit tests for TTS output format negotiation
+"""
+
+import struct
+import pytest
+from unittest.mock import AsyncMock, patch
+from utils.response_cache import ResponseCache
+from utils.tts_cache import TTSCache
+from utils.tts_formats import TTS_FORMATS, UnsupportedFormatError, negotiate_tts_format, prefers_raw_audio
+from utils.tts_provider import TTSProviderManager
+from tests.audio_helpers import ogg_page
+
+ALL_FORMATS = list(TTS_FORMATS)
+
+# Six seconds of 24 kHz mono MPEG-2 layer III at 48 kbps, Edge's output
+MP3_48K = (b"\xff\xf3\x64\xc0" + b"\x00" * 140) * 250
+
+# The same six seconds re-encoded as 24 kbps Ogg Opus
+OGG_OPUS_24K = ogg_page(0, b"OpusHead\x01\x01" + struct.pack("<HIhB", 312, 24000, 0, 0)) + b"".join(
+    ogg_page(312 + 48000 * 6 * (i + 1) // 72, b"\x00" * 250) for i in range(72)
+)
+
+@pytest.mark.unit
+class TestFormatNegotiation:
+    """Test choosing a format from the request field and Accept header"""
+
+    def test_explicit_format_wins(self):
+        """Test a format name overrides the Accept header"""
+        fmt = negotiate_tts_format("opus-ogg", "audio/mpeg", ALL_FORMATS)
+
+        assert fmt.name == "opus-ogg"
+        assert fmt.mime_type == "audio/ogg"
+        assert fmt.filename() == "response.ogg"
+
+    def test_accept_header_preference(self):
+        """Test q-values order the candidates and codecs narrow a MIME type"""
+        assert negotiate_tts_format(None, "audio/mpeg;q=0.5, audio/webm", ALL_FORMATS).name == "opus-webm"
+        assert negotiate_tts_format(None, 'audio/ogg; codecs="opus"', ALL_FORMATS).name == "opus-ogg"
+        assert negotiate_tts_format(None, "audio/*", ALL_FORMATS).name == "mp3"
+
+    def test_non_audio_accept_gets_default(self):
+        """Test JSON clients and missing headers get the provider default"""
+        assert negotiate_tts_format(None, "application/json", ["mp3"]).name == "mp3"
+        assert negotiate_tts_format(None, None, ["mp3"]).name == "mp3"
+
+    def test_unavailable_formats_are_refused(self):
+        """Test formats the provider can't produce raise instead of being mislabeled"""
+        with pytest.raises(UnsupportedFormatError):
+            negotiate_tts_format("opus-webm", None, ["mp3"])
+        with pytest.raises(UnsupportedFormatError):
+            negotiate_tts_format(None, "audio/webm", ["mp3"])
+        with pytest.raises(UnsupportedFormatError):
+            negotiate_tts_format("flac", None, ALL_FORMATS)
+
+    def test_raw_audio_preference(self):
+        """Test only clients ranking audio above JSON get a binary body"""
+        assert prefers_raw_audio("audio/mpeg")
+        assert prefers_raw_audio("audio/*, application/json;q=0.5")
+        assert not prefers_raw_audio("application/json, audio/mpeg;q=0.5")
+        assert not prefers_raw_audio("*/*")
+        assert not prefers_raw_audio(None)
+
+@pytest.mark.unit
+class TestProviderFormats:
+    """Test the provider manager labels and measures formats"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.manager = TTSProviderManager()
+        self.cache_patch = patch("utils.tts_provider.tts_cache", TTSCache(ResponseCache(enabled=False)))
+        self.cache_patch.start()
+
+    def teardown_method(self):
+        """Clean up test environment"""
+        self.cache_patch.stop()
+
+    def test_edge_default_is_mp3(self):
+        """Test Edge reports the MP3 it actually returns"""
+        assert self.manager.get_output_formats()[0] == "mp3"
+        assert self.manager.get_provider_info()["output_format"] == "mp3"
+
+    def test_cache_key_includes_format(self):
+        """Test the same text in two formats gets two cache entries"""
+        assert self.manager._cache_key("Hi", None, 1.0, "mp3") != self.manager._cache_key("Hi", None, 1.0, "opus-ogg")
+        assert self.manager._cache_key("Hi", None, 1.0) == self.manager._cache_key("Hi", None, 1.0, "mp3")
+
+    @pytest.mark.asyncio
+    async def test_bytes_per_second_of_speech(self):
+        """Test delivered bytes are measured against the audio's duration"""
+        with patch.object(self.manager, "_synthesize_speech", AsyncMock(return_value=MP3_48K)):
+            await self.manager.synthesize_speech("Hello there")
+
+        stats = self.manager.get_stats()['formats']['mp3']
+        assert stats['speech_seconds'] == 6.0
+        assert stats['bytes_per_second'] == 6000
+        assert stats['nominal_bytes_per_second'] == 6000
+
+    def test_ffmpeg_adds_reencoded_formats(self):
+        """Test formats Edge can't produce are offered once ffmpeg can re-encode its MP3"""
+        with patch("utils.tts_provider.audio_transcoder.ffmpeg_path", "/usr/bin/ffmpeg"):
+            assert self.manager.get_output_formats() == ["mp3", "mp3-32k", "opus-webm", "opus-ogg"]
+        with patch("utils.tts_provider.audio_transcoder.ffmpeg_path", None):
+            assert self.manager.get_output_formats() == ["mp3"]
+
+    @pytest.mark.asyncio
+    async def test_reencoded_format_is_cached_and_measured(self):
+        """Test Opus is encoded from Edge's MP3 once and measured separately from MP3"""
+        encode = AsyncMock(return_value=OGG_OPUS_24K)
+        with patch("utils.tts_provider.tts_cache", TTSCache(ResponseCache())), \
+                patch("utils.tts_provider.audio_transcoder.ffmpeg_path", "/usr/bin/ffmpeg"), \
+                patch("utils.tts_provider.audio_transcoder.encode_speech", encode), \
+                patch.object(self.manager, "_synthesize_speech", AsyncMock(return_value=MP3_48K)) as synthesize:
+            assert await self.manager.synthesize_speech("Hello there", audio_format="opus-ogg") == OGG_OPUS_24K
+            assert await self.manager.synthesize_speech("Hello there", audio_format="opus-ogg") == OGG_OPUS_24K
+            assert await self.manager.synthesize_speech("Hello there", audio_format="mp3") == MP3_48K
+
+        synthesize.assert_awaited_once()
+        assert synthesize.call_args.kwargs["audio_format"] == "mp3"
+        encode.assert_awaited_once_with(MP3_48K, "opus-ogg", 24000)
+        formats = self.manager.get_stats()['formats']
+        assert formats['opus-ogg']['speech_seconds'] == 12.0
+        assert formats['opus-ogg']['bytes_per_second'] == round(len(OGG_OPUS_24K) / 6)
+        assert formats['opus-ogg']['nominal_bytes_per_second'] == 3000
+        assert formats['mp3']['bytes_per_second'] == 6000
+
+    @pytest.mark.asyncio
+    async def test_reencoded_format_streams_as_one_chunk(self):
+        """Test WebM, which can't be stitched, is streamed whole after re-encoding"""
+        encode = AsyncMock(return_value=b"\x1aE\xdf\xa3 webm")
+        with patch("utils.tts_provider.audio_transcoder.ffmpeg_path", "/usr/bin/ffmpeg"), \
+                patch("utils.tts_provider.audio_transcoder.encode_speech", encode), \
+                patch.object(self.manager, "_synthesize_speech", AsyncMock(return_value=MP3_48K)):
+            chunks = [chunk async for chunk in self.manager.synthesize_stream("Hello there", audio_format="opus-webm")]
+
+        assert chunks == [b"\x1aE\xdf\xa3 webm"]
+        encode.assert_awaited_once_with(MP3_48K, "opus-webm", 24000)
+
+    @pytest.mark.asyncio
+    async def test_failed_reencoding_raises(self):
+        """Test an ffmpeg failure surfaces instead of returning mislabeled MP3"""
+        with patch("utils.tts_provider.audio_transcoder.ffmpeg_path", "/usr/bin/ffmpeg"), \
+                patch("utils.tts_provider.audio_transcoder.encode_speech", AsyncMock(return_value=None)), \
+                patch.object(self.manager, "_synthesize_speech", AsyncMock(return_value=MP3_48K)):
+            with pytest.raises(Exception, match="opus-ogg"):
+                await self.manager.synthesize_speech("Hello there", audio_format="opus-ogg")
+
+    @pytest.mark.asyncio
+    async def test_unsupported_format_fails_before_synthesis(self):
+        """Test a format Edge can't produce without ffmpeg never reaches the provider"""
+        with patch("utils.tts_provider.audio_transcoder.ffmpeg_path", None), \
+                patch.object(self.manager, "_synthesize_speech", AsyncMock()) as synthesize:
+            with pytest.raises(UnsupportedFormatError):
+                await self.manager.synthesize_speech("Hello there", audio_format="opus-webm")
+
+        synthesize.assert_not_called()
+
+@pytest.mark.unit
+class TestSynthesizeFormatEndpoints:
+    """Test MIME types, filenames and binary bodies on the TTS endpoints"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.synthesize = AsyncMock(return_value=MP3_48K)
+        self.synthesize_patch = patch("routers.voice.tts_provider.synthesize_speech", self.synthesize)
+        self.synthesize_patch.start()
+
+    def teardown_method(self):
+        """Clean up test environment"""
+        self.synthesize_patch.stop()
+
+    def test_json_response_is_labelled_mp3(self, test_client):
+        """Test the JSON body names the real format instead of WAV"""
+        response = test_client.post("/api/voice/synthesize", json={"text": "Hello there"})
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["filename"] == "response.mp3"
+        assert body["mime_type"] == "audio/mpeg"
+        assert body["format"] == "mp3"
+
+    def test_audio_accept_gets_binary_body(self, test_client):
+        """Test an audio Accept header skips the base64 JSON wrapper"""
+        response = test_client.post(
+            "/api/voice/synthesize",
+            json={"text": "Hello there"},
+            headers={"Accept": "audio/mpeg"}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "audio/mpeg"
+        assert 'filename="response.mp3"' in response.headers["content-disposition"]
+        assert response.content == MP3_48K
+
+    def test_unavailable_format_is_not_acceptable(self, test_client):
+        """Test asking for a format the provider can't produce is a 406"""
+        with patch("utils.tts_provider.audio_transcoder.ffmpeg_path", None):
+            response = test_client.post("/api/voice/synthesize", json={"text": "Hello there", "format": "opus-webm"})
+
+        assert response.status_code == 406
+        self.synthesize.assert_not_called()
+
+    def test_unknown_format_is_rejected(self, test_client):
+        """Test unknown format names fail validation"""
+        response = test_client.post("/api/voice/synthesize", json={"text": "Hello there", "format": "flac"})
+
+        assert response.status_code == 422
@@ -0,0 +1,198 @@
+"""
+Unit tests for TTS synthesis and audio streaming
+"""
+
+import asyncio
+import pytest
+from unittest.mock import Mock, patch
+from models.edge_tts import EdgeTTSModel
+from utils.disk_cache import DiskCache
+from utils.response_cache import ResponseCache
+from utils.tts_cache import TTSCache, tts_cache_key
+from utils.tts_provider import TTSProviderManager
+
+def _communicate(chunks, delay: float = 0.0):
+    """Stand-in for edge_tts.Communicate yielding the given audio chunks"""
+    async def stream():
+        yield {"type": "WordBoundary", "offset": 0}
+        for chunk in chunks:
+            await asyncio.sleep(delay)
+            yield {"type": "audio", "data": chunk}
+    communicate = Mock()
+    communicate.stream = stream
+    return Mock(return_value=communicate)
+
+@pytest.mark.unit
+class TestEdgeTTSStreaming:
+    """Test Edge TTS yields audio as it arrives"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.model = EdgeTTSModel()
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_audio_chunks(self):
+        """Test only audio chunks are yielded, in order"""
+        with patch("models.edge_tts.edge_tts.Communicate", _communicate([b"ab", b"cd", b"ef"])):
+            chunks = [chunk async for chunk in self.model.synthesize_stream("Hello there", "en-US-GuyNeural")]
+
+        assert chunks == [b"ab", b"cd", b"ef"]
+
+    @pytest.mark.asyncio
+    async def test_synthesize_speech_joins_chunks(self):
+        """Test the whole-clip API returns the joined stream"""
+        with patch("models.edge_tts.edge_tts.Communicate", _communicate([b"ab", b"cd"])):
+            assert await self.model.synthesize_speech("Hello there") == b"abcd"
+
+    @pytest.mark.asyncio
+    async def test_empty_stream_raises(self):
+        """Test a stream without audio is an error"""
+        with patch("models.edge_tts.edge_tts.Communicate", _communicate([])):
+            with pytest.raises(Exception, match="empty audio"):
+                await self.model.synthesize_speech("Hello there")
+
+    @pytest.mark.asyncio
+    async def test_empty_text_raises(self):
+        """Test empty text is rejected before any request"""
+        with pytest.raises(Exception, match="empty"):
+            async for _ in self.model.synthesize_stream("   "):
+                pass
+
+@pytest.mark.unit
+class TestTTSProviderStreaming:
+    """Test the provider manager measures first byte separately from total time"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.manager = TTSProviderManager()
+        self.cache_patch = patch("utils.tts_provider.tts_cache", TTSCache(ResponseCache(enabled=False)))
+        self.cache_patch.start()
+
+    def teardown_method(self):
+        """Clean up test environment"""
+        self.cache_patch.stop()
+
+    @pytest.mark.asyncio
+    async def test_first_byte_is_reported_before_total(self):
+        """Test time to first audio byte is shorter than the whole stream"""
+        with patch("models.edge_tts.edge_tts.Communicate", _communicate([b"a", b"b", b"c"], delay=0.02)):
+            chunks = [chunk async for chunk in self.manager.synthesize_stream("Hello there")]
+
+        stats = self.manager.get_stats()
+        assert chunks == [b"a", b"b", b"c"]
+        assert stats['streams'] == 1
+        assert stats['stream_bytes'] == 3
+        assert 0 < stats['stream_first_byte_ms']['avg'] < stats['stream_total_ms']['avg']
+
+    @pytest.mark.asyncio
+    async def test_stream_errors_are_counted(self):
+        """Test failures propagate and are counted"""
+        with patch("models.edge_tts.edge_tts.Communicate", _communicate([])):
+            with pytest.raises(Exception):
+                async for _ in self.manager.synthesize_stream("Hello there"):
+                    pass
+
+        assert self.manager.get_stats()['stream_errors'] == 1
+
+@pytest.mark.unit
+class TestSynthesizeStreamEndpoint:
+    """Test chunked audio delivery over HTTP"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.cache_patch = patch("utils.tts_provider.tts_cache", TTSCache(ResponseCache(enabled=False)))
+        self.cache_patch.start()
+
+    def teardown_method(self):
+        """Clean up test environment"""
+        self.cache_patch.stop()
+
+    def test_stream_endpoint(self, test_client):
+        """Test audio is streamed with the first-byte timing header"""
+        with patch("models.edge_tts.edge_tts.Communicate", _communicate([b"ID3", b"\xff\xfb"])):
+            response = test_client.post("/api/voice/synthesize/stream", json={"text": "Hello there"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "audio/mpeg"
+        assert float(response.headers["x-tts-first-byte-ms"]) >= 0
+        assert response.content == b"ID3\xff\xfb"
+
+    def test_stream_endpoint_synthesis_failure(self, test_client):
+        """Test a failure before the first chunk is a 500, not a broken stream"""
+        with patch("models.edge_tts.edge_tts.Communicate", _communicate([])):
+            response = test_client.post("/api/voice/synthesize/stream", json={"text": "Hello there"})
+
+        assert response.status_code == 500
+
+@pytest.mark.unit
+class TestTTSCache:
+    """Test the two-tier synthesized audio cache"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.manager = TTSProviderManager()
+
+    def test_key_normalizes_whitespace_only(self):
+        """Test spacing differences share a key but wording and voice don't"""
+        key = tts_cache_key("Hello   there.\n", "en-US-GuyNeural", "+0%", "mp3", "edge")
+
+        assert key == tts_cache_key(" Hello there.", "en-US-GuyNeural", "+0%", "mp3", "edge")
+        assert key != tts_cache_key("hello there.", "en-US-GuyNeural", "+0%", "mp3", "edge")
+        assert key != tts_cache_key("Hello there.", "en-US-AriaNeural", "+0%", "mp3", "edge")
+        assert key != tts_cache_key("Hello there.", "en-US-GuyNeural", "+20%", "mp3", "edge")
+
+    @pytest.mark.asyncio
+    async def test_repeated_sentence_is_not_resynthesized(self):
+        """Test the second request for the same sentence never reaches Edge TTS"""
+        cache = TTSCache(ResponseCache(max_entries=10))
+        communicate = _communicate([b"ab", b"cd"])
+
+        with patch("utils.tts_provider.tts_cache", cache), \
+                patch("models.edge_tts.edge_tts.Communicate", communicate):
+            first = await self.manager.synthesize_speech("Good morning!", "en-US-GuyNeural")
+            second = await self.manager.synthesize_speech("Good  morning!", "en-US-GuyNeural")
+
+        assert first == second == b"abcd"
+        assert communicate.call_count == 1
+        stats = cache.get_stats()
+        assert stats['memory_hits'] == 1
+        assert stats['bytes_saved'] == 4
+
+    @pytest.mark.asyncio
+    async def test_default_voice_shares_key_with_explicit_default(self):
+        """Test the key uses the voice the provider resolves to"""
+        default_voice = self.manager.get_current_provider().default_voice
+
+        assert self.manager._cache_key("Hi", None, 1.0) == self.manager._cache_key("Hi", default_voice, 1.0)
+        assert self.manager._cache_key("Hi", None, 1.0) != self.manager._cache_key("Hi", None, 1.5)
+
+    @pytest.mark.asyncio
+    async def test_disk_tier_survives_restart(self, tmp_path):
+        """Test audio stored by one process is served from disk by the next"""
+        communicate = _communicate([b"audio"])
+        with patch("utils.tts_provider.tts_cache", TTSCache(ResponseCache(), DiskCache(str(tmp_path)))), \
+                patch("models.edge_tts.edge_tts.Communicate", communicate):
+            await self.manager.synthesize_speech("Welcome back")
+
+        restarted = TTSCache(ResponseCache(), DiskCache(str(tmp_path)))
+        with patch("utils.tts_provider.tts_cache", restarted), \
+                patch("models.edge_tts.edge_tts.Communicate", communicate):
+            assert await self.manager.synthesize_speech("Welcome back") == b"audio"
+
+        assert communicate.call_count == 1
+        assert restarted.get_stats()['disk_hits'] == 1
+
+    @pytest.mark.asyncio
+    async def test_completed_stream_is_cached(self):
+        """Test a finished stream fills the cache and the next stream is served from it"""
+        cache = TTSCache(ResponseCache())
+        communicate = _communicate([b"a", b"b"])
+
+        with patch("utils.tts_provider.tts_cache", cache), \
+                patch("models.edge_tts.edge_tts.Communicate", communicate):
+            first = [chunk async for chunk in self.manager.synthesize_stream("One moment")]
+            second = [chunk async for chunk in self.manager.synthesize_stream("One moment")]
+
+        assert first == [b"a", b"b"]
+        assert second == [b"ab"]
+        assert communicate.call_count == 1
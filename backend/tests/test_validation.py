@@ -6,7 +6,7 @@ import pytest
 from utils.validation import (
     sanitize_text, validate_filename, validate_audio_format,
     validate_language_code, validate_voice_name, validate_numeric_range,
-    validate_conversation_history, SecurityError, handle_validation_error
+    validate_conversation_history, validate_conversation_id, SecurityError, handle_validation_error
 )
 from fastapi import HTTPException
 
@@ -238,6 +238,23 @@ class TestConversationHistoryValidation:
             validate_conversation_history("invalid")
         assert "must be a list" in str(exc_info.value)
 
+@pytest.mark.unit
+class TestConversationIdValidation:
+    """Test conversation id validation"""
+
+    def test_valid_conversation_id(self):
+        """Test server-issued ids are accepted"""
+        conversation_id = "0123456789abcdef0123456789abcdef"
+        assert validate_conversation_id(conversation_id) == conversation_id
+        assert validate_conversation_id(conversation_id.upper()) == conversation_id
+        assert validate_conversation_id(None) is None
+
+    def test_invalid_conversation_id(self):
+        """Test malformed ids are rejected"""
+        for bad_id in ["short", "../../etc/passwd", "g" * 32, "<script>"]:
+            with pytest.raises(SecurityError):
+                validate_conversation_id(bad_id)
+
 @pytest.mark.unit
 class TestErrorHandling:
     """Test error handling functionality"""
@@ -0,0 +1,92 @@
+"""
+Unit tests for language-aware Whisper model selection
+"""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+from utils.whisper_router import WhisperRouter, DEFAULT_WHISPER_MODELS
+from utils.stt_provider import STTProvider
+
+TURBO = DEFAULT_WHISPER_MODELS["turbo"]
+STANDARD = DEFAULT_WHISPER_MODELS["standard"]
+DISTIL = DEFAULT_WHISPER_MODELS["distil"]
+
+EBML_MAGIC = b"\x1aE\xdf\xa3"
+
+@pytest.mark.unit
+class TestWhisperRouter:
+    """Test model selection from language, accuracy and live latency"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        self.router = WhisperRouter(DEFAULT_WHISPER_MODELS, min_samples=3, failure_threshold=2)
+
+    def test_english_goes_to_distil(self):
+        """Test English audio uses the English-only model"""
+        selection = self.router.select("en")
+
+        assert (selection.model, selection.reason) == (DISTIL, "english")
+
+    def test_other_languages_go_to_turbo(self):
+        """Test non-English and auto-detected audio use turbo"""
+        assert self.router.select("es").model == TURBO
+        assert self.router.select(None).reason == "multilingual"
+
+    def test_accuracy_goes_to_standard(self):
+        """Test an explicit accuracy request overrides the language choice"""
+        selection = self.router.select("en", accuracy=True)
+
+        assert (selection.model, selection.reason) == (STANDARD, "accuracy")
+
+    def test_slow_distil_falls_back_to_turbo(self):
+        """Test live measurements steer English away from a slower distil"""
+        for _ in range(3):
+            self.router.record_success(DISTIL, 900)
+            self.router.record_success(TURBO, 300)
+
+        selection = self.router.select("en")
+
+        assert (selection.model, selection.reason) == (TURBO, "latency")
+
+    def test_few_samples_keep_preference(self):
+        """Test a single slow call doesn't move traffic"""
+        self.router.record_success(DISTIL, 5000)
+        self.router.record_success(TURBO, 300)
+
+        assert self.router.select("en").model == DISTIL
+
+    def test_failing_model_is_skipped(self):
+        """Test repeated failures fail over to turbo"""
+        self.router.record_failure(DISTIL)
+        self.router.record_failure(DISTIL)
+
+        selection = self.router.select("en")
+
+        assert (selection.model, selection.reason) == (TURBO, "failover")
+        assert self.router.get_stats()['models'][DISTIL]['healthy'] is False
+
+    def test_headers_report_model(self):
+        """Test the selection is exposed as response headers"""
+        headers = self.router.select("fr").to_headers()
+
+        assert headers == {"X-STT-Model": TURBO, "X-STT-Model-Route": "multilingual"}
+
+@pytest.mark.unit
+class TestSTTProviderModelSelection:
+    """Test the provider passes the selected model upstream"""
+
+    @pytest.mark.asyncio
+    async def test_language_hint_selects_model(self):
+        """Test en-US is formatted to en and transcribed with distil"""
+        provider = STTProvider()
+        upstream = AsyncMock(return_value="hello")
+        router = WhisperRouter(DEFAULT_WHISPER_MODELS)
+
+        with patch.object(provider.providers["groq"], "transcribe_audio_data", upstream), \
+                patch("utils.stt_provider.whisper_router", router):
+            assert provider.select_model("en-US").model == DISTIL
+            await provider.transcribe_audio_data(EBML_MAGIC + b"\x03" * 64, "webm", "en-US")
+            await provider.transcribe_audio_data(EBML_MAGIC + b"\x04" * 64, "webm", "de-DE")
+
+        models = [call.args[3] for call in upstream.call_args_list]
+        assert models == [DISTIL, TURBO]
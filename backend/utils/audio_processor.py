@@ -2,17 +2,123 @@
 Audio processing utilities for voice bot functionality
 """
 import os
+import wave
+import struct
 import tempfile
 import base64
-from typing import Optional, Tuple, Union
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Optional, Tuple, Union, Dict, Any, Callable
 from io import BytesIO
 
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+@dataclass
+class PCMAudio:
+    """Decoded PCM audio with the raw frames it came from"""
+    samples: "np.ndarray"  # float32 mono in [-1, 1]
+    sample_rate: int
+    channels: int
+    sample_width: int
+    frames: bytes
+
+@dataclass
+class VADResult:
+    """Outcome of voice activity trimming"""
+    audio_data: bytes
+    speech_detected: bool
+    original_seconds: float = 0.0
+    trimmed_seconds: float = 0.0
+    analyzed: bool = True
+
+class AudioValidationError(Exception):
+    """Raised when an upload is not usable audio and must not be sent upstream"""
+    pass
+
+@dataclass
+class AudioMetadata:
+    """Container facts parsed from the first bytes of an upload"""
+    format: Optional[str]  # detected container (wav, webm, ogg, mp3, flac, m4a)
+    declared_format: Optional[str] = None
+    codec: Optional[str] = None
+    duration_seconds: Optional[float] = None
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+    size_bytes: int = 0
+    error: Optional[str] = None
+
+    @property
+    def valid(self) -> bool:
+        return self.error is None
+
+    @property
+    def mislabeled(self) -> bool:
+        return bool(self.format and self.declared_format and self.format != self.declared_format)
+
+    def to_dict(self) -> Dict[str, Any]:
+        info = asdict(self)
+        if info['duration_seconds'] is not None:
+            info['duration_seconds'] = round(info['duration_seconds'], 3)
+        return info
+
+# Bytes read for magic detection and most headers; WebM and MP3 tags may use a larger window
+SNIFF_HEAD_BYTES = 4096
+SNIFF_WINDOW_BYTES = 64 * 1024
+
+# MPEG audio bitrates in kbps by (MPEG-1?, layer)
+_MP3_BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+}
+# Sample rates by MPEG version bits (3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5)
+_MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+_MP4_AUDIO_ENTRIES = {b"mp4a", b"alac", b"Opus", b"fLaC", b"ac-3", b"ec-3", b"samr"}
+
 class AudioProcessor:
     """Utility class for audio processing operations"""
     
     def __init__(self):
         self.supported_formats = ['wav', 'mp3', 'ogg', 'webm', 'm4a', 'flac']
         self.max_file_size = 25 * 1024 * 1024  # 25MB
+
+        # Voice activity detection settings
+        self.vad_enabled = NUMPY_AVAILABLE and os.getenv("STT_VAD_ENABLED", "true").lower() == "true"
+        self.vad_frame_ms = int(os.getenv("STT_VAD_FRAME_MS", "20"))
+        self.vad_hangover_ms = int(os.getenv("STT_VAD_HANGOVER_MS", "200"))
+        self.vad_margin_db = float(os.getenv("STT_VAD_MARGIN_DB", "12"))
+        self.vad_min_energy_db = float(os.getenv("STT_VAD_MIN_ENERGY_DB", "-45"))
+        self.vad_min_speech_ms = int(os.getenv("STT_VAD_MIN_SPEECH_MS", "100"))
+
+        # Header-level limits; uploads outside them never reach the STT provider
+        self.min_audio_seconds = float(os.getenv("STT_MIN_AUDIO_SECONDS", "0.1"))
+        self.max_audio_seconds = float(os.getenv("STT_MAX_AUDIO_SECONDS", "1800"))
+        self.sniff_stats = {
+            'inspected': 0,
+            'rejected': 0,
+            'mislabeled': 0,
+            'too_short': 0,
+            'too_long': 0,
+            'by_format': {}
+        }
+
+        self._trimmed_seconds = deque(maxlen=1000)
+        self.vad_stats = {
+            'analyzed': 0,
+            'not_decodable': 0,
+            'no_speech_skipped': 0,
+            'total_input_seconds': 0.0,
+            'total_trimmed_seconds': 0.0
+        }
     
     def validate_audio_file(self, file_path: str) -> Tuple[bool, str]:
         """
@@ -38,6 +144,11 @@ class AudioProcessor:
             file_extension = file_path.lower().split('.')[-1]
             if file_extension not in self.supported_formats:
                 return False, f"Unsupported format: {file_extension}. Supported: {self.supported_formats}"
+
+            # Check the header actually is audio
+            metadata = self.sniff_audio_file(file_path)
+            if not metadata.valid:
+                return False, metadata.error
             
             return True, "Valid audio file"
             
@@ -167,13 +278,19 @@ class AudioProcessor:
         except Exception as e:
             return {"error": f"Error getting audio info: {str(e)}"}
     
-    def create_audio_response(self, audio_data: bytes, filename: str = "response.wav") -> dict:
+    def create_audio_response(
+        self,
+        audio_data: bytes,
+        filename: str = "response.wav",
+        mime_type: Optional[str] = None
+    ) -> dict:
         """
         Create standardized audio response format
         
         Args:
             audio_data: Audio data as bytes
             filename: Filename for the audio
+            mime_type: Content type; guessed from the extension if omitted
             
         Returns:
             Dictionary with audio response data
@@ -187,11 +304,566 @@ class AudioProcessor:
                 "filename": filename,
                 "format": filename.split('.')[-1],
                 "size_bytes": len(audio_data),
-                "mime_type": f"audio/{filename.split('.')[-1]}"
+                "mime_type": mime_type or f"audio/{filename.split('.')[-1]}"
             }
             
         except Exception as e:
             raise Exception(f"Error creating audio response: {str(e)}")
 
+    def decode_pcm(self, audio_data: bytes) -> Optional[PCMAudio]:
+        """
+        Decode PCM WAV bytes into mono float samples
+
+        Args:
+            audio_data: WAV file bytes
+
+        Returns:
+            Decoded audio, or None if the data isn't PCM WAV
+        """
+        if not NUMPY_AVAILABLE or audio_data[:4] != b"RIFF" or audio_data[8:12] != b"WAVE":
+            return None
+
+        try:
+            with wave.open(BytesIO(audio_data), "rb") as wav:
+                channels = wav.getnchannels()
+                sample_width = wav.getsampwidth()
+                sample_rate = wav.getframerate()
+                frames = wav.readframes(wav.getnframes())
+        except (wave.Error, EOFError):
+            return None
+
+        if sample_width == 1:
+            samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+        elif sample_width == 2:
+            samples = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+        elif sample_width == 3:
+            raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+            as_int = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8) |
+                      (raw[:, 2].astype(np.int32) << 16))
+            as_int = np.where(as_int & 0x800000, as_int - 0x1000000, as_int)
+            samples = as_int.astype(np.float32) / 8388608.0
+        elif sample_width == 4:
+            samples = np.frombuffer(frames, dtype="<i4").astype(np.float32) / 2147483648.0
+        else:
+            return None
+
+        usable = len(samples) - len(samples) % channels
+        samples = samples[:usable].reshape(-1, channels).mean(axis=1)
+        return PCMAudio(samples, sample_rate, channels, sample_width, frames)
+
+    def detect_speech(self, samples: "np.ndarray", sample_rate: int) -> Optional[Tuple[int, int]]:
+        """
+        Find the span of speech in mono samples
+
+        Frames are classified from their RMS energy relative to the clip's
+        noise floor; quieter frames with a high zero-crossing rate (unvoiced
+        consonants such as "s" or "f") also count. A hangover extends every
+        speech frame on both sides so word edges and short pauses survive.
+
+        Args:
+            samples: float32 mono samples in [-1, 1]
+            sample_rate: Sample rate in Hz
+
+        Returns:
+            (start_sample, end_sample) of the speech span, or None if no speech
+        """
+        frame_size = max(1, int(sample_rate * self.vad_frame_ms / 1000))
+        frame_count = len(samples) // frame_size
+        if frame_count == 0:
+            return None
+
+        frames = samples[:frame_count * frame_size].reshape(frame_count, frame_size)
+        rms = np.sqrt(np.mean(frames ** 2, axis=1))
+        energy_db = 20 * np.log10(rms + 1e-10)
+        signs = np.signbit(frames)
+        zero_crossing_rate = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+        noise_floor = np.percentile(energy_db, 10)
+        peak = np.percentile(energy_db, 95)
+        # Clips that are speech throughout have no real noise floor; cap the
+        # threshold below the loud frames so they still count
+        threshold = max(min(noise_floor + self.vad_margin_db, peak - self.vad_margin_db), self.vad_min_energy_db)
+        unvoiced_threshold = max(threshold - self.vad_margin_db / 2, self.vad_min_energy_db)
+
+        speech = (energy_db > threshold) | ((energy_db > unvoiced_threshold) & (zero_crossing_rate > 0.3))
+        if speech.sum() * self.vad_frame_ms < self.vad_min_speech_ms:
+            return None
+
+        hangover = int(self.vad_hangover_ms / self.vad_frame_ms)
+        smoothed = np.convolve(speech.astype(np.int32), np.ones(2 * hangover + 1, dtype=np.int32), mode="same") > 0
+        speech_frames = np.flatnonzero(smoothed)
+        start = int(speech_frames[0]) * frame_size
+        end = min((int(speech_frames[-1]) + 1) * frame_size, len(samples))
+        return start, end
+
+    def trim_silence(self, audio_data: bytes, format: str = "wav") -> VADResult:
+        """
+        Trim leading and trailing silence from an upload
+
+        Only PCM WAV is analyzed; other formats pass through unchanged, so
+        callers decode compressed uploads first (see
+        audio_transcoder.decode_to_wav). The kept frames are copied byte-for-byte, so no re-quantization
+        happens.
+
+        Args:
+            audio_data: Encoded audio
+            format: Audio format (file extension)
+
+        Returns:
+            VADResult with the trimmed audio and whether speech was found
+        """
+        if not self.vad_enabled or format.lower().lstrip('.') != "wav":
+            return VADResult(audio_data, speech_detected=True, analyzed=False)
+
+        pcm = self.decode_pcm(audio_data)
+        if pcm is None or pcm.sample_rate <= 0:
+            self.vad_stats['not_decodable'] += 1
+            return VADResult(audio_data, speech_detected=True, analyzed=False)
+
+        original_seconds = len(pcm.samples) / pcm.sample_rate
+        self.vad_stats['analyzed'] += 1
+        self.vad_stats['total_input_seconds'] += original_seconds
+
+        span = self.detect_speech(pcm.samples, pcm.sample_rate)
+        if span is None:
+            self.vad_stats['no_speech_skipped'] += 1
+            self.vad_stats['total_trimmed_seconds'] += original_seconds
+            self._trimmed_seconds.append(original_seconds)
+            return VADResult(b"", False, original_seconds, original_seconds)
+
+        start, end = span
+        trimmed_seconds = original_seconds - (end - start) / pcm.sample_rate
+        self.vad_stats['total_trimmed_seconds'] += trimmed_seconds
+        self._trimmed_seconds.append(trimmed_seconds)
+        if start == 0 and end == len(pcm.samples):
+            return VADResult(audio_data, True, original_seconds, 0.0)
+
+        frame_bytes = pcm.channels * pcm.sample_width
+        output = BytesIO()
+        with wave.open(output, "wb") as wav:
+            wav.setnchannels(pcm.channels)
+            wav.setsampwidth(pcm.sample_width)
+            wav.setframerate(pcm.sample_rate)
+            wav.writeframes(pcm.frames[start * frame_bytes:end * frame_bytes])
+        return VADResult(output.getvalue(), True, original_seconds, trimmed_seconds)
+
+    def get_vad_stats(self) -> Dict[str, Any]:
+        """Get voice activity trimming statistics"""
+        trimmed = sorted(self._trimmed_seconds)
+        stats = self.vad_stats.copy()
+        stats.update({
+            'enabled': self.vad_enabled,
+            'total_input_seconds': round(self.vad_stats['total_input_seconds'], 2),
+            'total_trimmed_seconds': round(self.vad_stats['total_trimmed_seconds'], 2),
+            'last_trimmed_seconds': round(self._trimmed_seconds[-1], 3) if trimmed else 0.0,
+            'avg_trimmed_seconds': round(sum(trimmed) / len(trimmed), 3) if trimmed else 0.0,
+            'p95_trimmed_seconds': round(trimmed[int(len(trimmed) * 0.95)], 3) if trimmed else 0.0
+        })
+        return stats
+
+    def sniff_audio(
+        self,
+        audio_data: bytes,
+        declared_format: Optional[str] = None,
+        record_stats: bool = True
+    ) -> AudioMetadata:
+        """
+        Identify the container and parse basic stream facts from the header
+
+        Only small windows of the data are read (the first few KB, plus box
+        or page headers where the container needs them), so this is cheap
+        enough to run on every upload before it goes anywhere.
+
+        Args:
+            audio_data: Encoded audio
+            declared_format: Format implied by the file name, if any
+            record_stats: Count the result in the upload validation stats
+
+        Returns:
+            AudioMetadata; error is set when the data isn't recognizable audio
+        """
+        view = memoryview(audio_data)
+        return self._sniff(
+            lambda offset, size: bytes(view[offset:offset + size]), len(audio_data), declared_format, record_stats
+        )
+
+    def sniff_audio_file(self, file_path: str) -> AudioMetadata:
+        """
+        Sniff an audio file on disk without reading it whole
+
+        Args:
+            file_path: Path to audio file
+
+        Returns:
+            AudioMetadata for the file
+        """
+        declared_format = os.path.splitext(file_path)[1].lower().lstrip('.') or None
+        with open(file_path, "rb") as f:
+            def read(offset: int, size: int) -> bytes:
+                f.seek(offset)
+                return f.read(size)
+            return self._sniff(read, os.path.getsize(file_path), declared_format)
+
+    def _sniff(
+        self,
+        read: Callable[[int, int], bytes],
+        size: int,
+        declared_format: Optional[str],
+        record_stats: bool = True
+    ) -> AudioMetadata:
+        """Dispatch on magic bytes and record the outcome"""
+        declared_format = declared_format.lower().lstrip('.') if declared_format else None
+        head = read(0, SNIFF_HEAD_BYTES)
+
+        if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+            metadata = self._sniff_wav(read, size)
+        elif head[:4] == b"fLaC":
+            metadata = self._sniff_flac(head)
+        elif head[:4] == b"OggS":
+            metadata = self._sniff_ogg(read, head, size)
+        elif head[:4] == b"\x1aE\xdf\xa3":
+            metadata = self._sniff_webm(read(0, SNIFF_WINDOW_BYTES))
+        elif head[4:8] == b"ftyp":
+            metadata = self._sniff_mp4(read, size)
+        elif head[:3] == b"ID3" or self._find_mp3_frame(head, 0) is not None:
+            metadata = self._sniff_mp3(read, head, size)
+        elif not head:
+            metadata = AudioMetadata(None, error="Empty audio data")
+        else:
+            metadata = AudioMetadata(None, error="Unrecognized or corrupted audio data")
+
+        metadata.declared_format = declared_format
+        metadata.size_bytes = size
+        if not record_stats:
+            return metadata
+
+        self.sniff_stats['inspected'] += 1
+        if not metadata.valid:
+            self.sniff_stats['rejected'] += 1
+        else:
+            by_format = self.sniff_stats['by_format']
+            by_format[metadata.format] = by_format.get(metadata.format, 0) + 1
+            if metadata.mislabeled:
+                self.sniff_stats['mislabeled'] += 1
+        return metadata
+
+    def _sniff_wav(self, read: Callable[[int, int], bytes], size: int) -> AudioMetadata:
+        """Walk RIFF chunks for fmt and data"""
+        metadata = AudioMetadata("wav")
+        byte_rate = None
+        offset = 12
+        for _ in range(64):
+            header = read(offset, 8)
+            if len(header) < 8:
+                break
+            chunk_id, chunk_size = header[:4], struct.unpack("<I", header[4:])[0]
+            if chunk_id == b"fmt ":
+                fmt = read(offset + 8, 16)
+                if len(fmt) < 16:
+                    return AudioMetadata("wav", error="Truncated WAV fmt chunk")
+                audio_format, channels, sample_rate, byte_rate, _, bits = struct.unpack("<HHIIHH", fmt)
+                if channels == 0 or sample_rate == 0 or byte_rate == 0:
+                    return AudioMetadata("wav", error="Invalid WAV fmt chunk")
+                metadata.channels = channels
+                metadata.sample_rate = sample_rate
+                metadata.codec = {1: f"pcm_{bits}", 3: "float", 0xFFFE: f"pcm_{bits}", 6: "alaw", 7: "mulaw"}.get(
+                    audio_format, f"wav_{audio_format:#x}"
+                )
+            elif chunk_id == b"data":
+                if byte_rate is None:
+                    return AudioMetadata("wav", error="WAV data chunk before fmt chunk")
+                # Streamed WAVs leave the size unset; use what is actually there
+                available = size - offset - 8
+                data_size = available if chunk_size in (0, 0xFFFFFFFF) else min(chunk_size, available)
+                metadata.duration_seconds = max(data_size, 0) / byte_rate
+                return metadata
+            offset += 8 + chunk_size + (chunk_size & 1)
+        if byte_rate is None:
+            return AudioMetadata("wav", error="WAV header has no fmt chunk")
+        return AudioMetadata("wav", codec=metadata.codec, sample_rate=metadata.sample_rate,
+                             channels=metadata.channels, error="WAV file has no data chunk")
+
+    def _sniff_flac(self, head: bytes) -> AudioMetadata:
+        """Parse the STREAMINFO block"""
+        if len(head) < 26 or head[4] & 0x7F != 0:
+            return AudioMetadata("flac", error="FLAC stream has no STREAMINFO block")
+        fields = int.from_bytes(head[18:26], "big")
+        sample_rate = fields >> 44
+        if sample_rate == 0:
+            return AudioMetadata("flac", error="Invalid FLAC STREAMINFO")
+        total_samples = fields & 0xFFFFFFFFF
+        return AudioMetadata(
+            "flac",
+            codec="flac",
+            sample_rate=sample_rate,
+            channels=((fields >> 41) & 0x7) + 1,
+            duration_seconds=total_samples / sample_rate if total_samples else None
+        )
+
+    def _sniff_ogg(self, read: Callable[[int, int], bytes], head: bytes, size: int) -> AudioMetadata:
+        """Parse the identification header and the last page's granule position"""
+        if len(head) < 28:
+            return AudioMetadata("ogg", error="Truncated Ogg page")
+        payload = head[27 + head[26]:]
+        if payload[:8] == b"OpusHead" and len(payload) >= 16:
+            codec, channels = "opus", payload[9]
+            pre_skip = struct.unpack("<H", payload[10:12])[0]
+            sample_rate = struct.unpack("<I", payload[12:16])[0] or 48000
+            granule_rate = 48000
+        elif payload[:7] == b"\x01vorbis" and len(payload) >= 16:
+            codec, channels = "vorbis", payload[11]
+            pre_skip = 0
+            sample_rate = granule_rate = struct.unpack("<I", payload[12:16])[0]
+        else:
+            return AudioMetadata("ogg", error="Ogg stream is not Opus or Vorbis audio")
+
+        metadata = AudioMetadata("ogg", codec=codec, sample_rate=sample_rate, channels=channels)
+        tail_start = max(0, size - SNIFF_WINDOW_BYTES)
+        tail = read(tail_start, SNIFF_WINDOW_BYTES)
+        position = tail.rfind(b"OggS")
+        while position >= 0:
+            if position + 14 <= len(tail):
+                granule = struct.unpack("<q", tail[position + 6:position + 14])[0]
+                if granule > 0 and granule_rate:
+                    metadata.duration_seconds = max(granule - pre_skip, 0) / granule_rate
+                    break
+            position = tail.rfind(b"OggS", 0, position)
+        return metadata
+
+    @staticmethod
+    def _read_vint(buffer: bytes, position: int, keep_marker: bool) -> Optional[Tuple[int, int]]:
+        """Read an EBML variable-length integer, returning (value, length)"""
+        if position >= len(buffer) or buffer[position] == 0:
+            return None
+        length = 9 - buffer[position].bit_length()
+        if position + length > len(buffer):
+            return None
+        value = int.from_bytes(buffer[position:position + length], "big")
+        if not keep_marker:
+            value &= (1 << (7 * length)) - 1
+        return value, length
+
+    def _sniff_webm(self, window: bytes) -> AudioMetadata:
+        """Walk the EBML header, segment info and audio track"""
+        metadata = AudioMetadata("webm")
+        found = {}
+        # Master elements worth descending into: EBML, Segment, Info, Tracks, TrackEntry, Audio
+        masters = {0x1A45DFA3, 0x18538067, 0x1549A966, 0x1654AE6B, 0xAE, 0xE1}
+        leaves = {0x4282: "doc_type", 0x2AD7B1: "timecode_scale", 0x4489: "duration",
+                  0x86: "codec_id", 0xB5: "sampling_frequency", 0x9F: "channels"}
+
+        def walk(start: int, end: int, depth: int):
+            position = start
+            while position < end and depth < 6:
+                element_id = self._read_vint(window, position, keep_marker=True)
+                if element_id is None:
+                    return
+                element_size = self._read_vint(window, position + element_id[1], keep_marker=False)
+                if element_size is None:
+                    return
+                data_start = position + element_id[1] + element_size[1]
+                unknown_size = element_size[0] == (1 << (7 * element_size[1])) - 1
+                data_end = end if unknown_size else min(data_start + element_size[0], end)
+                identifier = element_id[0]
+                if identifier == 0x1F43B675:  # Cluster: media data starts, headers are done
+                    return
+                if identifier in masters:
+                    walk(data_start, data_end, depth + 1)
+                elif identifier in leaves and leaves[identifier] not in found:
+                    raw = window[data_start:data_end]
+                    name = leaves[identifier]
+                    if name in ("doc_type", "codec_id"):
+                        found[name] = raw.decode("ascii", "ignore").rstrip("\x00")
+                    elif name in ("duration", "sampling_frequency") and len(raw) in (4, 8):
+                        found[name] = struct.unpack(">f" if len(raw) == 4 else ">d", raw)[0]
+                    elif raw:
+                        found[name] = int.from_bytes(raw, "big")
+                position = data_end
+
+        walk(0, len(window), 0)
+
+        if found.get("doc_type") not in (None, "webm", "matroska"):
+            return AudioMetadata("webm", error=f"Unsupported EBML document type: {found['doc_type']}")
+        metadata.codec = found.get("codec_id", "").replace("A_", "").lower() or None
+        if "sampling_frequency" in found:
+            metadata.sample_rate = int(found["sampling_frequency"])
+        metadata.channels = found.get("channels")
+        if found.get("duration"):
+            metadata.duration_seconds = found["duration"] * found.get("timecode_scale", 1_000_000) / 1e9
+        return metadata
+
+    def _sniff_mp4(self, read: Callable[[int, int], bytes], size: int) -> AudioMetadata:
+        """Find moov among the top-level boxes and parse mvhd and the audio sample entry"""
+        metadata = AudioMetadata("m4a")
+        offset = 0
+        moov = None
+        for _ in range(64):
+            header = read(offset, 16)
+            if len(header) < 8:
+                break
+            box_size, box_type = struct.unpack(">I4s", header[:8])
+            header_size = 8
+            if box_size == 1 and len(header) >= 16:
+                box_size, header_size = struct.unpack(">Q", header[8:16])[0], 16
+            elif box_size == 0:
+                box_size = size - offset
+            if box_size < header_size:
+                return AudioMetadata("m4a", error="Corrupted MP4 box structure")
+            if box_type == b"moov":
+                # moov is small for audio; cap the read in case of a hostile size
+                moov = read(offset + header_size, min(box_size - header_size, 4 * 1024 * 1024))
+                break
+            offset += box_size
+
+        if moov is None:
+            return metadata
+
+        def boxes(buffer: bytes):
+            position = 0
+            while position + 8 <= len(buffer):
+                box_size, box_type = struct.unpack(">I4s", buffer[position:position + 8])
+                if box_size < 8:
+                    return
+                yield box_type, buffer[position + 8:position + box_size]
+                position += box_size
+
+        def find_audio_entry(buffer: bytes) -> Optional[bytes]:
+            for box_type, body in boxes(buffer):
+                if box_type in (b"trak", b"mdia", b"minf", b"stbl"):
+                    entry = find_audio_entry(body)
+                    if entry is not None:
+                        return entry
+                elif box_type == b"stsd" and len(body) >= 44 and body[12:16] in _MP4_AUDIO_ENTRIES:
+                    return body[8:]
+            return None
+
+        for box_type, body in boxes(moov):
+            if box_type == b"mvhd" and body:
+                if body[0] == 1 and len(body) >= 32:
+                    timescale, duration = struct.unpack(">IQ", body[20:32])
+                elif len(body) >= 20:
+                    timescale, duration = struct.unpack(">II", body[12:20])
+                else:
+                    continue
+                if timescale:
+                    metadata.duration_seconds = duration / timescale
+
+        entry = find_audio_entry(moov)
+        if entry is None:
+            return AudioMetadata("m4a", duration_seconds=metadata.duration_seconds, error="MP4 file has no audio track")
+        metadata.codec = entry[4:8].decode("ascii", "ignore").lower()
+        metadata.channels = struct.unpack(">H", entry[24:26])[0]
+        metadata.sample_rate = struct.unpack(">I", entry[32:36])[0] >> 16
+        return metadata
+
+    @staticmethod
+    def _parse_mp3_header(header: bytes) -> Optional[Dict[str, int]]:
+        """Decode an MPEG audio frame header, or None if it isn't one"""
+        if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+            return None
+        version = (header[1] >> 3) & 0x3
+        layer = 4 - ((header[1] >> 1) & 0x3)
+        bitrate_index = header[2] >> 4
+        rate_index = (header[2] >> 2) & 0x3
+        if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+            return None
+        mpeg1 = version == 3
+        bitrate = _MP3_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+        sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+        samples_per_frame = 384 if layer == 1 else (1152 if layer == 2 or mpeg1 else 576)
+        padding = (header[2] >> 1) & 0x1
+        if layer == 1:
+            frame_length = (12 * bitrate // sample_rate + padding) * 4
+        else:
+            frame_length = samples_per_frame // 8 * bitrate // sample_rate + padding
+        return {
+            'mpeg1': mpeg1,
+            'layer': layer,
+            'bitrate': bitrate,
+            'sample_rate': sample_rate,
+            'channels': 1 if header[3] >> 6 == 3 else 2,
+            'samples_per_frame': samples_per_frame,
+            'frame_length': frame_length
+        }
+
+    def _find_mp3_frame(self, buffer: bytes, start: int) -> Optional[int]:
+        """Find a frame header followed by a second valid header"""
+        position = buffer.find(b"\xff", start)
+        while 0 <= position < len(buffer) - 4:
+            frame = self._parse_mp3_header(buffer[position:position + 4])
+            if frame is not None:
+                following = position + frame['frame_length']
+                # A single sync word is easily a false positive; require the next frame too
+                if following + 4 > len(buffer) or self._parse_mp3_header(buffer[following:following + 4]):
+                    return position
+            position = buffer.find(b"\xff", position + 1)
+        return None
+
+    def _sniff_mp3(self, read: Callable[[int, int], bytes], head: bytes, size: int) -> AudioMetadata:
+        """Skip any ID3v2 tag, then parse the first frame and its Xing/VBRI header"""
+        start = 0
+        if head[:3] == b"ID3" and len(head) >= 10:
+            tag_size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+            start = 10 + tag_size + (10 if head[5] & 0x10 else 0)
+        window = read(start, SNIFF_HEAD_BYTES)
+        position = self._find_mp3_frame(window, 0)
+        if position is None:
+            return AudioMetadata("mp3", error="No MPEG audio frames found")
+
+        frame = self._parse_mp3_header(window[position:position + 4])
+        metadata = AudioMetadata(
+            "mp3",
+            codec=f"mp{frame['layer']}",
+            sample_rate=frame['sample_rate'],
+            channels=frame['channels']
+        )
+
+        # VBR files carry the frame count in a Xing/Info or VBRI header in the first frame
+        side_info = (32 if frame['channels'] == 2 else 17) if frame['mpeg1'] else (17 if frame['channels'] == 2 else 9)
+        frames = None
+        xing = window[position + 4 + side_info:position + 4 + side_info + 12]
+        if xing[:4] in (b"Xing", b"Info") and len(xing) >= 12 and struct.unpack(">I", xing[4:8])[0] & 0x1:
+            frames = struct.unpack(">I", xing[8:12])[0]
+        elif window[position + 36:position + 40] == b"VBRI":
+            frames = struct.unpack(">I", window[position + 50:position + 54])[0]
+
+        if frames:
+            metadata.duration_seconds = frames * frame['samples_per_frame'] / frame['sample_rate']
+        else:
+            # Constant bitrate: duration follows from the audio payload size
+            metadata.duration_seconds = (size - start - position) * 8 / frame['bitrate']
+        return metadata
+
+    def check_duration(self, metadata: AudioMetadata) -> Optional[str]:
+        """
+        Compare a sniffed duration with the configured limits
+
+        Args:
+            metadata: Result of sniff_audio
+
+        Returns:
+            "too_short", "too_long", or None if within limits or unknown
+        """
+        duration = metadata.duration_seconds
+        if duration is None:
+            return None
+        if duration < self.min_audio_seconds:
+            self.sniff_stats['too_short'] += 1
+            return "too_short"
+        if self.max_audio_seconds and duration > self.max_audio_seconds:
+            self.sniff_stats['too_long'] += 1
+            return "too_long"
+        return None
+
+    def get_sniff_stats(self) -> Dict[str, Any]:
+        """Get header inspection statistics"""
+        stats = self.sniff_stats.copy()
+        stats['by_format'] = dict(self.sniff_stats['by_format'])
+        stats.update({
+            'min_audio_seconds': self.min_audio_seconds,
+            'max_audio_seconds': self.max_audio_seconds
+        })
+        return stats
+
 # Global audio processor instance
 audio_processor = AudioProcessor()
@@ -0,0 +1,365 @@
+"""
+Pre-upload audio normalization for Whisper
+Resamples uploads to 16 kHz mono and compresses them on a process pool
+"""
+
+import os
+import time
+import shutil
+import asyncio
+import resource
+import tempfile
+import subprocess
+from io import BytesIO
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+FFMPEG_PATH = shutil.which(os.getenv("FFMPEG_BINARY", "ffmpeg"))
+FFMPEG_AVAILABLE = FFMPEG_PATH is not None
+
+# Whisper resamples everything to 16 kHz mono internally
+TARGET_SAMPLE_RATE = 16000
+
+# ffmpeg output settings per codec: (arguments, container format / extension)
+CODEC_SETTINGS = {
+    "flac": (["-c:a", "flac", "-compression_level", "5", "-f", "flac"], "flac"),
+    "opus": (["-c:a", "libopus", "-b:a", "24k", "-application", "voip", "-f", "ogg"], "ogg"),
+    "wav": (["-c:a", "pcm_s16le", "-f", "wav"], "wav")
+}
+
+# ffmpeg settings for re-encoding synthesized speech, keyed by TTS format name
+# (see utils.tts_formats). MP3 segments are concatenated, so no Xing header
+# claims the length of just one of them.
+TTS_ENCODE_SETTINGS = {
+    "mp3-32k": (["-c:a", "libmp3lame", "-b:a", "32k", "-write_xing", "0", "-f", "mp3"], "mp3"),
+    "opus-webm": (["-c:a", "libopus", "-b:a", "24k", "-application", "voip", "-f", "webm"], "webm"),
+    "opus-ogg": (["-c:a", "libopus", "-b:a", "24k", "-application", "voip", "-f", "ogg"], "ogg")
+}
+
+# Containers whose duration and cues are only written when ffmpeg can seek
+# back, so they are encoded to a temporary file instead of a pipe
+SEEKABLE_OUTPUTS = {"webm"}
+
+@dataclass
+class TranscodeResult:
+    """Normalized audio and what it cost to produce"""
+    audio_data: bytes
+    format: str
+    transcoded: bool
+    input_bytes: int = 0
+    output_bytes: int = 0
+    cpu_seconds: float = 0.0
+    wall_ms: float = 0.0
+    reason: str = ""
+
+def resample(samples: "np.ndarray", source_rate: int, target_rate: int) -> "np.ndarray":
+    """Band-limit and resample mono float samples"""
+    if source_rate == target_rate:
+        return samples
+    if source_rate > target_rate:
+        # Windowed-sinc low-pass at the target Nyquist frequency to avoid aliasing
+        cutoff = target_rate / source_rate / 2
+        taps = np.arange(-32, 33)
+        kernel = 2 * cutoff * np.sinc(2 * cutoff * taps) * np.hamming(len(taps))
+        samples = np.convolve(samples, kernel / kernel.sum(), mode="same")
+    duration = len(samples) / source_rate
+    target_times = np.arange(int(duration * target_rate)) / target_rate
+    return np.interp(target_times, np.arange(len(samples)) / source_rate, samples).astype(np.float32)
+
+def _numpy_to_wav(audio_data: bytes) -> Optional[bytes]:
+    """Resample PCM WAV to 16 kHz mono 16-bit WAV without ffmpeg"""
+    import wave
+    from utils.audio_processor import audio_processor
+
+    pcm = audio_processor.decode_pcm(audio_data)
+    if pcm is None:
+        return None
+
+    samples = resample(pcm.samples, pcm.sample_rate, TARGET_SAMPLE_RATE)
+    output = BytesIO()
+    with wave.open(output, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(TARGET_SAMPLE_RATE)
+        wav.writeframes((np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes())
+    return output.getvalue()
+
+def _run_ffmpeg(
+    ffmpeg_path: str,
+    audio_data: bytes,
+    arguments: list,
+    output_format: str,
+    sample_rate: int
+) -> Optional[bytes]:
+    command = [ffmpeg_path, "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+               "-ac", "1", "-ar", str(sample_rate), *arguments]
+    if output_format not in SEEKABLE_OUTPUTS:
+        completed = subprocess.run(
+            [*command, "pipe:1"],
+            input=audio_data,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=60
+        )
+        return completed.stdout if completed.returncode == 0 and completed.stdout else None
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f"output.{output_format}")
+        completed = subprocess.run(
+            [*command, path],
+            input=audio_data,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            timeout=60
+        )
+        if completed.returncode != 0 or not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read() or None
+
+def transcode_worker(
+    audio_data: bytes,
+    codec: str,
+    ffmpeg_path: Optional[str],
+    sample_rate: int = TARGET_SAMPLE_RATE
+) -> Tuple[Optional[bytes], str, float]:
+    """
+    Transcode audio in a pool worker process
+
+    Runs ffmpeg when available, otherwise resamples PCM WAV with NumPy.
+    CPU time includes the ffmpeg child process.
+
+    Args:
+        audio_data: Encoded input audio
+        codec: Target codec ("flac", "opus", "wav") or TTS format name
+            ("mp3-32k", "opus-webm", "opus-ogg")
+        ffmpeg_path: ffmpeg binary, or None to use the NumPy fallback
+        sample_rate: Output sample rate (ffmpeg only)
+
+    Returns:
+        Tuple of (output bytes or None on failure, output format, CPU seconds)
+    """
+    cpu_start = time.process_time()
+    children_start = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    output = None
+    output_format = "wav"
+    if ffmpeg_path:
+        arguments, output_format = CODEC_SETTINGS.get(codec) or TTS_ENCODE_SETTINGS[codec]
+        output = _run_ffmpeg(ffmpeg_path, audio_data, arguments, output_format, sample_rate)
+    elif NUMPY_AVAILABLE:
+        output = _numpy_to_wav(audio_data)
+
+    children_end = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu_seconds = (
+        time.process_time() - cpu_start +
+        (children_end.ru_utime - children_start.ru_utime) +
+        (children_end.ru_stime - children_start.ru_stime)
+    )
+    return output, output_format, cpu_seconds
+
+class AudioTranscoder:
+    """
+    Normalize uploads to 16 kHz mono compressed audio before they reach Whisper
+
+    The same worker pool re-encodes synthesized speech into output formats
+    the TTS provider can't produce itself.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        codec: str = "flac",
+        max_workers: int = 2,
+        min_input_bytes: int = 32 * 1024,
+        ffmpeg_path: Optional[str] = FFMPEG_PATH
+    ):
+        self.codec = codec if codec in CODEC_SETTINGS else "flac"
+        self.ffmpeg_path = ffmpeg_path
+        self.enabled = enabled and (ffmpeg_path is not None or NUMPY_AVAILABLE)
+        self.max_workers = max_workers
+        self.min_input_bytes = min_input_bytes
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+        self.stats = {
+            'requests': 0,
+            'transcoded': 0,
+            'skipped': 0,
+            'failed': 0,
+            'input_bytes': 0,
+            'output_bytes': 0,
+            'cpu_seconds': 0.0,
+            'wall_ms': 0.0,
+            'tts_encoded': 0,
+            'tts_encode_failed': 0,
+            'tts_encode_cpu_seconds': 0.0
+        }
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created on first use so importing the module doesn't fork workers
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def _skip_reason(self, audio_data: bytes, format: str) -> Optional[str]:
+        """Explain why an upload should be sent as-is, or None to transcode it"""
+        if not self.enabled:
+            return "disabled"
+        if len(audio_data) < self.min_input_bytes:
+            return "small_input"
+        if self.ffmpeg_path is None and format != "wav":
+            return "no_decoder"
+        return None
+
+    async def normalize(self, audio_data: bytes, format: str) -> TranscodeResult:
+        """
+        Resample to 16 kHz mono and compress, off the event loop
+
+        The original upload is kept whenever transcoding fails or doesn't
+        make it smaller.
+
+        Args:
+            audio_data: Encoded input audio
+            format: Input format (file extension)
+
+        Returns:
+            TranscodeResult with the audio to upload and its format
+        """
+        format = format.lower().lstrip('.')
+        self.stats['requests'] += 1
+
+        reason = self._skip_reason(audio_data, format)
+        if reason is not None:
+            self.stats['skipped'] += 1
+            return TranscodeResult(audio_data, format, False, len(audio_data), len(audio_data), reason=reason)
+
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            output, output_format, cpu_seconds = await loop.run_in_executor(
+                self._get_executor(), transcode_worker, audio_data,
+                self.codec if self.ffmpeg_path else "wav", self.ffmpeg_path
+            )
+        except Exception as e:
+            logger.warning(f"Audio transcoding failed, sending original: {e}")
+            output, output_format, cpu_seconds = None, format, 0.0
+        wall_ms = (time.perf_counter() - start) * 1000
+
+        self.stats['cpu_seconds'] += cpu_seconds
+        self.stats['wall_ms'] += wall_ms
+
+        if output is None:
+            self.stats['failed'] += 1
+            return TranscodeResult(audio_data, format, False, len(audio_data), len(audio_data),
+                                   cpu_seconds, wall_ms, reason="failed")
+
+        if len(output) >= len(audio_data):
+            self.stats['skipped'] += 1
+            return TranscodeResult(audio_data, format, False, len(audio_data), len(audio_data),
+                                   cpu_seconds, wall_ms, reason="not_smaller")
+
+        self.stats['transcoded'] += 1
+        self.stats['input_bytes'] += len(audio_data)
+        self.stats['output_bytes'] += len(output)
+        return TranscodeResult(output, output_format, True, len(audio_data), len(output), cpu_seconds, wall_ms)
+
+    async def decode_to_wav(self, audio_data: bytes, format: str) -> Optional[bytes]:
+        """
+        Decode compressed audio to 16 kHz mono PCM WAV with ffmpeg
+
+        Args:
+            audio_data: Encoded input audio
+            format: Input format (file extension)
+
+        Returns:
+            WAV bytes, or None if ffmpeg is unavailable or decoding failed
+        """
+        if self.ffmpeg_path is None:
+            return None
+        try:
+            loop = asyncio.get_running_loop()
+            output, _, _ = await loop.run_in_executor(
+                self._get_executor(), transcode_worker, audio_data, "wav", self.ffmpeg_path
+            )
+        except Exception as e:
+            logger.warning(f"Decoding {format} audio failed: {e}")
+            return None
+        return output
+
+    def can_encode(self, format_name: str) -> bool:
+        """Whether speech can be re-encoded to a TTS format name"""
+        return self.ffmpeg_path is not None and format_name in TTS_ENCODE_SETTINGS
+
+    async def encode_speech(self, audio_data: bytes, format_name: str, sample_rate: int) -> Optional[bytes]:
+        """
+        Re-encode synthesized speech to another TTS output format with ffmpeg
+
+        Args:
+            audio_data: Encoded speech from the provider
+            format_name: TTS format name (see TTS_ENCODE_SETTINGS)
+            sample_rate: Output sample rate of the format
+
+        Returns:
+            Encoded audio, or None if ffmpeg is unavailable or encoding failed
+        """
+        if not self.can_encode(format_name):
+            return None
+        try:
+            loop = asyncio.get_running_loop()
+            output, _, cpu_seconds = await loop.run_in_executor(
+                self._get_executor(), transcode_worker, audio_data, format_name, self.ffmpeg_path, sample_rate
+            )
+        except Exception as e:
+            logger.warning(f"Encoding speech as {format_name} failed: {e}")
+            output, cpu_seconds = None, 0.0
+
+        self.stats['tts_encode_cpu_seconds'] += cpu_seconds
+        if output is None:
+            self.stats['tts_encode_failed'] += 1
+            return None
+        self.stats['tts_encoded'] += 1
+        return output
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get transcoding statistics including compression ratio and CPU time"""
+        stats = self.stats.copy()
+        transcoded = self.stats['transcoded']
+        stats.update({
+            'enabled': self.enabled,
+            'codec': self.codec if self.ffmpeg_path else "wav",
+            'backend': "ffmpeg" if self.ffmpeg_path else "numpy",
+            'cpu_seconds': round(self.stats['cpu_seconds'], 3),
+            'tts_encode_cpu_seconds': round(self.stats['tts_encode_cpu_seconds'], 3),
+            'wall_ms': round(self.stats['wall_ms'], 1),
+            'compression_ratio': (
+                round(self.stats['input_bytes'] / self.stats['output_bytes'], 2)
+                if self.stats['output_bytes'] else 0.0
+            ),
+            'avg_cpu_ms': round(self.stats['cpu_seconds'] * 1000 / transcoded, 2) if transcoded else 0.0
+        })
+        return stats
+
+# Global audio transcoder
+audio_transcoder = AudioTranscoder(
+    enabled=os.getenv("STT_TRANSCODE_ENABLED", "true").lower() == "true",
+    codec=os.getenv("STT_TRANSCODE_CODEC", "flac").lower(),
+    max_workers=int(os.getenv("STT_TRANSCODE_WORKERS", "2")),
+    min_input_bytes=int(os.getenv("STT_TRANSCODE_MIN_BYTES", str(32 * 1024)))
+)
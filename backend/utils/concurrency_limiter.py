@@ -0,0 +1,108 @@
+"""
+Bounded concurrency for upstream calls
+Caps in-flight calls per service and records queue depth and wait times
+"""
+
+import os
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any, AsyncIterator
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ConcurrencyLimiter:
+    """
+    FIFO concurrency limit for one upstream service
+
+    Works like an asyncio.Semaphore but is not bound to one event loop and
+    keeps the metrics needed to size it: queue depth and how long calls
+    waited for a slot.
+    """
+
+    def __init__(self, name: str, max_concurrency: int = 8, wait_window: int = 1000):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self._active = 0
+        self._waiters: deque = deque()
+        self._wait_times_ms = deque(maxlen=wait_window)
+
+        self.stats = {
+            'acquired': 0,
+            'queued': 0,
+            'max_queue_depth': 0,
+            'peak_in_flight': 0,
+            'total_wait_ms': 0.0
+        }
+
+    async def acquire(self):
+        """Wait for a free slot"""
+        start = time.perf_counter()
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            self.stats['queued'] += 1
+            self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], len(self._waiters))
+            try:
+                # release() hands its slot directly to the next waiter
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self.release()
+                else:
+                    self._waiters.remove(waiter)
+                raise
+
+        wait_ms = (time.perf_counter() - start) * 1000
+        self._wait_times_ms.append(wait_ms)
+        self.stats['acquired'] += 1
+        self.stats['total_wait_ms'] += wait_ms
+        self.stats['peak_in_flight'] = max(self.stats['peak_in_flight'], self._active)
+
+    def release(self):
+        """Free a slot, handing it to the oldest waiter if there is one"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the block"""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    @property
+    def in_flight(self) -> int:
+        return self._active
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get slot usage, queue depth and wait time statistics"""
+        waits = sorted(self._wait_times_ms)
+        stats = self.stats.copy()
+        stats.update({
+            'name': self.name,
+            'max_concurrency': self.max_concurrency,
+            'in_flight': self._active,
+            'queue_depth': len(self._waiters),
+            'total_wait_ms': round(self.stats['total_wait_ms'], 1),
+            'avg_wait_ms': round(sum(waits) / len(waits), 2) if waits else 0.0,
+            'p95_wait_ms': round(waits[int(len(waits) * 0.95)], 2) if waits else 0.0
+        })
+        return stats
+
+# Global STT concurrency limit, sized separately from chat and TTS
+stt_limiter = ConcurrencyLimiter("stt", max_concurrency=int(os.getenv("STT_MAX_CONCURRENCY", "8")))
@@ -0,0 +1,327 @@
+"""
+Server-side conversation store
+Keeps sanitized conversation turns so clients only send the new message plus an id
+"""
+
+import os
+import time
+import uuid
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Tuple
+import logging
+
+from utils.validation import MAX_CONVERSATION_HISTORY
+
+logger = logging.getLogger(__name__)
+
+class ConversationNotFoundError(Exception):
+    """Raised when a conversation id is unknown or has expired"""
+    pass
+
+class ConversationBackend(ABC):
+    """Storage backend interface for conversation turns"""
+
+    @abstractmethod
+    def load(self, conversation_id: str) -> Optional[List[Dict[str, str]]]:
+        """Load turns for a conversation, or None if unknown or expired"""
+
+    @abstractmethod
+    def save(self, conversation_id: str, turns: List[Dict[str, str]]):
+        """Replace the stored turns for a conversation and refresh its TTL"""
+
+    @abstractmethod
+    def delete(self, conversation_id: str) -> bool:
+        """Delete a conversation, returning True if it existed"""
+
+    @abstractmethod
+    def evict_expired(self) -> int:
+        """Evict idle conversations, returning how many were removed"""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Get the number of stored conversations"""
+
+def _turns_bytes(turns: List[Dict[str, str]]) -> int:
+    return sum(len(t["content"].encode("utf-8")) for t in turns)
+
+class InMemoryConversationBackend(ConversationBackend):
+    """Process-local backend with idle TTL, a conversation count bound and a total size bound"""
+
+    def __init__(
+        self,
+        ttl_seconds: float = 1800.0,
+        max_conversations: int = 10000,
+        max_total_bytes: int = 64 * 1024 * 1024
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_conversations = max_conversations
+        self.max_total_bytes = max_total_bytes
+        self._conversations: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.evictions = 0
+
+    def _remove(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._conversations.pop(conversation_id, None)
+        if entry is not None:
+            self.total_bytes -= entry['bytes']
+        return entry
+
+    def load(self, conversation_id: str) -> Optional[List[Dict[str, str]]]:
+        with self._lock:
+            entry = self._conversations.get(conversation_id)
+            if entry is None:
+                return None
+            if time.time() - entry['last_active'] > self.ttl_seconds:
+                self._remove(conversation_id)
+                self.evictions += 1
+                return None
+            return list(entry['turns'])
+
+    def save(self, conversation_id: str, turns: List[Dict[str, str]]):
+        size = _turns_bytes(turns)
+        with self._lock:
+            self._remove(conversation_id)
+            self._conversations[conversation_id] = {
+                'turns': list(turns),
+                'last_active': time.time(),
+                'bytes': size
+            }
+            self.total_bytes += size
+
+            # Drop the least recently active conversations beyond either bound
+            while len(self._conversations) > 1 and (
+                len(self._conversations) > self.max_conversations or
+                self.total_bytes > self.max_total_bytes
+            ):
+                self._remove(next(iter(self._conversations)))
+                self.evictions += 1
+
+    def delete(self, conversation_id: str) -> bool:
+        with self._lock:
+            return self._remove(conversation_id) is not None
+
+    def evict_expired(self) -> int:
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        with self._lock:
+            # Entries are ordered by last activity, so stop at the first live one
+            while self._conversations:
+                oldest_id, oldest = next(iter(self._conversations.items()))
+                if oldest['last_active'] > cutoff:
+                    break
+                self._remove(oldest_id)
+                removed += 1
+            self.evictions += removed
+        return removed
+
+    def count(self) -> int:
+        return len(self._conversations)
+
+class ConversationStore:
+    """
+    Issues conversation ids and appends turns with bounded per-conversation memory
+
+    New conversation ids start out pending in a small separate pool and
+    only move to the backend once a request comes back with the id.
+    Clients that never reuse ids, such as ones that send their own history
+    every turn, can't evict live conversations.
+    """
+
+    def __init__(
+        self,
+        backend: ConversationBackend,
+        max_turns: int = MAX_CONVERSATION_HISTORY,
+        max_chars: int = 50000,
+        pending: Optional[InMemoryConversationBackend] = None
+    ):
+        self.backend = backend
+        self.max_turns = max_turns
+        self.max_chars = max_chars
+        self.pending = pending or InMemoryConversationBackend(
+            ttl_seconds=getattr(backend, 'ttl_seconds', 1800.0),
+            max_conversations=1000,
+            max_total_bytes=8 * 1024 * 1024
+        )
+        self.stats = {
+            'created': 0,
+            'promoted': 0,
+            'loaded': 0,
+            'not_found': 0,
+            'turns_appended': 0,
+            'turns_trimmed': 0
+        }
+
+    def create(self, initial_turns: Optional[List[Dict[str, str]]] = None) -> str:
+        """
+        Start a new pending conversation
+
+        It moves into the backend the first time a request uses its id.
+
+        Args:
+            initial_turns: Optional already-sanitized turns to seed it with
+
+        Returns:
+            New conversation id
+        """
+        # Sweeping on create keeps idle conversations from piling up
+        self.backend.evict_expired()
+        self.pending.evict_expired()
+
+        conversation_id = uuid.uuid4().hex
+        self.pending.save(conversation_id, self._trim(initial_turns or []))
+        self.stats['created'] += 1
+        return conversation_id
+
+    def get_history(self, conversation_id: str) -> Optional[List[Dict[str, str]]]:
+        """
+        Get the stored turns of a conversation
+
+        Args:
+            conversation_id: Conversation identifier
+
+        Returns:
+            List of {"role", "content"} turns, or None if unknown or expired
+        """
+        turns = self.backend.load(conversation_id)
+        if turns is None:
+            turns = self._promote(conversation_id)
+        if turns is None:
+            self.stats['not_found'] += 1
+        else:
+            self.stats['loaded'] += 1
+        return turns
+
+    def _promote(self, conversation_id: str) -> Optional[List[Dict[str, str]]]:
+        """Move a pending conversation into the backend now that its id was reused"""
+        turns = self.pending.load(conversation_id)
+        if turns is None:
+            return None
+        self.pending.delete(conversation_id)
+        self.backend.save(conversation_id, turns)
+        self.stats['promoted'] += 1
+        return turns
+
+    def resolve(
+        self,
+        conversation_id: Optional[str],
+        client_history: Optional[List[Dict[str, str]]] = None
+    ) -> Tuple[str, List[Dict[str, str]]]:
+        """
+        Resolve the conversation a request belongs to
+
+        With an id, the stored history is used and any client history is
+        ignored. Without one, a new pending conversation is started, seeded
+        with the (already-validated) client history for backwards
+        compatibility; it is kept only once a request reuses the id.
+
+        Args:
+            conversation_id: Optional server-issued conversation id
+            client_history: Optional history sent by the client
+
+        Returns:
+            Tuple of (conversation_id, history)
+
+        Raises:
+            ConversationNotFoundError: If the id is unknown or expired
+        """
+        if conversation_id:
+            history = self.get_history(conversation_id)
+            if history is None:
+                raise ConversationNotFoundError(f"Conversation {conversation_id} not found or expired")
+            return conversation_id, history
+
+        history = self._trim(client_history or [])
+        return self.create(history), history
+
+    def append_turns(self, conversation_id: str, turns: List[Dict[str, str]]):
+        """
+        Append turns to a conversation, trimming the oldest beyond the bounds
+
+        Args:
+            conversation_id: Conversation identifier
+            turns: Already-sanitized {"role", "content"} turns
+        """
+        new_turns = [{"role": t["role"], "content": t["content"]} for t in turns]
+        self.stats['turns_appended'] += len(turns)
+
+        pending = self.pending.load(conversation_id)
+        if pending is not None:
+            self.pending.save(conversation_id, self._trim(pending + new_turns))
+            return
+
+        existing = self.backend.load(conversation_id) or []
+        self.backend.save(conversation_id, self._trim(existing + new_turns))
+
+    def delete(self, conversation_id: str) -> bool:
+        """Delete a conversation"""
+        pending_deleted = self.pending.delete(conversation_id)
+        return self.backend.delete(conversation_id) or pending_deleted
+
+    def _trim(self, turns: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Keep the most recent turns within max_turns and max_chars"""
+        trimmed = list(turns[-self.max_turns:])
+        total_chars = sum(len(t["content"]) for t in trimmed)
+        while len(trimmed) > 1 and total_chars > self.max_chars:
+            total_chars -= len(trimmed.pop(0)["content"])
+        self.stats['turns_trimmed'] += len(turns) - len(trimmed)
+        return trimmed
+
+    def evict_expired(self) -> int:
+        """Evict idle conversations from the backend and the pending pool"""
+        return self.backend.evict_expired() + self.pending.evict_expired()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get conversation store statistics"""
+        stats = self.stats.copy()
+        stats.update({
+            'backend': type(self.backend).__name__,
+            'active_conversations': self.backend.count(),
+            'pending_conversations': self.pending.count(),
+            'max_turns': self.max_turns,
+            'max_chars': self.max_chars
+        })
+        if hasattr(self.backend, 'ttl_seconds'):
+            stats['ttl_seconds'] = self.backend.ttl_seconds
+        if hasattr(self.backend, 'evictions'):
+            stats['evictions'] = self.backend.evictions
+        if hasattr(self.backend, 'total_bytes'):
+            stats['total_bytes'] = self.backend.total_bytes
+            stats['max_total_bytes'] = self.backend.max_total_bytes
+        return stats
+
+def create_conversation_backend(name: str) -> ConversationBackend:
+    """
+    Create the configured conversation backend
+
+    Args:
+        name: Backend name (currently only "memory")
+
+    Returns:
+        Conversation backend instance
+    """
+    ttl_seconds = float(os.getenv("CONVERSATION_TTL_SECONDS", "1800"))
+    max_conversations = int(os.getenv("CONVERSATION_MAX_CONVERSATIONS", "10000"))
+    max_total_bytes = int(os.getenv("CONVERSATION_MAX_TOTAL_BYTES", str(64 * 1024 * 1024)))
+
+    if name != "memory":
+        logger.warning(f"Conversation backend '{name}' not available, using in-memory store")
+    return InMemoryConversationBackend(
+        ttl_seconds=ttl_seconds,
+        max_conversations=max_conversations,
+        max_total_bytes=max_total_bytes
+    )
+
+# Global conversation store
+conversation_store = ConversationStore(
+    backend=create_conversation_backend(os.getenv("CONVERSATION_STORE_BACKEND", "memory").lower()),
+    max_turns=int(os.getenv("CONVERSATION_MAX_TURNS", str(MAX_CONVERSATION_HISTORY))),
+    max_chars=int(os.getenv("CONVERSATION_MAX_CHARS", "50000")),
+    pending=InMemoryConversationBackend(
+        ttl_seconds=float(os.getenv("CONVERSATION_TTL_SECONDS", "1800")),
+        max_conversations=int(os.getenv("CONVERSATION_MAX_PENDING", "1000")),
+        max_total_bytes=int(os.getenv("CONVERSATION_MAX_PENDING_BYTES", str(8 * 1024 * 1024)))
+    )
+)
@@ -0,0 +1,189 @@
+"""
+Content-addressed on-disk cache
+Stores one file per key under a byte budget with LRU eviction and TTL expiry
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+class DiskCache:
+    """
+    Bounded file-per-key cache for values that should survive restarts
+
+    Keys are hex digests and become file names, sharded by their first two
+    characters. Writes go through a temp file and an atomic rename, so a
+    crash never leaves a partial entry behind. Blocking I/O; call from a
+    worker thread on async paths.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl_seconds: float = 7 * 24 * 3600.0,
+        enabled: bool = True
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled and bool(directory)
+
+        # key -> (size_bytes, stored_at), least recently used first
+        self._index: "OrderedDict[str, tuple]" = OrderedDict()
+        self._index_loaded = False
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'errors': 0
+        }
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def _load_index(self):
+        """Scan existing entries, oldest first (caller holds the lock)"""
+        if self._index_loaded:
+            return
+        self._index_loaded = True
+
+        entries = []
+        if os.path.isdir(self.directory):
+            for shard in os.scandir(self.directory):
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    if entry.is_file() and not entry.name.endswith(".tmp"):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, entry.name, stat.st_size))
+
+        for stored_at, key, size in sorted(entries):
+            self._index[key] = (size, stored_at)
+            self.current_bytes += size
+        self._evict(0)
+
+        if entries:
+            logger.info(f"Disk cache {self.directory}: {len(self._index)} entries, {self.current_bytes} bytes")
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Read a cached value and mark it as recently used
+
+        Args:
+            key: Hex digest key
+
+        Returns:
+            Cached bytes, or None on miss or expiry
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            self._load_index()
+            entry = self._index.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+
+            if entry[1] + self.ttl_seconds <= time.time():
+                self._remove(key)
+                self.stats['expirations'] += 1
+                self.stats['misses'] += 1
+                return None
+
+            try:
+                with open(self._path(key), "rb") as f:
+                    value = f.read()
+            except OSError:
+                # Removed behind our back; forget it
+                self._index.pop(key, None)
+                self.current_bytes -= entry[0]
+                self.stats['misses'] += 1
+                return None
+
+            self._index.move_to_end(key)
+            self.stats['hits'] += 1
+            return value
+
+    def set(self, key: str, value: bytes):
+        """
+        Store a value, evicting least recently used entries to fit
+
+        Args:
+            key: Hex digest key
+            value: Bytes to store
+        """
+        if not self.enabled or len(value) > self.max_bytes:
+            return
+
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, "wb") as f:
+                f.write(value)
+            os.replace(temp_path, path)
+        except OSError as e:
+            self.stats['errors'] += 1
+            logger.warning(f"Disk cache write failed: {e}")
+            return
+
+        with self._lock:
+            self._load_index()
+            if key in self._index:
+                self.current_bytes -= self._index.pop(key)[0]
+            self._index[key] = (len(value), time.time())
+            self.current_bytes += len(value)
+            self.stats['stores'] += 1
+            self._evict(0)
+
+    def _evict(self, incoming: int):
+        """Drop least recently used entries until the budget fits (caller holds the lock)"""
+        while self._index and self.current_bytes + incoming > self.max_bytes:
+            oldest_key = next(iter(self._index))
+            self._remove(oldest_key)
+            self.stats['evictions'] += 1
+
+    def _remove(self, key: str):
+        """Delete an entry and its file (caller holds the lock)"""
+        size, _ = self._index.pop(key)
+        self.current_bytes -= size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def clear(self):
+        """Remove all cached entries"""
+        with self._lock:
+            self._load_index()
+            for key in list(self._index):
+                self._remove(key)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        lookups = self.stats['hits'] + self.stats['misses']
+        stats = self.stats.copy()
+        stats.update({
+            'enabled': self.enabled,
+            'directory': self.directory,
+            'entries': len(self._index),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'hit_rate': round(self.stats['hits'] / lookups, 3) if lookups else 0.0
+        })
+        return stats
@@ -4,9 +4,11 @@ Unified Groq API client for STT, TTS, and Chat functionality
 import os
 import logging
 from typing import Optional, Dict, Any
-from groq import Groq
+import httpx
+from groq import Groq, AsyncGroq
 from dotenv import load_dotenv
 from utils.api_key_manager import api_key_manager, APIKeySecurityError
+from utils.rate_limit_scheduler import rate_limit_scheduler, request_kind
 
 load_dotenv()
 logger = logging.getLogger(__name__)
@@ -35,6 +37,13 @@ class GroqClient:
             # Initialize Groq client
             logger.info("Creating Groq client instance...")
             self.client = Groq(api_key=self.api_key)
+
+            # Async client shares one pooled HTTP transport across all requests
+            # so concurrent chat/STT calls reuse keep-alive connections
+            self.async_client = AsyncGroq(
+                api_key=self.api_key,
+                http_client=self._create_async_http_client()
+            )
             self.is_configured = True
             logger.info("✅ Groq client initialized successfully")
 
@@ -42,6 +51,7 @@ class GroqClient:
             logger.error(f"❌ Groq API key security error: {e}")
             self.api_key = None
             self.client = None
+            self.async_client = None
             self.is_configured = False
             # Don't raise here to allow graceful degradation
         except Exception as e:
@@ -51,6 +61,7 @@ class GroqClient:
             logger.error(f"Traceback: {traceback.format_exc()}")
             self.api_key = None
             self.client = None
+            self.async_client = None
             self.is_configured = False
         
         # Model configurations
@@ -58,6 +69,12 @@ class GroqClient:
             "llama3": "llama3-8b-8192",
             "mixtral": "mixtral-8x7b-32768"
         }
+
+        # Context window (prompt + completion tokens) per chat model
+        self.chat_context_windows = {
+            "llama3-8b-8192": 8192,
+            "mixtral-8x7b-32768": 32768
+        }
         
         self.whisper_models = {
             "turbo": "whisper-large-v3-turbo",  # Fastest (216x real-time)
@@ -78,6 +95,43 @@ class GroqClient:
             "conversational": ["Chip-PlayAI", "Gail-PlayAI"]
         }
     
+    def _create_async_http_client(self) -> httpx.AsyncClient:
+        """
+        Create the pooled HTTP transport used by the async Groq client
+
+        Returns:
+            Configured httpx.AsyncClient with keep-alive connection pooling
+            and rate-limit header observation
+        """
+        limits = httpx.Limits(
+            max_connections=int(os.getenv("GROQ_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("GROQ_MAX_KEEPALIVE", "20")),
+            keepalive_expiry=30.0
+        )
+        timeout = httpx.Timeout(
+            connect=10.0,
+            read=float(os.getenv("GROQ_READ_TIMEOUT", "60")),
+            write=30.0,
+            pool=10.0
+        )
+        return httpx.AsyncClient(
+            limits=limits,
+            timeout=timeout,
+            event_hooks={"response": [self._observe_rate_limits]}
+        )
+
+    @staticmethod
+    async def _observe_rate_limits(response: httpx.Response):
+        """Feed x-ratelimit-* headers of every Groq response to the scheduler"""
+        kind = request_kind(response.request.url.path)
+        if kind is not None:
+            rate_limit_scheduler.observe_headers(kind, response.status_code, response.headers)
+
+    async def aclose(self):
+        """Close the pooled async HTTP transport"""
+        if self.async_client is not None:
+            await self.async_client.close()
+
     def get_default_chat_model(self) -> str:
         """Get default chat model"""
         return self.chat_models["llama3"]
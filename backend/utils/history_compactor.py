@@ -0,0 +1,251 @@
+"""
+Token-budgeted conversation history compaction
+Keeps the most recent turns within a prompt budget and folds older turns into a rolling summary
+"""
+
+import os
+import re
+import math
+import asyncio
+import hashlib
+from collections import deque
+from typing import Dict, Any, Optional, List, Tuple, Callable, Awaitable
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Approximate per-message framing overhead of the chat template
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate the number of BPE tokens in text without a tokenizer download
+
+    Words of up to six characters count as one token, longer words add a
+    token per further four characters, and punctuation marks count as one
+    token each. This slightly overestimates, which keeps prompts in budget.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Estimated token count
+    """
+    if not text:
+        return 0
+    return sum(
+        1 + math.ceil(max(0, len(piece) - 6) / 4)
+        for piece in _TOKEN_PATTERN.findall(text)
+    )
+
+def estimate_message_tokens(message: Dict[str, str]) -> int:
+    """Estimate tokens for one chat message including template overhead"""
+    return estimate_tokens(message.get("content", "")) + MESSAGE_OVERHEAD_TOKENS
+
+def _turn_fingerprint(turn: Dict[str, str]) -> str:
+    return hashlib.sha1(f"{turn.get('role')}\x00{turn.get('content')}".encode("utf-8")).hexdigest()
+
+Summarizer = Callable[[str, List[Dict[str, str]]], Awaitable[str]]
+
+class HistoryCompactor:
+    """Fit conversation history into a prompt token budget"""
+
+    def __init__(
+        self,
+        token_budget: int = 3000,
+        min_recent_turns: int = 2,
+        max_summary_tokens: int = 250,
+        max_tracked_conversations: int = 5000
+    ):
+        self.token_budget = token_budget
+        self.min_recent_turns = min_recent_turns
+        self.max_summary_tokens = max_summary_tokens
+        self.max_tracked_conversations = max_tracked_conversations
+
+        self._summaries: Dict[str, Dict[str, Any]] = {}
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._prompt_tokens = deque(maxlen=1000)
+
+        self.stats = {
+            'requests': 0,
+            'compacted_requests': 0,
+            'turns_dropped': 0,
+            'summaries_generated': 0,
+            'summary_failures': 0
+        }
+
+    def compact(
+        self,
+        system_prompt: str,
+        conversation_history: Optional[List[Dict[str, str]]],
+        message: str,
+        conversation_id: Optional[str] = None,
+        summarizer: Optional[Summarizer] = None,
+        token_budget: Optional[int] = None
+    ) -> Tuple[List[Dict[str, str]], int]:
+        """
+        Select the history to send for this request
+
+        Recent turns are kept newest-first until the budget is reached. Turns
+        that no longer fit are represented by the conversation's rolling
+        summary; if the summary lags behind, an update is scheduled in the
+        background and the current (possibly stale) summary is used.
+
+        Args:
+            system_prompt: System prompt sent with every request
+            conversation_history: Full conversation history
+            message: Current user message
+            conversation_id: Optional conversation identifier; without one no
+                rolling summary is kept, since nothing else safely tells two
+                conversations with the same opening apart
+            summarizer: Coroutine (previous_summary, turns) -> new summary
+            token_budget: Optional per-request budget overriding the default
+
+        Returns:
+            Tuple of (history messages to send, estimated prompt tokens)
+        """
+        history = [
+            {"role": turn["role"], "content": turn["content"]}
+            for turn in (conversation_history or [])
+        ]
+        self.stats['requests'] += 1
+        budget = token_budget if token_budget is not None else self.token_budget
+
+        fixed_tokens = (
+            estimate_tokens(system_prompt) + MESSAGE_OVERHEAD_TOKENS +
+            estimate_tokens(message) + MESSAGE_OVERHEAD_TOKENS
+        )
+        history_tokens = [estimate_message_tokens(turn) for turn in history]
+
+        if fixed_tokens + sum(history_tokens) <= budget:
+            prompt_tokens = fixed_tokens + sum(history_tokens)
+            self._prompt_tokens.append(prompt_tokens)
+            return history, prompt_tokens
+
+        key = conversation_id or None
+        summary_state = self._summaries.get(key) if key else None
+        summary_tokens = (
+            estimate_tokens(summary_state['summary']) + MESSAGE_OVERHEAD_TOKENS
+            if summary_state else 0
+        )
+
+        # Walk back from the newest turn while the budget allows
+        available = budget - fixed_tokens - summary_tokens
+        keep_from = len(history)
+        used = 0
+        while keep_from > 0:
+            cost = history_tokens[keep_from - 1]
+            kept = len(history) - keep_from
+            if used + cost > available and kept >= self.min_recent_turns:
+                break
+            used += cost
+            keep_from -= 1
+
+        recent = history[keep_from:]
+        dropped = history[:keep_from]
+
+        selected = []
+        if summary_state:
+            selected.append({
+                "role": "system",
+                "content": f"Summary of the earlier conversation: {summary_state['summary']}"
+            })
+        selected.extend(recent)
+
+        self.stats['compacted_requests'] += 1
+        self.stats['turns_dropped'] += len(dropped)
+
+        if dropped and key and summarizer is not None:
+            self._schedule_summary(key, dropped, summarizer)
+
+        prompt_tokens = fixed_tokens + summary_tokens + used
+        self._prompt_tokens.append(prompt_tokens)
+        return selected, prompt_tokens
+
+    def _unsummarized_turns(self, key: str, dropped: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Get the dropped turns the current summary does not cover yet"""
+        state = self._summaries.get(key)
+        if not state:
+            return dropped
+
+        fingerprints = [_turn_fingerprint(turn) for turn in dropped]
+        if state['last_turn'] in fingerprints:
+            return dropped[fingerprints.index(state['last_turn']) + 1:]
+        # The covered turn was trimmed from the history already; the summary
+        # covers everything before it
+        return dropped
+
+    def _schedule_summary(self, key: str, dropped: List[Dict[str, str]], summarizer: Summarizer):
+        """Start a background summary update unless one is already running"""
+        pending = self._pending.get(key)
+        if pending is not None and not pending.done():
+            return
+
+        new_turns = self._unsummarized_turns(key, dropped)
+        if not new_turns:
+            return
+
+        try:
+            task = asyncio.get_running_loop().create_task(self._update_summary(key, new_turns, summarizer))
+        except RuntimeError:
+            return
+        self._pending[key] = task
+        task.add_done_callback(lambda _: self._pending.pop(key, None))
+
+    async def _update_summary(self, key: str, new_turns: List[Dict[str, str]], summarizer: Summarizer):
+        """Fold new turns into the rolling summary"""
+        previous = self._summaries.get(key, {}).get('summary', "")
+        try:
+            summary = await summarizer(previous, new_turns)
+        except Exception as e:
+            self.stats['summary_failures'] += 1
+            logger.warning(f"History summary update failed: {e}")
+            return
+
+        if not summary:
+            return
+
+        if key not in self._summaries and len(self._summaries) >= self.max_tracked_conversations:
+            # Forget the oldest tracked conversation
+            self._summaries.pop(next(iter(self._summaries)))
+
+        self._summaries[key] = {
+            'summary': summary.strip(),
+            'last_turn': _turn_fingerprint(new_turns[-1])
+        }
+        self.stats['summaries_generated'] += 1
+
+    def get_summary(self, key: str) -> Optional[str]:
+        """Get the rolling summary for a conversation key"""
+        state = self._summaries.get(key)
+        return state['summary'] if state else None
+
+    def forget(self, key: str):
+        """Drop the summary state of a conversation"""
+        self._summaries.pop(key, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get compaction statistics including prompt token counts"""
+        tokens = sorted(self._prompt_tokens)
+        stats = self.stats.copy()
+        stats.update({
+            'token_budget': self.token_budget,
+            'tracked_summaries': len(self._summaries),
+            'pending_summaries': len(self._pending),
+            'prompt_tokens': {
+                'last': self._prompt_tokens[-1] if self._prompt_tokens else 0,
+                'avg': round(sum(tokens) / len(tokens), 1) if tokens else 0,
+                'p95': tokens[int(len(tokens) * 0.95)] if tokens else 0,
+                'max': tokens[-1] if tokens else 0
+            }
+        })
+        return stats
+
+# Global history compactor
+history_compactor = HistoryCompactor(
+    token_budget=int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "3000")),
+    min_recent_turns=int(os.getenv("CHAT_HISTORY_MIN_RECENT_TURNS", "2")),
+    max_summary_tokens=int(os.getenv("CHAT_HISTORY_SUMMARY_TOKENS", "250"))
+)
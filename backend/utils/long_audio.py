@@ -0,0 +1,304 @@
+"""
+Long-audio transcription
+Splits recordings at silence into overlapping chunks, transcribes them
+concurrently and stitches the text back together
+"""
+
+import os
+import re
+import time
+import wave
+import asyncio
+from io import BytesIO
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable, AsyncIterator
+import logging
+
+from utils.audio_processor import audio_processor, NUMPY_AVAILABLE
+from utils.audio_transcoder import audio_transcoder
+
+logger = logging.getLogger(__name__)
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+# Whisper's per-request upload limit
+WHISPER_MAX_FILE_SIZE = 25 * 1024 * 1024
+
+class LongAudioError(Exception):
+    """Raised when a recording can't be split for long-audio transcription"""
+    pass
+
+@dataclass
+class AudioChunk:
+    """One slice of a long recording, encoded for upload"""
+    index: int
+    start_seconds: float
+    end_seconds: float
+    audio_data: bytes
+    format: str = "wav"
+
+@dataclass
+class ChunkTranscript:
+    """Transcript of one chunk with the overlap already removed"""
+    index: int
+    total_chunks: int
+    start_seconds: float
+    end_seconds: float
+    text: str
+
+def _words(text: str) -> List[str]:
+    """Lowercase words without punctuation, for overlap matching"""
+    return [re.sub(r"[^\w']", "", word.lower()) for word in text.split()]
+
+def merge_overlap(previous: str, current: str, max_overlap_words: int = 20, max_skip_words: int = 3) -> str:
+    """
+    Drop the words at the start of a chunk that repeat the end of the previous one
+
+    Whisper often garbles a word cut at a chunk edge, so the repeated run may
+    start a few words into the current chunk.
+
+    Args:
+        previous: Transcript of the preceding chunk
+        current: Transcript of this chunk
+        max_overlap_words: Longest repeated run to look for
+        max_skip_words: Leading words of this chunk the run may start after
+
+    Returns:
+        Current transcript with the repeated words removed
+    """
+    previous_words = _words(previous)
+    current_raw = current.split()
+    current_words = _words(current)
+
+    longest = min(max_overlap_words, len(previous_words), len(current_words))
+    for size in range(longest, 1, -1):
+        tail = previous_words[-size:]
+        for skip in range(0, min(max_skip_words, len(current_words) - size) + 1):
+            if current_words[skip:skip + size] == tail:
+                return " ".join(current_raw[skip + size:])
+    return current
+
+class LongAudioTranscriber:
+    """Chunked, concurrent transcription for recordings too long for one Whisper call"""
+
+    def __init__(
+        self,
+        chunk_seconds: float = 60.0,
+        overlap_seconds: float = 1.0,
+        search_seconds: float = 5.0,
+        max_parallel: int = 4,
+        max_bytes: int = 200 * 1024 * 1024
+    ):
+        self.chunk_seconds = chunk_seconds
+        self.overlap_seconds = overlap_seconds
+        self.search_seconds = search_seconds
+        self.max_parallel = max(1, max_parallel)
+        self.max_bytes = max_bytes
+
+        self.stats = {
+            'requests': 0,
+            'chunks': 0,
+            'single_chunk_requests': 0,
+            'audio_seconds': 0.0,
+            'wall_seconds': 0.0
+        }
+
+    def plan_chunks(self, samples: "np.ndarray", sample_rate: int) -> List[Tuple[int, int]]:
+        """
+        Choose chunk boundaries at the quietest point near each target length
+
+        Args:
+            samples: float32 mono samples
+            sample_rate: Sample rate in Hz
+
+        Returns:
+            (start_sample, end_sample) per chunk, including the overlap
+        """
+        total = len(samples)
+        chunk = int(self.chunk_seconds * sample_rate)
+        if total <= chunk + int(self.search_seconds * sample_rate):
+            return [(0, total)]
+
+        frame_size = max(1, int(sample_rate * audio_processor.vad_frame_ms / 1000))
+        frame_count = total // frame_size
+        energy = np.mean(samples[:frame_count * frame_size].reshape(frame_count, frame_size) ** 2, axis=1)
+        search_frames = int(self.search_seconds * sample_rate / frame_size)
+
+        cuts = [0]
+        while total - cuts[-1] > chunk + int(self.search_seconds * sample_rate):
+            target = (cuts[-1] + chunk) // frame_size
+            low = max(cuts[-1] // frame_size + 1, target - search_frames)
+            high = min(frame_count, target + search_frames + 1)
+            quietest = low + int(np.argmin(energy[low:high]))
+            cuts.append(quietest * frame_size)
+        cuts.append(total)
+
+        overlap = int(self.overlap_seconds * sample_rate)
+        return [
+            (max(0, start - overlap), min(total, end + overlap))
+            for start, end in zip(cuts[:-1], cuts[1:])
+        ]
+
+    def split(self, audio_data: bytes) -> Optional[List[AudioChunk]]:
+        """
+        Split PCM WAV into overlapping 16-bit mono WAV chunks
+
+        CPU-bound; call from a worker thread.
+
+        Args:
+            audio_data: WAV file bytes
+
+        Returns:
+            Chunks in order, or None if the data isn't PCM WAV
+        """
+        pcm = audio_processor.decode_pcm(audio_data)
+        if pcm is None or pcm.sample_rate <= 0:
+            return None
+
+        chunks = []
+        for index, (start, end) in enumerate(self.plan_chunks(pcm.samples, pcm.sample_rate)):
+            output = BytesIO()
+            with wave.open(output, "wb") as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(2)
+                wav.setframerate(pcm.sample_rate)
+                wav.writeframes((np.clip(pcm.samples[start:end], -1.0, 1.0) * 32767).astype("<i2").tobytes())
+            chunks.append(AudioChunk(index, start / pcm.sample_rate, end / pcm.sample_rate, output.getvalue()))
+        return chunks
+
+    async def prepare(self, audio_data: bytes, format: str) -> List[AudioChunk]:
+        """
+        Decode and split an upload without blocking the event loop
+
+        Compressed formats are decoded with ffmpeg first. Without ffmpeg
+        they can only be sent whole, which works up to Whisper's size limit.
+
+        Args:
+            audio_data: Encoded recording
+            format: Audio format (file extension)
+
+        Returns:
+            Chunks in order
+
+        Raises:
+            LongAudioError: If the recording can't be decoded or split
+        """
+        format = format.lower().lstrip('.')
+        if len(audio_data) > self.max_bytes:
+            raise LongAudioError(f"Recording too large: {len(audio_data)} bytes (max: {self.max_bytes})")
+
+        wav_data = audio_data
+        if format != "wav":
+            wav_data = await audio_transcoder.decode_to_wav(audio_data, format)
+
+        chunks = None
+        if wav_data is not None and NUMPY_AVAILABLE:
+            chunks = await asyncio.to_thread(self.split, wav_data)
+
+        if chunks is None:
+            if len(audio_data) > WHISPER_MAX_FILE_SIZE:
+                raise LongAudioError(
+                    f"Cannot split {format} audio; send PCM WAV or install ffmpeg for recordings over 25MB"
+                )
+            chunks = [AudioChunk(0, 0.0, 0.0, audio_data, format)]
+        return chunks
+
+    async def transcribe_iter(
+        self,
+        audio_data: bytes,
+        format: str,
+        transcribe: Callable[[bytes, str], Awaitable[str]]
+    ) -> AsyncIterator[ChunkTranscript]:
+        """
+        Transcribe chunks concurrently and yield them in order
+
+        Each chunk is yielded as soon as it and all chunks before it are
+        done, with the words it shares with the previous chunk removed.
+        Concurrency is capped here and, per upstream call, by the STT
+        limiter and the rate-limit scheduler.
+
+        Args:
+            audio_data: Encoded recording
+            format: Audio format (file extension)
+            transcribe: Coroutine function taking (audio_data, format)
+
+        Yields:
+            ChunkTranscript per chunk
+        """
+        chunks = await self.prepare(audio_data, format)
+        start = time.perf_counter()
+        self.stats['requests'] += 1
+        self.stats['chunks'] += len(chunks)
+        self.stats['audio_seconds'] += chunks[-1].end_seconds
+        if len(chunks) == 1:
+            self.stats['single_chunk_requests'] += 1
+
+        semaphore = asyncio.Semaphore(self.max_parallel)
+
+        async def run(chunk: AudioChunk) -> str:
+            async with semaphore:
+                return await transcribe(chunk.audio_data, chunk.format)
+
+        tasks = [asyncio.ensure_future(run(chunk)) for chunk in chunks]
+        previous = ""
+        try:
+            for chunk, task in zip(chunks, tasks):
+                text = (await task).strip()
+                merged = merge_overlap(previous, text) if previous else text
+                if text:
+                    previous = text
+                yield ChunkTranscript(chunk.index, len(chunks), chunk.start_seconds, chunk.end_seconds, merged)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.stats['wall_seconds'] += time.perf_counter() - start
+
+    async def transcribe(
+        self,
+        audio_data: bytes,
+        format: str,
+        transcribe: Callable[[bytes, str], Awaitable[str]]
+    ) -> Tuple[str, int]:
+        """
+        Transcribe a long recording into one stitched transcript
+
+        Args:
+            audio_data: Encoded recording
+            format: Audio format (file extension)
+            transcribe: Coroutine function taking (audio_data, format)
+
+        Returns:
+            Tuple of (transcript, number of chunks)
+        """
+        parts = []
+        total_chunks = 0
+        async for part in self.transcribe_iter(audio_data, format, transcribe):
+            total_chunks = part.total_chunks
+            if part.text:
+                parts.append(part.text)
+        return " ".join(parts), total_chunks
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get long-audio transcription statistics"""
+        stats = self.stats.copy()
+        stats.update({
+            'max_parallel': self.max_parallel,
+            'chunk_seconds': self.chunk_seconds,
+            'audio_seconds': round(self.stats['audio_seconds'], 1),
+            'wall_seconds': round(self.stats['wall_seconds'], 2),
+            'realtime_factor': (
+                round(self.stats['audio_seconds'] / self.stats['wall_seconds'], 1)
+                if self.stats['wall_seconds'] else 0.0
+            )
+        })
+        return stats
+
+# Global long-audio transcriber
+long_audio_transcriber = LongAudioTranscriber(
+    chunk_seconds=float(os.getenv("LONG_AUDIO_CHUNK_SECONDS", "60")),
+    overlap_seconds=float(os.getenv("LONG_AUDIO_OVERLAP_SECONDS", "1.0")),
+    max_parallel=int(os.getenv("LONG_AUDIO_MAX_PARALLEL", "4")),
+    max_bytes=int(os.getenv("LONG_AUDIO_MAX_BYTES", str(200 * 1024 * 1024)))
+)
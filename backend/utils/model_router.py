@@ -0,0 +1,293 @@
+"""
+Latency-aware routing across Groq chat models
+Keeps a live latency and error profile per model and picks one per request
+"""
+
+import os
+import time
+import threading
+from dataclasses import dataclass
+from typing import Dict, Any, Optional
+import logging
+
+from utils.groq_client import groq_client
+from utils.history_compactor import history_compactor
+
+logger = logging.getLogger(__name__)
+
+class LatencyProfile:
+    """EWMA latency, throughput and error profile of one upstream model"""
+
+    def __init__(
+        self,
+        alpha: float = 0.2,
+        default_ttft_ms: float = 300.0,
+        default_tokens_per_sec: float = 500.0
+    ):
+        self.alpha = alpha
+        self.ttft_ms = default_ttft_ms
+        self.tokens_per_sec = default_tokens_per_sec
+        self.latency_ms = default_ttft_ms
+        self.error_rate = 0.0
+        self.samples = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.last_failure = 0.0
+
+    def _ewma(self, current: float, sample: float) -> float:
+        # The first real sample replaces the prior instead of being averaged into it
+        if self.samples == 0:
+            return sample
+        return (1 - self.alpha) * current + self.alpha * sample
+
+    def record_success(self, ttft_ms: float, total_ms: float, output_tokens: int = 0):
+        """
+        Fold a successful call into the profile
+
+        Args:
+            ttft_ms: Time to first token (total time for non-streaming calls)
+            total_ms: Total call duration
+            output_tokens: Number of generated tokens, if known
+        """
+        self.ttft_ms = self._ewma(self.ttft_ms, ttft_ms)
+        self.latency_ms = self._ewma(self.latency_ms, total_ms)
+        generation_ms = total_ms - ttft_ms
+        if output_tokens > 1 and generation_ms > 0:
+            self.tokens_per_sec = self._ewma(self.tokens_per_sec, output_tokens / (generation_ms / 1000))
+        self.error_rate = (1 - self.alpha) * self.error_rate
+        self.samples += 1
+        self.consecutive_failures = 0
+
+    def record_failure(self):
+        """Fold a failed call into the profile"""
+        self.error_rate = (1 - self.alpha) * self.error_rate + self.alpha
+        self.errors += 1
+        self.consecutive_failures += 1
+        self.last_failure = time.time()
+
+    def estimate_latency_ms(self, output_tokens: int) -> float:
+        """Estimate the duration of a call producing output_tokens tokens"""
+        return self.ttft_ms + output_tokens / max(self.tokens_per_sec, 1.0) * 1000
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'ttft_ms': round(self.ttft_ms, 1),
+            'latency_ms': round(self.latency_ms, 1),
+            'tokens_per_sec': round(self.tokens_per_sec, 1),
+            'error_rate': round(self.error_rate, 3),
+            'samples': self.samples,
+            'errors': self.errors,
+            'consecutive_failures': self.consecutive_failures
+        }
+
+@dataclass
+class RoutingDecision:
+    """Model chosen for one request and why"""
+    model: str
+    reason: str
+    estimated_latency_ms: float
+    prompt_tokens: int
+    # Prompt token budget for history compaction; None keeps the default
+    token_budget: Optional[int] = None
+
+    def to_headers(self) -> Dict[str, str]:
+        """Response headers exposing the routing decision"""
+        return {
+            "X-Model": self.model,
+            "X-Model-Route": self.reason,
+            "X-Model-Estimated-Latency-Ms": str(int(self.estimated_latency_ms))
+        }
+
+class ModelRouter:
+    """Pick a chat model per request from prompt size, latency SLO and upstream health"""
+
+    def __init__(
+        self,
+        context_windows: Dict[str, int],
+        default_model: str,
+        long_context_tokens: int = 6000,
+        long_context_budget: int = 12000,
+        compacted_prompt_tokens: Optional[int] = None,
+        max_error_rate: float = 0.5,
+        failure_threshold: int = 3,
+        cooldown_seconds: float = 30.0,
+        alpha: float = 0.2
+    ):
+        self.context_windows = dict(context_windows)
+        self.default_model = default_model
+        self.long_context_tokens = long_context_tokens
+        self.long_context_budget = long_context_budget
+        self.compacted_prompt_tokens = compacted_prompt_tokens
+        self.max_error_rate = max_error_rate
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+
+        self._lock = threading.Lock()
+        self.profiles: Dict[str, LatencyProfile] = {
+            model: LatencyProfile(alpha=alpha) for model in self.context_windows
+        }
+        self.stats = {
+            'decisions': 0,
+            'by_model': {model: 0 for model in self.context_windows},
+            'by_reason': {}
+        }
+
+    def is_healthy(self, model: str) -> bool:
+        """
+        Check whether a model should receive traffic
+
+        A model is unhealthy while its error rate is above max_error_rate or
+        it has failed failure_threshold times in a row; after cooldown_seconds
+        it is tried again.
+        """
+        profile = self.profiles[model]
+        failing = (
+            profile.error_rate > self.max_error_rate or
+            profile.consecutive_failures >= self.failure_threshold
+        )
+        return not failing or time.time() - profile.last_failure > self.cooldown_seconds
+
+    def route(
+        self,
+        prompt_tokens: int,
+        max_tokens: int,
+        latency_slo_ms: Optional[float] = None,
+        profile: str = "text"
+    ) -> RoutingDecision:
+        """
+        Choose the model for a request
+
+        Voice turns go to the fastest healthy model. Text turns stay on the
+        default model unless their full prompt is long, in which case they go
+        to the largest context window. A latency SLO overrides both and picks
+        the preferred model among those expected to meet it.
+
+        Args:
+            prompt_tokens: Estimated tokens of the uncompacted prompt
+            max_tokens: Maximum response length
+            latency_slo_ms: Optional latency target for the whole call
+            profile: "text" or "voice"
+
+        Returns:
+            Routing decision
+        """
+        # History compaction bounds what is actually sent on default routes
+        sent_tokens = prompt_tokens
+        if self.compacted_prompt_tokens is not None:
+            sent_tokens = min(prompt_tokens, self.compacted_prompt_tokens)
+
+        with self._lock:
+            fitting = [
+                model for model, window in self.context_windows.items()
+                if window >= sent_tokens + max_tokens
+            ] or [max(self.context_windows, key=self.context_windows.get)]
+
+            candidates = [model for model in fitting if self.is_healthy(model)]
+            if not candidates:
+                # Every model looks unhealthy; the least failing one is the best bet
+                candidates = [min(fitting, key=lambda m: self.profiles[m].error_rate)]
+                degraded = True
+            else:
+                degraded = False
+
+            def estimate(model: str) -> float:
+                return self.profiles[model].estimate_latency_ms(max_tokens)
+
+            fastest = min(candidates, key=estimate)
+            long_context = prompt_tokens >= self.long_context_tokens
+            if long_context:
+                preferred = max(candidates, key=self.context_windows.get)
+            elif self.default_model in candidates:
+                preferred = self.default_model
+            else:
+                preferred = fastest
+
+            if latency_slo_ms is not None:
+                within_slo = [model for model in candidates if estimate(model) <= latency_slo_ms]
+                if preferred in within_slo:
+                    model, reason = preferred, "slo"
+                elif within_slo:
+                    model, reason = min(within_slo, key=estimate), "slo"
+                else:
+                    model, reason = fastest, "slo_fastest"
+            elif profile == "voice":
+                model, reason = fastest, "voice_fastest"
+            elif long_context:
+                model, reason = preferred, "long_context"
+            else:
+                model, reason = preferred, "default"
+
+            if degraded:
+                reason = "degraded"
+            elif reason == "default" and model != self.default_model:
+                reason = "failover"
+
+            # Long prompts routed to a larger window may keep more history
+            token_budget = None
+            if long_context and self.context_windows[model] > self.context_windows.get(self.default_model, 0):
+                token_budget = min(self.context_windows[model] - max_tokens, self.long_context_budget)
+
+            self.stats['decisions'] += 1
+            self.stats['by_model'][model] = self.stats['by_model'].get(model, 0) + 1
+            self.stats['by_reason'][reason] = self.stats['by_reason'].get(reason, 0) + 1
+
+            return RoutingDecision(
+                model=model,
+                reason=reason,
+                estimated_latency_ms=estimate(model),
+                prompt_tokens=prompt_tokens,
+                token_budget=token_budget
+            )
+
+    def record_success(self, model: str, ttft_ms: float, total_ms: float, output_tokens: int = 0):
+        """Record a successful call to a model"""
+        with self._lock:
+            if model in self.profiles:
+                self.profiles[model].record_success(ttft_ms, total_ms, output_tokens)
+
+    def record_failure(self, model: str):
+        """Record a failed call to a model"""
+        with self._lock:
+            if model in self.profiles:
+                self.profiles[model].record_failure()
+                if self.profiles[model].consecutive_failures == self.failure_threshold:
+                    logger.warning(f"Chat model {model} marked unhealthy after repeated failures")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get routing statistics and per-model profiles"""
+        with self._lock:
+            return {
+                'default_model': self.default_model,
+                'decisions': self.stats['decisions'],
+                'by_model': dict(self.stats['by_model']),
+                'by_reason': dict(self.stats['by_reason']),
+                'models': {
+                    model: dict(
+                        profile.to_dict(),
+                        context_window=self.context_windows[model],
+                        healthy=self.is_healthy(model)
+                    )
+                    for model, profile in self.profiles.items()
+                }
+            }
+
+# Fallback when the Groq client failed to initialize
+DEFAULT_CONTEXT_WINDOWS = {"llama3-8b-8192": 8192, "mixtral-8x7b-32768": 32768}
+
+if groq_client is not None:
+    _context_windows = dict(groq_client.chat_context_windows)
+    _default_model = groq_client.get_default_chat_model()
+else:
+    _context_windows = DEFAULT_CONTEXT_WINDOWS
+    _default_model = "llama3-8b-8192"
+
+# Global chat model router
+model_router = ModelRouter(
+    context_windows=_context_windows,
+    default_model=os.getenv("CHAT_ROUTER_DEFAULT_MODEL") or _default_model,
+    long_context_tokens=int(os.getenv("CHAT_ROUTER_LONG_CONTEXT_TOKENS", "6000")),
+    long_context_budget=int(os.getenv("CHAT_ROUTER_LONG_CONTEXT_BUDGET", "12000")),
+    compacted_prompt_tokens=history_compactor.token_budget,
+    max_error_rate=float(os.getenv("CHAT_ROUTER_MAX_ERROR_RATE", "0.5")),
+    cooldown_seconds=float(os.getenv("CHAT_ROUTER_COOLDOWN_SECONDS", "30"))
+)
@@ -0,0 +1,278 @@
+"""
+Sentence-parallel speech synthesis
+Splits long text at sentence boundaries, synthesizes the segments
+concurrently and stitches the audio back together in order
+"""
+
+import os
+import re
+import time
+import asyncio
+from typing import Dict, Any, List, Callable, Awaitable, AsyncIterator
+import logging
+
+from utils.concurrency_limiter import ConcurrencyLimiter
+
+logger = logging.getLogger(__name__)
+
+# Containers whose segments can be joined byte-wise: MPEG audio is a plain
+# sequence of frames and Ogg allows chained streams. WebM and WAV can't.
+STITCHABLE_CONTAINERS = {"mp3", "ogg"}
+
+# Abbreviations whose trailing period doesn't end a sentence
+_ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "e.g", "i.e",
+    "inc", "ltd", "co", "corp", "no", "approx", "dept", "fig", "u.s", "a.m", "p.m"
+}
+_SENTENCE_END = re.compile(r"""[.!?…]+["')\]]*\s+|\n\s*\n+""")
+_CLAUSE_END = re.compile(r"[,;:–—]\s+")
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Split text into sentences
+
+    A period after a known abbreviation, an initial or inside a number
+    doesn't end a sentence; blank lines always do.
+
+    Args:
+        text: Text to split
+
+    Returns:
+        Sentences with surrounding whitespace removed
+    """
+    sentences = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        candidate = text[start:match.start()]
+        last_word = candidate.rsplit(None, 1)[-1].lower().rstrip(".") if candidate.strip() else ""
+        punctuation = text[match.start():match.end()].strip()
+        following = text[match.end():match.end() + 1]
+        if punctuation.startswith(".") and "\n" not in match.group() and (
+            last_word in _ABBREVIATIONS or
+            (len(last_word) == 1 and last_word.isalpha()) or
+            (following and following.islower())
+        ):
+            continue
+        sentence = text[start:match.end()].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+    tail = text[start:].strip()
+    if tail:
+        sentences.append(tail)
+    return sentences
+
+def _split_long(sentence: str, max_chars: int) -> List[str]:
+    """Break an overlong sentence at clause boundaries, then at spaces"""
+    if len(sentence) <= max_chars:
+        return [sentence]
+
+    pieces = []
+    start = 0
+    for match in _CLAUSE_END.finditer(sentence):
+        if match.end() - start >= max_chars // 2:
+            pieces.append(sentence[start:match.end()].strip())
+            start = match.end()
+    pieces.append(sentence[start:].strip())
+
+    parts = []
+    for piece in pieces:
+        while len(piece) > max_chars:
+            cut = piece.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            parts.append(piece[:cut].strip())
+            piece = piece[cut:].strip()
+        if piece:
+            parts.append(piece)
+    return parts
+
+def plan_segments(text: str, target_chars: int = 300, first_segment_chars: int = 120) -> List[str]:
+    """
+    Pack sentences into synthesis segments
+
+    Sentences are joined greedily up to target_chars so each request is
+    worth its overhead. The first segment is kept shorter because it
+    decides how soon playback can start.
+
+    Args:
+        text: Text to synthesize
+        target_chars: Preferred segment length
+        first_segment_chars: Preferred length of the first segment
+
+    Returns:
+        Segments in reading order
+    """
+    segments: List[str] = []
+    current = ""
+    for sentence in split_sentences(text):
+        for part in _split_long(sentence, target_chars):
+            limit = first_segment_chars if not segments else target_chars
+            if current and len(current) + 1 + len(part) > limit:
+                segments.append(current)
+                current = part
+            else:
+                current = f"{current} {part}" if current else part
+    if current:
+        segments.append(current)
+    return segments
+
+def _strip_id3(audio_data: bytes, keep_header: bool, keep_trailer: bool) -> bytes:
+    """Remove ID3 tags so MPEG segments join at frame boundaries"""
+    start, end = 0, len(audio_data)
+    if not keep_header and audio_data[:3] == b"ID3" and len(audio_data) >= 10:
+        size = (audio_data[6] << 21) | (audio_data[7] << 14) | (audio_data[8] << 7) | audio_data[9]
+        start = 10 + size + (10 if audio_data[5] & 0x10 else 0)
+    if not keep_trailer and end - start >= 128 and audio_data[end - 128:end - 125] == b"TAG":
+        end -= 128
+    return audio_data[start:end]
+
+def prepare_segment(audio_data: bytes, container: str, index: int, total: int) -> bytes:
+    """
+    Trim a segment's audio so it can follow the previous one in a single stream
+
+    Args:
+        audio_data: Synthesized audio for one segment
+        container: Audio container ("mp3" or "ogg")
+        index: Segment position
+        total: Number of segments
+
+    Returns:
+        Bytes to append to the output
+    """
+    if container == "mp3":
+        return _strip_id3(audio_data, keep_header=index == 0, keep_trailer=index == total - 1)
+    return audio_data
+
+class ParallelTTS:
+    """
+    Concurrent synthesis of long text, one request per sentence group
+
+    Segments are synthesized under a per-provider concurrency cap and
+    yielded strictly in order, each as soon as it and everything before it
+    is done, so playback can start while later segments are in flight.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        min_text_chars: int = 400,
+        target_segment_chars: int = 300,
+        first_segment_chars: int = 120,
+        max_concurrency: int = 4
+    ):
+        self.enabled = enabled
+        self.min_text_chars = min_text_chars
+        self.target_segment_chars = target_segment_chars
+        self.first_segment_chars = first_segment_chars
+        self.max_concurrency = max(1, max_concurrency)
+        self.limiters: Dict[str, ConcurrencyLimiter] = {}
+
+        self.stats = {
+            'requests': 0,
+            'segments': 0,
+            'failures': 0,
+            'chars': 0,
+            'wall_seconds': 0.0
+        }
+
+    def should_split(self, text: str, container: str) -> bool:
+        """Whether text is long enough to split and its audio can be stitched"""
+        return self.enabled and container in STITCHABLE_CONTAINERS and len(text) >= self.min_text_chars
+
+    def limiter_for(self, provider: str) -> ConcurrencyLimiter:
+        """Concurrency cap shared by every request to one TTS provider"""
+        if provider not in self.limiters:
+            self.limiters[provider] = ConcurrencyLimiter(f"tts:{provider}", self.max_concurrency)
+        return self.limiters[provider]
+
+    async def synthesize_iter(
+        self,
+        text: str,
+        container: str,
+        provider: str,
+        synthesize: Callable[[str], Awaitable[bytes]]
+    ) -> AsyncIterator[bytes]:
+        """
+        Synthesize segments concurrently and yield their audio in order
+
+        Args:
+            text: Text to synthesize
+            container: Provider output container, used to join segments
+            provider: Provider name, selecting the concurrency cap
+            synthesize: Coroutine function synthesizing one segment
+
+        Yields:
+            Audio bytes per segment, trimmed so the concatenation is one stream
+        """
+        segments = plan_segments(text, self.target_segment_chars, self.first_segment_chars)
+        limiter = self.limiter_for(provider)
+        start = time.perf_counter()
+        self.stats['requests'] += 1
+        self.stats['segments'] += len(segments)
+        self.stats['chars'] += len(text)
+
+        async def run(segment: str) -> bytes:
+            async with limiter.slot():
+                return await synthesize(segment)
+
+        tasks = [asyncio.ensure_future(run(segment)) for segment in segments]
+        try:
+            for index, task in enumerate(tasks):
+                try:
+                    audio_data = await task
+                except Exception:
+                    self.stats['failures'] += 1
+                    raise
+                yield prepare_segment(audio_data, container, index, len(tasks))
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.stats['wall_seconds'] += time.perf_counter() - start
+
+    async def synthesize(
+        self,
+        text: str,
+        container: str,
+        provider: str,
+        synthesize: Callable[[str], Awaitable[bytes]]
+    ) -> bytes:
+        """
+        Synthesize text as concurrent segments and return the stitched audio
+
+        Args:
+            text: Text to synthesize
+            container: Provider output container, used to join segments
+            provider: Provider name, selecting the concurrency cap
+            synthesize: Coroutine function synthesizing one segment
+
+        Returns:
+            Audio for the whole text
+        """
+        parts = [part async for part in self.synthesize_iter(text, container, provider, synthesize)]
+        return b"".join(parts)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get segmentation and concurrency statistics"""
+        stats = self.stats.copy()
+        stats.update({
+            'enabled': self.enabled,
+            'min_text_chars': self.min_text_chars,
+            'max_concurrency': self.max_concurrency,
+            'wall_seconds': round(self.stats['wall_seconds'], 2),
+            'avg_segments': (
+                round(self.stats['segments'] / self.stats['requests'], 1)
+                if self.stats['requests'] else 0.0
+            ),
+            'providers': {name: limiter.get_stats() for name, limiter in self.limiters.items()}
+        })
+        return stats
+
+# Global sentence-parallel synthesizer
+parallel_tts = ParallelTTS(
+    enabled=os.getenv("TTS_PARALLEL_ENABLED", "true").lower() == "true",
+    min_text_chars=int(os.getenv("TTS_PARALLEL_MIN_CHARS", "400")),
+    target_segment_chars=int(os.getenv("TTS_PARALLEL_SEGMENT_CHARS", "300")),
+    first_segment_chars=int(os.getenv("TTS_PARALLEL_FIRST_SEGMENT_CHARS", "120")),
+    max_concurrency=int(os.getenv("TTS_MAX_CONCURRENCY", "4"))
+)
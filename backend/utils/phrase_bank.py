@@ -0,0 +1,321 @@
+"""
+Pre-synthesized filler and acknowledgement phrases
+Short clips ("Let me think…") played the moment a voice turn starts, so the
+user hears something while the model generates the real answer
+"""
+
+import os
+import json
+import mmap
+import time
+import base64
+import struct
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable
+import logging
+
+from utils.concurrency_limiter import ConcurrencyLimiter
+from utils.audio_processor import audio_processor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PHRASES = [
+    "Good question…",
+    "Let me think…",
+    "Hmm, one moment…",
+    "Sure, let me see…",
+    "Okay, give me a second…",
+    "Right, let me check…"
+]
+
+# Manifest layout: MAGIC, little-endian u32 index length, UTF-8 JSON index,
+# then the audio of every entry back to back. Entry offsets in the index are
+# relative to the start of the audio region, so it can be sliced straight
+# out of an mmap without copying.
+MANIFEST_MAGIC = b"VBPHRS01"
+_HEADER = struct.Struct("<8sI")
+
+@dataclass
+class FillerClip:
+    """One synthesized phrase for one voice and format"""
+    text: str
+    voice: str
+    audio_format: str
+    audio: memoryview
+    duration_seconds: Optional[float] = None
+
+    def audio_base64(self) -> str:
+        return base64.b64encode(self.audio).decode('utf-8')
+
+class PhraseBank:
+    """
+    In-memory bank of filler clips keyed by voice and output format
+
+    Clips come either from synthesis at startup or from a manifest file
+    produced offline, which is mapped read-only so the audio is paged in
+    from the file instead of being copied into the heap.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        phrases: Optional[List[str]] = None,
+        manifest_path: Optional[str] = None,
+        build_concurrency: int = 2
+    ):
+        self.enabled = enabled
+        self.phrases = phrases or list(DEFAULT_PHRASES)
+        self.manifest_path = manifest_path
+        self.build_concurrency = max(1, build_concurrency)
+        self.source: Optional[str] = None
+
+        self._clips: Dict[Tuple[str, str], List[FillerClip]] = {}
+        self._next: Dict[Tuple[str, str], int] = {}
+        self._mmap: Optional[mmap.mmap] = None
+
+        self.stats = {
+            'served': 0,
+            'misses': 0,
+            'build_failures': 0,
+            'build_seconds': 0.0
+        }
+
+    def __len__(self) -> int:
+        return sum(len(clips) for clips in self._clips.values())
+
+    def pick(self, voice: str, audio_format: str) -> Optional[FillerClip]:
+        """
+        Get the next filler clip for a voice, rotating so turns don't repeat
+
+        Args:
+            voice: Resolved provider voice
+            audio_format: Output format name
+
+        Returns:
+            A clip, or None if the bank has nothing for this voice and format
+        """
+        if not self.enabled:
+            return None
+        key = (voice, audio_format)
+        clips = self._clips.get(key)
+        if not clips:
+            self.stats['misses'] += 1
+            return None
+        index = self._next.get(key, 0)
+        self._next[key] = (index + 1) % len(clips)
+        self.stats['served'] += 1
+        return clips[index]
+
+    def _add(self, clip: FillerClip):
+        self._clips.setdefault((clip.voice, clip.audio_format), []).append(clip)
+
+    async def build(
+        self,
+        synthesize: Callable[[str, str], Awaitable[bytes]],
+        voices: List[str],
+        audio_format: str
+    ) -> int:
+        """
+        Synthesize every phrase for every voice and replace the bank
+
+        Args:
+            synthesize: Coroutine function taking (text, voice) and returning audio
+            voices: Provider voices to cover
+            audio_format: Output format name the audio is synthesized in
+
+        Returns:
+            Number of clips built
+        """
+        limiter = ConcurrencyLimiter("tts:phrase_bank", self.build_concurrency)
+        start = time.perf_counter()
+
+        async def run(text: str, voice: str) -> Optional[FillerClip]:
+            async with limiter.slot():
+                try:
+                    audio_data = await synthesize(text, voice)
+                except Exception as e:
+                    self.stats['build_failures'] += 1
+                    logger.warning(f"Filler '{text}' for {voice} failed: {e}")
+                    return None
+            metadata = audio_processor.sniff_audio(audio_data, record_stats=False)
+            return FillerClip(text, voice, audio_format, memoryview(audio_data), metadata.duration_seconds)
+
+        results = await asyncio.gather(*(run(text, voice) for voice in voices for text in self.phrases))
+
+        self._clips = {}
+        self._next = {}
+        self._close()
+        for clip in results:
+            if clip is not None:
+                self._add(clip)
+        self.source = "built"
+        self.stats['build_seconds'] = round(time.perf_counter() - start, 2)
+        logger.info(f"Built phrase bank with {len(self)} clips for {len(voices)} voices")
+        return len(self)
+
+    def save(self, path: Optional[str] = None) -> bool:
+        """
+        Write the bank to a manifest file atomically
+
+        Args:
+            path: Target path (defaults to manifest_path)
+
+        Returns:
+            True if the manifest was written
+        """
+        path = path or self.manifest_path
+        if not path or not self._clips:
+            return False
+
+        try:
+            entries = []
+            offset = 0
+            clips = [clip for group in self._clips.values() for clip in group]
+            for clip in clips:
+                entries.append({
+                    'text': clip.text,
+                    'voice': clip.voice,
+                    'format': clip.audio_format,
+                    'offset': offset,
+                    'length': len(clip.audio),
+                    'duration_seconds': clip.duration_seconds
+                })
+                offset += len(clip.audio)
+            index = json.dumps({'version': 1, 'created': time.time(), 'entries': entries}).encode('utf-8')
+
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            temp_path = f"{path}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(_HEADER.pack(MANIFEST_MAGIC, len(index)))
+                f.write(index)
+                for clip in clips:
+                    f.write(clip.audio)
+            os.replace(temp_path, path)
+            logger.info(f"Saved phrase bank with {len(clips)} clips to {path}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save phrase bank: {e}")
+            return False
+
+    def load(self, path: Optional[str] = None) -> bool:
+        """
+        Map a manifest file and index its clips
+
+        Args:
+            path: Source path (defaults to manifest_path)
+
+        Returns:
+            True if a manifest was loaded
+        """
+        path = path or self.manifest_path
+        if not path or not os.path.exists(path):
+            return False
+
+        try:
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, index_length = _HEADER.unpack_from(mapped, 0)
+            if magic != MANIFEST_MAGIC:
+                mapped.close()
+                logger.warning(f"{path} is not a phrase bank manifest, ignoring it")
+                return False
+            index = json.loads(mapped[_HEADER.size:_HEADER.size + index_length].decode('utf-8'))
+            data_start = _HEADER.size + index_length
+            view = memoryview(mapped)
+
+            clips = []
+            for entry in index['entries']:
+                start = data_start + entry['offset']
+                if start + entry['length'] > len(mapped):
+                    raise ValueError(f"Entry '{entry['text']}' for {entry['voice']} runs past the end of the file")
+                clips.append(FillerClip(
+                    entry['text'],
+                    entry['voice'],
+                    entry['format'],
+                    view[start:start + entry['length']],
+                    entry.get('duration_seconds')
+                ))
+
+            self._clips = {}
+            self._next = {}
+            self._close()
+            for clip in clips:
+                self._add(clip)
+            self._mmap = mapped
+            self.source = "manifest"
+            logger.info(f"Loaded phrase bank with {len(clips)} clips from {path}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to load phrase bank: {e}")
+            return False
+
+    def _close(self):
+        """Unmap a previously loaded manifest once no clip refers to it"""
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # A clip still being sent holds a view; the map is freed with it
+                pass
+            self._mmap = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get bank size and how often a filler was available"""
+        requests = self.stats['served'] + self.stats['misses']
+        stats = self.stats.copy()
+        stats.update({
+            'enabled': self.enabled,
+            'source': self.source,
+            'clips': len(self),
+            'voices': len({voice for voice, _ in self._clips}),
+            'bytes': sum(len(clip.audio) for group in self._clips.values() for clip in group),
+            'hit_rate': round(self.stats['served'] / requests, 3) if requests else 0.0,
+            'manifest_path': self.manifest_path
+        })
+        return stats
+
+# Global filler phrase bank; PHRASE_BANK_PATH points at a prebuilt manifest
+phrase_bank = PhraseBank(
+    enabled=os.getenv("PHRASE_BANK_ENABLED", "true").lower() == "true",
+    phrases=[p.strip() for p in os.getenv("PHRASE_BANK_PHRASES", "").split("|") if p.strip()] or None,
+    manifest_path=os.getenv("PHRASE_BANK_PATH") or None,
+    build_concurrency=int(os.getenv("PHRASE_BANK_BUILD_CONCURRENCY", "2"))
+)
+phrase_bank.load()
+
+async def build_phrase_bank(audio_format: Optional[str] = None) -> int:
+    """
+    Fill the global bank with every phrase in every voice of the current TTS provider
+
+    Args:
+        audio_format: Output format name; the provider default if omitted
+
+    Returns:
+        Number of clips built
+    """
+    from utils.tts_provider import tts_provider
+
+    fmt = tts_provider.resolve_format(audio_format)
+    return await phrase_bank.build(
+        # Fillers live in the bank, not the shared audio cache or the delivery stats
+        lambda text, voice: tts_provider.synthesize_uncached(text, voice, audio_format=fmt.name),
+        tts_provider.get_available_voices("all"),
+        fmt.name
+    )
+
+async def _regenerate(output: str, audio_format: Optional[str]):
+    count = await build_phrase_bank(audio_format)
+    phrase_bank.save(output)
+    print(f"Wrote {count} clips ({phrase_bank.get_stats()['bytes']} bytes) to {output}")
+
+if __name__ == "__main__":
+    # Offline regeneration (from backend/): python -m utils.phrase_bank fillers.bin [--format mp3]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Regenerate the filler phrase bank manifest")
+    parser.add_argument("output", help="Manifest file to write")
+    parser.add_argument("--format", default=None, help="Output format name (provider default if omitted)")
+    args = parser.parse_args()
+    asyncio.run(_regenerate(args.output, args.format))
@@ -0,0 +1,342 @@
+"""
+Rate-limit-aware scheduling of Groq requests
+Token buckets for chat requests, chat tokens and Whisper audio seconds, fed by x-ratelimit-* headers
+"""
+
+import os
+import re
+import time
+import asyncio
+import struct
+from typing import Dict, Any, Optional, Mapping
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Groq bills every transcription as at least this many audio seconds
+MIN_BILLED_AUDIO_SECONDS = 10.0
+
+# Byte rate assumed for compressed audio whose duration can't be read from the header
+DEFAULT_AUDIO_BYTES_PER_SECOND = 4000
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+def parse_reset_seconds(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Groq reset duration such as "2m59.56s", "7.66s" or "120ms"
+
+    Args:
+        value: Header value
+
+    Returns:
+        Duration in seconds, or None if it can't be parsed
+    """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    parts = _DURATION_PART.findall(value.strip())
+    if not parts:
+        return None
+    multipliers = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+    return sum(float(amount) * multipliers[unit] for amount, unit in parts)
+
+def estimate_audio_seconds(audio_bytes: bytes) -> float:
+    """
+    Estimate the billed audio seconds of an upload before sending it
+
+    WAV durations are read from the header; other formats are estimated
+    from their size.
+
+    Args:
+        audio_bytes: Encoded audio
+
+    Returns:
+        Estimated billed seconds (at least MIN_BILLED_AUDIO_SECONDS)
+    """
+    seconds = len(audio_bytes) / DEFAULT_AUDIO_BYTES_PER_SECOND
+    if len(audio_bytes) >= 44 and audio_bytes[:4] == b"RIFF" and audio_bytes[8:12] == b"WAVE":
+        byte_rate = struct.unpack("<I", audio_bytes[28:32])[0]
+        if byte_rate:
+            seconds = (len(audio_bytes) - 44) / byte_rate
+    return max(seconds, MIN_BILLED_AUDIO_SECONDS)
+
+class TokenBucket:
+    """
+    Token bucket that can be configured up front or learned from response headers
+
+    A bucket without a capacity is unlimited until headers describe it.
+    """
+
+    def __init__(self, capacity: Optional[float] = None, refill_per_second: Optional[float] = None):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity if capacity is not None else 0.0
+        self.last_refill = time.monotonic()
+
+    @property
+    def limited(self) -> bool:
+        return self.capacity is not None and self.refill_per_second is not None
+
+    def _refill(self, now: float):
+        if self.limited:
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.refill_per_second)
+        self.last_refill = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount tokens are available (0 if available now)"""
+        if not self.limited:
+            return 0.0
+        self._refill(now)
+        # A single request larger than the bucket waits for a full bucket
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        if self.refill_per_second <= 0:
+            return float("inf")
+        return (amount - self.tokens) / self.refill_per_second
+
+    def consume(self, amount: float):
+        if self.limited:
+            self.tokens -= min(amount, self.capacity)
+
+    def refund(self, amount: float):
+        if self.limited:
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+    def update(
+        self,
+        limit: Optional[float],
+        remaining: Optional[float],
+        reset_seconds: Optional[float],
+        window_seconds: float = 60.0
+    ):
+        """
+        Synchronize the bucket with server-reported limits
+
+        The refill rate is chosen so the bucket is full again exactly when
+        the server says the limit resets.
+
+        Args:
+            limit: Reported limit per window
+            remaining: Reported remaining amount
+            reset_seconds: Reported time until the bucket is full again
+            window_seconds: Window the limit applies to, for the initial refill rate
+        """
+        if limit is not None and limit > 0:
+            self.capacity = limit
+            if self.refill_per_second is None:
+                self.refill_per_second = limit / window_seconds
+        if remaining is not None and self.capacity is not None:
+            self.tokens = min(remaining, self.capacity)
+            self.last_refill = time.monotonic()
+            if reset_seconds and reset_seconds > 0 and self.capacity > remaining:
+                self.refill_per_second = (self.capacity - remaining) / reset_seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        if not self.limited:
+            return {'limited': False}
+        self._refill(time.monotonic())
+        return {
+            'limited': True,
+            'capacity': round(self.capacity, 1),
+            'available': round(self.tokens, 1),
+            'refill_per_second': round(self.refill_per_second, 3)
+        }
+
+# Request kinds and the buckets each one draws from
+KIND_BUCKETS = {
+    "chat": ("chat_requests", "chat_tokens"),
+    "audio": ("audio_requests", "audio_seconds")
+}
+
+# Groq's x-ratelimit-*-requests headers describe the requests-per-day limit,
+# so they feed a separate daily bucket and never the per-minute one
+DAILY_REQUEST_BUCKETS = {
+    "chat": "chat_requests_daily",
+    "audio": "audio_requests_daily"
+}
+DAY_SECONDS = 86400.0
+
+class RateLimitScheduler:
+    """
+    Central admission control for Groq requests
+
+    Callers acquire their estimated cost before sending. When a bucket is
+    short, requests of that kind queue in arrival order instead of firing
+    and collecting 429s.
+    """
+
+    def __init__(self, buckets: Optional[Dict[str, TokenBucket]] = None, enabled: bool = True):
+        self.enabled = enabled
+        names = [name for kind in KIND_BUCKETS.values() for name in kind] + list(DAILY_REQUEST_BUCKETS.values())
+        self.buckets: Dict[str, TokenBucket] = {name: TokenBucket() for name in names}
+        self.buckets.update(buckets or {})
+
+        self._blocked_until: Dict[str, float] = {kind: 0.0 for kind in KIND_BUCKETS}
+        self._locks: Dict[str, Any] = {}
+        self._queued: Dict[str, int] = {kind: 0 for kind in KIND_BUCKETS}
+
+        self.stats = {
+            kind: {
+                'admitted': 0,
+                'delayed': 0,
+                'total_wait_ms': 0.0,
+                'max_queue_depth': 0,
+                'rate_limited_responses': 0
+            }
+            for kind in KIND_BUCKETS
+        }
+
+    def _lock(self, kind: str) -> asyncio.Lock:
+        """Get the FIFO admission lock of a kind for the running event loop"""
+        loop = asyncio.get_running_loop()
+        entry = self._locks.get(kind)
+        if entry is None or entry[0] is not loop:
+            entry = (loop, asyncio.Lock())
+            self._locks[kind] = entry
+        return entry[1]
+
+    async def acquire(self, kind: str, cost: Mapping[str, float]) -> float:
+        """
+        Wait until a request's estimated cost fits within the limits
+
+        Args:
+            kind: "chat" or "audio"
+            cost: Amount per bucket, e.g. {"chat_requests": 1, "chat_tokens": 850}
+
+        Returns:
+            Seconds spent waiting
+        """
+        if not self.enabled:
+            return 0.0
+
+        # Every request also counts against the kind's daily request limit
+        requests_bucket = KIND_BUCKETS[kind][0]
+        if requests_bucket in cost:
+            cost = {**cost, DAILY_REQUEST_BUCKETS[kind]: cost[requests_bucket]}
+
+        stats = self.stats[kind]
+        start = time.monotonic()
+        self._queued[kind] += 1
+        stats['max_queue_depth'] = max(stats['max_queue_depth'], self._queued[kind])
+        try:
+            # asyncio.Lock wakes waiters in arrival order, which keeps admission fair
+            async with self._lock(kind):
+                while True:
+                    now = time.monotonic()
+                    wait = max(
+                        [self._blocked_until[kind] - now] +
+                        [self.buckets[name].wait_time(amount, now) for name, amount in cost.items()]
+                    )
+                    if wait <= 0:
+                        break
+                    # Re-check periodically since response headers may refresh the buckets
+                    await asyncio.sleep(min(wait, 1.0))
+
+                for name, amount in cost.items():
+                    self.buckets[name].consume(amount)
+        finally:
+            self._queued[kind] -= 1
+
+        waited = time.monotonic() - start
+        stats['admitted'] += 1
+        if waited > 0.001:
+            stats['delayed'] += 1
+            stats['total_wait_ms'] += waited * 1000
+        return waited
+
+    def reconcile(self, bucket: str, estimated: float, actual: float):
+        """
+        Correct a bucket once the real cost of a request is known
+
+        Args:
+            bucket: Bucket name
+            estimated: Amount acquired before the request
+            actual: Amount the request actually used
+        """
+        if actual <= 0:
+            return
+        if actual < estimated:
+            self.buckets[bucket].refund(estimated - actual)
+        else:
+            self.buckets[bucket].consume(actual - estimated)
+
+    def observe_headers(self, kind: str, status_code: int, headers: Mapping[str, str]):
+        """
+        Update buckets from x-ratelimit-* response headers
+
+        Args:
+            kind: "chat" or "audio"
+            status_code: HTTP status of the response
+            headers: Response headers
+        """
+        usage_bucket = KIND_BUCKETS[kind][1]
+
+        def number(name: str) -> Optional[float]:
+            try:
+                return float(headers[name]) if name in headers else None
+            except ValueError:
+                return None
+
+        self.buckets[DAILY_REQUEST_BUCKETS[kind]].update(
+            number("x-ratelimit-limit-requests"),
+            number("x-ratelimit-remaining-requests"),
+            parse_reset_seconds(headers.get("x-ratelimit-reset-requests")),
+            window_seconds=DAY_SECONDS
+        )
+        if kind == "chat":
+            self.buckets[usage_bucket].update(
+                number("x-ratelimit-limit-tokens"),
+                number("x-ratelimit-remaining-tokens"),
+                parse_reset_seconds(headers.get("x-ratelimit-reset-tokens"))
+            )
+
+        if status_code == 429:
+            self.stats[kind]['rate_limited_responses'] += 1
+            retry_after = parse_reset_seconds(headers.get("retry-after")) or 1.0
+            self._blocked_until[kind] = max(self._blocked_until[kind], time.monotonic() + retry_after)
+            logger.warning(f"Groq {kind} rate limit hit, pausing admissions for {retry_after:.1f}s")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get admission statistics and bucket levels"""
+        report = {'enabled': self.enabled, 'buckets': {}, 'kinds': {}}
+        for name, bucket in self.buckets.items():
+            report['buckets'][name] = bucket.to_dict()
+        for kind, stats in self.stats.items():
+            entry = stats.copy()
+            entry['total_wait_ms'] = round(stats['total_wait_ms'], 1)
+            entry['queued'] = self._queued[kind]
+            entry['avg_wait_ms'] = round(stats['total_wait_ms'] / stats['delayed'], 1) if stats['delayed'] else 0.0
+            report['kinds'][kind] = entry
+        return report
+
+def request_kind(path: str) -> Optional[str]:
+    """Map a Groq API path to its scheduler kind"""
+    if path.endswith("/chat/completions"):
+        return "chat"
+    if "/audio/" in path:
+        return "audio"
+    return None
+
+def _configured_bucket(limit_env: str, window_seconds: float) -> TokenBucket:
+    """Create a bucket from an optional per-window limit environment variable"""
+    limit = os.getenv(limit_env)
+    if not limit:
+        return TokenBucket()
+    return TokenBucket(capacity=float(limit), refill_per_second=float(limit) / window_seconds)
+
+# Global Groq rate-limit scheduler; per-minute request limits only come from
+# these settings, the rest are learned from response headers
+rate_limit_scheduler = RateLimitScheduler(
+    buckets={
+        "chat_requests": _configured_bucket("GROQ_CHAT_RPM", 60.0),
+        "chat_tokens": _configured_bucket("GROQ_CHAT_TPM", 60.0),
+        "audio_requests": _configured_bucket("GROQ_WHISPER_RPM", 60.0),
+        "audio_seconds": _configured_bucket("GROQ_WHISPER_ASH", 3600.0)
+    },
+    enabled=os.getenv("GROQ_SCHEDULER_ENABLED", "true").lower() == "true"
+)
@@ -0,0 +1,127 @@
+"""
+Singleflight request coalescing for identical in-flight upstream calls
+While a call with a given fingerprint is running, later callers share its result
+"""
+
+import asyncio
+import hashlib
+from typing import Dict, Any, Callable, Awaitable, Tuple, TypeVar
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+def fingerprint(*parts: Any) -> str:
+    """
+    Build a stable fingerprint from request parts
+
+    Bytes are hashed as-is; everything else is hashed via its repr.
+
+    Args:
+        *parts: Values identifying the request
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, (bytes, bytearray, memoryview)):
+            digest.update(part)
+        else:
+            digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+class RequestCoalescer:
+    """Deduplicate concurrent identical async calls per namespace"""
+
+    def __init__(self):
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._waiters: Dict[Tuple[str, str], int] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def _namespace_stats(self, namespace: str) -> Dict[str, int]:
+        if namespace not in self.stats:
+            self.stats[namespace] = {
+                'calls': 0,
+                'upstream_calls': 0,
+                'coalesced_waiters': 0,
+                'peak_waiters': 0
+            }
+        return self.stats[namespace]
+
+    async def run(
+        self,
+        namespace: str,
+        key: str,
+        factory: Callable[[], Awaitable[T]]
+    ) -> T:
+        """
+        Run factory once per in-flight key and share its result
+
+        The upstream call runs in its own task so one caller being cancelled
+        doesn't fail the others; it is cancelled only when every caller has
+        gone away.
+
+        Args:
+            namespace: Operation name used for metrics (e.g. "chat", "stt", "tts")
+            key: Request fingerprint
+            factory: Zero-argument callable returning the awaitable to run
+
+        Returns:
+            Result of the shared call
+        """
+        stats = self._namespace_stats(namespace)
+        stats['calls'] += 1
+        slot = (namespace, key)
+
+        task = self._inflight.get(slot)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[slot] = task
+            self._waiters[slot] = 0
+            stats['upstream_calls'] += 1
+            task.add_done_callback(lambda _: self._release(slot, task))
+        else:
+            stats['coalesced_waiters'] += 1
+            logger.debug(f"Coalesced {namespace} request onto in-flight call")
+
+        self._waiters[slot] += 1
+        stats['peak_waiters'] = max(stats['peak_waiters'], self._waiters[slot])
+
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if slot in self._waiters:
+                self._waiters[slot] -= 1
+                if self._waiters[slot] <= 0 and not task.done():
+                    task.cancel()
+            raise
+
+    def _release(self, slot: Tuple[str, str], task: asyncio.Task):
+        """Forget a finished call so the next request starts a fresh one"""
+        if self._inflight.get(slot) is task:
+            del self._inflight[slot]
+            self._waiters.pop(slot, None)
+
+    def in_flight(self, namespace: str = None) -> int:
+        """Get the number of in-flight upstream calls"""
+        if namespace is None:
+            return len(self._inflight)
+        return sum(1 for ns, _ in self._inflight if ns == namespace)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing statistics per namespace"""
+        report = {}
+        for namespace, stats in self.stats.items():
+            entry = stats.copy()
+            entry['in_flight'] = self.in_flight(namespace)
+            entry['coalesced_ratio'] = (
+                round(stats['coalesced_waiters'] / stats['calls'], 3) if stats['calls'] else 0.0
+            )
+            report[namespace] = entry
+        return report
+
+# Global request coalescer
+request_coalescer = RequestCoalescer()
@@ -0,0 +1,227 @@
+"""
+Hedged upstream requests for tail latency
+Fires a second attempt when the first is slower than the endpoint's recent percentile
+"""
+
+import os
+import time
+import asyncio
+from collections import deque
+from typing import Dict, Any, Callable, Awaitable, Optional, TypeVar, Iterable
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class RequestHedger:
+    """
+    Opt-in request hedging with a global hedge budget
+
+    Every request earns budget_ratio hedge credits (capped at budget_burst)
+    and each hedge spends one, so hedges can never exceed roughly
+    budget_ratio of traffic, even while an upstream outage makes every
+    request slow.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        endpoints: Optional[Iterable[str]] = None,
+        budget_ratio: float = 0.05,
+        budget_burst: float = 5.0,
+        percentile: float = 0.95,
+        min_samples: int = 20,
+        window_size: int = 200,
+        min_delay_ms: float = 50.0,
+        max_delay_ms: float = 10000.0
+    ):
+        self.enabled = enabled
+        self.endpoints = set(endpoints) if endpoints is not None else None
+        self.budget_ratio = budget_ratio
+        self.budget_burst = budget_burst
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.window_size = window_size
+        self.min_delay_ms = min_delay_ms
+        self.max_delay_ms = max_delay_ms
+
+        self._budget = 0.0
+        self._latencies: Dict[str, deque] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def _endpoint_stats(self, endpoint: str) -> Dict[str, int]:
+        if endpoint not in self.stats:
+            self.stats[endpoint] = {
+                'requests': 0,
+                'hedges_fired': 0,
+                'hedge_wins': 0,
+                'primary_wins': 0,
+                'budget_denied': 0
+            }
+        return self.stats[endpoint]
+
+    def is_enabled(self, endpoint: str) -> bool:
+        """Check whether hedging applies to an endpoint"""
+        return self.enabled and (self.endpoints is None or endpoint in self.endpoints)
+
+    def record_latency(self, endpoint: str, latency_ms: float):
+        """Add a completed attempt's latency to the endpoint's window"""
+        if endpoint not in self._latencies:
+            self._latencies[endpoint] = deque(maxlen=self.window_size)
+        self._latencies[endpoint].append(latency_ms)
+
+    def hedge_delay_ms(self, endpoint: str) -> Optional[float]:
+        """
+        Get how long to wait before hedging a request
+
+        Args:
+            endpoint: Endpoint name (e.g. "chat", "stt")
+
+        Returns:
+            Delay in milliseconds, or None until enough latencies are recorded
+        """
+        latencies = self._latencies.get(endpoint)
+        if not latencies or len(latencies) < self.min_samples:
+            return None
+        ordered = sorted(latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile))
+        return min(max(ordered[index], self.min_delay_ms), self.max_delay_ms)
+
+    def _take_budget(self) -> bool:
+        if self._budget >= 1.0:
+            self._budget -= 1.0
+            return True
+        return False
+
+    async def run(
+        self,
+        endpoint: str,
+        factory: Callable[[], Awaitable[T]],
+        discard: Optional[Callable[[T], Awaitable[None]]] = None
+    ) -> T:
+        """
+        Run an upstream call, hedging it if it is slower than usual
+
+        If the first attempt has not finished after the endpoint's percentile
+        latency, a second attempt is started and whichever succeeds first
+        wins; the other is cancelled. An attempt that fails while the other
+        is still running does not fail the request.
+
+        Args:
+            endpoint: Endpoint name used for thresholds and metrics
+            factory: Zero-argument callable starting one attempt
+            discard: Optional coroutine function releasing the result of an
+                attempt that also succeeded but lost the race (e.g. closing
+                an open stream)
+
+        Returns:
+            Result of the winning attempt
+        """
+        if not self.is_enabled(endpoint):
+            return await factory()
+
+        stats = self._endpoint_stats(endpoint)
+        stats['requests'] += 1
+        self._budget = min(self.budget_burst, self._budget + self.budget_ratio)
+
+        delay_ms = self.hedge_delay_ms(endpoint)
+        start = time.perf_counter()
+        primary = asyncio.ensure_future(factory())
+
+        try:
+            if delay_ms is not None:
+                await asyncio.wait({primary}, timeout=delay_ms / 1000)
+
+            if primary.done() or delay_ms is None:
+                result = await primary
+                self.record_latency(endpoint, (time.perf_counter() - start) * 1000)
+                return result
+
+            if not self._take_budget():
+                stats['budget_denied'] += 1
+                result = await primary
+                self.record_latency(endpoint, (time.perf_counter() - start) * 1000)
+                return result
+
+            stats['hedges_fired'] += 1
+            logger.debug(f"Hedging {endpoint} request after {delay_ms:.0f}ms")
+            hedge_start = time.perf_counter()
+            hedge = asyncio.ensure_future(factory())
+            return await self._race(endpoint, stats, primary, hedge, start, hedge_start, discard)
+        finally:
+            if not primary.done():
+                primary.cancel()
+
+    async def _race(
+        self,
+        endpoint: str,
+        stats: Dict[str, int],
+        primary: asyncio.Future,
+        hedge: asyncio.Future,
+        primary_start: float,
+        hedge_start: float,
+        discard: Optional[Callable[[Any], Awaitable[None]]] = None
+    ):
+        """Wait for the first successful attempt and cancel or discard the other"""
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+
+                    if task is hedge:
+                        stats['hedge_wins'] += 1
+                        self.record_latency(endpoint, (time.perf_counter() - hedge_start) * 1000)
+                    else:
+                        stats['primary_wins'] += 1
+                        self.record_latency(endpoint, (time.perf_counter() - primary_start) * 1000)
+
+                    # Both attempts can finish in the same round; release the loser
+                    for other in done - {task}:
+                        if other.exception() is None and discard is not None:
+                            try:
+                                await discard(other.result())
+                            except Exception as e:
+                                logger.warning(f"Failed to discard losing {endpoint} attempt: {e}")
+                    return task.result()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hedging statistics per endpoint"""
+        report = {
+            'enabled': self.enabled,
+            'budget_ratio': self.budget_ratio,
+            'budget_available': round(self._budget, 2),
+            'endpoints': {}
+        }
+        for endpoint, stats in self.stats.items():
+            entry = stats.copy()
+            entry['hedge_rate'] = round(stats['hedges_fired'] / stats['requests'], 3) if stats['requests'] else 0.0
+            entry['hedge_win_rate'] = (
+                round(stats['hedge_wins'] / stats['hedges_fired'], 3) if stats['hedges_fired'] else 0.0
+            )
+            delay_ms = self.hedge_delay_ms(endpoint)
+            entry['hedge_delay_ms'] = round(delay_ms, 1) if delay_ms is not None else None
+            report['endpoints'][endpoint] = entry
+        return report
+
+def _parse_endpoints(value: str) -> Optional[set]:
+    endpoints = {name.strip() for name in value.split(",") if name.strip()}
+    return endpoints or None
+
+# Global request hedger (opt-in)
+request_hedger = RequestHedger(
+    enabled=os.getenv("HEDGING_ENABLED", "false").lower() == "true",
+    endpoints=_parse_endpoints(os.getenv("HEDGING_ENDPOINTS", "chat,chat_stream,stt")),
+    budget_ratio=float(os.getenv("HEDGING_BUDGET_RATIO", "0.05")),
+    percentile=float(os.getenv("HEDGING_PERCENTILE", "0.95")),
+    min_samples=int(os.getenv("HEDGING_MIN_SAMPLES", "20"))
+)
@@ -0,0 +1,232 @@
+"""
+Exact-match response cache for upstream model calls
+Provides LRU + TTL eviction under an entry count and byte budget
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+CacheValue = Union[str, bytes]
+
+def _normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different prompts share a key"""
+    return re.sub(r"\s+", " ", text or "").strip()
+
+def normalize_history(conversation_history: Optional[List[Dict[str, str]]]) -> List[Dict[str, str]]:
+    """
+    Normalize conversation history for fingerprinting
+
+    Only role and content take part in the key; extra fields such as
+    timestamps are dropped.
+
+    Args:
+        conversation_history: Previous conversation messages
+
+    Returns:
+        List of normalized {"role", "content"} messages
+    """
+    if not conversation_history:
+        return []
+    return [
+        {"role": msg.get("role", ""), "content": _normalize_text(msg.get("content", ""))}
+        for msg in conversation_history
+    ]
+
+def make_chat_cache_key(
+    system_prompt: str,
+    conversation_history: Optional[List[Dict[str, str]]],
+    message: str,
+    model: str,
+    temperature: float,
+    max_tokens: int
+) -> str:
+    """
+    Build a stable fingerprint for a chat completion request
+
+    Args:
+        system_prompt: System prompt sent to the model
+        conversation_history: Previous conversation messages
+        message: Current user message
+        model: Model identifier
+        temperature: Sampling temperature
+        max_tokens: Maximum response length
+
+    Returns:
+        Hex SHA-256 digest of the canonical request
+    """
+    payload = {
+        "system": _normalize_text(system_prompt),
+        "history": normalize_history(conversation_history),
+        "message": _normalize_text(message),
+        "model": model,
+        "temperature": round(float(temperature), 3),
+        "max_tokens": int(max_tokens),
+    }
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """In-memory LRU cache with TTL expiry and a byte budget"""
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        max_bytes: int = 16 * 1024 * 1024,
+        ttl_seconds: float = 3600.0,
+        cache_sampled_responses: bool = True,
+        enabled: bool = True
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.cache_sampled_responses = cache_sampled_responses
+        self.enabled = enabled
+
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'skipped_sampled': 0
+        }
+
+    @staticmethod
+    def _sizeof(value: CacheValue) -> int:
+        """Get the payload size of a cached value in bytes"""
+        if isinstance(value, str):
+            return len(value.encode("utf-8"))
+        return len(value)
+
+    def is_cacheable(self, temperature: float) -> bool:
+        """
+        Check whether a request at this temperature may use the cache
+
+        Args:
+            temperature: Sampling temperature of the request
+
+        Returns:
+            True if the response may be served from or stored in the cache
+        """
+        if not self.enabled:
+            return False
+        if temperature > 0 and not self.cache_sampled_responses:
+            self.stats['skipped_sampled'] += 1
+            return False
+        return True
+
+    def get(self, key: str) -> Optional[CacheValue]:
+        """
+        Get a cached value and mark it as recently used
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value, or None on miss or expiry
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+
+            if entry['expires_at'] <= time.time():
+                self._remove(key)
+                self.stats['expirations'] += 1
+                self.stats['misses'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            entry['hits'] += 1
+            self.stats['hits'] += 1
+            return entry['value']
+
+    def set(self, key: str, value: CacheValue, ttl_seconds: Optional[float] = None):
+        """
+        Store a value, evicting least recently used entries to fit
+
+        Args:
+            key: Cache key
+            value: Value to cache (str or bytes)
+            ttl_seconds: Optional per-entry TTL override
+        """
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            logger.debug(f"Skipping cache store: {size} bytes exceeds budget")
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            while self._entries and (
+                len(self._entries) >= self.max_entries or
+                self.current_bytes + size > self.max_bytes
+            ):
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.stats['evictions'] += 1
+
+            self._entries[key] = {
+                'value': value,
+                'size_bytes': size,
+                'expires_at': time.time() + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds),
+                'hits': 0
+            }
+            self.current_bytes += size
+            self.stats['stores'] += 1
+
+    def _remove(self, key: str):
+        """Remove an entry (caller holds the lock)"""
+        entry = self._entries.pop(key)
+        self.current_bytes -= entry['size_bytes']
+
+    def clear(self):
+        """Remove all cached entries"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        lookups = self.stats['hits'] + self.stats['misses']
+        stats = self.stats.copy()
+        stats.update({
+            'enabled': self.enabled,
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'ttl_seconds': self.ttl_seconds,
+            'hit_rate': round(self.stats['hits'] / lookups, 3) if lookups else 0.0
+        })
+        return stats
+
+# Global chat response cache
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "1000")),
+    max_bytes=int(os.getenv("CHAT_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+    ttl_seconds=float(os.getenv("CHAT_CACHE_TTL_SECONDS", "3600")),
+    cache_sampled_responses=os.getenv("CHAT_CACHE_SAMPLED_RESPONSES", "true").lower() == "true",
+    enabled=os.getenv("CHAT_CACHE_ENABLED", "true").lower() == "true"
+)
@@ -0,0 +1,453 @@
+"""
+Local semantic answer cache for history-free chat turns
+Matches paraphrased questions using hashed character n-gram and word vectors
+"""
+
+import os
+import re
+import json
+import time
+import zlib
+import hashlib
+import threading
+from typing import Dict, Any, Optional, Tuple, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+    logger.warning("NumPy not available. Semantic answer cache disabled.")
+
+# Common contractions expanded before hashing so "what's" and "what is" match
+CONTRACTIONS = {
+    "what's": "what is",
+    "whats": "what is",
+    "how's": "how is",
+    "who's": "who is",
+    "where's": "where is",
+    "it's": "it is",
+    "that's": "that is",
+    "you're": "you are",
+    "i'm": "i am",
+    "don't": "do not",
+    "didn't": "did not",
+    "can't": "can not",
+    "cannot": "can not",
+    "won't": "will not",
+    "you've": "you have",
+    "i've": "i have"
+}
+
+# Words that flip a question's meaning without changing most of its n-grams
+NEGATIONS = {"not", "no", "never", "nothing", "nobody", "none", "neither", "nor", "without"}
+
+# Spelled-out numbers mapped to digits so "five years" and "5 years" agree
+NUMBER_WORDS = {
+    "zero": "0", "one": "1", "two": "2", "three": "3", "four": "4", "five": "5",
+    "six": "6", "seven": "7", "eight": "8", "nine": "9", "ten": "10", "eleven": "11",
+    "twelve": "12", "fifteen": "15", "twenty": "20", "thirty": "30", "forty": "40",
+    "fifty": "50", "hundred": "100", "first": "1", "second": "2", "third": "3"
+}
+
+# Function words left out of the word features; they still count in the n-grams
+STOPWORDS = {
+    "a", "an", "the", "be", "do", "does", "did", "you", "your", "yourself", "i", "me",
+    "my", "we", "our", "us", "what", "which", "who", "how", "why", "where", "when",
+    "can", "could", "would", "should", "will", "to", "of", "in", "on", "at", "for",
+    "with", "about", "and", "or", "that", "this", "it", "have", "has", "had"
+}
+
+BE_FORMS = {"is", "are", "am", "was", "were"}
+
+# Bumped whenever vectorize() changes so stale persisted vectors are ignored
+FEATURES_VERSION = 2
+
+def make_context_key(system_prompt: str, model: str, max_tokens: int) -> str:
+    """
+    Fingerprint the generation context an answer was produced under
+
+    Answers are only reused for questions asked under the same persona,
+    model and length limit.
+
+    Args:
+        system_prompt: System prompt sent to the model
+        model: Model identifier
+        max_tokens: Maximum response length
+
+    Returns:
+        Short hex digest identifying the context
+    """
+    raw = f"{model}\x00{int(max_tokens)}\x00{system_prompt}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+class SemanticCache:
+    """
+    In-process semantic cache backed by a NumPy vector matrix
+
+    Each question is embedded as a signed, hashed bag of character n-grams
+    plus weighted content words and word pairs (no model download, no GPU),
+    L2-normalized and stored as one row of a float32 matrix. A lookup is a
+    single matrix-vector product.
+
+    N-gram overlap can't tell "Why should we hire you?" from "Why should
+    we not hire you?", or 5 years from 10, so questions only match others
+    with the same negation and the same numbers.
+
+    The default threshold was calibrated on labelled interview question
+    pairs (see tests/test_semantic_cache.py): hard negatives that pass the
+    guard top out near 0.79, while plain paraphrases score 0.86 and up.
+    """
+
+    def __init__(
+        self,
+        dim: int = 1024,
+        ngram_sizes: Tuple[int, ...] = (3, 4, 5),
+        word_weight: float = 4.0,
+        threshold: float = 0.85,
+        max_entries: int = 10000,
+        persist_path: Optional[str] = None,
+        enabled: bool = True
+    ):
+        self.dim = dim
+        self.ngram_sizes = ngram_sizes
+        self.word_weight = word_weight
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self.enabled = enabled and NUMPY_AVAILABLE
+
+        self._lock = threading.Lock()
+        self._size = 0
+        self._questions: List[str] = []
+        self._answers: List[str] = []
+        self._context_names: List[str] = []
+        self._context_ids: Dict[str, int] = {}
+
+        if NUMPY_AVAILABLE:
+            initial_capacity = min(256, max_entries)
+            self._vectors = np.zeros((initial_capacity, dim), dtype=np.float32)
+            self._entry_contexts = np.full(initial_capacity, -1, dtype=np.int32)
+            self._last_used = np.zeros(initial_capacity, dtype=np.float64)
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'total_lookup_ms': 0.0
+        }
+
+    @staticmethod
+    def _stem(word: str) -> str:
+        """Fold forms of "be", spelled-out numbers and plurals"""
+        if word in BE_FORMS:
+            return "be"
+        if word in NUMBER_WORDS:
+            return NUMBER_WORDS[word]
+        if len(word) > 4 and word.endswith("ies"):
+            return word[:-3] + "y"
+        if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+            return word[:-1]
+        return word
+
+    @classmethod
+    def _tokenize(cls, text: str) -> List[str]:
+        """Lowercase, expand contractions, drop punctuation and stem each word"""
+        words = []
+        for word in text.lower().replace("\u2019", "'").split():
+            word = CONTRACTIONS.get(word, word)
+            for part in re.sub(r"[^\w\s']", " ", word).split():
+                if part.endswith("n't"):
+                    words.extend([part[:-3], "not"])
+                else:
+                    words.append(part.replace("'", ""))
+        return [cls._stem(word) for word in words if word]
+
+    @staticmethod
+    def _guard_key(words: List[str]) -> str:
+        """Negation and numbers a matching question must share"""
+        negated = "not" if any(word in NEGATIONS for word in words) else ""
+        numbers = ",".join(sorted(word for word in words if word.isdigit()))
+        return f"{negated}|{numbers}"
+
+    def _features(self, words: List[str]) -> List[Tuple[str, float]]:
+        padded = " " + " ".join(words) + " "
+        features = [
+            (padded[i:i + n], 1.0)
+            for n in self.ngram_sizes
+            for i in range(len(padded) - n + 1)
+        ]
+        # A differing content word ("strengths" vs "weaknesses") should
+        # weigh more than the shared "what are your" around it
+        content = [word for word in words if word not in STOPWORDS] or words
+        features.extend((f"w:{word}", self.word_weight) for word in content)
+        features.extend(
+            (f"b:{first} {second}", self.word_weight / 2)
+            for first, second in zip(content, content[1:])
+        )
+        return features
+
+    def vectorize(self, text: str) -> "np.ndarray":
+        """
+        Embed text as a unit-length hashed n-gram and word vector
+
+        Args:
+            text: Question text
+
+        Returns:
+            float32 vector of length dim
+        """
+        indices = []
+        weights = []
+        for feature, weight in self._features(self._tokenize(text)):
+            # crc32 is stable across processes, unlike hash(), so
+            # persisted vectors stay valid after a restart
+            h = zlib.crc32(feature.encode("utf-8"))
+            indices.append(h % self.dim)
+            weights.append(weight if h & 0x80000000 else -weight)
+
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if indices:
+            np.add.at(vector, indices, weights)
+            norm = np.linalg.norm(vector)
+            if norm > 0:
+                vector /= norm
+        return vector
+
+    def _scoped_context(self, question: str, context: str) -> str:
+        """Generation context narrowed to questions with the same negation and numbers"""
+        return f"{context}\x00{self._guard_key(self._tokenize(question))}"
+
+    def _context_id(self, context: str) -> int:
+        """Map a context key to a small integer id"""
+        if context not in self._context_ids:
+            self._context_ids[context] = len(self._context_names)
+            self._context_names.append(context)
+        return self._context_ids[context]
+
+    def _grow(self):
+        """Double matrix capacity up to max_entries (caller holds the lock)"""
+        capacity = self._vectors.shape[0]
+        new_capacity = min(capacity * 2, self.max_entries)
+        vectors = np.zeros((new_capacity, self.dim), dtype=np.float32)
+        vectors[:capacity] = self._vectors
+        contexts = np.full(new_capacity, -1, dtype=np.int32)
+        contexts[:capacity] = self._entry_contexts
+        last_used = np.zeros(new_capacity, dtype=np.float64)
+        last_used[:capacity] = self._last_used
+        self._vectors, self._entry_contexts, self._last_used = vectors, contexts, last_used
+
+    def lookup(self, question: str, context: str) -> Optional[Tuple[str, float]]:
+        """
+        Find a cached answer for a semantically similar question
+
+        Args:
+            question: User question
+            context: Context key from make_context_key
+
+        Returns:
+            Tuple of (answer, similarity), or None if nothing passes the threshold
+        """
+        if not self.enabled:
+            return None
+
+        start = time.perf_counter()
+        query = self.vectorize(question)
+        context = self._scoped_context(question, context)
+
+        with self._lock:
+            context_id = self._context_ids.get(context)
+            result = None
+            if context_id is not None and self._size:
+                similarities = self._vectors[:self._size] @ query
+                similarities[self._entry_contexts[:self._size] != context_id] = -1.0
+                best = int(np.argmax(similarities))
+                best_score = float(similarities[best])
+                if best_score >= self.threshold:
+                    self._last_used[best] = time.time()
+                    result = (self._answers[best], best_score)
+
+            self.stats['total_lookup_ms'] += (time.perf_counter() - start) * 1000
+            if result is None:
+                self.stats['misses'] += 1
+            else:
+                self.stats['hits'] += 1
+        return result
+
+    def add(self, question: str, answer: str, context: str):
+        """
+        Store an answer for a question, evicting the least recently used row when full
+
+        Args:
+            question: User question
+            answer: Generated answer
+            context: Context key from make_context_key
+        """
+        if not self.enabled or not answer:
+            return
+
+        vector = self.vectorize(question)
+        context = self._scoped_context(question, context)
+
+        with self._lock:
+            if self._size < self._vectors.shape[0]:
+                row = self._size
+                self._size += 1
+                self._questions.append(question)
+                self._answers.append(answer)
+            elif self._size < self.max_entries:
+                self._grow()
+                row = self._size
+                self._size += 1
+                self._questions.append(question)
+                self._answers.append(answer)
+            else:
+                row = int(np.argmin(self._last_used[:self._size]))
+                self._questions[row] = question
+                self._answers[row] = answer
+                self.stats['evictions'] += 1
+
+            self._vectors[row] = vector
+            self._entry_contexts[row] = self._context_id(context)
+            self._last_used[row] = time.time()
+            self.stats['stores'] += 1
+
+    def save(self, path: Optional[str] = None) -> bool:
+        """
+        Persist the index to disk atomically
+
+        Args:
+            path: Target .npz path (defaults to persist_path)
+
+        Returns:
+            True if the index was written
+        """
+        path = path or self.persist_path
+        if not path or not NUMPY_AVAILABLE:
+            return False
+
+        try:
+            with self._lock:
+                metadata = json.dumps({
+                    'dim': self.dim,
+                    'ngram_sizes': list(self.ngram_sizes),
+                    'word_weight': self.word_weight,
+                    'features_version': FEATURES_VERSION,
+                    'questions': self._questions,
+                    'answers': self._answers,
+                    'contexts': self._context_names
+                })
+                directory = os.path.dirname(os.path.abspath(path))
+                os.makedirs(directory, exist_ok=True)
+                temp_path = f"{path}.tmp"
+                with open(temp_path, "wb") as f:
+                    np.savez_compressed(
+                        f,
+                        vectors=self._vectors[:self._size],
+                        entry_contexts=self._entry_contexts[:self._size],
+                        last_used=self._last_used[:self._size],
+                        metadata=np.array(metadata)
+                    )
+                os.replace(temp_path, path)
+            logger.info(f"Saved semantic cache with {self._size} entries to {path}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save semantic cache: {e}")
+            return False
+
+    def load(self, path: Optional[str] = None) -> bool:
+        """
+        Load a previously saved index from disk
+
+        Args:
+            path: Source .npz path (defaults to persist_path)
+
+        Returns:
+            True if an index was loaded
+        """
+        path = path or self.persist_path
+        if not path or not NUMPY_AVAILABLE or not os.path.exists(path):
+            return False
+
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                metadata = json.loads(str(data['metadata']))
+                if (metadata['dim'] != self.dim or
+                        tuple(metadata['ngram_sizes']) != tuple(self.ngram_sizes) or
+                        metadata.get('word_weight') != self.word_weight or
+                        metadata.get('features_version') != FEATURES_VERSION):
+                    logger.warning("Semantic cache on disk uses different vector settings, ignoring it")
+                    return False
+
+                vectors = data['vectors']
+                entry_contexts = data['entry_contexts']
+                last_used = data['last_used']
+
+            size = min(len(vectors), self.max_entries)
+            capacity = max(size, min(256, self.max_entries))
+            with self._lock:
+                self._vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+                self._vectors[:size] = vectors[:size]
+                self._entry_contexts = np.full(capacity, -1, dtype=np.int32)
+                self._entry_contexts[:size] = entry_contexts[:size]
+                self._last_used = np.zeros(capacity, dtype=np.float64)
+                self._last_used[:size] = last_used[:size]
+                self._questions = metadata['questions'][:size]
+                self._answers = metadata['answers'][:size]
+                self._context_names = metadata['contexts']
+                self._context_ids = {name: i for i, name in enumerate(self._context_names)}
+                self._size = size
+
+            logger.info(f"Loaded semantic cache with {size} entries from {path}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to load semantic cache: {e}")
+            return False
+
+    def clear(self):
+        """Remove all cached entries"""
+        with self._lock:
+            self._size = 0
+            self._questions = []
+            self._answers = []
+            self._context_names = []
+            self._context_ids = {}
+            if NUMPY_AVAILABLE:
+                self._entry_contexts[:] = -1
+
+    def __len__(self) -> int:
+        return self._size
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            'enabled': self.enabled,
+            'entries': self._size,
+            'max_entries': self.max_entries,
+            'threshold': self.threshold,
+            'hits': self.stats['hits'],
+            'misses': self.stats['misses'],
+            'stores': self.stats['stores'],
+            'evictions': self.stats['evictions'],
+            'hit_rate': round(self.stats['hits'] / lookups, 3) if lookups else 0.0,
+            'avg_lookup_ms': round(self.stats['total_lookup_ms'] / lookups, 3) if lookups else 0.0,
+            'persist_path': self.persist_path
+        }
+
+# Global semantic answer cache; off unless SEMANTIC_CACHE_ENABLED=true, since
+# a wrong match serves a confidently wrong answer
+semantic_cache = SemanticCache(
+    dim=int(os.getenv("SEMANTIC_CACHE_DIM", "1024")),
+    word_weight=float(os.getenv("SEMANTIC_CACHE_WORD_WEIGHT", "4.0")),
+    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.85")),
+    max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "10000")),
+    persist_path=os.getenv("SEMANTIC_CACHE_PATH") or None,
+    enabled=os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+)
+semantic_cache.load()
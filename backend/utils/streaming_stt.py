@@ -0,0 +1,339 @@
+"""
+Streaming speech-to-text
+Buffers PCM frames from a live recording, cuts segments at pauses and
+transcribes each one while the user is still speaking
+"""
+
+import os
+import time
+import wave
+import asyncio
+from io import BytesIO
+from collections import deque
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+import logging
+
+from utils.audio_processor import audio_processor, NUMPY_AVAILABLE
+
+logger = logging.getLogger(__name__)
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+SegmentTranscriber = Callable[[bytes], Awaitable[str]]
+PartialCallback = Callable[[int, str], Awaitable[None]]
+
+class StreamingSTTSession:
+    """
+    One recording's worth of streamed audio
+
+    Frames are 16-bit little-endian mono PCM. Each analysis frame is
+    classified as speech when its energy clears an adaptive noise floor
+    (the same margin and minimum as the upload VAD). A pause after speech
+    closes a segment, which is transcribed in the background; results are
+    reported in segment order even when later segments finish first.
+    """
+
+    def __init__(
+        self,
+        transcribe: SegmentTranscriber,
+        on_partial: Optional[PartialCallback] = None,
+        sample_rate: int = 16000,
+        pause_ms: float = 500.0,
+        max_segment_seconds: float = 15.0,
+        min_speech_ms: float = 200.0,
+        lead_in_ms: float = 200.0,
+        stats: Optional[Dict[str, Any]] = None
+    ):
+        self.transcribe = transcribe
+        self.on_partial = on_partial
+        self.sample_rate = sample_rate
+        self.frame_samples = max(1, int(sample_rate * audio_processor.vad_frame_ms / 1000))
+        self.frame_bytes = self.frame_samples * 2
+
+        frame_ms = audio_processor.vad_frame_ms
+        self.pause_frames = max(1, int(pause_ms / frame_ms))
+        self.max_segment_frames = max(self.pause_frames * 2, int(max_segment_seconds * 1000 / frame_ms))
+        self.min_speech_frames = max(1, int(min_speech_ms / frame_ms))
+        self.lead_in_frames = int(lead_in_ms / frame_ms)
+
+        self._partial_frame = b""
+        self._frames: List[bytes] = []
+        self._energies: List[float] = []
+        self._is_speech_frame: List[bool] = []
+        # Recent frame energies, about three seconds, for the noise floor estimate
+        self._history = deque(maxlen=max(50, int(3000 / frame_ms)))
+        self._speech_frames = 0
+        self._silence_run = 0
+
+        self._texts: List[str] = []
+        self._last_task: Optional[asyncio.Task] = None
+        self._tasks: List[asyncio.Task] = []
+        self.audio_seconds = 0.0
+        self.closed = False
+        self.released = False
+        self.stats = stats if stats is not None else {}
+
+    @property
+    def segments(self) -> int:
+        return len(self._texts)
+
+    def _is_speech(self, energy_db: float) -> bool:
+        """Classify a frame against the recent noise floor and loudness"""
+        self._history.append(energy_db)
+        noise_floor, peak = np.percentile(self._history, [10, 95])
+        margin = audio_processor.vad_margin_db
+        # As in the upload VAD, continuous speech has no real noise floor, so
+        # the threshold is capped below the loud frames; half the margin above
+        # the floor still keeps steady background noise out
+        threshold = max(min(noise_floor + margin, peak - margin), noise_floor + margin / 2,
+                        audio_processor.vad_min_energy_db)
+        return energy_db > threshold
+
+    def feed(self, pcm: bytes) -> int:
+        """
+        Add recorded audio, starting transcription of any completed segments
+
+        Must be called from the event loop.
+
+        Args:
+            pcm: 16-bit little-endian mono PCM at the session sample rate
+
+        Returns:
+            Number of segments started by this call
+        """
+        if self.closed:
+            raise RuntimeError("Streaming session is closed")
+
+        data = self._partial_frame + pcm
+        usable = len(data) - len(data) % self.frame_bytes
+        self._partial_frame = data[usable:]
+        if not usable:
+            return 0
+
+        started = 0
+        samples = np.frombuffer(data[:usable], dtype="<i2").astype(np.float32) / 32768.0
+        frames = samples.reshape(-1, self.frame_samples)
+        energies = 20 * np.log10(np.sqrt(np.mean(frames ** 2, axis=1)) + 1e-10)
+        self.audio_seconds += len(samples) / self.sample_rate
+
+        for index, energy in enumerate(energies):
+            self._frames.append(data[index * self.frame_bytes:(index + 1) * self.frame_bytes])
+            self._energies.append(float(energy))
+            speech = self._is_speech(float(energy))
+            self._is_speech_frame.append(speech)
+            if speech:
+                self._speech_frames += 1
+                self._silence_run = 0
+            else:
+                self._silence_run += 1
+
+            if self._speech_frames == 0:
+                # Nothing said yet: keep only a short lead-in so onsets aren't clipped
+                excess = len(self._frames) - self.lead_in_frames
+                if excess > 0:
+                    self._drop(excess)
+            elif self._silence_run >= self.pause_frames:
+                # Keep half the pause as trailing context
+                started += self._cut(len(self._frames) - self._silence_run // 2)
+            elif len(self._frames) >= self.max_segment_frames:
+                # No pause for too long: cut at the quietest frame in the last third
+                search_start = len(self._frames) * 2 // 3
+                quietest = search_start + int(np.argmin(self._energies[search_start:]))
+                self.stats['forced_cuts'] = self.stats.get('forced_cuts', 0) + 1
+                started += self._cut(quietest + 1)
+        return started
+
+    def _drop(self, count: int):
+        """Remove the oldest buffered frames"""
+        del self._frames[:count]
+        del self._energies[:count]
+        del self._is_speech_frame[:count]
+
+    def _cut(self, end_frame: int) -> int:
+        """Close the segment at end_frame, transcribing it if it holds enough speech"""
+        segment = self._frames[:end_frame]
+        enough_speech = sum(self._is_speech_frame[:end_frame]) >= self.min_speech_frames
+        self._drop(end_frame)
+
+        # Frames after the cut start the next segment
+        self._speech_frames = sum(self._is_speech_frame)
+        self._silence_run = 0
+        for speech in reversed(self._is_speech_frame):
+            if speech:
+                break
+            self._silence_run += 1
+        if not enough_speech:
+            return 0
+        self._start_segment(b"".join(segment))
+        return 1
+
+    def _encode(self, pcm: bytes) -> bytes:
+        output = BytesIO()
+        with wave.open(output, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(self.sample_rate)
+            wav.writeframes(pcm)
+        return output.getvalue()
+
+    def _start_segment(self, pcm: bytes):
+        index = len(self._texts)
+        self._texts.append("")
+        task = asyncio.ensure_future(self._transcribe_segment(index, self._encode(pcm), self._last_task))
+        self._last_task = task
+        self._tasks.append(task)
+        self.stats['segments'] = self.stats.get('segments', 0) + 1
+
+    async def _transcribe_segment(self, index: int, audio_data: bytes, previous: Optional[asyncio.Task]):
+        """Transcribe a segment, then report it once every earlier segment has been reported"""
+        try:
+            text = (await self.transcribe(audio_data)).strip()
+        except Exception as e:
+            logger.warning(f"Streaming segment {index} transcription failed: {e}")
+            self.stats['segment_errors'] = self.stats.get('segment_errors', 0) + 1
+            text = ""
+
+        if previous is not None:
+            await asyncio.shield(previous)
+        self._texts[index] = text
+        if text and self.on_partial is not None:
+            self.stats['partials'] = self.stats.get('partials', 0) + 1
+            await self.on_partial(index, text)
+
+    @property
+    def transcript(self) -> str:
+        """Text of the segments reported so far"""
+        return " ".join(text for text in self._texts if text)
+
+    async def finish(self) -> str:
+        """
+        Transcribe whatever is still buffered and wait for every segment
+
+        Returns:
+            Full transcript of the recording
+        """
+        if not self.closed:
+            self.closed = True
+            if self._speech_frames:
+                self._cut(len(self._frames))
+        if self._last_task is not None:
+            await asyncio.shield(self._last_task)
+        return self.transcript
+
+    def cancel(self):
+        """Abandon the recording and any transcriptions in flight"""
+        self.closed = True
+        for task in self._tasks:
+            task.cancel()
+
+class StreamingSTT:
+    """Creates streaming sessions with shared settings and statistics"""
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        pause_ms: float = 500.0,
+        max_segment_seconds: float = 15.0,
+        min_speech_ms: float = 200.0,
+        allowed_sample_rates: tuple = (8000, 16000, 24000, 44100, 48000)
+    ):
+        self.enabled = enabled and NUMPY_AVAILABLE
+        self.pause_ms = pause_ms
+        self.max_segment_seconds = max_segment_seconds
+        self.min_speech_ms = min_speech_ms
+        self.allowed_sample_rates = allowed_sample_rates
+
+        self.stats = {
+            'sessions': 0,
+            'active_sessions': 0,
+            'segments': 0,
+            'forced_cuts': 0,
+            'partials': 0,
+            'segment_errors': 0,
+            'audio_seconds': 0.0,
+            'finalize_ms_total': 0.0,
+            'finalized': 0
+        }
+
+    def create_session(
+        self,
+        transcribe: SegmentTranscriber,
+        on_partial: Optional[PartialCallback] = None,
+        sample_rate: int = 16000
+    ) -> StreamingSTTSession:
+        """
+        Start a streaming session for one recording
+
+        Args:
+            transcribe: Transcribes one WAV segment
+            on_partial: Called with (segment index, text) in segment order
+            sample_rate: Sample rate of the PCM the client will send
+
+        Returns:
+            New session
+        """
+        if not self.enabled:
+            raise RuntimeError("Streaming STT is not available")
+        if sample_rate not in self.allowed_sample_rates:
+            raise ValueError(f"Unsupported sample rate: {sample_rate}. Supported: {list(self.allowed_sample_rates)}")
+
+        self.stats['sessions'] += 1
+        self.stats['active_sessions'] += 1
+        return StreamingSTTSession(
+            transcribe,
+            on_partial,
+            sample_rate=sample_rate,
+            pause_ms=self.pause_ms,
+            max_segment_seconds=self.max_segment_seconds,
+            min_speech_ms=self.min_speech_ms,
+            stats=self.stats
+        )
+
+    async def finish(self, session: StreamingSTTSession) -> str:
+        """
+        Finish a session, recording how long the final transcript took after recording stopped
+
+        Args:
+            session: Session created by create_session
+
+        Returns:
+            Full transcript
+        """
+        start = time.perf_counter()
+        try:
+            return await session.finish()
+        finally:
+            self.stats['finalize_ms_total'] += (time.perf_counter() - start) * 1000
+            self.stats['finalized'] += 1
+            self.release(session)
+
+    def release(self, session: StreamingSTTSession):
+        """Account for a finished or abandoned session"""
+        if session.released:
+            return
+        session.released = True
+        session.cancel()
+        self.stats['active_sessions'] -= 1
+        self.stats['audio_seconds'] += session.audio_seconds
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get streaming transcription statistics"""
+        stats = self.stats.copy()
+        finalized = stats.pop('finalized')
+        stats.pop('finalize_ms_total')
+        stats.update({
+            'enabled': self.enabled,
+            'pause_ms': self.pause_ms,
+            'audio_seconds': round(self.stats['audio_seconds'], 1),
+            'avg_finalize_ms': round(self.stats['finalize_ms_total'] / finalized, 1) if finalized else 0.0
+        })
+        return stats
+
+# Global streaming STT settings
+streaming_stt = StreamingSTT(
+    enabled=os.getenv("STT_STREAMING_ENABLED", "true").lower() == "true",
+    pause_ms=float(os.getenv("STT_STREAMING_PAUSE_MS", "500")),
+    max_segment_seconds=float(os.getenv("STT_STREAMING_MAX_SEGMENT_SECONDS", "15")),
+    min_speech_ms=float(os.getenv("STT_STREAMING_MIN_SPEECH_MS", "200"))
+)
@@ -0,0 +1,286 @@
+"""
+Whisper micro-batching
+Packs short clips that arrive together into one upstream request and splits
+the timestamped segments back to each caller
+"""
+
+import os
+import wave
+import asyncio
+from io import BytesIO
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+import logging
+
+from utils.audio_processor import audio_processor, NUMPY_AVAILABLE
+from utils.audio_transcoder import audio_transcoder, resample, TARGET_SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+SegmentTranscriber = Callable[[bytes], Awaitable[List[Dict[str, Any]]]]
+
+@dataclass
+class _PendingClip:
+    """A clip waiting for its batch to be sent"""
+    samples: "np.ndarray"
+    transcribe_single: Callable[[], Awaitable[str]]
+    future: asyncio.Future
+    start_seconds: float = 0.0
+    end_seconds: float = 0.0
+
+@dataclass
+class _PendingBatch:
+    """Clips collected for one language during the batching window"""
+    transcribe_segments: SegmentTranscriber
+    clips: List[_PendingClip] = field(default_factory=list)
+    seconds: float = 0.0
+    timer: Optional[asyncio.TimerHandle] = None
+
+def assign_segments(
+    segments: List[Dict[str, Any]],
+    spans: List[tuple],
+    tolerance_seconds: float = 0.1
+) -> tuple:
+    """
+    Map batch segments back to the clips they came from
+
+    A segment belongs to the one clip it overlaps by more than the
+    tolerance. Segments inside a silence separator are dropped. A segment
+    that overlaps two clips makes both ambiguous, and so does a clip that
+    gets no segment at all.
+
+    Args:
+        segments: Whisper segments with start, end and text
+        spans: (start_seconds, end_seconds) of each clip in the batch
+        tolerance_seconds: Overlap below which a segment doesn't count for a clip
+
+    Returns:
+        Tuple of (text per clip, set of ambiguous clip indexes)
+    """
+    texts: List[List[str]] = [[] for _ in spans]
+    ambiguous = set()
+
+    for segment in segments:
+        owners = [
+            index for index, (start, end) in enumerate(spans)
+            if min(end, segment["end"]) - max(start, segment["start"]) > tolerance_seconds
+        ]
+        if len(owners) == 1:
+            if segment["text"]:
+                texts[owners[0]].append(segment["text"])
+        elif len(owners) > 1:
+            ambiguous.update(owners)
+
+    for index, parts in enumerate(texts):
+        if not parts:
+            ambiguous.add(index)
+    return [" ".join(parts) for parts in texts], ambiguous
+
+class STTBatcher:
+    """
+    Collects short clips for a few milliseconds and sends them as one request
+
+    Under a requests-per-minute cap this trades a small delay for several
+    transcriptions per request. Clips are joined at 16 kHz with silence in
+    between so Whisper closes a segment at every boundary.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        window_ms: float = 50.0,
+        max_batch_size: int = 8,
+        max_clip_seconds: float = 5.0,
+        max_batch_seconds: float = 60.0,
+        separator_seconds: float = 1.5
+    ):
+        self.enabled = enabled and NUMPY_AVAILABLE
+        self.window_ms = window_ms
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_clip_seconds = max_clip_seconds
+        self.max_batch_seconds = max_batch_seconds
+        self.separator_seconds = separator_seconds
+
+        self._pending: Dict[Any, _PendingBatch] = {}
+        self._running: set = set()
+
+        self.stats = {
+            'clips_submitted': 0,
+            'clips_ineligible': 0,
+            'clips_batched': 0,
+            'batches': 0,
+            'single_clip_batches': 0,
+            'ambiguous_fallbacks': 0,
+            'batch_failures': 0,
+            'requests_saved': 0
+        }
+
+    async def _decode(self, audio_data: bytes, format: str) -> Optional["np.ndarray"]:
+        """Decode a clip to 16 kHz mono samples, or None if it can't be batched"""
+        if format.lower().lstrip('.') != "wav":
+            # Browser recordings are WebM/Opus; ffmpeg decodes them when available
+            audio_data = await audio_transcoder.decode_to_wav(audio_data, format)
+            if audio_data is None:
+                return None
+        return await asyncio.to_thread(self._decode_pcm, audio_data)
+
+    def _decode_pcm(self, audio_data: bytes) -> Optional["np.ndarray"]:
+        pcm = audio_processor.decode_pcm(audio_data)
+        if pcm is None or pcm.sample_rate <= 0:
+            return None
+        if len(pcm.samples) / pcm.sample_rate > self.max_clip_seconds:
+            return None
+        return resample(pcm.samples, pcm.sample_rate, TARGET_SAMPLE_RATE)
+
+    async def submit(
+        self,
+        audio_data: bytes,
+        format: str,
+        group: Any,
+        transcribe_single: Callable[[], Awaitable[str]],
+        transcribe_segments: SegmentTranscriber
+    ) -> str:
+        """
+        Transcribe a clip, batching it with others that arrive in the window
+
+        Args:
+            audio_data: Encoded clip
+            format: Audio format (file extension)
+            group: Clips are only batched with others of the same group (e.g. language)
+            transcribe_single: Transcribes this clip on its own
+            transcribe_segments: Transcribes a batch WAV into timestamped segments
+
+        Returns:
+            Transcribed text
+        """
+        self.stats['clips_submitted'] += 1
+        samples = None
+        if self.enabled:
+            samples = await self._decode(audio_data, format)
+        if samples is None:
+            self.stats['clips_ineligible'] += 1
+            return await transcribe_single()
+
+        loop = asyncio.get_running_loop()
+        clip = _PendingClip(samples, transcribe_single, loop.create_future())
+        clip_seconds = len(samples) / TARGET_SAMPLE_RATE
+
+        batch = self._pending.get(group)
+        if batch is not None and batch.seconds + clip_seconds > self.max_batch_seconds:
+            self._flush(group)
+            batch = None
+        if batch is None:
+            batch = _PendingBatch(transcribe_segments)
+            batch.timer = loop.call_later(self.window_ms / 1000, self._flush, group)
+            self._pending[group] = batch
+
+        batch.clips.append(clip)
+        batch.seconds += clip_seconds + self.separator_seconds
+        if len(batch.clips) >= self.max_batch_size:
+            self._flush(group)
+
+        return await clip.future
+
+    def _flush(self, group: Any):
+        """Send the pending batch for a group"""
+        batch = self._pending.pop(group, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        task = asyncio.ensure_future(self._run_batch(batch))
+        # Keep a reference so the task isn't garbage collected mid-flight
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    def _encode(self, clips: List[_PendingClip]) -> bytes:
+        """Join clips with silence separators into one 16 kHz mono WAV, recording each clip's span"""
+        separator = np.zeros(int(self.separator_seconds * TARGET_SAMPLE_RATE), dtype=np.float32)
+        pieces = []
+        position = 0
+        for clip in clips:
+            pieces.extend([separator, clip.samples])
+            position += len(separator)
+            clip.start_seconds = position / TARGET_SAMPLE_RATE
+            position += len(clip.samples)
+            clip.end_seconds = position / TARGET_SAMPLE_RATE
+        pieces.append(separator)
+
+        output = BytesIO()
+        with wave.open(output, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(TARGET_SAMPLE_RATE)
+            wav.writeframes((np.clip(np.concatenate(pieces), -1.0, 1.0) * 32767).astype("<i2").tobytes())
+        return output.getvalue()
+
+    async def _run_batch(self, batch: _PendingBatch):
+        """Transcribe a batch and resolve each clip's future"""
+        clips = batch.clips
+        if len(clips) == 1:
+            self.stats['single_clip_batches'] += 1
+            await self._run_single(clips[0])
+            return
+
+        self.stats['batches'] += 1
+        self.stats['clips_batched'] += len(clips)
+        try:
+            batch_audio = await asyncio.to_thread(self._encode, clips)
+            segments = await batch.transcribe_segments(batch_audio)
+        except Exception as e:
+            logger.warning(f"Batched transcription of {len(clips)} clips failed, retrying individually: {e}")
+            self.stats['batch_failures'] += 1
+            await asyncio.gather(*[self._run_single(clip) for clip in clips])
+            return
+
+        texts, ambiguous = assign_segments(segments, [(clip.start_seconds, clip.end_seconds) for clip in clips])
+        self.stats['requests_saved'] += len(clips) - 1 - len(ambiguous)
+        self.stats['ambiguous_fallbacks'] += len(ambiguous)
+
+        retries = []
+        for index, clip in enumerate(clips):
+            if index in ambiguous:
+                retries.append(self._run_single(clip))
+            elif not clip.future.done():
+                clip.future.set_result(texts[index])
+        if retries:
+            await asyncio.gather(*retries)
+
+    async def _run_single(self, clip: _PendingClip):
+        """Transcribe one clip on its own and resolve its future"""
+        try:
+            result = await clip.transcribe_single()
+        except Exception as e:
+            if not clip.future.done():
+                clip.future.set_exception(e)
+            return
+        if not clip.future.done():
+            clip.future.set_result(result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get batching statistics"""
+        stats = self.stats.copy()
+        stats.update({
+            'enabled': self.enabled,
+            'window_ms': self.window_ms,
+            'max_batch_size': self.max_batch_size,
+            'pending_batches': len(self._pending),
+            'avg_batch_size': (
+                round(self.stats['clips_batched'] / self.stats['batches'], 2)
+                if self.stats['batches'] else 0.0
+            )
+        })
+        return stats
+
+# Global STT micro-batcher (opt-in)
+stt_batcher = STTBatcher(
+    enabled=os.getenv("STT_BATCHING_ENABLED", "false").lower() == "true",
+    window_ms=float(os.getenv("STT_BATCH_WINDOW_MS", "50")),
+    max_batch_size=int(os.getenv("STT_BATCH_MAX_CLIPS", "8")),
+    max_clip_seconds=float(os.getenv("STT_BATCH_MAX_CLIP_SECONDS", "5")),
+    max_batch_seconds=float(os.getenv("STT_BATCH_MAX_SECONDS", "60")),
+    separator_seconds=float(os.getenv("STT_BATCH_SEPARATOR_SECONDS", "1.5"))
+)
@@ -0,0 +1,128 @@
+"""
+Content-addressed cache for speech-to-text results
+Serves byte-identical audio from memory, then disk, before calling Whisper
+"""
+
+import os
+import asyncio
+from typing import Dict, Any, Optional
+import logging
+
+from utils.response_cache import ResponseCache
+from utils.disk_cache import DiskCache
+from utils.request_coalescer import fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Audio above this size is hashed in a worker thread (hashlib releases the GIL)
+HASH_IN_THREAD_BYTES = 1024 * 1024
+
+async def audio_cache_key(audio_data: bytes, format: str, language: Optional[str], model: str) -> str:
+    """
+    Hash audio bytes together with everything that changes the transcript
+
+    Args:
+        audio_data: Raw uploaded audio
+        format: Audio format (file extension)
+        language: Requested language code
+        model: Whisper model that will transcribe it
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    parts = (audio_data, format.lower().lstrip('.'), language or "", model)
+    if len(audio_data) > HASH_IN_THREAD_BYTES:
+        return await asyncio.to_thread(fingerprint, *parts)
+    return fingerprint(*parts)
+
+class STTCache:
+    """Two-tier transcript cache: an in-memory LRU backed by an optional disk tier"""
+
+    def __init__(self, memory: ResponseCache, disk: Optional[DiskCache] = None):
+        self.memory = memory
+        self.disk = disk
+
+        self.stats = {
+            'lookups': 0,
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.memory.enabled
+
+    async def get(self, key: str) -> Optional[str]:
+        """
+        Look up a transcript, promoting disk hits into memory
+
+        Args:
+            key: Audio cache key
+
+        Returns:
+            Cached transcript, or None on miss
+        """
+        if not self.enabled:
+            return None
+        self.stats['lookups'] += 1
+
+        text = self.memory.get(key)
+        if text is not None:
+            self.stats['memory_hits'] += 1
+            return text
+
+        if self.disk is not None and self.disk.enabled:
+            value = await asyncio.to_thread(self.disk.get, key)
+            if value is not None:
+                text = value.decode("utf-8")
+                self.memory.set(key, text)
+                self.stats['disk_hits'] += 1
+                return text
+
+        self.stats['misses'] += 1
+        return None
+
+    async def set(self, key: str, text: str):
+        """
+        Store a transcript in both tiers
+
+        Args:
+            key: Audio cache key
+            text: Transcript to cache
+        """
+        if not self.enabled:
+            return
+        self.memory.set(key, text)
+        if self.disk is not None and self.disk.enabled:
+            await asyncio.to_thread(self.disk.set, key, text.encode("utf-8"))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit ratios across both tiers"""
+        lookups = self.stats['lookups']
+        hits = self.stats['memory_hits'] + self.stats['disk_hits']
+        stats = self.stats.copy()
+        stats.update({
+            'enabled': self.enabled,
+            'hit_ratio': round(hits / lookups, 3) if lookups else 0.0,
+            'memory_hit_ratio': round(self.stats['memory_hits'] / lookups, 3) if lookups else 0.0,
+            'disk_hit_ratio': round(self.stats['disk_hits'] / lookups, 3) if lookups else 0.0,
+            'memory': self.memory.get_stats(),
+            'disk': self.disk.get_stats() if self.disk is not None else None
+        })
+        return stats
+
+# Global STT transcript cache; the disk tier is enabled by setting STT_CACHE_DIR
+stt_cache = STTCache(
+    memory=ResponseCache(
+        max_entries=int(os.getenv("STT_CACHE_MAX_ENTRIES", "2000")),
+        max_bytes=int(os.getenv("STT_CACHE_MAX_BYTES", str(4 * 1024 * 1024))),
+        ttl_seconds=float(os.getenv("STT_CACHE_TTL_SECONDS", "86400")),
+        enabled=os.getenv("STT_CACHE_ENABLED", "true").lower() == "true"
+    ),
+    disk=DiskCache(
+        directory=os.getenv("STT_CACHE_DIR", ""),
+        max_bytes=int(os.getenv("STT_CACHE_DISK_MAX_BYTES", str(64 * 1024 * 1024))),
+        ttl_seconds=float(os.getenv("STT_CACHE_DISK_TTL_SECONDS", str(7 * 24 * 3600)))
+    )
+)
@@ -3,8 +3,15 @@ Groq Speech-to-Text Provider
 Simplified STT provider using only Groq Whisper
 """
 
+import asyncio
 from typing import Optional, Dict, Any
 from models.groq_stt import groq_stt
+from utils.request_coalescer import request_coalescer
+from utils.stt_cache import stt_cache, audio_cache_key
+from utils.audio_processor import audio_processor, AudioMetadata, AudioValidationError
+from utils.audio_transcoder import audio_transcoder
+from utils.stt_batcher import stt_batcher
+from utils.whisper_router import whisper_router, WhisperSelection
 
 class STTProvider:
     """Unified STT provider with multiple backends"""
@@ -64,7 +71,9 @@ class STTProvider:
         self,
         audio_data: bytes,
         format: str = "wav",
-        language: Optional[str] = None
+        language: Optional[str] = None,
+        model: Optional[str] = None,
+        metadata: Optional[AudioMetadata] = None
     ) -> str:
         """
         Transcribe audio data using current provider with fallback
@@ -73,10 +82,115 @@ class STTProvider:
             audio_data: Audio data as bytes
             format: Audio format
             language: Language code
+            model: Whisper model from select_model(); selected from the language if omitted
+            metadata: Result of audio_processor.sniff_audio, if the caller already sniffed
             
         Returns:
-            Transcribed text
+            Transcribed text (empty if the audio contains no speech or is too short)
+
+        Raises:
+            AudioValidationError: If the audio is corrupted, unrecognized or too long
         """
+        provider = self.providers[self.current_provider]
+
+        # Reject bad uploads from their headers before they cost an upstream round-trip
+        if metadata is None:
+            metadata = audio_processor.sniff_audio(audio_data, format)
+        if not metadata.valid:
+            raise AudioValidationError(metadata.error)
+        limit = audio_processor.check_duration(metadata)
+        if limit == "too_long":
+            raise AudioValidationError(
+                f"Audio is {metadata.duration_seconds:.0f}s long; the limit is "
+                f"{audio_processor.max_audio_seconds:.0f}s. Use /api/voice/transcribe-long for long recordings"
+            )
+        if limit == "too_short":
+            print(f"🔇 Audio is only {metadata.duration_seconds:.2f}s long, skipping STT")
+            return ""
+        # Trust the container over a wrong file extension
+        format = metadata.format or format
+
+        model = model or self.select_model(language).model
+
+        # Byte-identical audio (retries, duplicate uploads, fixtures) is served
+        # from the transcript cache
+        key = await audio_cache_key(audio_data, format, language, f"{self.current_provider}:{model}")
+        cached = await stt_cache.get(key)
+        if cached is not None:
+            return cached
+
+        # Identical uploads in flight at the same time share one transcription
+        result = await request_coalescer.run(
+            "stt",
+            key,
+            lambda: self._prepare_and_transcribe(audio_data, format, language, model)
+        )
+        # Mock transcripts from an unconfigured provider must not outlive the misconfiguration
+        if provider.is_configured:
+            await stt_cache.set(key, result)
+        return result
+
+    async def _prepare_and_transcribe(
+        self,
+        audio_data: bytes,
+        format: str,
+        language: Optional[str],
+        model: str
+    ) -> str:
+        """Trim silence and normalize the audio, then transcribe it"""
+        # Silence costs Whisper latency and audio-seconds quota, so trim it first
+        if audio_processor.vad_enabled:
+            if format.lower().lstrip('.') != "wav":
+                # Browser recordings are WebM/Opus; VAD needs the PCM samples
+                decoded = await audio_transcoder.decode_to_wav(audio_data, format)
+                if decoded is not None:
+                    audio_data, format = decoded, "wav"
+            vad = await asyncio.to_thread(audio_processor.trim_silence, audio_data, format)
+            if not vad.speech_detected:
+                print(f"🔇 No speech detected in {vad.original_seconds:.1f}s of audio, skipping STT")
+                return ""
+            audio_data = vad.audio_data
+
+        # Short clips arriving together share one upstream request when batching is on
+        if stt_batcher.enabled:
+            return await stt_batcher.submit(
+                audio_data,
+                format,
+                (self.current_provider, language, model),
+                lambda: self._normalize_and_transcribe(audio_data, format, language, model),
+                lambda batch_audio: self._transcribe_segments(batch_audio, language, model)
+            )
+        return await self._normalize_and_transcribe(audio_data, format, language, model)
+
+    async def _normalize_and_transcribe(
+        self,
+        audio_data: bytes,
+        format: str,
+        language: Optional[str],
+        model: str
+    ) -> str:
+        """Transcode the audio for upload, then transcribe it"""
+        # Whisper only needs 16 kHz mono; a compressed copy uploads and queues faster
+        if audio_transcoder.enabled:
+            transcoded = await audio_transcoder.normalize(audio_data, format)
+            audio_data, format = transcoded.audio_data, transcoded.format
+
+        return await self._transcribe_audio_data(audio_data, format, language, model)
+
+    async def _transcribe_segments(self, audio_data: bytes, language: Optional[str], model: str) -> list:
+        """Transcribe a batch WAV into timestamped segments with the current provider"""
+        provider = self.providers[self.current_provider]
+        formatted_language = self._format_language_for_provider(language, self.current_provider)
+        return await provider.transcribe_segments(audio_data, "wav", formatted_language, model)
+
+    async def _transcribe_audio_data(
+        self,
+        audio_data: bytes,
+        format: str,
+        language: Optional[str],
+        model: Optional[str] = None
+    ) -> str:
+        """Transcribe audio data with the current provider, falling back on failure"""
         # Try current provider first
         try:
             provider = self.providers[self.current_provider]
@@ -84,8 +198,8 @@ class STTProvider:
             # Convert language format if needed
             formatted_language = self._format_language_for_provider(language, self.current_provider)
             
-            result = await provider.transcribe_audio_data(audio_data, format, formatted_language)
-            print(f"✅ STT successful with {self.current_provider}: '{result[:50]}...'")
+            result = await provider.transcribe_audio_data(audio_data, format, formatted_language, model)
+            print(f"✅ STT successful with {self.current_provider} ({model}): '{result[:50]}...'")
             return result
             
         except Exception as e:
@@ -138,6 +252,20 @@ class STTProvider:
         # If all providers fail, return a helpful error message
         raise Exception("All STT providers failed. Please check your API keys and try again.")
     
+    def select_model(self, language: Optional[str] = None, accuracy: bool = False) -> WhisperSelection:
+        """
+        Choose the Whisper model for a transcription
+
+        Args:
+            language: Language code as given by the client (e.g. "en-US")
+            accuracy: Whether the client asked for the most accurate model
+
+        Returns:
+            Selected model and reason
+        """
+        formatted_language = self._format_language_for_provider(language, self.current_provider)
+        return whisper_router.select(formatted_language, accuracy)
+
     def _format_language_for_provider(self, language: Optional[str], provider_name: str) -> Optional[str]:
         """Format language code for Groq provider"""
         if not language:
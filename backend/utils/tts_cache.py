@@ -0,0 +1,137 @@
+"""
+Content-addressed cache for synthesized speech
+Serves repeated sentences (greetings, error prompts, repeated answers) from
+memory, then disk, before calling the TTS provider
+"""
+
+import os
+import re
+import asyncio
+import unicodedata
+from typing import Dict, Any, Optional
+import logging
+
+from utils.response_cache import ResponseCache
+from utils.disk_cache import DiskCache
+from utils.request_coalescer import fingerprint
+
+logger = logging.getLogger(__name__)
+
+def normalize_tts_text(text: str) -> str:
+    """
+    Canonicalize text without changing how it is spoken
+
+    Unicode is NFC-normalized and whitespace collapsed. Case and
+    punctuation are kept because they change prosody.
+    """
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text or "")).strip()
+
+def tts_cache_key(text: str, voice: str, rate: str, output_format: str, provider: str) -> str:
+    """
+    Hash synthesized text together with everything that changes the audio
+
+    Args:
+        text: Text to synthesize
+        voice: Resolved provider voice
+        rate: Speaking rate as sent to the provider
+        output_format: Audio encoding the provider returns
+        provider: TTS provider name
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    return fingerprint(normalize_tts_text(text), voice, rate, output_format, provider)
+
+class TTSCache:
+    """Two-tier audio cache: a byte-budgeted in-memory LRU backed by an optional disk tier"""
+
+    def __init__(self, memory: ResponseCache, disk: Optional[DiskCache] = None):
+        self.memory = memory
+        self.disk = disk
+
+        self.stats = {
+            'lookups': 0,
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'bytes_saved': 0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.memory.enabled
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """
+        Look up synthesized audio, promoting disk hits into memory
+
+        Args:
+            key: Cache key from tts_cache_key
+
+        Returns:
+            Cached audio, or None on miss
+        """
+        if not self.enabled:
+            return None
+        self.stats['lookups'] += 1
+
+        audio_data = self.memory.get(key)
+        if audio_data is not None:
+            self.stats['memory_hits'] += 1
+            self.stats['bytes_saved'] += len(audio_data)
+            return audio_data
+
+        if self.disk is not None and self.disk.enabled:
+            audio_data = await asyncio.to_thread(self.disk.get, key)
+            if audio_data is not None:
+                self.memory.set(key, audio_data)
+                self.stats['disk_hits'] += 1
+                self.stats['bytes_saved'] += len(audio_data)
+                return audio_data
+
+        self.stats['misses'] += 1
+        return None
+
+    async def set(self, key: str, audio_data: bytes):
+        """
+        Store synthesized audio in both tiers
+
+        Args:
+            key: Cache key from tts_cache_key
+            audio_data: Audio to cache
+        """
+        if not self.enabled or not audio_data:
+            return
+        self.memory.set(key, audio_data)
+        if self.disk is not None and self.disk.enabled:
+            await asyncio.to_thread(self.disk.set, key, audio_data)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit ratios and bytes served without synthesis"""
+        lookups = self.stats['lookups']
+        hits = self.stats['memory_hits'] + self.stats['disk_hits']
+        stats = self.stats.copy()
+        stats.update({
+            'enabled': self.enabled,
+            'hit_ratio': round(hits / lookups, 3) if lookups else 0.0,
+            'memory_hit_ratio': round(self.stats['memory_hits'] / lookups, 3) if lookups else 0.0,
+            'disk_hit_ratio': round(self.stats['disk_hits'] / lookups, 3) if lookups else 0.0,
+            'memory': self.memory.get_stats(),
+            'disk': self.disk.get_stats() if self.disk is not None else None
+        })
+        return stats
+
+# Global TTS audio cache; the disk tier is enabled by setting TTS_CACHE_DIR
+tts_cache = TTSCache(
+    memory=ResponseCache(
+        max_entries=int(os.getenv("TTS_CACHE_MAX_ENTRIES", "500")),
+        max_bytes=int(os.getenv("TTS_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+        ttl_seconds=float(os.getenv("TTS_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+        enabled=os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true"
+    ),
+    disk=DiskCache(
+        directory=os.getenv("TTS_CACHE_DIR", ""),
+        max_bytes=int(os.getenv("TTS_CACHE_DISK_MAX_BYTES", str(256 * 1024 * 1024))),
+        ttl_seconds=float(os.getenv("TTS_CACHE_DISK_TTL_SECONDS", str(30 * 24 * 3600)))
+    )
+)
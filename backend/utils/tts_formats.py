@@ -0,0 +1,128 @@
+"""
+TTS output formats and per-request negotiation
+Maps format names, MIME types and the speech service's output format IDs,
+and picks a format from an explicit request field or the Accept header
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+@dataclass(frozen=True)
+class TTSFormat:
+    """One encoding a TTS provider can return"""
+    name: str
+    mime_type: str
+    extension: str
+    container: str
+    codec: str
+    bitrate_kbps: int
+    sample_rate: int
+    service_format: str  # Speech service outputFormat ID
+
+    def filename(self, stem: str = "response") -> str:
+        return f"{stem}.{self.extension}"
+
+# Ordered from the most to the least widely playable
+TTS_FORMATS: Dict[str, TTSFormat] = {
+    fmt.name: fmt for fmt in (
+        TTSFormat("mp3", "audio/mpeg", "mp3", "mp3", "mp3", 48, 24000, "audio-24khz-48kbitrate-mono-mp3"),
+        TTSFormat("mp3-32k", "audio/mpeg", "mp3", "mp3", "mp3", 32, 16000, "audio-16khz-32kbitrate-mono-mp3"),
+        TTSFormat("opus-webm", "audio/webm", "webm", "webm", "opus", 24, 24000, "webm-24khz-16bit-24kbps-mono-opus"),
+        TTSFormat("opus-ogg", "audio/ogg", "ogg", "ogg", "opus", 24, 24000, "ogg-24khz-16bit-mono-opus")
+    )
+}
+
+class UnsupportedFormatError(ValueError):
+    """Requested audio format is unknown or the provider can't produce it"""
+
+def _parse_accept(accept: str) -> List[Tuple[str, Dict[str, str], float]]:
+    """Split an Accept header into (media range, parameters, q) sorted by preference"""
+    ranges = []
+    for position, item in enumerate(accept.split(",")):
+        parts = [part.strip() for part in item.split(";")]
+        if not parts[0]:
+            continue
+        params = {}
+        q = 1.0
+        for param in parts[1:]:
+            key, _, value = param.partition("=")
+            key, value = key.strip().lower(), value.strip().strip('"').lower()
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+            elif key:
+                params[key] = value
+        # Specific types beat wildcards at equal q, then header order
+        specificity = 0 if parts[0] == "*/*" else 1 if parts[0].endswith("/*") else 2
+        ranges.append((parts[0].lower(), params, q, -specificity, position))
+    ranges.sort(key=lambda r: (-r[2], r[3], r[4]))
+    return [(media_range, params, q) for media_range, params, q, _, _ in ranges]
+
+def _matches(fmt: TTSFormat, media_range: str, params: Dict[str, str]) -> bool:
+    if media_range == "*/*" or media_range == "audio/*":
+        return True
+    if media_range != fmt.mime_type:
+        return False
+    codecs = params.get("codecs")
+    return codecs is None or codecs == fmt.codec
+
+def negotiate_tts_format(
+    requested: Optional[str],
+    accept: Optional[str],
+    supported: List[str]
+) -> TTSFormat:
+    """
+    Choose the output format for one request
+
+    An explicit format name wins. Otherwise the Accept header's audio
+    media ranges are matched in preference order; headers without any
+    audio range (e.g. application/json) get the provider default.
+
+    Args:
+        requested: Format name from the request body, if any
+        accept: Accept header value
+        supported: Format names the provider can produce, default first
+
+    Returns:
+        The chosen format
+
+    Raises:
+        UnsupportedFormatError: If the request can't be satisfied
+    """
+    if requested:
+        if requested not in TTS_FORMATS:
+            raise UnsupportedFormatError(f"Unknown audio format '{requested}'. Known: {list(TTS_FORMATS)}")
+        if requested not in supported:
+            raise UnsupportedFormatError(f"Audio format '{requested}' not available. Available: {supported}")
+        return TTS_FORMATS[requested]
+
+    audio_ranges = [
+        (media_range, params, q) for media_range, params, q in _parse_accept(accept or "")
+        if media_range.startswith("audio/")
+    ]
+    if not audio_ranges:
+        return TTS_FORMATS[supported[0]]
+
+    for media_range, params, q in audio_ranges:
+        if q <= 0:
+            continue
+        for name in supported:
+            if _matches(TTS_FORMATS[name], media_range, params):
+                return TTS_FORMATS[name]
+    raise UnsupportedFormatError(
+        f"None of the accepted audio types can be produced. Available: "
+        f"{sorted({TTS_FORMATS[name].mime_type for name in supported})}"
+    )
+
+def prefers_raw_audio(accept: Optional[str]) -> bool:
+    """Whether the client ranks an audio type above JSON in its Accept header"""
+    for media_range, _, q in _parse_accept(accept or ""):
+        if q <= 0:
+            continue
+        if media_range.startswith("audio/"):
+            return True
+        if media_range in ("application/json", "*/*", "application/*"):
+            return False
+    return False
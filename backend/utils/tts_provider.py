@@ -2,8 +2,16 @@
 TTS Provider Manager - Switch between different TTS services
 """
 import os
-from typing import Optional
+import time
+from collections import deque
+from typing import Optional, AsyncIterator, Dict, Any
 from dotenv import load_dotenv
+from utils.request_coalescer import request_coalescer, fingerprint
+from utils.tts_cache import tts_cache, tts_cache_key
+from utils.parallel_tts import parallel_tts
+from utils.tts_formats import TTS_FORMATS, TTSFormat, negotiate_tts_format
+from utils.audio_processor import audio_processor
+from utils.audio_transcoder import audio_transcoder
 
 load_dotenv()
 
@@ -14,6 +22,19 @@ class TTSProviderManager:
         self.current_provider = os.getenv("TTS_PROVIDER", "edge").lower()
         self.providers = {}
         self._initialize_providers()
+
+        # Recent timings in ms: whole-clip synthesis, and first byte / total for streams
+        self._synthesis_ms = deque(maxlen=1000)
+        self._first_byte_ms = deque(maxlen=1000)
+        self._stream_total_ms = deque(maxlen=1000)
+        self.stats = {
+            'syntheses': 0,
+            'streams': 0,
+            'stream_errors': 0,
+            'stream_bytes': 0
+        }
+        # Bytes delivered and seconds of speech they carry, per output format
+        self.format_stats: Dict[str, Dict[str, float]] = {}
     
     def _initialize_providers(self):
         """Initialize available TTS providers (Edge TTS only)"""
@@ -52,11 +73,51 @@ class TTSProviderManager:
         """Get list of available TTS providers"""
         return list(self.providers.keys())
     
+    def resolve_voice(self, voice: Optional[str]) -> str:
+        """Voice the current provider will actually use for a requested voice"""
+        provider = self.get_current_provider()
+        if hasattr(provider, 'resolve_voice'):
+            return provider.resolve_voice(voice)
+        return voice or getattr(provider, 'default_voice', '')
+
+    def _native_formats(self) -> list:
+        """Output format names the current provider returns itself, default first"""
+        provider = self.get_current_provider()
+        return list(getattr(provider, 'output_formats', None) or [getattr(provider, 'output_format', 'mp3')])
+
+    def get_output_formats(self) -> list:
+        """
+        Output format names available for the current provider, default first
+
+        Formats the provider can't produce itself are added when ffmpeg is
+        available to re-encode its default output.
+        """
+        formats = self._native_formats()
+        formats.extend(name for name in TTS_FORMATS if name not in formats and audio_transcoder.can_encode(name))
+        return formats
+
+    def resolve_format(self, audio_format: Optional[str] = None, accept: Optional[str] = None) -> TTSFormat:
+        """
+        Pick the output format from a format name or an Accept header
+
+        Args:
+            audio_format: Explicit format name; the provider default if omitted
+            accept: Accept header, consulted when no name is given
+
+        Returns:
+            The format to synthesize
+
+        Raises:
+            UnsupportedFormatError: If the provider can't produce what was asked for
+        """
+        return negotiate_tts_format(audio_format, accept, self.get_output_formats())
+
     async def synthesize_speech(
         self,
         text: str,
         voice: Optional[str] = None,
         speed: float = 1.0,
+        audio_format: Optional[str] = None,
         **kwargs
     ) -> bytes:
         """
@@ -66,11 +127,229 @@ class TTSProviderManager:
             text: Text to convert to speech
             voice: Voice to use
             speed: Speech speed
+            audio_format: Output format name; the provider default if omitted
             **kwargs: Additional provider-specific arguments
             
         Returns:
             Audio data as bytes
         """
+        start = time.perf_counter()
+        fmt = self.resolve_format(audio_format)
+        if not kwargs and parallel_tts.should_split(text, fmt.container):
+            # Long text: sentence groups are synthesized concurrently and stitched in order
+            key = self._cache_key(text, voice, speed, fmt.name)
+            audio_data = await tts_cache.get(key)
+            if audio_data is None:
+                audio_data = await parallel_tts.synthesize(
+                    text,
+                    fmt.container,
+                    self.current_provider,
+                    lambda segment: self._synthesize_cached(segment, voice, speed, fmt.name)
+                )
+                await tts_cache.set(key, audio_data)
+        else:
+            audio_data = await self._synthesize_cached(text, voice, speed, fmt.name, **kwargs)
+        self.stats['syntheses'] += 1
+        self._synthesis_ms.append((time.perf_counter() - start) * 1000)
+        self._record_format(fmt, audio_data)
+        return audio_data
+
+    async def _synthesize_cached(
+        self,
+        text: str,
+        voice: Optional[str],
+        speed: float,
+        audio_format: str,
+        **kwargs
+    ) -> bytes:
+        """Synthesize one request through the audio cache and request coalescing"""
+        # Repeated sentences are served from the audio cache
+        key = self._cache_key(text, voice, speed, audio_format, **kwargs)
+        audio_data = await tts_cache.get(key)
+        if audio_data is None:
+            if audio_format in self._native_formats():
+                synthesize = lambda: self._synthesize_speech(text, voice, speed, audio_format=audio_format, **kwargs)
+            else:
+                synthesize = lambda: self._synthesize_transcoded(text, voice, speed, audio_format, **kwargs)
+            # Identical synthesis requests in flight at the same time share one result
+            audio_data = await request_coalescer.run("tts", key, synthesize)
+            await tts_cache.set(key, audio_data)
+        return audio_data
+
+    async def _synthesize_transcoded(
+        self,
+        text: str,
+        voice: Optional[str],
+        speed: float,
+        audio_format: str,
+        **kwargs
+    ) -> bytes:
+        """Synthesize in the provider's default format, then re-encode with ffmpeg"""
+        # The source audio is cached too, so the same text in another format skips the provider
+        source = await self._synthesize_cached(text, voice, speed, self._native_formats()[0], **kwargs)
+        return await self._encode(source, TTS_FORMATS[audio_format])
+
+    async def _encode(self, source: bytes, fmt: TTSFormat) -> bytes:
+        audio_data = await audio_transcoder.encode_speech(source, fmt.name, fmt.sample_rate)
+        if audio_data is None:
+            raise Exception(f"Re-encoding speech as {fmt.name} failed")
+        return audio_data
+
+    async def synthesize_uncached(
+        self,
+        text: str,
+        voice: Optional[str] = None,
+        speed: float = 1.0,
+        audio_format: Optional[str] = None
+    ) -> bytes:
+        """
+        Synthesize speech without the audio cache or delivery stats
+
+        For bulk jobs such as building the filler phrase bank, whose clips
+        would otherwise crowd the shared cache and skew per-format stats.
+
+        Args:
+            text: Text to convert to speech
+            voice: Voice to use
+            speed: Speech speed
+            audio_format: Output format name; the provider default if omitted
+
+        Returns:
+            Audio data as bytes
+        """
+        fmt = self.resolve_format(audio_format)
+        native = self._native_formats()
+        if fmt.name in native:
+            return await self._synthesize_speech(text, voice, speed, audio_format=fmt.name)
+        source = await self._synthesize_speech(text, voice, speed, audio_format=native[0])
+        return await self._encode(source, fmt)
+
+    def _record_format(self, fmt: TTSFormat, audio_data: bytes):
+        """Count delivered bytes against the seconds of speech read from the audio header"""
+        metadata = audio_processor.sniff_audio(audio_data, fmt.extension, record_stats=False)
+        stats = self.format_stats.setdefault(fmt.name, {'responses': 0, 'bytes': 0, 'speech_seconds': 0.0})
+        stats['responses'] += 1
+        stats['bytes'] += len(audio_data)
+        stats['speech_seconds'] += metadata.duration_seconds or 0.0
+
+    def _cache_key(
+        self,
+        text: str,
+        voice: Optional[str],
+        speed: float,
+        audio_format: Optional[str] = None,
+        **kwargs
+    ) -> str:
+        """Cache key from the voice, rate and format the provider will actually use"""
+        provider = self.get_current_provider()
+        voice = self.resolve_voice(voice)
+        if hasattr(provider, '_convert_speed_to_rate'):
+            rate = provider._convert_speed_to_rate(speed)
+        else:
+            rate = f"{float(speed):.2f}"
+        output_format = audio_format or self.get_output_formats()[0]
+        if kwargs:
+            output_format = f"{output_format}:{fingerprint(sorted(kwargs.items()))}"
+        return tts_cache_key(text, voice or "", rate, output_format, self.current_provider)
+
+    async def synthesize_stream(
+        self,
+        text: str,
+        voice: Optional[str] = None,
+        speed: float = 1.0,
+        audio_format: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Synthesize speech with the current provider, yielding audio as it arrives
+        
+        Long text is split into sentence groups synthesized concurrently;
+        each group's audio is yielded as soon as it and all earlier groups
+        are ready. Providers without a streaming API yield their whole
+        result as one chunk.
+        
+        Args:
+            text: Text to convert to speech
+            voice: Voice to use
+            speed: Speech speed
+            audio_format: Output format name; the provider default if omitted
+            
+        Yields:
+            Audio chunks in playback order
+        """
+        provider = self.get_current_provider()
+        fmt = self.resolve_format(audio_format)
+        self.stats['streams'] += 1
+        start = time.perf_counter()
+        first_byte = None
+        total_bytes = 0
+
+        key = self._cache_key(text, voice, speed, fmt.name)
+        cached = await tts_cache.get(key)
+        collected = [] if cached is None else None
+
+        try:
+            if cached is not None:
+                chunks = self._yield_cached(cached)
+            elif parallel_tts.should_split(text, fmt.container):
+                chunks = parallel_tts.synthesize_iter(
+                    text,
+                    fmt.container,
+                    self.current_provider,
+                    lambda segment: self._synthesize_cached(segment, voice, speed, fmt.name)
+                )
+            elif fmt.name not in self._native_formats():
+                # Re-encoded formats need the provider's whole output first
+                cached = await self._synthesize_cached(text, voice, speed, fmt.name)
+                collected = None
+                chunks = self._yield_cached(cached)
+            elif hasattr(provider, 'synthesize_stream'):
+                chunks = provider.synthesize_stream(text=text, voice=voice, speed=speed, audio_format=fmt.name)
+            else:
+                chunks = self._single_chunk(provider, text, voice, speed, fmt.name)
+            async for chunk in chunks:
+                if first_byte is None:
+                    first_byte = (time.perf_counter() - start) * 1000
+                    self._first_byte_ms.append(first_byte)
+                total_bytes += len(chunk)
+                if collected is not None:
+                    collected.append(chunk)
+                yield chunk
+            # Only a stream that ran to completion is worth caching
+            if collected:
+                audio_data = b"".join(collected)
+                await tts_cache.set(key, audio_data)
+                self._record_format(fmt, audio_data)
+            elif cached is not None:
+                self._record_format(fmt, cached)
+        except Exception:
+            self.stats['stream_errors'] += 1
+            raise
+        finally:
+            self.stats['stream_bytes'] += total_bytes
+            if first_byte is not None:
+                self._stream_total_ms.append((time.perf_counter() - start) * 1000)
+
+    async def _yield_cached(self, audio_data: bytes) -> AsyncIterator[bytes]:
+        yield audio_data
+
+    async def _single_chunk(
+        self,
+        provider,
+        text: str,
+        voice: Optional[str],
+        speed: float,
+        audio_format: str
+    ) -> AsyncIterator[bytes]:
+        yield await provider.synthesize_speech(text=text, voice=voice, speed=speed, audio_format=audio_format)
+
+    async def _synthesize_speech(
+        self,
+        text: str,
+        voice: Optional[str] = None,
+        speed: float = 1.0,
+        **kwargs
+    ) -> bytes:
+        """Synthesize speech with the current provider, falling back on failure"""
         provider = self.get_current_provider()
         
         try:
@@ -141,6 +420,7 @@ class TTSProviderManager:
         
         if hasattr(provider, 'get_model_info'):
             info.update(provider.get_model_info())
+        info["output_formats"] = self.get_output_formats()
         
         return info
     
@@ -151,31 +431,59 @@ class TTSProviderManager:
             return provider.validate_text_length(text)
         return len(text) <= 5000  # Default limit
 
-    async def synthesize_async(self, text: str, voice: Optional[str] = None, speed: float = 1.0) -> str:
+    async def synthesize_async(
+        self,
+        text: str,
+        voice: Optional[str] = None,
+        speed: float = 1.0,
+        audio_format: Optional[str] = None
+    ) -> str:
         """
         Async wrapper for synthesize_speech that returns base64 encoded audio
         """
         try:
             import base64
-            from utils.performance_optimizer import async_optimizer, memory_manager
-
-            # Use performance-optimized async execution
-            audio_bytes = await async_optimizer.run_in_thread(
-                self.synthesize_speech, text, voice, speed
-            )
-
-            # Cache audio for potential reuse
-            cache_key = f"tts_{hash(text)}_{voice}_{speed}"
-            memory_manager.cache_audio(cache_key, audio_bytes, {
-                'text': text[:100],  # Store first 100 chars for debugging
-                'voice': voice,
-                'speed': speed
-            })
 
+            # synthesize_speech is a coroutine; the audio cache handles reuse
+            audio_bytes = await self.synthesize_speech(text, voice, speed, audio_format)
             return base64.b64encode(audio_bytes).decode('utf-8')
         except Exception as e:
             raise Exception(f"TTS synthesis error: {str(e)}")
 
+    @staticmethod
+    def _summarize(samples: deque) -> Dict[str, float]:
+        ordered = sorted(samples)
+        if not ordered:
+            return {'avg': 0.0, 'p50': 0.0, 'p95': 0.0}
+        return {
+            'avg': round(sum(ordered) / len(ordered), 1),
+            'p50': round(ordered[len(ordered) // 2], 1),
+            'p95': round(ordered[int(len(ordered) * 0.95)], 1)
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get synthesis timing statistics, with time to first audio byte reported separately"""
+        stats = self.stats.copy()
+        stats.update({
+            'provider': self.current_provider,
+            'synthesis_ms': self._summarize(self._synthesis_ms),
+            'stream_first_byte_ms': self._summarize(self._first_byte_ms),
+            'stream_total_ms': self._summarize(self._stream_total_ms),
+            'formats': {
+                name: {
+                    'responses': entry['responses'],
+                    'bytes': entry['bytes'],
+                    'speech_seconds': round(entry['speech_seconds'], 1),
+                    'bytes_per_second': (
+                        round(entry['bytes'] / entry['speech_seconds']) if entry['speech_seconds'] else None
+                    ),
+                    'nominal_bytes_per_second': TTS_FORMATS[name].bitrate_kbps * 1000 // 8
+                }
+                for name, entry in self.format_stats.items()
+            }
+        })
+        return stats
+
     async def get_available_voices_async(self) -> dict:
         """
         Async wrapper for get_available_voices
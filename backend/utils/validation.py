@@ -30,6 +30,7 @@ ALLOWED_VOICES = [
 SAFE_TEXT_PATTERN = re.compile(r'^[a-zA-Z0-9\s\.,\?!\-\'\"\(\)\[\]\{\}:;@#$%&*+=<>/\\|`~_\n\r\t]*$')
 FILENAME_PATTERN = re.compile(r'^[a-zA-Z0-9\-_\.\s]+$')
 LANGUAGE_PATTERN = re.compile(r'^[a-z]{2}(-[A-Z]{2})?$')
+CONVERSATION_ID_PATTERN = re.compile(r'^[a-f0-9]{32}$')
 
 class SecurityError(Exception):
     """Custom exception for security-related validation errors"""
@@ -251,6 +252,32 @@ def validate_conversation_history(history: Optional[List[Dict[str, str]]]) -> Op
     
     return validated_history
 
+def validate_conversation_id(conversation_id: Optional[str]) -> Optional[str]:
+    """
+    Validate a server-issued conversation id
+
+    Args:
+        conversation_id: Conversation identifier
+
+    Returns:
+        Validated conversation id or None
+
+    Raises:
+        SecurityError: If the id is malformed
+    """
+    if conversation_id is None:
+        return None
+
+    if not isinstance(conversation_id, str):
+        raise SecurityError("Conversation id must be a string")
+
+    conversation_id = conversation_id.strip().lower()
+
+    if not CONVERSATION_ID_PATTERN.match(conversation_id):
+        raise SecurityError("Invalid conversation id format")
+
+    return conversation_id
+
 # Custom exception handler for validation errors
 def handle_validation_error(error: Exception) -> HTTPException:
     """
@@ -0,0 +1,173 @@
+"""
+Language-aware Whisper model selection
+Picks a Whisper model per request from the language hint, the requested
+accuracy and live latency measurements
+"""
+
+import os
+import time
+import threading
+from dataclasses import dataclass
+from typing import Dict, Any, Optional
+import logging
+
+from utils.groq_client import groq_client
+from utils.model_router import LatencyProfile
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class WhisperSelection:
+    """Whisper model chosen for one transcription and why"""
+    model: str
+    reason: str
+
+    def to_headers(self) -> Dict[str, str]:
+        """Response headers exposing the selected model"""
+        return {"X-STT-Model": self.model, "X-STT-Model-Route": self.reason}
+
+class WhisperRouter:
+    """
+    Route transcriptions between the turbo, standard and distil Whisper models
+
+    English goes to the English-only distil model, other or unknown
+    languages to turbo, and requests asking for accuracy to standard. A
+    preferred model is skipped while it is failing, and distil is skipped
+    while it measures clearly slower than turbo.
+    """
+
+    def __init__(
+        self,
+        models: Dict[str, str],
+        latency_tolerance: float = 1.25,
+        min_samples: int = 5,
+        max_error_rate: float = 0.5,
+        failure_threshold: int = 3,
+        cooldown_seconds: float = 30.0,
+        alpha: float = 0.2
+    ):
+        self.models = dict(models)
+        self.latency_tolerance = latency_tolerance
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+
+        self._lock = threading.Lock()
+        self.profiles: Dict[str, LatencyProfile] = {
+            model: LatencyProfile(alpha=alpha) for model in self.models.values()
+        }
+        self.stats = {
+            'selections': 0,
+            'by_model': {model: 0 for model in self.models.values()},
+            'by_reason': {}
+        }
+
+    def is_healthy(self, model: str) -> bool:
+        """Check whether a Whisper model should receive traffic"""
+        profile = self.profiles.get(model)
+        if profile is None:
+            return True
+        failing = (
+            profile.error_rate > self.max_error_rate or
+            profile.consecutive_failures >= self.failure_threshold
+        )
+        return not failing or time.time() - profile.last_failure > self.cooldown_seconds
+
+    def _slower(self, model: str, baseline: str) -> bool:
+        """Whether model measures clearly slower than baseline"""
+        profile, reference = self.profiles.get(model), self.profiles.get(baseline)
+        if profile is None or reference is None:
+            return False
+        if profile.samples < self.min_samples or reference.samples < self.min_samples:
+            return False
+        return profile.latency_ms > reference.latency_ms * self.latency_tolerance
+
+    def select(self, language: Optional[str] = None, accuracy: bool = False) -> WhisperSelection:
+        """
+        Choose the Whisper model for a transcription
+
+        Args:
+            language: Language hint as sent to Whisper (e.g. "en"), or None to auto-detect
+            accuracy: Whether the client asked for the most accurate model
+
+        Returns:
+            Selected model and reason
+        """
+        turbo = self.models["turbo"]
+        standard = self.models.get("standard", turbo)
+        distil = self.models.get("distil")
+
+        with self._lock:
+            if accuracy:
+                model, reason = standard, "accuracy"
+            elif language and language.lower() == "en" and distil:
+                if self._slower(distil, turbo):
+                    model, reason = turbo, "latency"
+                else:
+                    model, reason = distil, "english"
+            else:
+                model, reason = turbo, "multilingual"
+
+            if not self.is_healthy(model):
+                # Turbo handles every language; standard is the last resort
+                fallback = next(
+                    (candidate for candidate in (turbo, standard) if candidate != model and self.is_healthy(candidate)),
+                    None
+                )
+                if fallback is not None:
+                    model, reason = fallback, "failover"
+
+            self.stats['selections'] += 1
+            self.stats['by_model'][model] = self.stats['by_model'].get(model, 0) + 1
+            self.stats['by_reason'][reason] = self.stats['by_reason'].get(reason, 0) + 1
+
+        return WhisperSelection(model, reason)
+
+    def record_success(self, model: str, latency_ms: float):
+        """Record a completed transcription"""
+        with self._lock:
+            if model in self.profiles:
+                self.profiles[model].record_success(latency_ms, latency_ms)
+
+    def record_failure(self, model: str):
+        """Record a failed transcription"""
+        with self._lock:
+            if model in self.profiles:
+                self.profiles[model].record_failure()
+                if self.profiles[model].consecutive_failures == self.failure_threshold:
+                    logger.warning(f"Whisper model {model} marked unhealthy after repeated failures")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get selection statistics and per-model latency profiles"""
+        with self._lock:
+            return {
+                'selections': self.stats['selections'],
+                'by_model': dict(self.stats['by_model']),
+                'by_reason': dict(self.stats['by_reason']),
+                'models': {
+                    model: dict(
+                        latency_ms=round(profile.latency_ms, 1),
+                        error_rate=round(profile.error_rate, 3),
+                        samples=profile.samples,
+                        errors=profile.errors,
+                        healthy=self.is_healthy(model)
+                    )
+                    for model, profile in self.profiles.items()
+                }
+            }
+
+# Fallback when the Groq client failed to initialize
+DEFAULT_WHISPER_MODELS = {
+    "turbo": "whisper-large-v3-turbo",
+    "standard": "whisper-large-v3",
+    "distil": "distil-whisper-large-v3-en"
+}
+
+# Global Whisper model router
+whisper_router = WhisperRouter(
+    models=groq_client.whisper_models if groq_client is not None else DEFAULT_WHISPER_MODELS,
+    latency_tolerance=float(os.getenv("STT_ROUTER_LATENCY_TOLERANCE", "1.25")),
+    max_error_rate=float(os.getenv("STT_ROUTER_MAX_ERROR_RATE", "0.5")),
+    cooldown_seconds=float(os.getenv("STT_ROUTER_COOLDOWN_SECONDS", "30"))
+)
@@ -330,6 +330,7 @@ async def get(message: str = "", response_id: str = ""):
             # Generate TTS if needed (using male voice)
             tts_result = await api_client.synthesize_speech(decoded_response, voice="en-US-GuyNeural")
             audio_data = tts_result['data'].get('audio_data') if tts_result['success'] else None
+            mime_type = (tts_result['data'].get('mime_type') or "audio/mpeg") if tts_result['success'] else None
 
             return Div(
                 Div(
@@ -341,7 +342,7 @@ async def get(message: str = "", response_id: str = ""):
                 Div(
                     # Audio player if TTS was successful
                     Audio(
-                        Source(src=f"data:audio/wav;base64,{audio_data}", type="audio/wav"),
+                        Source(src=f"data:{mime_type};base64,{audio_data}", type=mime_type),
                         controls=True,
                         autoplay=True,
                         style="width: 100%; margin-top: 0.5rem;"
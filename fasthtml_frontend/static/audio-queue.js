@@ -26,10 +26,11 @@ class AudioQueueManager {
     /**
      * Add audio chunk to the queue for sequential playback
      */
-    addChunk(audioData, text, responseId, chunkIndex = 0) {
+    addChunk(audioData, text, responseId, chunkIndex = 0, mimeType = 'audio/mpeg') {
         const chunk = {
             id: `${responseId}_${chunkIndex}`,
             audioData: audioData,
+            mimeType: mimeType,
             text: text,
             responseId: responseId,
             chunkIndex: chunkIndex,
@@ -72,7 +73,7 @@ class AudioQueueManager {
         try {
             // Create audio element
             const audio = new Audio();
-            audio.src = `data:audio/wav;base64,${chunk.audioData}`;
+            audio.src = `data:${chunk.mimeType};base64,${chunk.audioData}`;
             audio.volume = 0.8;
             
             // Store audio element for potential cleanup